@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+
+class AmixerSession:
+    """
+    Persistent "amixer -s" process of a soundcard: mixer commands are written to amixer
+    standard input and their output is read back, so no process is created per command.
+
+    Amixer stdin mode only accepts sset and cset commands. Command output has no end
+    marker, so caller gives expected number of lines (known from controls listing).
+    Process is started on first command and started again if it fails (killed, stalled,
+    unexpected output).
+    """
+
+    # amixer output is block buffered when writing to a pipe
+    COMMAND = ["stdbuf", "-oL", "amixer", "-s"]
+    TIMEOUT = 0.5
+
+    def __init__(self, card_id, timeout=TIMEOUT, command=None):
+        """
+        Constructor
+
+        Args:
+            card_id (int): alsa card index
+            timeout (float): command output timeout (seconds)
+            command (list): session command line (default COMMAND with card option)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.card_id = card_id
+        self.timeout = timeout
+        self.command = command or self.COMMAND + ["-c", str(card_id)]
+        self.__process = None
+        self.__buffer = b""
+        self.__lock = threading.Lock()
+
+    def is_running(self):
+        """
+        Return True if amixer process is running
+
+        Returns:
+            bool: True if running
+        """
+        process = self.__process
+        return process is not None and process.poll() is None
+
+    def close(self):
+        """
+        Stop amixer process
+        """
+        with self.__lock:
+            self._stop()
+
+    def _start(self):
+        """
+        Launch amixer process. Must be called with lock acquired
+
+        Raises:
+            OSError: if process can't be launched
+        """
+        self.logger.debug("Start mixer session: %s", self.command)
+        self.__buffer = b""
+        self.__process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _stop(self):
+        """
+        Stop amixer process. Must be called with lock acquired
+        """
+        process = self.__process
+        self.__process = None
+        if process is None:
+            return
+
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def _read_lines(self, count):
+        """
+        Read output lines. Must be called with lock acquired
+
+        Args:
+            count (int): number of lines to read
+
+        Returns:
+            list: lines or None if output is not received before timeout
+        """
+        fd = self.__process.stdout.fileno()
+        deadline = time.monotonic() + self.timeout
+        while self.__buffer.count(b"\n") < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            self.__buffer += chunk
+
+        lines = self.__buffer.split(b"\n")
+        self.__buffer = b"\n".join(lines[count:])
+        return [line.decode("utf-8", errors="replace") for line in lines[:count]]
+
+    def _execute(self, commands):
+        """
+        Write all commands at once then read their outputs. Must be called with lock
+        acquired
+
+        Args:
+            commands (list): list of (numid, raw, lines) tuples
+
+        Returns:
+            list: output lines of each command or None if a command failed
+        """
+        if not self.is_running():
+            self._stop()
+            self._start()
+        batch = "".join(f"cset numid={numid} {raw}\n" for numid, raw, _ in commands)
+        try:
+            self.__process.stdin.write(batch.encode("utf-8"))
+            self.__process.stdin.flush()
+        except OSError:
+            return None
+        output = self._read_lines(sum(lines for _, _, lines in commands))
+        if output is None:
+            return None
+
+        outputs = []
+        for numid, _, lines in commands:
+            if not output[0].startswith(f"numid={numid},"):
+                return None
+            outputs.append(output[:lines])
+            output = output[lines:]
+        return outputs
+
+    def execute(self, commands):
+        """
+        Write several controls values in a single round trip
+
+        Args:
+            commands (list): list of (numid, raw, lines) tuples::
+
+                [
+                    (
+                        numid (int): control numid,
+                        raw (str): raw values as accepted by amixer (ie "20,20"),
+                        lines (int): number of lines of control output,
+                    ),
+                    ...
+                ]
+
+        Returns:
+            list: output lines of each command (same as "amixer cset" output) or None if
+                session failed twice
+        """
+        with self.__lock:
+            for _ in range(2):
+                try:
+                    outputs = self._execute(commands)
+                except OSError as error:
+                    self.logger.warning("Unable to start mixer session: %s", error)
+                    return None
+                if outputs is not None:
+                    return outputs
+                self.logger.warning("Mixer session failed on %s, restart it", commands)
+                self._stop()
+
+        return None
+
+    def cset(self, numid, raw, lines):
+        """
+        Write control values
+
+        Args:
+            numid (int): control numid
+            raw (str): raw values as accepted by amixer (ie "20,20")
+            lines (int): number of lines of control output
+
+        Returns:
+            list: control output lines (same as "amixer cset" output) or None if session
+                failed twice
+        """
+        outputs = self.execute([(numid, raw, lines)])
+        return outputs[0] if outputs else None
@@ -1,16 +1,29 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import time
 import os
+import threading
 from cleep.core import CleepResources
 from cleep.exception import CommandError, InvalidParameter
 from cleep.libs.commands.alsa import Alsa
 from cleep.libs.configs.etcasoundconf import EtcAsoundConf
 from cleep.libs.drivers.driver import Driver
+from cleep.libs.internals.task import Task
 import cleep.libs.internals.tools as Tools
-from .bcm2835audiodriver import Bcm2835AudioDriver
-from .usbaudiodriver import UsbAudioDriver
+from .audiojobs import AudioJob, AudioJobs
+from .audiomixer import AppGains, AudioDucker, AudioMixer
+from .audioqueue import AudioQueue
+from .audioscheduler import AudioScheduler, AudioPriority
+from .audiosource import get_source
+from .audiostream import AudioStream
+from .cardwatcher import CardWatcher
+from .configversions import ConfigVersions
+from .driverregistry import DriverRegistry
+from .idlemanager import OutputIdleManager
+from .levelmeter import LevelMeterStream
+from .pcmbuffer import PcmBuffer
+from .pcmstream import PcmCapture, PcmPlayback
+from .volumemonitor import VolumeMonitor
 
 __all__ = ["Audio"]
 
@@ -35,9 +48,40 @@ class Audio(CleepResources):
     MODULE_URLSITE = None
 
     MODULE_CONFIG_FILE = "audio.conf"
-    DEFAULT_CONFIG = {"driver": None}
+    DEFAULT_CONFIG = {
+        "driver": None,
+        "route": "jack",
+        "ducking": {"attack": 0.05, "release": 0.5, "gain": -12.0},
+        "idle_timeout": 30.0,
+        "app_volumes": {},
+    }
+
+    # output routes of raspberry pi soundcard
+    OUTPUT_ROUTES = ("auto", "jack", "hdmi")
 
     TEST_SOUND = "connected.wav"
+    CARDS_WATCH_INTERVAL = 2.0
+    # level meter does not need fidelity, capture is resampled by alsa to keep cpu low
+    LEVEL_METER_RATE = 16000
+    LEVEL_METER_MAX_DURATION = 60.0
+    # software mixer format
+    MIXER_RATE = 44100
+    MIXER_CHANNELS = 2
+    # sounds queue decoder only handles wav files
+    QUEUE_EXTENSION = ".wav"
+    # level meter gives way to any other capture (test recording...)
+    LEVEL_METER_PRIORITY = AudioPriority.MUSIC
+    # priority of test jobs in audio scheduler
+    JOB_PRIORITIES = {
+        "playing": AudioPriority.NOTIFICATION,
+        "recording": AudioPriority.VOICE,
+    }
+    # test recording is kept in memory (160kB for 5 seconds)
+    RECORD_RATE = 16000
+    RECORD_DURATION = 5.0
+    RECORD_CHUNK_FRAMES = 1600
+    # max time to acquire resource of a job, job fails after it
+    RESOURCE_TIMEOUT = 10.0
 
     MODULE_RESOURCES = {
         "audio.playback": {
@@ -62,17 +106,83 @@ class Audio(CleepResources):
         # members
         self.alsa = Alsa(self.cleep_filesystem)
         self.asoundconf = EtcAsoundConf(self.cleep_filesystem)
-        self.bcm2835_driver = Bcm2835AudioDriver()
-        self.usb_driver = UsbAudioDriver()
+        self.driver_registry = DriverRegistry()
+        self.card_watcher = CardWatcher(self._on_cards_changed)
+        self.card_watcher_task = None
+        self.volume_monitor = VolumeMonitor(self._on_volumes_changed)
+        # last volumes sent to clients
+        self.volumes = None
+        self.config_versions = ConfigVersions()
+        # module config must be probed again (devices changed...)
+        self.config_dirty = True
+        self.level_meter = None
+        self.level_meter_grant = None
+        self.level_meter_lock = threading.Lock()
+        self.jobs = AudioJobs(self._on_job_update)
+        # jobs waiting for their resource, by resource name
+        self.pending_jobs = {}
+        # scheduler grants of jobs, by resource name
+        self.job_grants = {}
+        # resource acquisition timers of pending jobs, by resource name
+        self.job_timers = {}
+        # pcm streams of running jobs (interrupted on preemption), by resource name
+        self.job_streams = {}
+        self.jobs_lock = threading.Lock()
+        # Cleep resources held for scheduler grants: acquired flag by resource name
+        self.cleep_resources = {}
+        self.resources_lock = threading.RLock()
+        self.scheduler = AudioScheduler(
+            self._on_grant_update, self._sync_cleep_resource
+        )
+        self.ducker = AudioDucker(self.MIXER_RATE)
+        self.app_gains = AppGains(self._get_grant_owner)
+        self.mixer = AudioMixer(self.MIXER_CHANNELS, self.ducker, self.app_gains)
+        self.idle_manager = OutputIdleManager(self._create_playback)
+        self.queue = AudioQueue(
+            self.MIXER_RATE,
+            self.MIXER_CHANNELS,
+            self.idle_manager.get_output,
+            mixer=self.mixer,
+            on_start=self._on_queue_start,
+            on_idle=self._on_queue_idle,
+        )
+        self.queue_grant = None
+        self.stream = None
+
+        # events
+        self.level_update_event = self._get_event("audio.level.update")
+        self.job_update_event = self._get_event("audio.job.update")
+        self.resource_update_event = self._get_event("audio.resource.update")
+        self.volume_changed_event = self._get_event("audio.volume.changed")
+
+        # register audio drivers that apply to current hardware
+        self._register_drivers()
+
+    def _register_drivers(self, cards=None):
+        """
+        Register drivers that apply to current hardware and are not registered yet.
+        Configured driver is always registered
 
-        # register default audio drivers
-        self._register_driver(self.bcm2835_driver)
-        self._register_driver(self.usb_driver)
+        Args:
+            cards (str): current soundcards (read if not specified)
+        """
+        configured_driver_name = self._get_config_field("driver")
+        required = [configured_driver_name] if configured_driver_name else []
+        for driver in self.driver_registry.discover(cards, required):
+            self.logger.info('Register audio driver "%s"', driver.name)
+            self._register_driver(driver)
 
     def _configure(self):
         """
         Module configuration
         """
+        # restore ducking
+        ducking = self._get_config_field("ducking")
+        self.ducker.configure(ducking["attack"], ducking["release"], ducking["gain"])
+        self.idle_manager.idle_timeout = self._get_config_field("idle_timeout")
+        for owner, volume in self._get_config_field("app_volumes").items():
+            self.app_gains.set_gain(owner, volume / 100.0)
+
         # restore selected soundcard
         selected_driver_name = self._get_config_field("driver")
         self.logger.trace(
@@ -83,8 +193,8 @@ class Audio(CleepResources):
         if not selected_driver_name and Tools.raspberry_pi_infos()["audio"]:
             # set default sound driver to raspberry pi embedded one
             self.logger.trace("Set default sound driver")
-            selected_driver_name = self.bcm2835_driver.name
-            self._set_config_field("driver", self.bcm2835_driver.name)
+            selected_driver_name = DriverRegistry.DEFAULT_DRIVER
+            self._set_config_field("driver", DriverRegistry.DEFAULT_DRIVER)
 
         if selected_driver_name is None:
             # still no selected driver name, it means audio is not supported on this board
@@ -100,25 +210,90 @@ class Audio(CleepResources):
             self.logger.warning(
                 "Configured audio driver is not loaded, fallback to default one."
             )
-            self._set_config_field("driver", self.bcm2835_driver.name)
+            self._set_config_field("driver", DriverRegistry.DEFAULT_DRIVER)
             driver = self.drivers.get_driver(
-                Driver.DRIVER_AUDIO, self.bcm2835_driver.name
+                Driver.DRIVER_AUDIO, DriverRegistry.DEFAULT_DRIVER
             )
 
         # enable driver if possible
         if not driver:
             self.logger.info("No audio driver found while it should be")
             return
+        route = self._get_config_field("route")
         if not driver.is_installed():
             self.logger.error(
                 "Unable to enable soundcard because it is not properly installed. Please reinstall it."
             )
         elif not driver.is_enabled():
             self.logger.info('Enabling audio driver "%s"', driver.name)
+            if self._driver_has_routes(driver):
+                # persisted route is applied during enable
+                driver.output_route = route
             if not driver.enable():
                 self.logger.error("Unable to enable audio. Internal driver error.")
         else:
             self.logger.debug("Audio driver seems to be already configured")
+            if self._driver_has_routes(driver) and not driver.set_output_route(route):
+                self.logger.warning('Unable to restore output route "%s"', route)
+
+    def _driver_has_routes(self, driver):
+        """
+        Check if driver supports output routing
+
+        Args:
+            driver (AudioDriver): audio driver
+
+        Returns:
+            bool: True if driver supports output routing
+        """
+        return isinstance(getattr(driver, "OUTPUT_ROUTES", None), dict)
+
+    def _on_start(self):
+        """
+        Module started
+        """
+        # watch soundcards hotplug
+        self.card_watcher.check()
+        self.card_watcher_task = Task(
+            self.CARDS_WATCH_INTERVAL, self.card_watcher.check, self.logger
+        )
+        self.card_watcher_task.start()
+
+        # watch volumes changed by other apps or hardware buttons
+        try:
+            self.volume_monitor.start()
+        except Exception:
+            self.logger.warning("Volume changes can't be monitored")
+
+    def _on_stop(self):
+        """
+        Module stopped
+        """
+        if self.card_watcher_task:
+            self.card_watcher_task.stop()
+        self.volume_monitor.stop()
+        if self.level_meter:
+            self.level_meter.stop()
+        self.queue.clear()
+        if self.stream:
+            self.stream.stop()
+        self.idle_manager.suspend()
+
+    def _on_cards_changed(self, cards):
+        """
+        Soundcards changed (hotplug). Invalidate drivers cached card data
+
+        Args:
+            cards (str): current soundcards
+        """
+        self.logger.info("Soundcards changed")
+        self._register_drivers(cards)
+        for driver in self.drivers.get_drivers(Driver.DRIVER_AUDIO).values():
+            if hasattr(driver, "on_cards_changed"):
+                driver.on_cards_changed()
+        # opened output may target removed card
+        self.idle_manager.suspend()
+        self.config_dirty = True
 
     def get_module_config(self):
         """
@@ -130,6 +305,12 @@ class Audio(CleepResources):
                 {
                     volumes (dict): volumes values (playback and capture)
                     devices (dict): audio devices installed on device (playback and capture)
+                    route (str): current output route (None if not supported)
+                    routes (list): output routes supported by current device
+                    ducking (dict): ducking configuration (attack, release and gain)
+                    idle_timeout (float): time before closing unused output (seconds)
+                    app_volumes (dict): software volume by application (only reduced ones)
+                    version (int): config version (see get_module_config_changes)
                 }
 
         """
@@ -139,6 +320,8 @@ class Audio(CleepResources):
             "playback": None,
             "capture": None,
         }
+        route = None
+        routes = []
 
         audio_drivers = self.drivers.get_drivers(Driver.DRIVER_AUDIO)
         for driver_name, driver in audio_drivers.items():
@@ -157,6 +340,10 @@ class Audio(CleepResources):
                     captures.append(device)
                 if device["enabled"] and device["installed"]:
                     volumes = driver.get_volumes()
+                    self.volumes = volumes
+                    if self._driver_has_routes(driver):
+                        route = driver.get_output_route()
+                        routes = list(driver.OUTPUT_ROUTES.keys())
             except Exception as error:
                 # problem with driver, unregister it
                 self.logger.warning(
@@ -166,12 +353,60 @@ class Audio(CleepResources):
                 )
                 self.drivers.unregister(driver)
 
-        return {
+        config = {
             "devices": {
                 "playback": sorted(playbacks, key=lambda k: k["label"]),
                 "capture": sorted(captures, key=lambda k: k["label"]),
             },
             "volumes": volumes,
+            "route": route,
+            "routes": routes,
+            "ducking": self._get_config_field("ducking"),
+            "idle_timeout": self._get_config_field("idle_timeout"),
+            "app_volumes": self._get_config_field("app_volumes"),
+        }
+        self.config_dirty = False
+        config["version"] = self.config_versions.update(config)
+
+        return config
+
+    def get_module_config_changes(self, since_version=0):
+        """
+        Return module config sections changed since specified version. Devices are probed
+        again only if they may have changed (hotplug, configuration update)
+
+        Args:
+            since_version (int): config version known by client (0 for whole config)
+
+        Returns:
+            dict: config changes::
+
+                {
+                    version (int): current config version
+                    changes (dict): changed sections (see get_module_config)
+                }
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "since_version",
+                    "type": int,
+                    "value": since_version,
+                    "validator": lambda val: val >= 0,
+                    "message": 'Parameter "since_version" must be positive',
+                },
+            ]
+        )
+
+        if self.config_dirty:
+            self.get_module_config()
+
+        return {
+            "version": self.config_versions.version,
+            "changes": self.config_versions.get_changes(since_version),
         }
 
     def select_device(self, driver_name):
@@ -241,6 +476,7 @@ class Audio(CleepResources):
 
         # everything is fine, save new driver
         self._set_config_field("driver", new_driver.name)
+        self.config_dirty = True
 
         # restart cleep
         self.send_command("restart_cleep", "system")
@@ -306,73 +542,1107 @@ class Audio(CleepResources):
             self.logger.warning('Driver "%s" not found', selected_driver_name)
             return volumes
 
-        # set volumes
-        driver.set_volumes(playback, capture)
+        # set volumes, driver returns values confirmed by mixer
+        volumes = driver.set_volumes(playback, capture)
+        self._update_volumes(volumes)
 
-        return driver.get_volumes()
+        return volumes
 
-    def test_playing(self):
+    def get_channel_volumes(self):
+        """
+        Return volume of each channel (left, right...) of selected device
+
+        Returns:
+            dict: channels volumes::
+
+                {
+                    playback (list): playback volume of each channel (None if not supported)
+                    capture (list): capture volume of each channel (None if not supported)
+                }
+
+        Raises:
+            CommandError: if selected device does not support per-channel volume
         """
-        Play test sound to make sure audio card is correctly configured
+        return self._get_channel_driver().get_channel_volumes()
+
+    def set_channel_volumes(self, playback, capture):
         """
-        # request playback resource
-        self._need_resource("audio.playback")
+        Set volume of each channel (ie stereo balance). Number of values must match number
+        of channels of device control
 
-    def test_recording(self):
+        Args:
+            playback (list): playback volume percentage of each channel (None to keep it)
+            capture (list): capture volume percentage of each channel (None to keep it)
+
+        Returns:
+            dict: channels volumes confirmed by mixer (see get_channel_volumes)
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+            CommandError: if selected device does not support per-channel volume
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "playback",
+                    "type": list,
+                    "value": playback,
+                    "none": True,
+                    "validator": lambda val: self._is_channel_volumes(val),
+                    "message": 'Parameter "playback" must be a list of 0<=volume<=100',
+                },
+                {
+                    "name": "capture",
+                    "type": list,
+                    "value": capture,
+                    "none": True,
+                    "validator": lambda val: self._is_channel_volumes(val),
+                    "message": 'Parameter "capture" must be a list of 0<=volume<=100',
+                },
+            ]
+        )
+        driver = self._get_channel_driver()
+
+        self.logger.info(
+            "Set channel volumes to: playback%s capture%s", playback, capture
+        )
+        try:
+            channels = driver.set_channel_volumes(playback, capture)
+        except Exception as error:
+            raise CommandError(str(error)) from error
+        self._update_volumes(
+            {
+                key: max(volumes) if volumes else None
+                for key, volumes in channels.items()
+            }
+        )
+
+        return channels
+
+    @staticmethod
+    def _is_channel_volumes(volumes):
         """
-        Record sound during few seconds and play it
+        Return True if volumes is a list of channel volume percentages (bool is an int
+        subclass, it is rejected)
         """
-        # request capture resource (non blocking)
-        self._need_resource("audio.capture")
+        return len(volumes) > 0 and all(
+            not isinstance(volume, bool)
+            and isinstance(volume, int)
+            and 0 <= volume <= 100
+            for volume in volumes
+        )
 
-        # pause to simulate 5 seconds recording
-        time.sleep(5.0)
+    def _get_channel_driver(self):
+        """
+        Return selected driver if it supports per-channel volume
 
-    def _resource_acquired(self, resource_name):
+        Returns:
+            AudioDriver: selected driver
+
+        Raises:
+            CommandError: if no driver is selected or driver does not support it
+        """
+        driver = self._get_selected_driver()
+        if not driver or not hasattr(driver, "set_channel_volumes"):
+            raise CommandError("Selected device does not support per-channel volume")
+        return driver
+
+    def _on_volumes_changed(self, controls):
         """
-        Function called when resource is acquired
+        Mixer controls values changed (by this app, another one or hardware buttons)
 
         Args:
-            resource_name (string): acquired resource name
+            controls (list): changed controls (see VolumeMonitor.parse_event)
+        """
+        self.logger.debug("Mixer controls changed: %s", controls)
+        driver = self._get_selected_driver()
+        if not driver or not driver.is_enabled():
+            return
+        self._update_volumes(driver.get_volumes())
+
+    def _update_volumes(self, volumes):
+        """
+        Send volumes to clients if they changed since last update
+
+        Args:
+            volumes (dict): current volumes (playback and capture)
+        """
+        if volumes == self.volumes:
+            return
+        self.volumes = volumes
+        self.config_versions.set("volumes", volumes)
+        self.volume_changed_event.send(params=volumes, render=False)
+
+    def set_output_route(self, route):
+        """
+        Set audio output route of current device (auto, jack or hdmi)
+
+        Args:
+            route (str): output route
+
+        Returns:
+            bool: True if route applied
 
         Raises:
-            CommandError: if command failed
+            InvalidParameter: if parameter is invalid
+            CommandError: if current device does not support output routing or command failed
         """
-        self.logger.debug('Resource "%s" acquired', resource_name)
-        if resource_name == "audio.playback":
-            # play test sample
+        self._check_parameters(
+            [
+                {
+                    "name": "route",
+                    "type": str,
+                    "value": route,
+                    "validator": lambda val: val in self.OUTPUT_ROUTES,
+                    "message": f'Output route "{route}" is not supported',
+                },
+            ]
+        )
+
+        driver = self._get_selected_driver()
+        if not driver or not self._driver_has_routes(driver):
+            raise CommandError("Current audio device does not support output routing")
+        if route not in driver.OUTPUT_ROUTES:
+            raise CommandError(f'Output route "{route}" is not supported by device')
+
+        # route is cached by driver, nothing to write if already applied
+        if driver.get_output_route() != route and not driver.set_output_route(route):
+            raise CommandError("Unable to set output route")
+        self._set_config_field("route", route)
+        self.config_dirty = True
+
+        return True
+
+    def _create_playback(self):
+        """
+        Create mixer output playback stream. Selected driver can provide its own stream
+        (sound server stream), raw alsa playback is used otherwise
+
+        Returns:
+            PcmPlayback: playback stream
+        """
+        driver = self._get_selected_driver()
+        create_playback = getattr(driver, "create_playback", None)
+        playback = (
+            create_playback(self.MIXER_RATE, self.MIXER_CHANNELS)
+            if create_playback
+            else None
+        )
+        return playback or PcmPlayback(self.MIXER_RATE, self.MIXER_CHANNELS)
+
+    def _get_selected_driver(self):
+        """
+        Return selected audio driver
+
+        Returns:
+            AudioDriver: selected driver or None if no driver selected
+        """
+        selected_driver_name = self._get_config_field("driver")
+        if not selected_driver_name:
+            return None
+        return self.drivers.get_driver(Driver.DRIVER_AUDIO, selected_driver_name)
+
+    def start_level_meter(self, update_rate=20):
+        """
+        Start input level meter. Levels are sent with audio.level.update event at specified
+        rate. Meter is stopped automatically after one minute, or when capture is needed by
+        another stream (test recording...). Last event has running field set to False.
+
+        Args:
+            update_rate (int): number of levels per second (1..50)
+
+        Returns:
+            bool: True if level meter started
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+            CommandError: if selected device can't capture sound or capture is used
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "update_rate",
+                    "type": int,
+                    "value": update_rate,
+                    "validator": lambda val: 1 <= val <= 50,
+                    "message": 'Parameter "update_rate" must be 1<=update_rate<=50',
+                },
+            ]
+        )
+
+        driver = self._get_selected_driver()
+        if not driver or not driver.get_card_capabilities()[1]:
+            raise CommandError("Selected audio device has no capture capability")
+
+        if self.level_meter and self.level_meter.is_running():
+            self.logger.debug("Level meter already running")
+            return True
+
+        grant = self.scheduler.request(
+            "audio.capture", "audio", self.LEVEL_METER_PRIORITY
+        )
+        if not grant.is_granted():
+            raise CommandError("Audio capture is used by another stream")
+
+        with self.level_meter_lock:
+            self.level_meter_grant = grant.id
+        # stop callback is bound to meter grant: a previous meter stopping late must not
+        # release grant of the new one
+        self.level_meter = LevelMeterStream(
+            PcmCapture(self.LEVEL_METER_RATE),
+            self._on_level,
+            update_rate=update_rate,
+            max_duration=self.LEVEL_METER_MAX_DURATION,
+            on_stop=lambda: self._on_level_meter_stop(grant.id),
+        )
+        try:
+            self.level_meter.start()
+        except Exception as error:
+            self.logger.exception("Unable to start level meter")
+            self._release_level_meter_grant(grant.id)
+            raise CommandError("Unable to start level meter") from error
+
+        return True
+
+    def stop_level_meter(self):
+        """
+        Stop input level meter
+        """
+        if self.level_meter:
+            self.level_meter.stop()
+
+    def _on_level(self, level):
+        """
+        Level meter callback
+
+        Args:
+            level (dict): rms and peak levels (dBFS) of each channel
+        """
+        self.level_update_event.send(params={**level, "running": True}, render=False)
+
+    def _on_level_meter_stop(self, grant_id):
+        """
+        Level meter stopped (by user, after max duration or on error): release capture and
+        notify clients. Nothing is done if meter was already replaced by a new one
+
+        Args:
+            grant_id (str): scheduler grant of stopped meter
+        """
+        if not self._release_level_meter_grant(grant_id):
+            self.logger.debug("Stale level meter stopped, current meter is kept")
+            return
+        self.level_update_event.send(
+            params={"rms": [], "peak": [], "running": False}, render=False
+        )
+
+    def _release_level_meter_grant(self, grant_id):
+        """
+        Release scheduler grant of level meter if it is still the current meter grant
+
+        Args:
+            grant_id (str): meter grant to release
+
+        Returns:
+            bool: True if grant was released
+        """
+        with self.level_meter_lock:
+            if grant_id is None or grant_id != self.level_meter_grant:
+                return False
+            self.level_meter_grant = None
+        self._release_grant(grant_id)
+        return True
+
+    def request_audio(self, resource, owner, priority, duck=False, timeout=0.0):
+        """
+        Request audio resource to audio scheduler. Higher priority request preempts (or ducks)
+        streams using the resource, other requests wait for resource during timeout.
+        Grant changes are sent with audio.resource.update event
+
+        Args:
+            resource (str): audio resource (audio.playback or audio.capture)
+            owner (str): request owner (module name)
+            priority (str): stream priority (alarm, voice, notification or music)
+            duck (bool): duck lower priority streams instead of preempting them
+            timeout (float): max time to wait for resource (seconds)
+
+        Returns:
+            dict: grant (see AudioGrant.to_dict). Resource is granted if state is active
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "resource",
+                    "type": str,
+                    "value": resource,
+                    "validator": lambda val: val in self.MODULE_RESOURCES,
+                    "message": f'Resource "{resource}" is not an audio resource',
+                },
+                {"name": "owner", "type": str, "value": owner},
+                {
+                    "name": "priority",
+                    "type": str,
+                    "value": priority,
+                    "validator": lambda val: val in AudioPriority.NAMES,
+                    "message": f'Priority "{priority}" is not supported',
+                },
+                {"name": "duck", "type": bool, "value": duck},
+                {
+                    "name": "timeout",
+                    "type": float,
+                    "value": timeout,
+                    "validator": lambda val: 0 <= val <= AudioScheduler.MAX_WAIT,
+                    "message": f'Parameter "timeout" must be 0<=timeout<={AudioScheduler.MAX_WAIT}',
+                },
+            ]
+        )
+
+        grant = self.scheduler.request(
+            resource, owner, AudioPriority.NAMES[priority], duck=duck, timeout=timeout
+        )
+        self.logger.debug("Audio request: %s", grant.to_dict())
+        return grant.to_dict()
+
+    def release_audio(self, grant_id):
+        """
+        Release audio resource granted by audio scheduler
+
+        Args:
+            grant_id (str): grant id
+
+        Returns:
+            bool: True if resource released, False if grant does not exist anymore
+        """
+        return self._release_grant(grant_id)
+
+    def _release_grant(self, grant_id):
+        """
+        Release scheduler grant and its ducking state
+
+        Args:
+            grant_id (str): grant id
+
+        Returns:
+            bool: True if grant released
+        """
+        self.ducker.remove(grant_id)
+        return self.scheduler.release(grant_id)
+
+    def _get_grant_owner(self, grant_id):
+        """
+        Return owner of scheduler grant (mixer voice owner)
+
+        Args:
+            grant_id (str): grant id
+
+        Returns:
+            str: grant owner or None if grant does not exist
+        """
+        grant = self.scheduler.get_grant(grant_id)
+        return grant.owner if grant else None
+
+    def set_ducking(self, attack, release, gain):
+        """
+        Configure ducking of lower priority streams (applied in software mixer, hardware
+        volume is not changed). Only sounds queue and stream playback are ducked, test
+        sound and sounds played directly by drivers are not
+
+        Args:
+            attack (float): time to reach ducked gain (seconds)
+            release (float): time to get back to full gain (seconds)
+            gain (float): ducked streams gain (dB)
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "attack",
+                    "type": float,
+                    "value": attack,
+                    "validator": lambda val: 0 <= val <= 5.0,
+                    "message": 'Parameter "attack" must be 0<=attack<=5.0',
+                },
+                {
+                    "name": "release",
+                    "type": float,
+                    "value": release,
+                    "validator": lambda val: 0 <= val <= 5.0,
+                    "message": 'Parameter "release" must be 0<=release<=5.0',
+                },
+                {
+                    "name": "gain",
+                    "type": float,
+                    "value": gain,
+                    "validator": lambda val: -60.0 <= val <= 0,
+                    "message": 'Parameter "gain" must be -60.0<=gain<=0',
+                },
+            ]
+        )
+
+        self.ducker.configure(attack, release, gain)
+        self._set_config_field(
+            "ducking", {"attack": attack, "release": release, "gain": gain}
+        )
+        self.config_dirty = True
+
+    def set_app_volume(self, owner, volume):
+        """
+        Set software volume of application streams (applied in software mixer on streams
+        which owner is specified application, hardware volume is not changed). Gain only
+        applies to sounds queue and stream playback, test sound and sounds played directly
+        by drivers are not affected
+
+        Args:
+            owner (str): application (audio request owner)
+            volume (int): volume percentage
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+        """
+        self._check_parameters(
+            [
+                {"name": "owner", "type": str, "value": owner},
+                {
+                    "name": "volume",
+                    "type": int,
+                    "value": volume,
+                    "validator": lambda val: 0 <= val <= 100,
+                    "message": 'Parameter "volume" must be 0<=volume<=100',
+                },
+            ]
+        )
+
+        self.app_gains.set_gain(owner, volume / 100.0)
+        app_volumes = dict(self._get_config_field("app_volumes"))
+        if volume == 100:
+            app_volumes.pop(owner, None)
+        else:
+            app_volumes[owner] = volume
+        self._set_config_field("app_volumes", app_volumes)
+        self.config_dirty = True
+
+    def get_app_volume(self, owner):
+        """
+        Return software volume of application streams
+
+        Args:
+            owner (str): application (audio request owner)
+
+        Returns:
+            int: volume percentage
+        """
+        return round(self.app_gains.get_gain(owner) * 100)
+
+    def set_idle_timeout(self, timeout):
+        """
+        Set time before closing unused playback output. Output is kept opened during this
+        time to play next sound without wake up latency
+
+        Args:
+            timeout (float): idle timeout (seconds, 0 to close output after each sound)
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "timeout",
+                    "type": float,
+                    "value": timeout,
+                    "validator": lambda val: 0 <= val <= 3600.0,
+                    "message": 'Parameter "timeout" must be 0<=timeout<=3600.0',
+                },
+            ]
+        )
+
+        self.idle_manager.idle_timeout = timeout
+        self._set_config_field("idle_timeout", timeout)
+        self.config_dirty = True
+
+    def get_output_stats(self):
+        """
+        Return playback output power stats (state, wake ups and wake up latency)
+
+        Returns:
+            dict: output stats (see OutputIdleManager.get_stats)
+        """
+        return self.idle_manager.get_stats()
+
+    def get_audio_scheduler_stats(self):
+        """
+        Return audio scheduler stats (requests, preemptions and arbitration latency)
+
+        Returns:
+            dict: scheduler stats (see AudioScheduler.get_stats)
+        """
+        return self.scheduler.get_stats()
+
+    def _on_grant_update(self, grant):
+        """
+        Audio scheduler grant updated (preempted, ducked, restored or granted after wait)
+
+        Args:
+            grant (dict): grant (see AudioGrant.to_dict)
+        """
+        if grant["state"] in ("active", "ducked"):
+            self.ducker.set_ducked(grant["id"], grant["state"] == "ducked")
+        else:
+            self.ducker.remove(grant["id"])
+        level_meter = self.level_meter
+        if (
+            level_meter
+            and grant["id"] == self.level_meter_grant
+            and grant["state"] in ("preempted", "ducked")
+        ):
+            self.logger.info("Level meter stopped: capture needed by another stream")
+            level_meter.stop()
+        if grant["id"] == self.queue_grant and grant["state"] == "preempted":
+            self.logger.info("Sounds queue preempted by higher priority stream")
+            self.queue.clear()
+        stream = self.stream
+        if stream and grant["id"] == stream.voice_id and grant["state"] == "preempted":
+            self.logger.info("Stream preempted by higher priority stream")
+            stream.stop()
+        if grant["state"] == "preempted":
+            with self.jobs_lock:
+                job_grants = dict(self.job_grants)
+            for resource_name, grant_id in job_grants.items():
+                if grant_id == grant["id"]:
+                    self._on_job_preempted(resource_name, grant_id)
+        self.resource_update_event.send(params=grant, render=False)
+
+    def _get_sound_path(self, sound):
+        """
+        Return sound file path
+
+        Args:
+            sound (str): sound file name in application assets or absolute path
+
+        Returns:
+            str: sound path
+        """
+        return (
+            sound if os.path.isabs(sound) else os.path.join(self.APP_ASSET_PATH, sound)
+        )
+
+    def enqueue_sounds(self, sounds):
+        """
+        Add sounds to sounds queue. Queued sounds are played without gap
+
+        Queue only decodes wav files (16 or 32 bits PCM), other formats (bundled mp3
+        sounds...) must be converted to wav first
+
+        Args:
+            sounds (list): list of wav file names (application assets) or absolute paths
+
+        Returns:
+            list: queued items ids
+
+        Raises:
+            InvalidParameter: if parameter is invalid or a sound is not a wav file
+            CommandError: if a sound can't be played
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "sounds",
+                    "type": list,
+                    "value": sounds,
+                    "validator": lambda val: len(val) > 0
+                    and all(
+                        isinstance(sound, str)
+                        and os.path.exists(self._get_sound_path(sound))
+                        for sound in val
+                    ),
+                    "message": 'Parameter "sounds" must be a list of existing sound files',
+                },
+            ]
+        )
+        unsupported = [
+            sound
+            for sound in sounds
+            if not sound.lower().endswith(self.QUEUE_EXTENSION)
+        ]
+        if unsupported:
+            raise InvalidParameter(
+                f'Sounds queue only plays wav files: {", ".join(unsupported)}'
+            )
+
+        self.idle_manager.prewarm()
+        items_ids = []
+        for sound in sounds:
+            try:
+                items_ids.append(self.queue.enqueue(self._get_sound_path(sound)))
+            except Exception as error:
+                raise CommandError(str(error)) from error
+
+        return items_ids
+
+    def skip_sound(self):
+        """
+        Skip sound currently played by sounds queue
+
+        Returns:
+            bool: True if a sound was skipped
+        """
+        return self.queue.skip()
+
+    def clear_sounds(self):
+        """
+        Stop sounds queue and remove all queued sounds
+        """
+        self.queue.clear()
+
+    def get_sounds_queue(self):
+        """
+        Return sounds queue
+
+        Returns:
+            list: queued sounds, first one is playing (see QueueItem.to_dict)
+        """
+        return self.queue.get_items()
+
+    def _on_queue_start(self):
+        """
+        Sounds queue starts playing: request playback to audio scheduler
+
+        Returns:
+            bool: True if playback granted
+        """
+        grant = self.scheduler.request(
+            "audio.playback", "audio", AudioPriority.NOTIFICATION, duck=True
+        )
+        if not grant.is_granted():
+            self.logger.info("Sounds queue not played: audio used by higher priority")
+            return False
+
+        self.queue_grant = grant.id
+        self.queue.voice_id = grant.id
+        return True
+
+    def _on_queue_idle(self):
+        """
+        Sounds queue is over: release playback
+        """
+        if self.queue_grant:
+            self._release_grant(self.queue_grant)
+        self.queue_grant = None
+
+    def play_stream(self, location, owner="audio"):
+        """
+        Play wav stream while it is received. Current stream is stopped
+
+        Args:
+            location (str): stream http(s) url or absolute file path
+            owner (str): application playing stream (its software volume is applied)
+
+        Returns:
+            dict: stream (see AudioStream.to_dict)
+
+        Raises:
+            InvalidParameter: if parameter is invalid
+            CommandError: if stream can't be played
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "location",
+                    "type": str,
+                    "value": location,
+                },
+                {"name": "owner", "type": str, "value": owner},
+            ]
+        )
+        try:
+            source = get_source(location)
+        except Exception as error:
+            raise InvalidParameter(str(error)) from error
+
+        self.stop_stream()
+        self.idle_manager.prewarm()
+        grant = self.scheduler.request("audio.playback", owner, AudioPriority.MUSIC)
+        if not grant.is_granted():
+            raise CommandError("Audio is used by a stream with same or higher priority")
+
+        stream = AudioStream(
+            source,
+            self.MIXER_RATE,
+            self.MIXER_CHANNELS,
+            self.idle_manager.get_output,
+            mixer=self.mixer,
+            on_end=self._on_stream_end,
+        )
+        stream.voice_id = grant.id
+        try:
+            stream.start()
+        except Exception as error:
+            self._release_grant(grant.id)
+            raise CommandError(str(error)) from error
+        self.stream = stream
+
+        return stream.to_dict()
+
+    def stop_stream(self):
+        """
+        Stop current stream
+
+        Returns:
+            bool: True if a stream was stopped
+        """
+        stream = self.stream
+        if not stream or stream.state not in (
+            AudioStream.STATE_BUFFERING,
+            AudioStream.STATE_PLAYING,
+        ):
+            return False
+
+        stream.stop()
+        stream.join(2.0)
+        return True
+
+    def get_stream(self):
+        """
+        Return current (or last) stream
+
+        Returns:
+            dict: stream (see AudioStream.to_dict) or None if no stream played
+        """
+        return self.stream.to_dict() if self.stream else None
+
+    def _on_stream_end(self, stream):
+        """
+        Stream is over: release playback
+
+        Args:
+            stream (AudioStream): ended stream
+        """
+        self.logger.debug("Stream ended: %s", stream.to_dict())
+        self._release_grant(stream.voice_id)
+
+    def _on_job_update(self, job):
+        """
+        Audio job updated
+
+        Args:
+            job (dict): job (see AudioJob.to_dict)
+        """
+        self.job_update_event.send(params=job, render=False)
+
+    def get_job(self, job_id):
+        """
+        Return audio job
+
+        Args:
+            job_id (str): job id
+
+        Returns:
+            dict: job (see AudioJob.to_dict)
+
+        Raises:
+            InvalidParameter: if job does not exist
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            raise InvalidParameter(f'Job "{job_id}" does not exist')
+        return job.to_dict()
+
+    def _start_job(self, action, resource_name):
+        """
+        Create job and request resource needed by job to audio scheduler (grant acquires
+        Cleep resource). Job is run when Cleep resource is acquired, it fails if resource
+        is not acquired within RESOURCE_TIMEOUT
+
+        Args:
+            action (str): job action
+            resource_name (str): resource needed by job
+
+        Returns:
+            str: job id
+
+        Raises:
+            CommandError: if same job is already running, resource is used by a stream
+                with same or higher priority or resource can't be requested
+        """
+        try:
+            job = self.jobs.create(action)
+        except Exception as error:
+            raise CommandError(str(error)) from error
+
+        grant = self.scheduler.request(
+            resource_name, "audio", self.JOB_PRIORITIES[action], duck=True
+        )
+        if not grant.is_granted():
+            error = "Audio is used by a stream with same or higher priority"
+            self.jobs.update(job, status=AudioJob.STATUS_FAILED, error=error)
+            raise CommandError(error)
+
+        timer = threading.Timer(
+            self.RESOURCE_TIMEOUT, self._on_resource_timeout, args=(resource_name, job)
+        )
+        timer.daemon = True
+        with self.jobs_lock:
+            self.job_grants[resource_name] = grant.id
+            self.pending_jobs[resource_name] = job
+            self.job_timers[resource_name] = timer
+        timer.start()
+
+        with self.resources_lock:
+            acquired = self.cleep_resources.get(resource_name)
+        if acquired is None:
+            error = f'Unable to acquire resource "{resource_name}"'
+            self._fail_pending_job(resource_name, job, error)
+            raise CommandError(error)
+        if acquired:
+            # resource already held for another grant (ducked stream)
+            self._run_pending_job(resource_name)
+
+        return job.id
+
+    def _pop_pending_job(self, resource_name, job=None):
+        """
+        Remove job waiting for resource and cancel its acquisition timer
+
+        Args:
+            resource_name (str): resource name
+            job (AudioJob): remove job only if it is this one (any job if None)
+
+        Returns:
+            AudioJob: removed job or None if no job (or another one) is waiting
+        """
+        with self.jobs_lock:
+            pending = self.pending_jobs.get(resource_name)
+            if pending is None or (job is not None and pending is not job):
+                return None
+            del self.pending_jobs[resource_name]
+            timer = self.job_timers.pop(resource_name, None)
+        if timer:
+            timer.cancel()
+        return pending
+
+    def _release_job_grant(self, resource_name):
+        """
+        Release scheduler grant of job using resource
+
+        Args:
+            resource_name (str): resource name
+        """
+        with self.jobs_lock:
+            grant_id = self.job_grants.pop(resource_name, None)
+        if grant_id:
+            self._release_grant(grant_id)
+
+    def _fail_pending_job(self, resource_name, job, error):
+        """
+        Fail job still waiting for its resource and release its grant
+
+        Args:
+            resource_name (str): resource name
+            job (AudioJob): pending job
+            error (str): job error
+        """
+        if not self._pop_pending_job(resource_name, job):
+            return
+        self.jobs.update(job, status=AudioJob.STATUS_FAILED, error=error)
+        self._release_job_grant(resource_name)
+
+    def _run_pending_job(self, resource_name):
+        """
+        Run job waiting for resource in background, if any
+
+        Args:
+            resource_name (str): acquired resource name
+        """
+        targets = {
+            "audio.playback": self._play_test_sound,
+            "audio.capture": self._record_test_sound,
+        }
+        job = self._pop_pending_job(resource_name)
+        if job:
+            self.jobs.run(job, targets[resource_name])
+
+    def _on_job_preempted(self, resource_name, grant_id):
+        """
+        Job grant preempted (higher priority stream or resource needed by another module):
+        pending job fails, running job streams are interrupted
+
+        Args:
+            resource_name (str): resource name
+            grant_id (str): preempted grant id
+        """
+        self.logger.info('Test job using "%s" preempted', resource_name)
+        with self.jobs_lock:
+            if self.job_grants.get(resource_name) != grant_id:
+                return
+            del self.job_grants[resource_name]
+            streams = self.job_streams.get(resource_name, ())
+        job = self._pop_pending_job(resource_name)
+        if job:
+            self.jobs.update(
+                job,
+                status=AudioJob.STATUS_FAILED,
+                error="Audio is used by another stream",
+            )
+        for stream in streams:
+            stream.interrupt()
+
+    def _on_resource_timeout(self, resource_name, job):
+        """
+        Resource of pending job not acquired in time (used by another module)
+
+        Args:
+            resource_name (str): resource name
+            job (AudioJob): pending job
+        """
+        self.logger.warning('Resource "%s" not acquired in time', resource_name)
+        self._fail_pending_job(
+            resource_name, job, f'Unable to acquire resource "{resource_name}"'
+        )
+
+    def test_playing(self):
+        """
+        Play test sound to make sure audio card is correctly configured. Test runs in
+        background, its status is sent with audio.job.update event
+
+        Returns:
+            str: job id
+        """
+        return self._start_job("playing", "audio.playback")
+
+    def test_recording(self):
+        """
+        Record sound during few seconds and play it. Test runs in background, its status
+        is sent with audio.job.update event
+
+        Returns:
+            str: job id
+        """
+        return self._start_job("recording", "audio.capture")
+
+    def _play_test_sound(self, progress):
+        """
+        Playing job: play test sound
+
+        Args:
+            progress (function): job progress function
+        """
+        try:
             audio_path = os.path.join(self.APP_ASSET_PATH, self.TEST_SOUND)
             if not self.alsa.play_sound(audio_path):
                 raise CommandError("Unable to play test sound: internal error")
+        finally:
+            self._release_job_grant("audio.playback")
+
+    def _record_test_sound(self, progress):
+        """
+        Recording job: record sound in memory and play it from memory
 
-            # release resource
-            self._release_resource("audio.playback")
+        Args:
+            progress (function): job progress function
+        """
+        buffer = PcmBuffer(self.RECORD_RATE, max_duration=self.RECORD_DURATION)
+        capture = PcmCapture(self.RECORD_RATE)
+        playback = PcmPlayback(self.RECORD_RATE)
+        recorded = 0
+        with self.jobs_lock:
+            if "audio.capture" not in self.job_grants:
+                raise CommandError(
+                    "Unable to record sound: audio used by another stream"
+                )
+            self.job_streams["audio.capture"] = (capture, playback)
+        try:
+            capture.start()
+            while not buffer.is_full():
+                data = capture.read(self.RECORD_CHUNK_FRAMES)
+                if data is None:
+                    raise CommandError("Unable to record sound: capture stopped")
+                buffer.write(data)
+                # recording is first half of job, progress is sent every second
+                if int(buffer.get_duration()) > recorded:
+                    recorded = int(buffer.get_duration())
+                    progress(int(recorded * 50 / self.RECORD_DURATION))
+            capture.stop()
+            self.logger.debug("Recorded %.1f seconds", buffer.get_duration())
 
-        elif resource_name == "audio.capture":
-            # record sound
-            sound = self.alsa.record_sound(timeout=5.0)
-            self.logger.debug("Recorded sound: %s", sound)
-            if not self.alsa.play_sound(sound, timeout=6.0):
+            playback.start()
+            for chunk in buffer.get_chunks(self.RECORD_CHUNK_FRAMES):
+                if not playback.write(chunk):
+                    break
+            if not playback.drain(timeout=self.RECORD_DURATION + 1.0):
                 raise CommandError("Unable to play recorded sound: internal error")
+        finally:
+            with self.jobs_lock:
+                self.job_streams.pop("audio.capture", None)
+            capture.stop()
+            playback.stop()
+            buffer.clear()
+            self._release_job_grant("audio.capture")
 
-            # release resource
-            self._release_resource("audio.capture")
+    def _sync_cleep_resource(self, resource_name):
+        """
+        Audio scheduler resource became used or free: acquire or release matching Cleep
+        resource, so other modules using Cleep resources and audio scheduler grants don't
+        use audio device at the same time
 
-            # purge file
-            time.sleep(0.5)
-            try:
-                os.remove(sound)
-            except Exception:
-                self.logger.warning('Unable to delete recorded test sound "%s"', sound)
+        Args:
+            resource_name (str): resource name
+        """
+        with self.resources_lock:
+            used = self.scheduler.is_used(resource_name)
+            if used == (resource_name in self.cleep_resources):
+                return
 
-        else:
+            if used:
+                self.logger.debug('Acquire resource "%s"', resource_name)
+                self.cleep_resources[resource_name] = False
+                try:
+                    self._need_resource(resource_name)
+                except Exception:
+                    self.logger.exception(
+                        'Unable to acquire resource "%s"', resource_name
+                    )
+                    self.cleep_resources.pop(resource_name, None)
+            else:
+                self.logger.debug('Release resource "%s"', resource_name)
+                del self.cleep_resources[resource_name]
+                self._release_resource(resource_name)
+
+    def _resource_acquired(self, resource_name):
+        """
+        Function called when resource is acquired. Pending job is run in background to
+        return immediately
+
+        Args:
+            resource_name (string): acquired resource name
+        """
+        self.logger.debug('Resource "%s" acquired', resource_name)
+        if resource_name not in self.MODULE_RESOURCES:
             self.logger.error('Unsupported resource "%s" acquired', resource_name)
+            return
+
+        with self.resources_lock:
+            if resource_name not in self.cleep_resources:
+                # all grants released while resource was acquired
+                self.logger.debug('Resource "%s" not needed anymore', resource_name)
+                self._release_resource(resource_name)
+                return
+            self.cleep_resources[resource_name] = True
+        self._run_pending_job(resource_name)
 
-    def _resource_needs_to_be_released(self, resource_name):  # pragma: no cover
+    def _resource_needs_to_be_released(self, resource_name):
         """
         Function called when resource is acquired by other module and needs to be released.
+        All streams using resource (level meter, sounds queue, stream, test job) are
+        preempted, which releases resource
 
         Args:
             resource_name (string): acquired resource name
         """
-        # resource is not acquired for too long, it will be released naturally so nothing to do here
+        self.logger.info('Resource "%s" needed by another module', resource_name)
+        self.scheduler.preempt(resource_name)
+        # resource may be held without grant (grant released while it was acquired)
+        self._sync_cleep_resource(resource_name)
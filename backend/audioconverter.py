@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from math import gcd
+import numpy
+
+
+class SampleFormat:
+    """
+    Supported PCM sample formats (named as alsa does)
+    """
+
+    S16_LE = "S16_LE"
+    S32_LE = "S32_LE"
+    FLOAT_LE = "FLOAT_LE"
+
+    DTYPES = {
+        S16_LE: numpy.dtype("<i2"),
+        S32_LE: numpy.dtype("<i4"),
+        FLOAT_LE: numpy.dtype("<f4"),
+    }
+
+    SCALES = {
+        S16_LE: 32768.0,
+        S32_LE: 2147483648.0,
+        FLOAT_LE: 1.0,
+    }
+
+    @staticmethod
+    def get_dtype(sample_format):
+        """
+        Return numpy dtype of specified sample format
+
+        Args:
+            sample_format (str): sample format
+
+        Returns:
+            numpy.dtype: sample format dtype
+
+        Raises:
+            Exception: if sample format is not supported
+        """
+        if sample_format not in SampleFormat.DTYPES:
+            raise Exception(f'Unsupported sample format "{sample_format}"')
+        return SampleFormat.DTYPES[sample_format]
+
+
+def frames_from_bytes(raw, sample_format, channels):
+    """
+    Convert interleaved raw PCM data to frames array
+
+    Args:
+        raw (bytes): raw interleaved PCM data
+        sample_format (str): sample format (see SampleFormat)
+        channels (int): number of channels
+
+    Returns:
+        numpy.ndarray: frames array of shape (frames, channels)
+    """
+    dtype = SampleFormat.get_dtype(sample_format)
+    usable = len(raw) - len(raw) % (dtype.itemsize * channels)
+    return numpy.frombuffer(raw[:usable], dtype=dtype).reshape(-1, channels)
+
+
+def frames_to_bytes(frames):
+    """
+    Convert frames array to interleaved raw PCM data
+
+    Args:
+        frames (numpy.ndarray): frames array of shape (frames, channels)
+
+    Returns:
+        bytes: raw interleaved PCM data
+    """
+    return numpy.ascontiguousarray(frames).tobytes()
+
+
+def to_float(frames, sample_format):
+    """
+    Convert frames to float32 frames in range [-1.0, 1.0]
+
+    Args:
+        frames (numpy.ndarray): frames in specified sample format
+        sample_format (str): frames sample format
+
+    Returns:
+        numpy.ndarray: float32 frames
+    """
+    SampleFormat.get_dtype(sample_format)
+    if sample_format == SampleFormat.FLOAT_LE:
+        return frames.astype(numpy.float32, copy=False)
+    return frames.astype(numpy.float32) * numpy.float32(
+        1.0 / SampleFormat.SCALES[sample_format]
+    )
+
+
+def from_float(frames, sample_format):
+    """
+    Convert float32 frames to specified sample format. Values are clipped
+
+    Args:
+        frames (numpy.ndarray): float32 frames in range [-1.0, 1.0]
+        sample_format (str): output sample format
+
+    Returns:
+        numpy.ndarray: frames in specified sample format
+    """
+    dtype = SampleFormat.get_dtype(sample_format)
+    if sample_format == SampleFormat.FLOAT_LE:
+        return numpy.clip(frames, -1.0, 1.0).astype(dtype, copy=False)
+
+    scale = SampleFormat.SCALES[sample_format]
+    info = numpy.iinfo(dtype)
+    # compute in float64 to keep 32 bits precision
+    scaled = numpy.rint(frames.astype(numpy.float64) * scale)
+    return numpy.clip(scaled, info.min, info.max).astype(dtype)
+
+
+def convert_format(frames, in_format, out_format):
+    """
+    Convert frames from a sample format to another one
+
+    Args:
+        frames (numpy.ndarray): input frames
+        in_format (str): input sample format
+        out_format (str): output sample format
+
+    Returns:
+        numpy.ndarray: converted frames
+    """
+    if in_format == out_format:
+        return frames
+    if in_format == SampleFormat.S16_LE and out_format == SampleFormat.S32_LE:
+        # lossless integer shift
+        return frames.astype(numpy.int32) << 16
+    if in_format == SampleFormat.S32_LE and out_format == SampleFormat.S16_LE:
+        return (frames >> 16).astype(numpy.int16)
+    return from_float(to_float(frames, in_format), out_format)
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational sample rate converter based on a polyphase windowed-sinc filter bank
+
+    Resampling is fully vectorized: each call to process computes all output frames of
+    the chunk with a single gather and a single tensor contraction, no python loop per sample.
+    Filter state is kept between calls so chunks can be of any size.
+    """
+
+    QUALITY_FAST = "fast"
+    QUALITY_MEDIUM = "medium"
+    QUALITY_BEST = "best"
+
+    # quality: (taps per phase, kaiser beta, rolloff)
+    QUALITIES = {
+        QUALITY_FAST: (8, 5.0, 0.85),
+        QUALITY_MEDIUM: (16, 7.0, 0.90),
+        QUALITY_BEST: (32, 9.0, 0.95),
+    }
+
+    def __init__(self, in_rate, out_rate, channels, quality=QUALITY_MEDIUM):
+        """
+        Constructor
+
+        Args:
+            in_rate (int): input sample rate
+            out_rate (int): output sample rate
+            channels (int): number of channels
+            quality (str): resampling quality (QUALITY_FAST, QUALITY_MEDIUM or QUALITY_BEST)
+
+        Raises:
+            Exception: if parameter is invalid
+        """
+        if quality not in self.QUALITIES:
+            raise Exception(f'Unsupported resampling quality "{quality}"')
+        if in_rate <= 0 or out_rate <= 0:
+            raise Exception("Sample rates must be positive")
+
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.quality = quality
+
+        divisor = gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps, beta, rolloff = self.QUALITIES[quality]
+        self.filters = self._design_filters(
+            self.up, self.down, self.taps, beta, rolloff
+        )
+
+        self.__history = numpy.zeros((self.taps - 1, channels), dtype=numpy.float32)
+        self.__position = 0
+        self.__tap_offsets = numpy.arange(self.taps)
+
+    @staticmethod
+    def _design_filters(up, down, taps, beta, rolloff):
+        """
+        Design polyphase filter bank
+
+        Returns:
+            numpy.ndarray: filter bank of shape (up, taps). Each phase is reversed
+                           to be directly applied on a window of input samples
+        """
+        length = up * taps
+        cutoff = rolloff / max(up, down)
+        positions = numpy.arange(length) - (length - 1) / 2.0
+        prototype = numpy.sinc(cutoff * positions) * numpy.kaiser(length, beta)
+        prototype *= up / prototype.sum()
+
+        # phase p uses coefficients h[p + k*up], k=0..taps-1
+        bank = prototype.reshape(taps, up).T
+        return numpy.ascontiguousarray(bank[:, ::-1], dtype=numpy.float32)
+
+    def reset(self):
+        """
+        Reset filter state
+        """
+        self.__history[:] = 0.0
+        self.__position = 0
+
+    def get_output_frames_count(self, input_frames):
+        """
+        Return number of frames that next process call will return for specified input length
+
+        Args:
+            input_frames (int): number of input frames
+
+        Returns:
+            int: number of output frames
+        """
+        span = input_frames * self.up - self.__position
+        return max(0, -(-span // self.down))
+
+    def process(self, frames):
+        """
+        Resample frames
+
+        Args:
+            frames (numpy.ndarray): float32 frames of shape (frames, channels)
+
+        Returns:
+            numpy.ndarray: resampled float32 frames of shape (frames, channels)
+        """
+        frames = numpy.asarray(frames, dtype=numpy.float32).reshape(-1, self.channels)
+        if self.up == self.down:
+            return frames
+
+        count = self.get_output_frames_count(len(frames))
+        extended = numpy.concatenate((self.__history, frames))
+
+        times = self.__position + numpy.arange(count) * self.down
+        bases = times // self.up
+        phases = times % self.up
+
+        # window of taps input frames ending at each base sample (history offsets indexes)
+        windows = extended[bases[:, None] + self.__tap_offsets[None, :]]
+        output = numpy.einsum("nt,ntc->nc", self.filters[phases], windows)
+
+        self.__position += count * self.down - len(frames) * self.up
+        self.__history = extended[len(extended) - (self.taps - 1) :].copy()
+
+        return output.astype(numpy.float32, copy=False)
+
+    def flush(self):
+        """
+        Flush filter delay line
+
+        Returns:
+            numpy.ndarray: remaining float32 frames
+        """
+        tail = self.process(
+            numpy.zeros((self.taps // 2, self.channels), dtype=numpy.float32)
+        )
+        self.reset()
+        return tail
+
+
+class AudioConverter:
+    """
+    Playback pipeline stage that converts sample format and sample rate of a PCM stream
+    to the format expected by the audio card
+    """
+
+    def __init__(
+        self,
+        in_format,
+        in_rate,
+        out_format,
+        out_rate,
+        channels,
+        quality=PolyphaseResampler.QUALITY_MEDIUM,
+    ):
+        """
+        Constructor
+
+        Args:
+            in_format (str): input sample format (see SampleFormat)
+            in_rate (int): input sample rate
+            out_format (str): output sample format (see SampleFormat)
+            out_rate (int): output sample rate
+            channels (int): number of channels
+            quality (str): resampling quality (see PolyphaseResampler)
+        """
+        SampleFormat.get_dtype(in_format)
+        SampleFormat.get_dtype(out_format)
+
+        self.in_format = in_format
+        self.out_format = out_format
+        self.channels = channels
+        self.resampler = (
+            PolyphaseResampler(in_rate, out_rate, channels, quality)
+            if in_rate != out_rate
+            else None
+        )
+
+    def is_passthrough(self):
+        """
+        Return True if stage does nothing
+
+        Returns:
+            bool: True if input and output formats are the same
+        """
+        return self.resampler is None and self.in_format == self.out_format
+
+    def process(self, frames):
+        """
+        Convert frames
+
+        Args:
+            frames (numpy.ndarray): input frames of shape (frames, channels)
+
+        Returns:
+            numpy.ndarray: converted frames
+        """
+        if self.resampler is None:
+            return convert_format(frames, self.in_format, self.out_format)
+
+        resampled = self.resampler.process(to_float(frames, self.in_format))
+        return from_float(resampled, self.out_format)
+
+    def process_bytes(self, raw):
+        """
+        Convert raw interleaved PCM data
+
+        Args:
+            raw (bytes): input raw PCM data
+
+        Returns:
+            bytes: converted raw PCM data
+        """
+        if self.is_passthrough():
+            return raw
+        frames = frames_from_bytes(raw, self.in_format, self.channels)
+        return frames_to_bytes(self.process(frames))
+
+    def flush(self):
+        """
+        Flush remaining frames kept by resampler
+
+        Returns:
+            numpy.ndarray: remaining frames in output format
+        """
+        if self.resampler is None:
+            return numpy.zeros(
+                (0, self.channels), dtype=SampleFormat.get_dtype(self.out_format)
+            )
+        return from_float(self.resampler.flush(), self.out_format)
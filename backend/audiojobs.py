@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+import uuid
+
+
+class AudioJob:
+    """
+    Long running audio action (test playing, test recording...) executed in background
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, action):
+        """
+        Constructor
+
+        Args:
+            action (str): job action name
+        """
+        self.id = str(uuid.uuid4())
+        self.action = action
+        self.status = self.STATUS_PENDING
+        self.progress = 0
+        self.error = None
+        self.timestamp = int(time.time())
+
+    def is_finished(self):
+        """
+        Return True if job is finished (successfully or not)
+
+        Returns:
+            bool: True if job finished
+        """
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def to_dict(self):
+        """
+        Return job as dict
+
+        Returns:
+            dict: job::
+
+                {
+                    id (str): job id
+                    action (str): job action
+                    status (str): job status (pending, running, done, failed)
+                    progress (int): job progress percentage
+                    error (str): error message if job failed
+                    timestamp (int): job creation timestamp
+                }
+
+        """
+        return {
+            "id": self.id,
+            "action": self.action,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "timestamp": self.timestamp,
+        }
+
+
+class AudioJobs:
+    """
+    Audio jobs manager. Each job runs in its own thread so caller is never blocked, job
+    updates are notified through callback.
+    """
+
+    MAX_FINISHED_JOBS = 10
+
+    def __init__(self, on_update):
+        """
+        Constructor
+
+        Args:
+            on_update (function): function called with job dict each time a job is updated
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_update = on_update
+        self.__jobs = {}
+        self.__lock = threading.Lock()
+
+    def create(self, action):
+        """
+        Create pending job. Only one unfinished job per action is allowed
+
+        Args:
+            action (str): job action name
+
+        Returns:
+            AudioJob: created job
+
+        Raises:
+            Exception: if a job with same action is already pending or running
+        """
+        with self.__lock:
+            for job in self.__jobs.values():
+                if job.action == action and not job.is_finished():
+                    raise Exception(f'Job "{action}" is already running')
+
+            job = AudioJob(action)
+            self.__jobs[job.id] = job
+            self._purge()
+
+        self._notify(job)
+        return job
+
+    def _purge(self):
+        """
+        Keep only last finished jobs. Must be called with lock acquired
+        """
+        finished = [job for job in self.__jobs.values() if job.is_finished()]
+        for job in finished[: max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self.__jobs[job.id]
+
+    def get(self, job_id):
+        """
+        Return job
+
+        Args:
+            job_id (str): job id
+
+        Returns:
+            AudioJob: job or None if job does not exist
+        """
+        return self.__jobs.get(job_id)
+
+    def run(self, job, target):
+        """
+        Run job in background thread
+
+        Args:
+            job (AudioJob): job to run
+            target (function): job function, called with a progress function that takes
+                a percentage. Job fails if target raises an exception
+
+        Returns:
+            threading.Thread: job thread
+        """
+        thread = threading.Thread(target=self._run, args=(job, target), daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, job, target):
+        """
+        Job thread
+        """
+        self.update(job, status=AudioJob.STATUS_RUNNING)
+        try:
+            target(lambda progress: self.update(job, progress=progress))
+            self.update(job, status=AudioJob.STATUS_DONE, progress=100)
+        except Exception as error:
+            self.logger.exception('Job "%s" failed', job.action)
+            self.update(job, status=AudioJob.STATUS_FAILED, error=str(error))
+
+    def update(self, job, status=None, progress=None, error=None):
+        """
+        Update job and notify it
+
+        Args:
+            job (AudioJob): job to update
+            status (str): new job status (None to keep current one)
+            progress (int): new job progress (None to keep current one)
+            error (str): job error message
+        """
+        if status is not None:
+            job.status = status
+        if progress is not None:
+            job.progress = progress
+        if error is not None:
+            job.error = error
+        self._notify(job)
+
+    def _notify(self, job):
+        """
+        Notify job update
+        """
+        try:
+            self.on_update(job.to_dict())
+        except Exception:
+            self.logger.exception("Error notifying job update")
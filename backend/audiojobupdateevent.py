@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+
+class AudioJobUpdateEvent(Event):
+    """
+    Audio.job.update event
+    """
+
+    EVENT_NAME = "audio.job.update"
+    EVENT_PROPAGATE = False
+    EVENT_PARAMS = ["id", "action", "status", "progress", "error", "timestamp"]
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+
+class AudioLevelUpdateEvent(Event):
+    """
+    Audio.level.update event
+    """
+
+    EVENT_NAME = "audio.level.update"
+    EVENT_PROPAGATE = False
+    EVENT_PARAMS = ["rms", "peak", "running"]
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import numpy
+
+
+class AudioDucker:
+    """
+    Ducking stage: smoothly attenuate gain of ducked voices
+
+    Gain goes linearly from full scale to duck gain during attack time, and back during
+    release time. Gain ramp of a buffer is computed at once.
+    """
+
+    def __init__(self, rate, attack=0.05, release=0.5, duck_gain=-12.0):
+        """
+        Constructor
+
+        Args:
+            rate (int): stream sample rate
+            attack (float): time to reach duck gain (seconds)
+            release (float): time to get back to full gain (seconds)
+            duck_gain (float): gain of ducked voices (dB)
+        """
+        self.rate = rate
+        self.__lock = threading.Lock()
+        self.__voices = {}
+        self.configure(attack, release, duck_gain)
+
+    def configure(self, attack, release, duck_gain):
+        """
+        Configure ducking
+
+        Args:
+            attack (float): time to reach duck gain (seconds)
+            release (float): time to get back to full gain (seconds)
+            duck_gain (float): gain of ducked voices (dB, negative)
+
+        Raises:
+            Exception: if parameter is invalid
+        """
+        if attack < 0 or release < 0 or duck_gain > 0:
+            raise Exception("Invalid ducking parameters")
+
+        self.attack = attack
+        self.release = release
+        self.duck_gain = duck_gain
+        self.ducked_level = 10.0 ** (duck_gain / 20.0)
+        amplitude = 1.0 - self.ducked_level
+        # gain change per frame (instant change if time is 0)
+        self.attack_step = amplitude / (attack * self.rate) if attack else amplitude
+        self.release_step = amplitude / (release * self.rate) if release else amplitude
+
+    def set_ducked(self, voice_id, ducked):
+        """
+        Duck or restore voice
+
+        Args:
+            voice_id (str): voice id
+            ducked (bool): True to duck voice
+        """
+        with self.__lock:
+            voice = self.__voices.setdefault(voice_id, {"gain": 1.0, "ducked": False})
+            voice["ducked"] = ducked
+
+    def is_ducked(self, voice_id):
+        """
+        Return True if voice is ducked
+
+        Args:
+            voice_id (str): voice id
+
+        Returns:
+            bool: True if voice is ducked
+        """
+        voice = self.__voices.get(voice_id)
+        return voice is not None and voice["ducked"]
+
+    def get_gain(self, voice_id):
+        """
+        Return current linear gain of voice
+
+        Args:
+            voice_id (str): voice id
+
+        Returns:
+            float: linear gain (1.0 for unknown voice)
+        """
+        voice = self.__voices.get(voice_id)
+        return voice["gain"] if voice else 1.0
+
+    def remove(self, voice_id):
+        """
+        Forget voice
+
+        Args:
+            voice_id (str): voice id
+        """
+        with self.__lock:
+            self.__voices.pop(voice_id, None)
+
+    def process(self, voice_id, frames):
+        """
+        Apply voice gain on frames
+
+        Args:
+            voice_id (str): voice id
+            frames (numpy.ndarray): float frames of shape (frames, channels)
+
+        Returns:
+            numpy.ndarray: float frames
+        """
+        with self.__lock:
+            voice = self.__voices.get(voice_id)
+            if voice is None:
+                return frames
+
+            gain = voice["gain"]
+            target = self.ducked_level if voice["ducked"] else 1.0
+            if gain == target:
+                return frames if gain == 1.0 else frames * numpy.float32(gain)
+
+            count = len(frames)
+            if target < gain:
+                ramp = gain - self.attack_step * numpy.arange(1, count + 1)
+                ramp = numpy.maximum(ramp, target)
+            else:
+                ramp = gain + self.release_step * numpy.arange(1, count + 1)
+                ramp = numpy.minimum(ramp, target)
+            if count:
+                voice["gain"] = float(ramp[-1])
+
+        return frames * ramp.astype(numpy.float32)[:, numpy.newaxis]
+
+
+class AppGains:
+    """
+    Per-application gain stage: constant gain applied on voices of each application (voice
+    owner). Gains are software only, so an application sets its level without writing the
+    shared hardware mixer. Only sounds queue and stream playback go through this stage.
+
+    Gains are read without lock by mix path, a gain change is a single dict assignment.
+    """
+
+    def __init__(self, get_owner):
+        """
+        Constructor
+
+        Args:
+            get_owner (function): function returning owner of specified voice id (None if
+                unknown)
+        """
+        self.get_owner = get_owner
+        self.__gains = {}
+
+    def set_gain(self, owner, gain):
+        """
+        Set application gain
+
+        Args:
+            owner (str): application (voice owner)
+            gain (float): linear gain (1.0 for full level)
+
+        Raises:
+            Exception: if gain is invalid
+        """
+        if not 0.0 <= gain <= 1.0:
+            raise Exception("Invalid application gain")
+
+        if gain == 1.0:
+            self.__gains.pop(owner, None)
+        else:
+            self.__gains[owner] = numpy.float32(gain)
+
+    def get_gain(self, owner):
+        """
+        Return application gain
+
+        Args:
+            owner (str): application (voice owner)
+
+        Returns:
+            float: linear gain (1.0 if not set)
+        """
+        return float(self.__gains.get(owner, 1.0))
+
+    def get_gains(self):
+        """
+        Return gains of all applications with reduced level
+
+        Returns:
+            dict: linear gain by application
+        """
+        return {owner: float(gain) for owner, gain in list(self.__gains.items())}
+
+    def process(self, voice_id, frames):
+        """
+        Apply gain of voice owner on frames
+
+        Args:
+            voice_id (str): voice id
+            frames (numpy.ndarray): float frames of shape (frames, channels)
+
+        Returns:
+            numpy.ndarray: float frames
+        """
+        if not self.__gains:
+            return frames
+        gain = self.__gains.get(self.get_owner(voice_id))
+        return frames if gain is None else frames * gain
+
+
+class AudioMixer:
+    """
+    Software mixer: sum voices frames after ducking and application gain stages. Hardware
+    mixer is never used.
+
+    Mixer is applied on sounds queue and stream playback only, each one mixing its own
+    voice: sounds played by test_playing or directly by drivers (PlaySound) don't go
+    through it, so ducking and application gains don't apply to them.
+    """
+
+    def __init__(self, channels, ducker, gains=None):
+        """
+        Constructor
+
+        Args:
+            channels (int): number of channels
+            ducker (AudioDucker): ducking stage
+            gains (AppGains): application gain stage (optional)
+        """
+        self.channels = channels
+        self.ducker = ducker
+        self.gains = gains
+
+    def mix(self, voices):
+        """
+        Mix voices frames. Shorter voices are padded with silence
+
+        Args:
+            voices (dict): float frames of shape (frames, channels) by voice id
+
+        Returns:
+            numpy.ndarray: mixed float frames clipped to [-1.0, 1.0]
+        """
+        count = max((len(frames) for frames in voices.values()), default=0)
+        mixed = numpy.zeros((count, self.channels), dtype=numpy.float32)
+        for voice_id, frames in voices.items():
+            frames = self.ducker.process(voice_id, frames)
+            if self.gains:
+                frames = self.gains.process(voice_id, frames)
+            mixed[: len(frames)] += frames
+
+        return numpy.clip(mixed, -1.0, 1.0, out=mixed)
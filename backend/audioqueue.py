@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import threading
+import uuid
+import wave
+import numpy
+from .audioconverter import (
+    PolyphaseResampler,
+    SampleFormat,
+    frames_from_bytes,
+    frames_to_bytes,
+    from_float,
+    to_float,
+)
+
+WAV_FORMATS = {
+    2: SampleFormat.S16_LE,
+    4: SampleFormat.S32_LE,
+}
+
+
+def read_wav_infos(path):
+    """
+    Read wav file header
+
+    Args:
+        path (str): wav file path
+
+    Returns:
+        tuple: (frames count, sample rate, channels, sample format)
+
+    Raises:
+        Exception: if file is not a supported wav file
+    """
+    try:
+        with wave.open(path, "rb") as wav:
+            sample_width = wav.getsampwidth()
+            infos = (
+                wav.getnframes(),
+                wav.getframerate(),
+                wav.getnchannels(),
+            )
+    except (OSError, EOFError, wave.Error) as error:
+        raise Exception(f'Unable to read audio file "{path}": {error}') from error
+    if sample_width not in WAV_FORMATS:
+        raise Exception(f'Unsupported sample width in audio file "{path}"')
+
+    return infos + (WAV_FORMATS[sample_width],)
+
+
+def decode_wav(path):
+    """
+    Decode wav file
+
+    Args:
+        path (str): wav file path
+
+    Returns:
+        tuple: (frames array of shape (frames, channels), sample rate, sample format)
+
+    Raises:
+        Exception: if file is not a supported wav file
+    """
+    _, rate, channels, sample_format = read_wav_infos(path)
+    with wave.open(path, "rb") as wav:
+        raw = wav.readframes(wav.getnframes())
+
+    return frames_from_bytes(raw, sample_format, channels), rate, sample_format
+
+
+class QueueItem:
+    """
+    Audio queue item
+    """
+
+    def __init__(self, path, frames_count):
+        """
+        Constructor
+
+        Args:
+            path (str): audio file path
+            frames_count (int): item length in queue output frames
+        """
+        self.id = str(uuid.uuid4())
+        self.path = path
+        self.frames_count = frames_count
+        self.frames = None
+        self.decoding = False
+        self.position = 0
+
+    def to_dict(self):
+        """
+        Return item as dict
+
+        Returns:
+            dict: item::
+
+                {
+                    id (str): item id
+                    sound (str): sound file name
+                    decoded (bool): True if item is decoded
+                }
+
+        """
+        return {
+            "id": self.id,
+            "sound": os.path.basename(self.path),
+            "decoded": self.frames is not None,
+        }
+
+
+class AudioQueue:
+    """
+    Gapless audio queue
+
+    Items are decoded and converted to output format ahead of playback by a decoder thread,
+    within a memory budget. Player thread writes items to a single output stream by fixed
+    size chunks, chunks overlap items boundaries so there is no gap between items.
+    """
+
+    CHUNK_FRAMES = 2048
+    LOOKAHEAD_BYTES = 4 * 1024 * 1024
+
+    def __init__(
+        self,
+        rate,
+        channels,
+        output_factory,
+        mixer=None,
+        on_start=None,
+        on_idle=None,
+        lookahead_bytes=LOOKAHEAD_BYTES,
+    ):
+        """
+        Constructor
+
+        Args:
+            rate (int): output sample rate
+            channels (int): output channels
+            output_factory (function): function returning output stream (see PcmPlayback)
+                that plays S16_LE frames at queue rate and channels
+            mixer (AudioMixer): mix stage applied on output chunks (queue is voice_id voice)
+            on_start (function): function called before playback starts, queue is cleared
+                if it returns False
+            on_idle (function): function called when queue is over
+            lookahead_bytes (int): max memory used by decoded items waiting to be played
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.rate = rate
+        self.channels = channels
+        self.output_factory = output_factory
+        self.mixer = mixer
+        self.on_start = on_start
+        self.on_idle = on_idle
+        self.lookahead_bytes = lookahead_bytes
+        self.voice_id = None
+        self.frame_size = numpy.dtype(numpy.float32).itemsize * channels
+        self.__items = []
+        self.__cond = threading.Condition()
+        self.__player = None
+        self.__decoder = None
+        self.__running = False
+
+    def enqueue(self, path):
+        """
+        Add sound at end of queue. Playback starts if queue is not playing
+
+        Args:
+            path (str): wav file path
+
+        Returns:
+            str: item id
+
+        Raises:
+            Exception: if file can't be played
+        """
+        frames_count, rate, _, _ = read_wav_infos(path)
+        item = QueueItem(path, int(frames_count * self.rate / rate))
+        with self.__cond:
+            self.__items.append(item)
+            if not self.__running:
+                self.__running = True
+                # previous player may still drain its output
+                self.__player = threading.Thread(
+                    target=self._play, args=(self.__player,), daemon=True
+                )
+                self.__decoder = threading.Thread(target=self._decode, daemon=True)
+                self.__player.start()
+                self.__decoder.start()
+            self.__cond.notify_all()
+
+        return item.id
+
+    def skip(self):
+        """
+        Skip current item
+
+        Returns:
+            bool: True if an item was skipped
+        """
+        with self.__cond:
+            if not self.__items:
+                return False
+            self.__items.pop(0)
+            self.__cond.notify_all()
+        return True
+
+    def clear(self):
+        """
+        Remove all items (current item playback is stopped)
+        """
+        with self.__cond:
+            self.__items.clear()
+            self.__cond.notify_all()
+
+    def get_items(self):
+        """
+        Return queue items, first one is playing
+
+        Returns:
+            list: list of items (see QueueItem.to_dict)
+        """
+        with self.__cond:
+            return [item.to_dict() for item in self.__items]
+
+    def is_playing(self):
+        """
+        Return True if queue is playing
+
+        Returns:
+            bool: True if playing
+        """
+        return self.__running
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait for end of queue
+
+        Args:
+            timeout (float): max time to wait (seconds)
+
+        Returns:
+            bool: True if queue is over
+        """
+        player = self.__player
+        if player:
+            player.join(timeout)
+        return not self.__running
+
+    def _get_lookahead_size(self):
+        """
+        Return memory used by decoded items waiting to be played. Must be called with lock
+        acquired
+        """
+        return sum(
+            item.frames.nbytes for item in self.__items[1:] if item.frames is not None
+        )
+
+    def _get_next_to_decode(self):
+        """
+        Return next item to decode if memory budget allows it (current and next items are
+        always decoded). Must be called with lock acquired
+        """
+        for index, item in enumerate(self.__items):
+            if item.frames is not None or item.decoding:
+                continue
+            if index <= 1:
+                return item
+            size = item.frames_count * self.frame_size
+            if self._get_lookahead_size() + size <= self.lookahead_bytes:
+                return item
+            return None
+        return None
+
+    def _decode(self):
+        """
+        Decoder thread
+        """
+        while True:
+            with self.__cond:
+                item = self._get_next_to_decode()
+                while item is None and self.__running:
+                    self.__cond.wait()
+                    item = self._get_next_to_decode()
+                if not self.__running:
+                    return
+                item.decoding = True
+
+            try:
+                frames = self._decode_item(item.path)
+            except Exception:
+                self.logger.exception('Unable to decode "%s"', item.path)
+                frames = numpy.zeros((0, self.channels), dtype=numpy.float32)
+            with self.__cond:
+                item.frames = frames
+                self.__cond.notify_all()
+
+    def _decode_item(self, path):
+        """
+        Decode item and convert it to queue output format
+
+        Args:
+            path (str): wav file path
+
+        Returns:
+            numpy.ndarray: float32 frames of shape (frames, channels)
+        """
+        frames, rate, sample_format = decode_wav(path)
+        frames = to_float(frames, sample_format)
+
+        # channels mapping
+        if frames.shape[1] != self.channels:
+            if frames.shape[1] == 1:
+                frames = numpy.repeat(frames, self.channels, axis=1)
+            else:
+                frames = numpy.repeat(
+                    frames.mean(axis=1, keepdims=True), self.channels, axis=1
+                )
+
+        if rate == self.rate:
+            return numpy.ascontiguousarray(frames, dtype=numpy.float32)
+
+        resampler = PolyphaseResampler(rate, self.rate, self.channels)
+        resampled = numpy.concatenate((resampler.process(frames), resampler.flush()))
+        # drop filter group delay so items are spliced sample accurately
+        delay = int(round(resampler.taps / 2.0 * self.rate / rate))
+        return resampled[delay : delay + int(len(frames) * self.rate / rate)]
+
+    def _next_chunk(self):
+        """
+        Build next output chunk from queue items, across items boundaries
+
+        Returns:
+            numpy.ndarray: float32 chunk or None if queue is over
+        """
+        parts = []
+        missing = self.CHUNK_FRAMES
+        with self.__cond:
+            if not self.__items:
+                # stop now so next enqueue starts a new player
+                self.__running = False
+                self.__cond.notify_all()
+                return None
+            while missing > 0 and self.__items:
+                item = self.__items[0]
+                while item.frames is None and self.__items and self.__items[0] is item:
+                    self.__cond.wait()
+                if not self.__items or self.__items[0] is not item:
+                    # item skipped while decoding
+                    continue
+
+                part = item.frames[item.position : item.position + missing]
+                item.position += len(part)
+                missing -= len(part)
+                parts.append(part)
+                if item.position >= len(item.frames):
+                    self.__items.pop(0)
+                    # decoder can prefetch one more item
+                    self.__cond.notify_all()
+
+        if not parts:
+            return None
+        return numpy.concatenate(parts) if len(parts) > 1 else parts[0]
+
+    def _play(self, previous_player):
+        """
+        Player thread
+
+        Args:
+            previous_player (Thread): previous player thread, waited before starting
+        """
+        if previous_player:
+            previous_player.join()
+
+        output = None
+        try:
+            if self.on_start and not self.on_start():
+                self.clear()
+            while True:
+                chunk = self._next_chunk()
+                if chunk is None:
+                    break
+                if self.mixer:
+                    chunk = self.mixer.mix({self.voice_id: chunk})
+                if output is None:
+                    output = self.output_factory()
+                    output.start()
+                if not output.write(
+                    frames_to_bytes(from_float(chunk, SampleFormat.S16_LE))
+                ):
+                    self.logger.error("Audio queue output stopped")
+                    self.clear()
+            if output:
+                output.drain()
+        except Exception:
+            self.logger.exception("Audio queue playback failed")
+            self.clear()
+            # consume queue end
+            self._next_chunk()
+            if output:
+                output.stop()
+        finally:
+            if self.on_idle:
+                self.on_idle()
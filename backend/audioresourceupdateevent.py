@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+
+class AudioResourceUpdateEvent(Event):
+    """
+    Audio.resource.update event
+    """
+
+    EVENT_NAME = "audio.resource.update"
+    EVENT_PROPAGATE = False
+    EVENT_PARAMS = ["id", "resource", "owner", "priority", "state"]
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import threading
+import time
+import uuid
+
+
+class AudioPriority:
+    """
+    Audio streams priorities (highest value wins)
+    """
+
+    MUSIC = 0
+    NOTIFICATION = 1
+    VOICE = 2
+    ALARM = 3
+
+    NAMES = {
+        "music": MUSIC,
+        "notification": NOTIFICATION,
+        "voice": VOICE,
+        "alarm": ALARM,
+    }
+
+
+class AudioGrant:
+    """
+    Audio resource request and its grant state
+    """
+
+    STATE_WAITING = "waiting"
+    STATE_ACTIVE = "active"
+    STATE_DUCKED = "ducked"
+    STATE_PREEMPTED = "preempted"
+    STATE_RELEASED = "released"
+    STATE_TIMEOUT = "timeout"
+
+    def __init__(self, resource, owner, priority, duck):
+        """
+        Constructor
+
+        Args:
+            resource (str): resource name
+            owner (str): request owner (module name...)
+            priority (int): request priority (see AudioPriority)
+            duck (bool): True to duck lower priority streams instead of preempting them
+        """
+        self.id = str(uuid.uuid4())
+        self.resource = resource
+        self.owner = owner
+        self.priority = priority
+        self.duck = duck
+        self.state = self.STATE_WAITING
+        self.requested_at = time.perf_counter()
+        self.granted_at = None
+
+    def is_granted(self):
+        """
+        Return True if resource is currently granted (active or ducked)
+
+        Returns:
+            bool: True if granted
+        """
+        return self.state in (self.STATE_ACTIVE, self.STATE_DUCKED)
+
+    def to_dict(self):
+        """
+        Return grant as dict
+
+        Returns:
+            dict: grant::
+
+                {
+                    id (str): grant id
+                    resource (str): resource name
+                    owner (str): request owner
+                    priority (int): request priority
+                    state (str): grant state
+                }
+
+        """
+        return {
+            "id": self.id,
+            "resource": self.resource,
+            "owner": self.owner,
+            "priority": self.priority,
+            "state": self.state,
+        }
+
+
+class AudioScheduler:
+    """
+    Priority aware audio resources scheduler
+
+    Each resource is granted to one foreground stream. Higher priority request preempts
+    current streams, or ducks them if request allows it (ducked streams keep the resource
+    and get it back in foreground when higher priority stream is released). Lower or equal
+    priority requests are queued (by priority, then arrival) during a bounded time.
+    """
+
+    MAX_WAIT = 10.0
+    STATS_WINDOW = 100
+
+    def __init__(self, on_update=None, on_resource=None):
+        """
+        Constructor
+
+        Args:
+            on_update (function): function called with grant dict when grant state changes
+                because of another request (preempted, ducked, restored, granted after wait)
+            on_resource (function): function called with resource name when resource becomes
+                used (first stream granted) or free (last stream released or preempted)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_update = on_update
+        self.on_resource = on_resource
+        self.__cond = threading.Condition()
+        # granted streams by resource, last one is in foreground
+        self.__active = collections.defaultdict(list)
+        self.__waiting = collections.defaultdict(list)
+        self.__grants = {}
+        self.__latencies = collections.deque(maxlen=self.STATS_WINDOW)
+        self.__requests = 0
+        self.__preemptions = 0
+        self.__timeouts = 0
+
+    def request(self, resource, owner, priority, duck=False, timeout=0.0):
+        """
+        Request resource
+
+        Args:
+            resource (str): resource name
+            owner (str): request owner
+            priority (int): request priority (see AudioPriority)
+            duck (bool): duck lower priority streams instead of preempting them
+            timeout (float): max time to wait for resource if it is used by equal or higher
+                priority stream (seconds, bounded to MAX_WAIT)
+
+        Returns:
+            AudioGrant: grant, its state is active if resource is granted, timeout otherwise
+        """
+        grant = AudioGrant(resource, owner, priority, duck)
+        notifications = []
+        with self.__cond:
+            was_used = bool(self.__active[resource])
+            self.__requests += 1
+            self.__grants[grant.id] = grant
+            if not self._try_grant(grant, notifications):
+                self.__waiting[resource].append(grant)
+                end = time.monotonic() + min(max(timeout, 0.0), self.MAX_WAIT)
+                while grant.state == AudioGrant.STATE_WAITING:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        self.__waiting[resource].remove(grant)
+                        self.__grants.pop(grant.id, None)
+                        self._set_state(grant, AudioGrant.STATE_TIMEOUT, [])
+                        self.__timeouts += 1
+                        break
+                    self.__cond.wait(remaining)
+            changed = was_used != bool(self.__active[resource])
+        self._notify(notifications)
+        if changed:
+            self._notify_resource(resource)
+
+        return grant
+
+    def release(self, grant_id):
+        """
+        Release granted resource (or cancel waiting request)
+
+        Args:
+            grant_id (str): grant id
+
+        Returns:
+            bool: True if grant was released
+        """
+        notifications = []
+        with self.__cond:
+            grant = self.__grants.pop(grant_id, None)
+            if grant is None:
+                return False
+
+            resource = grant.resource
+            was_used = bool(self.__active[resource])
+            if grant in self.__waiting[resource]:
+                self.__waiting[resource].remove(grant)
+            was_foreground = (
+                self.__active[resource] and self.__active[resource][-1] is grant
+            )
+            if grant in self.__active[resource]:
+                self.__active[resource].remove(grant)
+            if grant.state != AudioGrant.STATE_PREEMPTED:
+                grant.state = AudioGrant.STATE_RELEASED
+
+            # restore ducked stream
+            if was_foreground and self.__active[resource]:
+                self._set_state(
+                    self.__active[resource][-1], AudioGrant.STATE_ACTIVE, notifications
+                )
+            self._grant_waiting(resource, notifications)
+            self.__cond.notify_all()
+            changed = was_used != bool(self.__active[resource])
+        self._notify(notifications)
+        if changed:
+            self._notify_resource(resource)
+
+        return True
+
+    def preempt(self, resource):
+        """
+        Preempt all streams using resource (resource is taken by someone the scheduler
+        does not arbitrate). Waiting requests keep waiting
+
+        Args:
+            resource (str): resource name
+
+        Returns:
+            int: number of preempted streams
+        """
+        notifications = []
+        with self.__cond:
+            active = self.__active[resource]
+            for grant in active:
+                self._set_state(grant, AudioGrant.STATE_PREEMPTED, notifications)
+                self.__grants.pop(grant.id, None)
+                self.__preemptions += 1
+            count = len(active)
+            active.clear()
+        self._notify(notifications)
+        if count:
+            self._notify_resource(resource)
+
+        return count
+
+    def is_used(self, resource):
+        """
+        Return True if resource is granted to at least one stream
+
+        Args:
+            resource (str): resource name
+
+        Returns:
+            bool: True if resource is used
+        """
+        with self.__cond:
+            return bool(self.__active[resource])
+
+    def get_grant(self, grant_id):
+        """
+        Return grant
+
+        Args:
+            grant_id (str): grant id
+
+        Returns:
+            AudioGrant: grant or None if grant does not exist (or is released)
+        """
+        return self.__grants.get(grant_id)
+
+    def get_stats(self):
+        """
+        Return scheduler stats
+
+        Returns:
+            dict: stats::
+
+                {
+                    requests (int): number of requests
+                    preemptions (int): number of preempted streams
+                    timeouts (int): number of requests not granted in time
+                    latency (dict): arbitration latency of last granted requests (ms)
+                        count, mean, p95 and max
+                }
+
+        """
+        with self.__cond:
+            latencies = sorted(self.__latencies)
+            stats = {
+                "requests": self.__requests,
+                "preemptions": self.__preemptions,
+                "timeouts": self.__timeouts,
+            }
+        latency = {"count": len(latencies), "mean": None, "p95": None, "max": None}
+        if latencies:
+            latency["mean"] = sum(latencies) / len(latencies) * 1000.0
+            latency["p95"] = latencies[int((len(latencies) - 1) * 0.95)] * 1000.0
+            latency["max"] = latencies[-1] * 1000.0
+        stats["latency"] = latency
+
+        return stats
+
+    def _try_grant(self, grant, notifications):
+        """
+        Grant resource if it is free or used by lower priority stream. Must be called with
+        lock acquired
+
+        Returns:
+            bool: True if resource granted
+        """
+        active = self.__active[grant.resource]
+        if active:
+            foreground = active[-1]
+            if grant.priority <= foreground.priority:
+                return False
+            if grant.duck:
+                self._set_state(foreground, AudioGrant.STATE_DUCKED, notifications)
+            else:
+                for preempted in active:
+                    self._set_state(
+                        preempted, AudioGrant.STATE_PREEMPTED, notifications
+                    )
+                    self.__grants.pop(preempted.id, None)
+                    self.__preemptions += 1
+                active.clear()
+
+        active.append(grant)
+        grant.granted_at = time.perf_counter()
+        self.__latencies.append(grant.granted_at - grant.requested_at)
+        self._set_state(grant, AudioGrant.STATE_ACTIVE, [])
+        return True
+
+    def _grant_waiting(self, resource, notifications):
+        """
+        Grant resource to waiting requests by priority. Must be called with lock acquired
+        """
+        waiting = self.__waiting[resource]
+        while waiting:
+            # highest priority first, then oldest request
+            grant = max(
+                waiting, key=lambda request: (request.priority, -request.requested_at)
+            )
+            if not self._try_grant(grant, notifications):
+                break
+            waiting.remove(grant)
+            notifications.append(grant.to_dict())
+
+    def _set_state(self, grant, state, notifications):
+        """
+        Change grant state and append notification
+        """
+        if grant.state == state:
+            return
+        grant.state = state
+        notifications.append(grant.to_dict())
+
+    def _notify(self, notifications):
+        """
+        Send notifications (without lock acquired)
+        """
+        if not self.on_update:
+            return
+        for notification in notifications:
+            try:
+                self.on_update(notification)
+            except Exception:
+                self.logger.exception("Error notifying grant update")
+
+    def _notify_resource(self, resource):
+        """
+        Notify resource usage change (without lock acquired)
+        """
+        if not self.on_resource:
+            return
+        try:
+            self.on_resource(resource)
+        except Exception:
+            self.logger.exception("Error notifying resource update")
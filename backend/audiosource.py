@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import urllib.error
+import urllib.request
+
+
+class StreamSource:
+    """
+    Audio stream source base class: sequential, non seekable bytes reader
+    """
+
+    def __init__(self, location):
+        """
+        Constructor
+
+        Args:
+            location (str): source location (path, url...)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.location = location
+
+    def open(self):
+        """
+        Open source
+
+        Raises:
+            Exception: if source can't be opened
+        """
+        raise NotImplementedError("open function must be implemented")
+
+    def read(self, size):
+        """
+        Read data
+
+        Args:
+            size (int): max number of bytes to read
+
+        Returns:
+            bytes: data, empty at end of stream
+
+        Raises:
+            Exception: if read failed
+        """
+        raise NotImplementedError("read function must be implemented")
+
+    def close(self):
+        """
+        Close source
+        """
+        raise NotImplementedError("close function must be implemented")
+
+
+class PipeSource(StreamSource):
+    """
+    Stream source reading an already opened file object (pipe, process output...)
+    """
+
+    def __init__(self, fileobj, location="pipe"):
+        """
+        Constructor
+
+        Args:
+            fileobj (file): opened binary file object
+            location (str): source name
+        """
+        StreamSource.__init__(self, location)
+        self._fileobj = fileobj
+
+    def open(self):
+        """
+        Open source (file object is already opened)
+        """
+
+    def read(self, size):
+        """
+        Read data
+
+        Args:
+            size (int): max number of bytes to read
+
+        Returns:
+            bytes: data, empty at end of stream
+        """
+        return self._fileobj.read(size)
+
+    def close(self):
+        """
+        Close source
+        """
+        self._fileobj.close()
+
+
+class FileSource(PipeSource):
+    """
+    Stream source reading local file
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Args:
+            path (str): file path
+        """
+        PipeSource.__init__(self, None, path)
+
+    def open(self):
+        """
+        Open file
+
+        Raises:
+            Exception: if file can't be opened
+        """
+        try:
+            self._fileobj = open(self.location, "rb")
+        except OSError as error:
+            raise Exception(f'Unable to open "{self.location}": {error}') from error
+
+    def close(self):
+        """
+        Close file
+        """
+        if self._fileobj:
+            self._fileobj.close()
+
+
+class HttpSource(PipeSource):
+    """
+    Stream source reading HTTP response body while it is downloaded
+    """
+
+    def __init__(self, url, timeout=10.0):
+        """
+        Constructor
+
+        Args:
+            url (str): stream url
+            timeout (float): connection and read timeout (seconds)
+        """
+        PipeSource.__init__(self, None, url)
+        self.timeout = timeout
+
+    def open(self):
+        """
+        Connect to server
+
+        Raises:
+            Exception: if request failed
+        """
+        try:
+            self._fileobj = urllib.request.urlopen(self.location, timeout=self.timeout)
+        except (urllib.error.URLError, OSError, ValueError) as error:
+            raise Exception(f'Unable to open "{self.location}": {error}') from error
+
+    def read(self, size):
+        """
+        Read downloaded data
+
+        Args:
+            size (int): max number of bytes to read
+
+        Returns:
+            bytes: data, empty at end of stream
+        """
+        # read1 returns as soon as some data is received
+        return self._fileobj.read1(size)
+
+    def close(self):
+        """
+        Close connection
+        """
+        if self._fileobj:
+            self._fileobj.close()
+
+
+def get_source(location):
+    """
+    Return stream source according to location
+
+    Args:
+        location (str): http(s) url or absolute file path
+
+    Returns:
+        StreamSource: stream source
+
+    Raises:
+        Exception: if location is not supported
+    """
+    if location.startswith(("http://", "https://")):
+        return HttpSource(location)
+    if os.path.isabs(location):
+        return FileSource(location)
+
+    raise Exception(f'Unsupported stream location "{location}"')
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import uuid
+import wave
+import numpy
+from .audioconverter import (
+    PolyphaseResampler,
+    SampleFormat,
+    frames_from_bytes,
+    frames_to_bytes,
+    from_float,
+    to_float,
+)
+from .audioqueue import WAV_FORMATS
+from .prefetchbuffer import PrefetchBuffer
+
+
+class AudioStream:
+    """
+    Stream player: play wav stream from source while it is received
+
+    Source is read through a bounded prefetch buffer, playback starts as soon as buffer
+    reaches its high watermark.
+    """
+
+    STATE_BUFFERING = "buffering"
+    STATE_PLAYING = "playing"
+    STATE_STOPPED = "stopped"
+    STATE_ENDED = "ended"
+    STATE_FAILED = "failed"
+
+    CHUNK_FRAMES = 2048
+    PREFILL_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        source,
+        rate,
+        channels,
+        output_factory,
+        mixer=None,
+        on_end=None,
+        high_watermark=262144,
+        low_watermark=131072,
+    ):
+        """
+        Constructor
+
+        Args:
+            source (StreamSource): stream source
+            rate (int): output sample rate
+            channels (int): output channels
+            output_factory (function): function returning output stream (see PcmPlayback)
+                that plays S16_LE frames at stream rate and channels
+            mixer (AudioMixer): mix stage applied on output chunks (stream is voice_id voice)
+            on_end (function): function called with stream when playback is over
+            high_watermark (int): prefetch buffer high watermark (bytes)
+            low_watermark (int): prefetch buffer low watermark (bytes)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.id = str(uuid.uuid4())
+        self.source = source
+        self.rate = rate
+        self.channels = channels
+        self.output_factory = output_factory
+        self.mixer = mixer
+        self.on_end = on_end
+        self.voice_id = None
+        self.state = self.STATE_BUFFERING
+        self.error = None
+        self.buffer = PrefetchBuffer(source, high_watermark, low_watermark)
+        self.__stopped = threading.Event()
+        self.__output = None
+        self.__thread = None
+
+    def start(self):
+        """
+        Start stream
+
+        Raises:
+            Exception: if source can't be opened
+        """
+        self.buffer.start()
+        self.__thread = threading.Thread(target=self._run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop stream immediately
+        """
+        self.__stopped.set()
+        self.buffer.close()
+        output = self.__output
+        if output:
+            output.stop()
+
+    def join(self, timeout=None):
+        """
+        Wait for end of stream
+
+        Args:
+            timeout (float): max time to wait (seconds)
+
+        Returns:
+            bool: True if stream is over
+        """
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def to_dict(self):
+        """
+        Return stream as dict
+
+        Returns:
+            dict: stream::
+
+                {
+                    id (str): stream id
+                    location (str): source location
+                    state (str): stream state
+                    error (str): error message if stream failed
+                    buffer (dict): prefetch buffer stats (see PrefetchBuffer.get_stats)
+                }
+
+        """
+        return {
+            "id": self.id,
+            "location": self.source.location,
+            "state": self.state,
+            "error": self.error,
+            "buffer": self.buffer.get_stats(),
+        }
+
+    def _convert(self, raw, sample_format, channels, resampler):
+        """
+        Convert stream chunk to float frames at output rate and channels
+
+        Returns:
+            numpy.ndarray: float32 frames of shape (frames, channels)
+        """
+        frames = to_float(
+            frames_from_bytes(raw, sample_format, channels), sample_format
+        )
+        if channels != self.channels:
+            if channels != 1:
+                frames = frames.mean(axis=1, keepdims=True)
+            frames = numpy.repeat(frames, self.channels, axis=1)
+        if resampler:
+            frames = resampler.process(frames)
+
+        return numpy.ascontiguousarray(frames, dtype=numpy.float32)
+
+    def _write(self, frames):
+        """
+        Mix and write frames to output (output is opened on first write)
+
+        Returns:
+            bool: True if frames written
+        """
+        if self.mixer:
+            frames = self.mixer.mix({self.voice_id: frames})
+        if self.__output is None:
+            self.__output = self.output_factory()
+            self.__output.start()
+        return self.__output.write(
+            frames_to_bytes(from_float(frames, SampleFormat.S16_LE))
+        )
+
+    def _run(self):
+        """
+        Player thread
+        """
+        try:
+            self.buffer.wait_filled(self.PREFILL_TIMEOUT)
+            with wave.open(self.buffer, "rb") as wav:
+                if wav.getsampwidth() not in WAV_FORMATS:
+                    raise Exception("Unsupported sample width in audio stream")
+                sample_format = WAV_FORMATS[wav.getsampwidth()]
+                channels = wav.getnchannels()
+                rate = wav.getframerate()
+                resampler = (
+                    PolyphaseResampler(rate, self.rate, self.channels)
+                    if rate != self.rate
+                    else None
+                )
+
+                self.state = self.STATE_PLAYING
+                while not self.__stopped.is_set():
+                    raw = wav.readframes(self.CHUNK_FRAMES)
+                    if not raw:
+                        break
+                    frames = self._convert(raw, sample_format, channels, resampler)
+                    if not self._write(frames):
+                        raise Exception("Audio output stopped")
+                if resampler and not self.__stopped.is_set():
+                    self._write(resampler.flush())
+
+            if self.__stopped.is_set():
+                self.state = self.STATE_STOPPED
+            elif self.buffer.error:
+                raise Exception(self.buffer.error)
+            else:
+                if self.__output:
+                    self.__output.drain()
+                self.state = self.STATE_ENDED
+        except (wave.Error, EOFError) as error:
+            self._fail(f"Invalid audio stream: {error}")
+        except Exception as error:
+            self.logger.exception('Stream "%s" failed', self.source.location)
+            self._fail(str(error))
+        finally:
+            self.buffer.close()
+            if self.on_end:
+                self.on_end(self)
+
+    def _fail(self, error):
+        """
+        Stop playback after error
+        """
+        self.state = (
+            self.STATE_STOPPED if self.__stopped.is_set() else self.STATE_FAILED
+        )
+        self.error = None if self.__stopped.is_set() else error
+        if self.__output:
+            self.__output.stop()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.internals.event import Event
+
+
+class AudioVolumeChangedEvent(Event):
+    """
+    Audio.volume.changed event
+    """
+
+    EVENT_NAME = "audio.volume.changed"
+    EVENT_PROPAGATE = False
+    EVENT_PARAMS = ["playback", "capture"]
+
+    def __init__(self, params):
+        """
+        Constructor
+
+        Args:
+            params (dict): event parameters
+        """
+        Event.__init__(self, params)
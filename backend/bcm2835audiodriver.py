@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import re
-from cleep.libs.commands.alsa import Alsa
 from cleep.libs.configs.etcasoundconf import EtcAsoundConf
 from cleep.libs.drivers.audiodriver import AudioDriver
 from cleep.libs.internals.console import Console
 from cleep.libs.configs.configtxt import ConfigTxt
 import cleep.libs.internals.tools as Tools
+from .amixersession import AmixerSession
+from .controlmap import ControlMap
+from .driverstate import DriverState
 
 
 class Bcm2835AudioDriver(AudioDriver):
@@ -20,12 +22,17 @@ class Bcm2835AudioDriver(AudioDriver):
 
     MODULE_NAME = "snd_bcm2835"
 
-    VOLUME_PATTERN = ("Mono", r"\[(\d*)%\]")
-
     AMIXER_AUTO = 0
     AMIXER_JACK = 1
     AMIXER_HDMI = 2
 
+    OUTPUT_ROUTES = {
+        "auto": AMIXER_AUTO,
+        "jack": AMIXER_JACK,
+        "hdmi": AMIXER_HDMI,
+    }
+    DEFAULT_OUTPUT_ROUTE = "jack"
+
     def __init__(self):
         """
         Constructor
@@ -37,6 +44,15 @@ class Bcm2835AudioDriver(AudioDriver):
         self.console = None
         self.volume_control = ""
         self.volume_control_numid = None
+        self.controls = None
+        self.state = DriverState(
+            {
+                "installed": self._is_installed,
+                "card": lambda: self.is_card_enabled(),
+                "asound": lambda: self.asoundconf.exists(),
+            }
+        )
+        self.output_route = self.DEFAULT_OUTPUT_ROUTE
 
     def _on_audio_registered(self):
         """
@@ -45,6 +61,7 @@ class Bcm2835AudioDriver(AudioDriver):
         self.asoundconf = EtcAsoundConf(self.cleep_filesystem)
         self.configtxt = ConfigTxt(self.cleep_filesystem)
         self.console = Console()
+        self.controls = ControlMap(self.console, AmixerSession)
 
     def _get_card_name(self, devices_names):
         """
@@ -86,11 +103,13 @@ class Bcm2835AudioDriver(AudioDriver):
 
         # as the default driver and just in case, delete existing config
         self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
 
         # installing native audio device consists of enabling dtparam audio in /boot/config.txt
         if not self.configtxt.enable_audio():
             raise Exception("Error enabling raspberry pi audio")
 
+        self.state.invalidate("installed")
         return True
 
     def _uninstall(self, params=None):
@@ -107,11 +126,21 @@ class Bcm2835AudioDriver(AudioDriver):
         if not self.configtxt.disable_audio():
             raise Exception("Error disabling raspberry pi audio")
 
+        self.state.invalidate("installed")
         return True
 
     def is_installed(self):
         """
-        Is driver installed
+        Is driver installed (memoized)
+
+        Returns:
+            bool: True if driver is installed
+        """
+        return self.state.get("installed")
+
+    def _is_installed(self):
+        """
+        Probe driver installation
 
         Returns:
             bool: True if driver is installed
@@ -124,6 +153,7 @@ class Bcm2835AudioDriver(AudioDriver):
         """
         # as the default driver and just in case, delete existing config
         self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
 
         # create default /etc/asound.conf
         card_infos = self.get_cardid_deviceid()
@@ -143,18 +173,18 @@ class Bcm2835AudioDriver(AudioDriver):
             )
             return False
 
-        # configure default output to "auto" in alsa (0=auto, 1=headphone jack, 2=HDMI) if necessary
-        route_control_numid = self.get_control_numid("Route")
-        self.logger.trace("route_control_numid=%s", route_control_numid)
-        if route_control_numid is not None:
-            if not self.alsa.amixer_control(
-                Alsa.CSET, route_control_numid, self.AMIXER_JACK
-            ):
+        # configure output route in alsa (0=auto, 1=headphone jack, 2=HDMI) if necessary
+        controls = self._get_controls(card_infos[0])
+        route_control = controls.find("Route") if controls else None
+        self.logger.trace("route_control=%s", route_control)
+        if route_control is not None:
+            if not self._write_output_route(route_control, self.output_route):
                 self.logger.error("Error executing amixer command")
                 return False
 
         # force saving alsa conf (this will create asound.state if needed)
         self.alsa.save()
+        self.state.set("asound", True)
 
         self.logger.debug("Driver enabled")
         return True
@@ -169,31 +199,121 @@ class Bcm2835AudioDriver(AudioDriver):
         self.logger.debug("Delete /etc/asound.conf and /var/lib/alsa/asound.state")
         if not self.asoundconf.delete():
             self.logger.error("Unable to delete asound.conf file")
+            self.state.invalidate("asound", "card")
             return False
+        self.state.set("asound", False)
+        self.state.invalidate("card")
 
         self.logger.debug("Driver disabled")
         return True
 
     def is_enabled(self):
         """
-        Is driver enabled ?
+        Is driver enabled ? Status is memoized, it is updated by driver transitions and
+        hotplug events
 
         Returns:
             bool: True if driver enabled
         """
-        card = self.is_card_enabled()
-        asound = self.asoundconf.exists()
+        return self.state.get("card") and self.state.get("asound")
 
-        return card and asound
+    def _write_output_route(self, route_control, route):
+        """
+        Write output route control
+
+        Args:
+            route_control (dict): route control
+            route (str): output route (see OUTPUT_ROUTES)
+
+        Returns:
+            bool: True if route written successfully
+        """
+        values = self.controls.write(route_control, [self.OUTPUT_ROUTES[route]])
+        return values is not None and values[0] == self.OUTPUT_ROUTES[route]
+
+    def get_output_route(self):
+        """
+        Return current output route (cached value, no hardware access)
+
+        Returns:
+            str: output route (see OUTPUT_ROUTES)
+        """
+        return self.output_route
+
+    def set_output_route(self, route):
+        """
+        Set output route at runtime (single control write, driver is not re-enabled)
+
+        Args:
+            route (str): output route (see OUTPUT_ROUTES)
+
+        Returns:
+            bool: True if route applied successfully
+
+        Raises:
+            Exception: if route is not supported
+        """
+        if route not in self.OUTPUT_ROUTES:
+            raise Exception(f'Unsupported output route "{route}"')
+
+        controls = self._get_controls()
+        route_control = controls.find("Route") if controls else None
+        if route_control is None:
+            self.logger.warning("Soundcard has no output route control")
+            return False
+        if not self._write_output_route(route_control, route):
+            self.logger.error('Unable to set output route to "%s"', route)
+            return False
+
+        self.output_route = route
+        return True
+
+    def on_cards_changed(self):
+        """
+        Soundcards changed (hotplug), invalidate card controls map and card status
+        """
+        self.controls.invalidate()
+        self.state.invalidate("card")
+
+    def _get_controls(self, card_id=None):
+        """
+        Return card controls map. Map is built once per card appearance
+
+        Args:
+            card_id (int): card index if already known
+
+        Returns:
+            ControlMap: controls map or None if card is not found
+        """
+        if card_id is not None and card_id != self.controls.card_id:
+            self.controls.invalidate()
+        if not self.controls.is_built():
+            if card_id is None:
+                card_id, _ = self.get_cardid_deviceid()
+            if card_id is None or not self.controls.build(card_id):
+                return None
+
+        return self.controls
+
+    def _get_volume_control(self):
+        """
+        Return playback volume control
+
+        Returns:
+            dict: playback volume control or None if not found
+        """
+        controls = self._get_controls()
+        return controls.find("Playback Volume") if controls else None
 
     def _set_volumes_controls(self):
         """
         Set controls used to configure volumes
         """
-        controls = self.alsa.get_simple_controls()
-        self.volume_control = controls[0] if len(controls) > 0 else ""
-
-        self.volume_control_numid = self.get_control_numid("Volume")
+        control = self._get_volume_control()
+        self.volume_control = (
+            control["name"].replace(" Playback Volume", "") if control else ""
+        )
+        self.volume_control_numid = control["numid"] if control else None
 
     def get_volumes(self):
         """
@@ -208,8 +328,12 @@ class Bcm2835AudioDriver(AudioDriver):
                 }
 
         """
+        control = self._get_volume_control()
+        values = self.controls.read(control) if control else None
         return {
-            "playback": self.alsa.get_volume(self.volume_control, self.VOLUME_PATTERN),
+            "playback": (
+                ControlMap.raw_to_percent(control, values[0]) if values else None
+            ),
             "capture": None,
         }
 
@@ -230,13 +354,60 @@ class Bcm2835AudioDriver(AudioDriver):
                 }
 
         """
+        if playback is None:
+            return self.get_volumes()
+
+        control = self._get_volume_control()
+        values = (
+            self.controls.write(control, [ControlMap.percent_to_raw(control, playback)])
+            if control
+            else None
+        )
         return {
-            "playback": self.alsa.set_volume(
-                self.volume_control, self.VOLUME_PATTERN, playback
+            "playback": (
+                ControlMap.raw_to_percent(control, values[0]) if values else None
             ),
             "capture": None,
         }
 
+    def get_channel_volumes(self):
+        """
+        Get volume of each channel
+
+        Returns:
+            dict: channels volumes::
+
+                {
+                    playback (list): playback volume of each channel
+                    capture (list): capture volume of each channel
+                }
+
+        """
+        return self.set_channel_volumes(None, None)
+
+    def set_channel_volumes(self, playback=None, capture=None):
+        """
+        Set volume of each channel
+
+        Args:
+            playback (list): playback volume of each channel (None to disable update)
+            capture (list): not supported, always None
+
+        Returns:
+            dict: channels volumes (see get_channel_volumes)
+
+        Raises:
+            Exception: if number of volumes does not match control channels
+        """
+        control = self._get_volume_control()
+        transaction = self.controls.transaction()
+        transaction.set_percents(control, playback)
+        transaction.commit()
+        return {
+            "playback": transaction.get_percents(control),
+            "capture": None,
+        }
+
     def require_reboot(self):
         """
         Require reboot after install/uninstall
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from cleep.libs.configs.etcasoundconf import EtcAsoundConf
+from cleep.libs.drivers.audiodriver import AudioDriver
+from cleep.libs.internals.console import Console
+from .bluezclient import BluezClient
+from .driverstate import DriverState
+
+
+class BluetoothAudioDriver(AudioDriver):
+    """
+    Audio driver for bluetooth speakers (A2DP sinks)
+
+    Devices are managed through BlueZ D-Bus api and audio is routed to bluez-alsa pcm.
+    Devices must be paired before being used.
+    """
+
+    PACKAGE = "bluez-alsa-utils"
+    ASOUNDCONF_PATH = "/etc/asound.conf"
+    ASOUNDCONF_TEMPLATE = """defaults.bluealsa.device "%(address)s"
+defaults.bluealsa.profile "a2dp"
+pcm.!default {
+    type plug
+    slave.pcm "bluealsa"
+}
+ctl.!default {
+    type bluealsa
+}
+"""
+
+    # AVRCP absolute volume range
+    MAX_VOLUME = 127
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        AudioDriver.__init__(self, "Bluetooth audio device")
+
+        self.asoundconf = None
+        self.console = None
+        self.bluez = None
+        # card status is not memoized: bluez client keeps devices state up to date
+        self.state = DriverState(
+            {
+                "installed": self._is_installed,
+                "asound": self._is_asoundconf_bluetooth,
+            }
+        )
+
+    def _on_audio_registered(self):
+        """
+        Audio driver registered
+        """
+        self.asoundconf = EtcAsoundConf(self.cleep_filesystem)
+        self.console = Console()
+        self.bluez = BluezClient()
+
+    def _get_sinks(self):
+        """
+        Return paired audio sinks
+
+        Returns:
+            list: bluetooth devices (see BluezClient.get_devices), empty list if bluez is
+                not reachable
+        """
+        try:
+            devices = self.bluez.get_devices()
+        except Exception as error:
+            self.logger.warning("Unable to get bluetooth devices: %s", str(error))
+            return []
+
+        return [
+            device for device in devices if device["paired"] and device["a2dp_sink"]
+        ]
+
+    def _get_connected_sink(self):
+        """
+        Return connected audio sink
+
+        Returns:
+            dict: bluetooth device or None if no sink is connected
+        """
+        return next((sink for sink in self._get_sinks() if sink["connected"]), None)
+
+    def get_devices(self):
+        """
+        Return paired bluetooth speakers
+
+        Returns:
+            list: speakers::
+
+                [
+                    {
+                        address (str): device address
+                        name (str): device name
+                        connected (bool): True if device is connected
+                    },
+                    ...
+                ]
+
+        """
+        return [
+            {
+                "address": sink["address"],
+                "name": sink["name"],
+                "connected": sink["connected"],
+            }
+            for sink in self._get_sinks()
+        ]
+
+    def get_card_name(self):
+        """
+        Return card name
+
+        Returns:
+            string: connected speaker name or None if no speaker connected
+        """
+        sink = self._get_connected_sink()
+        return sink["name"] if sink else None
+
+    def _get_card_name(self, devices_names):
+        """
+        Return card name. Bluetooth speakers are not listed in alsa devices
+
+        Returns:
+            string: connected speaker name or None if no speaker connected
+        """
+        return self.get_card_name()
+
+    def get_cardid_deviceid(self):
+        """
+        Return card and device ids. Bluetooth speaker is not an alsa hardware card
+
+        Returns:
+            tuple: (None, None)
+        """
+        return (None, None)
+
+    def is_card_enabled(self):
+        """
+        Is speaker connected
+
+        Returns:
+            bool: True if a paired speaker is connected
+        """
+        return self._get_connected_sink() is not None
+
+    def get_card_capabilities(self):
+        """
+        Return card capabilities
+
+        Returns:
+            tuple: card capabilities::
+
+                (
+                    bool: playback capability,
+                    bool: capture capability
+                )
+        """
+        return (True, False)
+
+    def _install(self, params=None):
+        """
+        Install driver
+
+        Args:
+            params (dict): additional parameters
+        """
+        resp = self.console.command(
+            f"apt update -qq && apt install -q --yes {self.PACKAGE}", timeout=300
+        )
+        if resp["returncode"] != 0:
+            self.logger.error("Unable to install bluetooth audio: %s", resp)
+            raise Exception("Unable to install bluetooth audio")
+
+        self.state.invalidate("installed")
+        return True
+
+    def _uninstall(self, params=None):
+        """
+        Uninstall driver
+
+        Args:
+            params (dict): additional parameters
+        """
+        resp = self.console.command(f"apt purge -q --yes {self.PACKAGE}")
+        if resp["returncode"] != 0:
+            self.logger.error("Unable to uninstall bluetooth audio: %s", resp)
+            raise Exception("Unable to uninstall bluetooth audio")
+
+        self.state.invalidate("installed")
+        return True
+
+    def is_installed(self):
+        """
+        Is driver installed (memoized)
+
+        Returns:
+            bool: True if driver is installed
+        """
+        return self.state.get("installed")
+
+    def _is_installed(self):
+        """
+        Probe driver installation
+
+        Returns:
+            bool: True if driver is installed
+        """
+        resp = self.console.command(f"dpkg -s {self.PACKAGE}")
+        return resp["returncode"] == 0
+
+    def _is_asoundconf_bluetooth(self):
+        """
+        Check if /etc/asound.conf routes audio to bluetooth speaker
+
+        Returns:
+            bool: True if asound.conf is configured for bluetooth
+        """
+        if not self.asoundconf.exists():
+            return False
+        content = self.cleep_filesystem.read_data(self.ASOUNDCONF_PATH)
+        return bool(content) and "bluealsa" in content
+
+    def enable(self, params=None):
+        """
+        Enable driver. Connected speaker is used, otherwise specified (or first) paired
+        speaker is connected
+
+        Args:
+            params (dict): additional parameters::
+
+                {
+                    address (str): speaker address (optional)
+                }
+
+        """
+        address = (params or {}).get("address")
+        sinks = self._get_sinks()
+        sink = next(
+            (
+                sink
+                for sink in sinks
+                if sink["address"] == address or (not address and sink["connected"])
+            ),
+            None,
+        )
+        if not sink and not address and sinks:
+            sink = sinks[0]
+        if not sink:
+            self.logger.error(
+                "No bluetooth speaker found. Please pair device before enabling it"
+            )
+            return False
+
+        if not sink["connected"]:
+            try:
+                self.bluez.connect_device(sink["path"])
+            except Exception as error:
+                self.logger.error(
+                    'Unable to connect bluetooth speaker "%s": %s',
+                    sink["name"],
+                    str(error),
+                )
+                return False
+
+        self.asoundconf.delete()
+        self.state.invalidate("asound")
+        self.logger.debug(
+            'Write to /etc/asound.conf bluetooth speaker "%s"', sink["address"]
+        )
+        if not self.cleep_filesystem.write_data(
+            self.ASOUNDCONF_PATH, self.ASOUNDCONF_TEMPLATE % sink
+        ):
+            self.logger.error(
+                'Unable to create /etc/asound.conf for bluetooth speaker "%s"',
+                sink["name"],
+            )
+            return False
+        self.state.set("asound", True)
+
+        return True
+
+    def disable(self, params=None):
+        """
+        Disable driver. Speaker stays connected
+
+        Args:
+            params (dict): additional parameters
+        """
+        self.logger.debug("Delete /etc/asound.conf")
+        if not self.asoundconf.delete():
+            self.logger.error("Unable to delete asound.conf file")
+            self.state.invalidate("asound")
+            return False
+        self.state.set("asound", False)
+
+        self.logger.debug("Driver disabled")
+        return True
+
+    def is_enabled(self):
+        """
+        Is driver enabled ? asound.conf status is memoized, speaker status is kept up to date
+        by bluez client
+
+        Returns:
+            bool: True if driver enabled
+        """
+        return self.state.get("asound") and self.is_card_enabled()
+
+    def on_cards_changed(self):
+        """
+        Soundcards changed (hotplug), read bluetooth devices again
+        """
+        self.bluez.invalidate()
+
+    def _get_transport(self):
+        """
+        Return media transport of connected speaker
+
+        Returns:
+            str: transport object path or None if speaker is not streaming
+        """
+        sink = self._get_connected_sink()
+        return sink["transport"] if sink else None
+
+    def get_volumes(self):
+        """
+        Get volumes
+
+        Returns:
+            dict: volumes level::
+
+                {
+                    playback (float): playback volume (None if not supported)
+                    capture (float): capture volume (always None)
+                }
+
+        """
+        transport = self._get_transport()
+        playback = None
+        if transport:
+            try:
+                volume = self.bluez.get_transport_volume(transport)
+                playback = round(volume * 100 / self.MAX_VOLUME)
+            except Exception as error:
+                self.logger.debug("Unable to get speaker volume: %s", str(error))
+
+        return {
+            "playback": playback,
+            "capture": None,
+        }
+
+    def set_volumes(self, playback=None, capture=None):
+        """
+        Set volumes
+
+        Args:
+            playback (float): playback volume (None to disable update)
+            capture (float): not supported
+
+        Returns:
+            dict: volumes level::
+
+                {
+                    playback (float): playback volume
+                    capture (float): capture volume (always None)
+                }
+
+        """
+        transport = self._get_transport()
+        if playback is None or not transport:
+            return self.get_volumes()
+
+        try:
+            self.bluez.set_transport_volume(
+                transport, round(playback * self.MAX_VOLUME / 100)
+            )
+        except Exception as error:
+            self.logger.error("Unable to set speaker volume: %s", str(error))
+            return {
+                "playback": None,
+                "capture": None,
+            }
+
+        return self.get_volumes()
+
+    def require_reboot(self):
+        """
+        Require reboot after install/uninstall
+
+        Returns:
+            bool: True if reboot required
+        """
+        return False
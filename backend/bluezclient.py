@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+import threading
+from jeepney import DBusAddress, MatchRule, message_bus, new_method_call
+from jeepney.wrappers import unwrap_msg
+from jeepney.io.threading import DBusRouter, open_dbus_connection
+
+
+class BluezClient:
+    """
+    BlueZ client over a single persistent D-Bus connection (no bluetoothctl subprocess)
+
+    Devices state is read once with ObjectManager and kept until BlueZ emits a signal
+    (device paired, connected, transport added...) or a device is connected or disconnected.
+    Connection is opened on first call and opened again if it is lost (dbus restarted).
+    """
+
+    BUS_NAME = "org.bluez"
+    DEVICE_INTERFACE = "org.bluez.Device1"
+    TRANSPORT_INTERFACE = "org.bluez.MediaTransport1"
+    OBJECT_MANAGER_INTERFACE = "org.freedesktop.DBus.ObjectManager"
+    PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+    A2DP_SINK_UUID = "0000110b-0000-1000-8000-00805f9b34fb"
+
+    def __init__(self, bus="SYSTEM", timeout=5.0):
+        """
+        Constructor
+
+        Args:
+            bus (str): SYSTEM, SESSION or bus address
+            timeout (float): method call timeout (seconds). Device connection may need more
+                time, see connect_device
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.bus = bus
+        self.timeout = timeout
+        self.__router = None
+        self.__signals = None
+        self.__devices = None
+        self.__lock = threading.Lock()
+
+    def close(self):
+        """
+        Close D-Bus connection
+        """
+        with self.__lock:
+            self._close_router()
+
+    def _get_router(self):
+        """
+        Return D-Bus router, opened if necessary. Must be called with lock acquired
+
+        Returns:
+            DBusRouter: D-Bus router
+        """
+        if self.__router is not None:
+            return self.__router
+
+        self.logger.debug("Open D-Bus connection")
+        router = DBusRouter(open_dbus_connection(bus=self.bus))
+        try:
+            # bus daemon only forwards bluez signals, so all received signals invalidate cache
+            rule = MatchRule(type="signal", sender=self.BUS_NAME)
+            router.send_and_get_reply(message_bus.AddMatch(rule), timeout=self.timeout)
+            self.__signals = router.filter(
+                MatchRule(type="signal"), queue=queue.Queue(maxsize=1)
+            )
+        except Exception:
+            router.close()
+            router.conn.close()
+            raise
+        self.__router = router
+        self.__devices = None
+        return router
+
+    def _close_router(self):
+        """
+        Close D-Bus router. Must be called with lock acquired
+        """
+        router = self.__router
+        self.__router = None
+        self.__devices = None
+        if router is None:
+            return
+        self.__signals.close()
+        router.close()
+        router.conn.close()
+
+    def _call(self, path, interface, method, signature=None, body=(), timeout=None):
+        """
+        Call BlueZ method. Must be called with lock acquired
+
+        Args:
+            path (str): object path
+            interface (str): interface name
+            method (str): method name
+            signature (str): arguments signature
+            body (tuple): arguments
+            timeout (float): call timeout (default timeout if not specified)
+
+        Returns:
+            tuple: reply body
+
+        Raises:
+            Exception: if call failed
+        """
+        router = self._get_router()
+        try:
+            reply = self._send(
+                router, path, interface, method, signature, body, timeout
+            )
+        except Exception:
+            # connection is probably lost, it will be opened again on next call
+            self._close_router()
+            raise
+
+        return self._unwrap(reply, interface, method)
+
+    def _send(
+        self, router, path, interface, method, signature=None, body=(), timeout=None
+    ):
+        """
+        Send BlueZ method call and wait for reply. Router dispatches replies to waiting
+        threads, so lock is not needed
+
+        Args:
+            router (DBusRouter): D-Bus router
+            path (str): object path
+            interface (str): interface name
+            method (str): method name
+            signature (str): arguments signature
+            body (tuple): arguments
+            timeout (float): call timeout (default timeout if not specified)
+
+        Returns:
+            Message: reply message
+
+        Raises:
+            Exception: if D-Bus call failed
+        """
+        address = DBusAddress(path, bus_name=self.BUS_NAME, interface=interface)
+        message = new_method_call(address, method, signature, body)
+        try:
+            return router.send_and_get_reply(message, timeout=timeout or self.timeout)
+        except Exception as error:
+            raise Exception(
+                f"D-Bus call {interface}.{method} failed: {error}"
+            ) from error
+
+    def _unwrap(self, reply, interface, method):
+        """
+        Return reply body
+
+        Args:
+            reply (Message): reply message
+            interface (str): interface name
+            method (str): method name
+
+        Returns:
+            tuple: reply body
+
+        Raises:
+            Exception: if BlueZ returned an error
+        """
+        try:
+            return unwrap_msg(reply)
+        except Exception as error:
+            raise Exception(f"BlueZ {interface}.{method} failed: {error}") from error
+
+    def invalidate(self):
+        """
+        Forget devices state, it will be read again on next query
+        """
+        with self.__lock:
+            self.__devices = None
+
+    def get_devices(self):
+        """
+        Return bluetooth devices known by BlueZ
+
+        Returns:
+            list: devices::
+
+                [
+                    {
+                        path (str): device object path
+                        address (str): device address
+                        name (str): device name
+                        paired (bool): True if device is paired
+                        connected (bool): True if device is connected
+                        a2dp_sink (bool): True if device is an audio sink
+                        transport (str): media transport object path (None if not streaming)
+                    },
+                    ...
+                ]
+
+        Raises:
+            Exception: if BlueZ is not reachable
+        """
+        with self.__lock:
+            self._get_router()
+            if self.__signals.queue.full():
+                # state changed since last read
+                self.__signals.queue.get_nowait()
+                self.__devices = None
+            if self.__devices is None:
+                (objects,) = self._call(
+                    "/", self.OBJECT_MANAGER_INTERFACE, "GetManagedObjects"
+                )
+                self.__devices = self._parse_objects(objects)
+            return [dict(device) for device in self.__devices]
+
+    def _parse_objects(self, objects):
+        """
+        Parse ObjectManager objects
+
+        Args:
+            objects (dict): interfaces properties by object path
+
+        Returns:
+            list: devices
+        """
+        devices = {}
+        transports = {}
+        for path, interfaces in objects.items():
+            if self.TRANSPORT_INTERFACE in interfaces:
+                device = interfaces[self.TRANSPORT_INTERFACE].get("Device")
+                if device:
+                    transports[device[1]] = path
+            properties = interfaces.get(self.DEVICE_INTERFACE)
+            if properties is None:
+                continue
+            # properties are variants (signature, value)
+            values = {name: value for name, (_, value) in properties.items()}
+            devices[path] = {
+                "path": path,
+                "address": values.get("Address"),
+                "name": values.get("Alias") or values.get("Name"),
+                "paired": values.get("Paired", False),
+                "connected": values.get("Connected", False),
+                "a2dp_sink": self.A2DP_SINK_UUID in values.get("UUIDs", []),
+                "transport": None,
+            }
+        for device_path, transport_path in transports.items():
+            if device_path in devices:
+                devices[device_path]["transport"] = transport_path
+
+        return sorted(devices.values(), key=lambda device: device["path"])
+
+    def connect_device(self, path, timeout=30.0):
+        """
+        Connect device profiles. BlueZ replies once device is connected, lock is released
+        while waiting so other calls (volume, devices) are not blocked during connection
+
+        Args:
+            path (str): device object path
+            timeout (float): connection timeout (seconds)
+
+        Raises:
+            Exception: if connection failed
+        """
+        with self.__lock:
+            self.__devices = None
+            router = self._get_router()
+
+        try:
+            reply = self._send(
+                router, path, self.DEVICE_INTERFACE, "Connect", timeout=timeout
+            )
+        except Exception:
+            with self.__lock:
+                if self.__router is router:
+                    self._close_router()
+            raise
+        finally:
+            with self.__lock:
+                # devices read during connection are outdated
+                self.__devices = None
+
+        self._unwrap(reply, self.DEVICE_INTERFACE, "Connect")
+
+    def disconnect_device(self, path):
+        """
+        Disconnect device
+
+        Args:
+            path (str): device object path
+
+        Raises:
+            Exception: if disconnection failed
+        """
+        with self.__lock:
+            self.__devices = None
+            self._call(path, self.DEVICE_INTERFACE, "Disconnect")
+
+    def get_transport_volume(self, transport):
+        """
+        Return media transport volume
+
+        Args:
+            transport (str): transport object path
+
+        Returns:
+            int: volume (0..127)
+
+        Raises:
+            Exception: if volume is not supported by device
+        """
+        with self.__lock:
+            (volume,) = self._call(
+                transport,
+                self.PROPERTIES_INTERFACE,
+                "Get",
+                "ss",
+                (self.TRANSPORT_INTERFACE, "Volume"),
+            )
+            return volume[1]
+
+    def set_transport_volume(self, transport, volume):
+        """
+        Set media transport volume (AVRCP absolute volume)
+
+        Args:
+            transport (str): transport object path
+            volume (int): volume (0..127)
+
+        Raises:
+            Exception: if volume is not supported by device
+        """
+        with self.__lock:
+            self._call(
+                transport,
+                self.PROPERTIES_INTERFACE,
+                "Set",
+                "ssv",
+                (self.TRANSPORT_INTERFACE, "Volume", ("q", volume)),
+            )
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+
+class CardWatcher:
+    """
+    Detect soundcards hotplug watching /proc/asound/cards content
+
+    Reading procfs file is cheap (no subprocess), so it can be polled periodically.
+    """
+
+    CARDS_PATH = "/proc/asound/cards"
+
+    def __init__(self, on_change, cards_path=CARDS_PATH):
+        """
+        Constructor
+
+        Args:
+            on_change (function): function called with current cards content when cards changed
+            cards_path (str): cards file path
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_change = on_change
+        self.cards_path = cards_path
+        self.__cards = None
+
+    def _read_cards(self):
+        """
+        Read cards file
+
+        Returns:
+            str: cards file content or empty string if file does not exist
+        """
+        try:
+            with open(self.cards_path, encoding="utf-8") as cards_file:
+                return cards_file.read()
+        except OSError:
+            return ""
+
+    def check(self):
+        """
+        Check cards. First call only stores current cards.
+
+        Returns:
+            bool: True if cards changed since last check
+        """
+        cards = self._read_cards()
+        if self.__cards is None or cards == self.__cards:
+            self.__cards = cards
+            return False
+
+        self.logger.debug("Soundcards changed: %s", cards)
+        self.__cards = cards
+        self.on_change(cards)
+        return True
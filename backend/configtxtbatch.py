@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+
+class ConfigTxtBatch:
+    """
+    Batched /boot/config.txt edition: file is read once, edits are applied in memory and
+    file is written once on commit (and only if content changed)
+
+    Usage::
+
+        with ConfigTxtBatch(cleep_filesystem) as batch:
+            batch.add_overlay("hifiberry-dacplus")
+            batch.set_dtparam("audio", "off")
+
+    """
+
+    CONFIG_TXT_PATH = "/boot/config.txt"
+    ALL_SECTION = "[all]"
+
+    def __init__(self, cleep_filesystem, path=CONFIG_TXT_PATH):
+        """
+        Constructor
+
+        Args:
+            cleep_filesystem (CleepFilesystem): filesystem instance
+            path (str): config.txt path
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cleep_filesystem = cleep_filesystem
+        self.path = path
+        self.lines = None
+        self.changed = False
+
+    def __enter__(self):
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and not self.commit():
+            raise Exception(f"Unable to write {self.path}")
+        return False
+
+    def load(self):
+        """
+        Read config.txt content. Pending edits are lost
+        """
+        content = self.cleep_filesystem.read_data(self.path)
+        self.lines = content.splitlines() if content else []
+        self.changed = False
+
+    def _get_lines(self):
+        """
+        Return config.txt lines, file is read on first call
+        """
+        if self.lines is None:
+            self.load()
+        return self.lines
+
+    @staticmethod
+    def _split(line):
+        """
+        Split config line
+
+        Args:
+            line (str): config line
+
+        Returns:
+            tuple: key and value (None, None) if line is empty, comment or section
+        """
+        line = line.strip()
+        if not line or line.startswith("#") or line.startswith("["):
+            return (None, None)
+        key, _, value = line.partition("=")
+        return (key.strip(), value.strip())
+
+    def _find(self, key, name):
+        """
+        Return indexes of lines with specified key and value name (value before first
+        "=" or ",")
+
+        Args:
+            key (str): line key (dtoverlay, dtparam)
+            name (str): value name
+
+        Returns:
+            list: lines indexes
+        """
+        indexes = []
+        for index, line in enumerate(self._get_lines()):
+            line_key, value = self._split(line)
+            if line_key == key and value.split(",")[0].split("=")[0] == name:
+                indexes.append(index)
+        return indexes
+
+    def _append(self, line):
+        """
+        Append line in [all] section (last section can be conditional)
+
+        Args:
+            line (str): line to append
+        """
+        lines = self._get_lines()
+        sections = [text.strip() for text in lines if text.strip().startswith("[")]
+        if sections and sections[-1] != self.ALL_SECTION:
+            lines.append(self.ALL_SECTION)
+        lines.append(line)
+        self.changed = True
+
+    def get_overlays(self):
+        """
+        Return declared overlays
+
+        Returns:
+            list: overlays names
+        """
+        overlays = []
+        for line in self._get_lines():
+            key, value = self._split(line)
+            if key == "dtoverlay":
+                overlays.append(value.split(",")[0])
+        return overlays
+
+    def has_overlay(self, name):
+        """
+        Check if overlay is declared
+
+        Args:
+            name (str): overlay name
+
+        Returns:
+            bool: True if overlay is declared
+        """
+        return name in self.get_overlays()
+
+    def get_overlay_params(self, name):
+        """
+        Return overlay parameters
+
+        Args:
+            name (str): overlay name
+
+        Returns:
+            list: overlay parameters or None if overlay is not declared
+        """
+        indexes = self._find("dtoverlay", name)
+        if not indexes:
+            return None
+        return self._split(self.lines[indexes[-1]])[1].split(",")[1:]
+
+    def add_overlay(self, name, params=None):
+        """
+        Declare overlay (existing declaration is replaced)
+
+        Args:
+            name (str): overlay name
+            params (list): overlay parameters (ie ["unmute_amp"])
+        """
+        params = params or []
+        if (
+            self.get_overlay_params(name) == params
+            and len(self._find("dtoverlay", name)) == 1
+        ):
+            return
+        self.remove_overlay(name)
+        self._append("dtoverlay=" + ",".join([name] + params))
+
+    def remove_overlay(self, name):
+        """
+        Remove overlay declaration
+
+        Args:
+            name (str): overlay name
+        """
+        indexes = self._find("dtoverlay", name)
+        for index in reversed(indexes):
+            del self.lines[index]
+        self.changed = self.changed or bool(indexes)
+
+    def get_dtparam(self, name):
+        """
+        Return dtparam value
+
+        Args:
+            name (str): parameter name (ie audio)
+
+        Returns:
+            str: parameter value or None if parameter is not declared
+        """
+        indexes = self._find("dtparam", name)
+        if not indexes:
+            return None
+        return self._split(self.lines[indexes[-1]])[1].partition("=")[2]
+
+    def set_dtparam(self, name, value):
+        """
+        Set dtparam value
+
+        Args:
+            name (str): parameter name (ie audio)
+            value (str): parameter value (ie on)
+        """
+        line = f"dtparam={name}={value}"
+        indexes = self._find("dtparam", name)
+        if not indexes:
+            self._append(line)
+            return
+        if self.lines[indexes[-1]].strip() != line:
+            self.lines[indexes[-1]] = line
+            self.changed = True
+
+    def commit(self):
+        """
+        Write config.txt if content changed
+
+        Returns:
+            bool: True if file written successfully or nothing to write
+        """
+        if not self.changed:
+            return True
+
+        self.logger.debug("Write %s", self.path)
+        if not self.cleep_filesystem.write_data(
+            self.path, "\n".join(self.lines) + "\n"
+        ):
+            self.logger.error("Unable to write %s", self.path)
+            return False
+        self.changed = False
+        return True
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import copy
+import threading
+
+
+class ConfigVersions:
+    """
+    Versioned configuration: each configuration section keeps the version of its last
+    change, so clients can fetch only sections changed since the version they know
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.version = 0
+        self.__sections = {}
+        self.__lock = threading.Lock()
+
+    def set(self, name, value):
+        """
+        Set section value. Version is increased if value changed
+
+        Args:
+            name (str): section name
+            value (any): section value
+
+        Returns:
+            bool: True if section changed
+        """
+        with self.__lock:
+            section = self.__sections.get(name)
+            if section is not None and section[0] == value:
+                return False
+            self.version += 1
+            self.__sections[name] = (copy.deepcopy(value), self.version)
+            return True
+
+    def update(self, config):
+        """
+        Set all sections of configuration
+
+        Args:
+            config (dict): sections values by name
+
+        Returns:
+            int: current version
+        """
+        for name, value in config.items():
+            self.set(name, value)
+        return self.version
+
+    def get_changes(self, since_version):
+        """
+        Return sections changed since specified version
+
+        Args:
+            since_version (int): version known by client (0 to get all sections)
+
+        Returns:
+            dict: changed sections values by name
+        """
+        with self.__lock:
+            if since_version > self.version:
+                # client version comes from previous app run
+                since_version = 0
+            return {
+                name: copy.deepcopy(value)
+                for name, (value, version) in self.__sections.items()
+                if version > since_version
+            }
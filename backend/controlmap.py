@@ -0,0 +1,633 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import bisect
+import math
+import re
+import threading
+
+
+class ControlMap:
+    """
+    Map of soundcard mixer controls (name -> numid, type, range, dB scale)
+
+    Map is built from a single "amixer contents" listing and kept until invalidated (card
+    hotplug). Controls are then read or written with a single amixer call, without listing.
+    If a session factory is given, controls are written through a persistent amixer session
+    (see AmixerSession) instead.
+
+    Volume percentages are perceptual (see get_volume_table): each percentage is mapped
+    to control dB range with the same curve as alsamixer, through a lookup table built
+    once per control.
+    """
+
+    CONTROL_PATTERN = re.compile(r"^numid=(\d+),iface=(\w+),name='(.*)'$")
+    TYPE_PATTERN = re.compile(
+        r"^\s+; type=(\w+),access=[^,]*,values=(\d+)(?:,min=(-?\d+),max=(-?\d+))?"
+    )
+    ITEM_PATTERN = re.compile(r"^\s+; Item #(\d+) '(.*)'$")
+    VALUES_PATTERN = re.compile(r"^\s+: values=(.*)$")
+    DBSCALE_PATTERN = re.compile(
+        r"^\s+\| dBscale-min=(-?[\d.]+)dB,step=(-?[\d.]+)dB,mute=(\d)"
+    )
+    DBMINMAX_PATTERN = re.compile(r"^\s+\| dBminmax-min=(-?[\d.]+)dB,max=(-?[\d.]+)dB")
+
+    # dB span of perceptual curve normalization (alsamixer mapped volume)
+    CURVE_DB_RANGE = 60.0
+    # assumed dB range of controls without dB info, raw value is used as linear gain
+    SOFT_GAIN_DB_RANGE = 60.0
+
+    def __init__(self, console, session_factory=None):
+        """
+        Constructor
+
+        Args:
+            console (Console): console instance to run amixer commands
+            session_factory (function): function returning mixer session of specified card
+                index (AmixerSession). Console is used for all commands if not specified
+        """
+        self.console = console
+        self.session_factory = session_factory
+        self.card_id = None
+        self.__controls = None
+        self.__session = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def parse_contents(lines):
+        """
+        Parse "amixer contents" (or "amixer cget/cset") output
+
+        Args:
+            lines (list): output lines
+
+        Returns:
+            dict: controls by name::
+
+                {
+                    name (str): {
+                        numid (int): control numid,
+                        iface (str): control interface,
+                        name (str): control name,
+                        type (str): INTEGER, BOOLEAN, ENUMERATED...,
+                        channels (int): number of values,
+                        min (int): min raw value (None if not integer),
+                        max (int): max raw value (None if not integer),
+                        values (list): current raw values,
+                        items (list): enumerated items,
+                        db_min (float): dB value at min (None if no dB info),
+                        db_max (float): dB value at max (None if no dB info),
+                        lines (int): number of output lines of control,
+                        table (list): raw value of each percentage (see
+                            get_volume_table, built on first use)
+                    },
+                    ...
+                }
+
+        """
+        controls = {}
+        control = None
+        for line in lines:
+            line = line.rstrip()
+            match = ControlMap.CONTROL_PATTERN.match(line)
+            if match:
+                control = {
+                    "numid": int(match.group(1)),
+                    "iface": match.group(2),
+                    "name": match.group(3),
+                    "type": None,
+                    "channels": 0,
+                    "min": None,
+                    "max": None,
+                    "values": [],
+                    "items": [],
+                    "db_min": None,
+                    "db_max": None,
+                    "lines": 1,
+                    "table": None,
+                }
+                controls[control["name"]] = control
+                continue
+            if control is None:
+                continue
+            control["lines"] += 1
+
+            match = ControlMap.TYPE_PATTERN.match(line)
+            if match:
+                control["type"] = match.group(1)
+                control["channels"] = int(match.group(2))
+                if match.group(3) is not None:
+                    control["min"] = int(match.group(3))
+                    control["max"] = int(match.group(4))
+                elif control["type"] == "BOOLEAN":
+                    control["min"], control["max"] = 0, 1
+                continue
+            match = ControlMap.ITEM_PATTERN.match(line)
+            if match:
+                control["items"].append(match.group(2))
+                continue
+            match = ControlMap.VALUES_PATTERN.match(line)
+            if match:
+                control["values"] = [
+                    ControlMap._parse_value(value)
+                    for value in match.group(1).split(",")
+                ]
+                continue
+            match = ControlMap.DBSCALE_PATTERN.match(line)
+            if match and control["min"] is not None:
+                control["db_min"] = float(match.group(1))
+                control["db_max"] = control["db_min"] + float(match.group(2)) * (
+                    control["max"] - control["min"]
+                )
+                continue
+            match = ControlMap.DBMINMAX_PATTERN.match(line)
+            if match:
+                control["db_min"] = float(match.group(1))
+                control["db_max"] = float(match.group(2))
+
+        return controls
+
+    @staticmethod
+    def _parse_value(value):
+        """
+        Parse control raw value
+        """
+        if value == "on":
+            return 1
+        if value == "off":
+            return 0
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    def invalidate(self):
+        """
+        Invalidate map. It will be built again at next build call
+        """
+        with self.__lock:
+            self.__controls = None
+            self.card_id = None
+            self._close_session()
+
+    def _close_session(self):
+        """
+        Stop mixer session. Must be called with lock acquired
+        """
+        session = self.__session
+        self.__session = None
+        if session is not None:
+            session.close()
+
+    def is_built(self):
+        """
+        Return True if map is built
+
+        Returns:
+            bool: True if map is built
+        """
+        return self.__controls is not None
+
+    def build(self, card_id):
+        """
+        Build controls map for specified card (single amixer call)
+
+        Args:
+            card_id (int): alsa card index
+
+        Returns:
+            bool: True if map built successfully
+        """
+        resp = self.console.command(f"amixer -c {card_id} contents")
+        if resp["returncode"] != 0:
+            return False
+
+        controls = self.parse_contents(resp["stdout"])
+        with self.__lock:
+            if card_id != self.card_id:
+                self._close_session()
+            self.__controls = controls
+            self.card_id = card_id
+
+        return True
+
+    def get_controls(self):
+        """
+        Return all controls
+
+        Returns:
+            list: list of controls (see parse_contents)
+        """
+        return list((self.__controls or {}).values())
+
+    def find(self, pattern):
+        """
+        Return first control (lowest numid) which name contains pattern
+
+        Args:
+            pattern (str): control name pattern (ie "Playback Volume")
+
+        Returns:
+            dict: control (see parse_contents) or None if not found
+        """
+        found = [
+            control
+            for control in (self.__controls or {}).values()
+            if control["name"].find(pattern) >= 0
+        ]
+        return min(found, key=lambda control: control["numid"]) if found else None
+
+    def get_numid(self, pattern):
+        """
+        Return numid of first control which name contains pattern
+
+        Args:
+            pattern (str): control name pattern
+
+        Returns:
+            int: control numid or None if not found
+        """
+        control = self.find(pattern)
+        return control["numid"] if control else None
+
+    def _get_session(self):
+        """
+        Return mixer session of current card, session is created if necessary
+
+        Returns:
+            AmixerSession: mixer session or None if sessions are not used
+        """
+        with self.__lock:
+            if self.__session is None and self.session_factory is not None:
+                if self.card_id is None:
+                    return None
+                self.__session = self.session_factory(self.card_id)
+            return self.__session
+
+    def _execute_session(self, writes):
+        """
+        Write controls through mixer session
+
+        Args:
+            writes (list): list of (control, raw values) tuples
+
+        Returns:
+            list: output lines or None if session can't be used
+        """
+        if not all(control.get("lines") for control, _ in writes):
+            return None
+        session = self._get_session()
+        if session is None:
+            return None
+
+        outputs = session.execute(
+            [(control["numid"], raw, control["lines"]) for control, raw in writes]
+        )
+        if outputs is None:
+            # output doesn't match listing, don't use session for these controls anymore
+            for control, _ in writes:
+                control["lines"] = None
+            return None
+        return [line for output in outputs for line in output]
+
+    def execute(self, writes, reads):
+        """
+        Write and read several controls in a single round trip: writes only batch goes
+        through mixer session, otherwise amixer commands are chained in a single console
+        command. Written values are confirmed by amixer output
+
+        Args:
+            writes (list): list of (control, raw values) tuples (raw values as accepted by
+                amixer, ie "20,20")
+            reads (list): list of controls to read
+
+        Returns:
+            dict: controls raw values by control numid (control is missing if error)
+        """
+        if not writes and not reads:
+            return {}
+
+        lines = self._execute_session(writes) if writes and not reads else None
+        if lines is None:
+            # "--" so negative raw values are not parsed as amixer options
+            commands = [
+                f"amixer -c {self.card_id} cget numid={control['numid']}"
+                for control in reads
+            ] + [
+                f"amixer -c {self.card_id} cset numid={control['numid']} -- {raw}"
+                for control, raw in writes
+            ]
+            resp = self.console.command(" ; ".join(commands))
+            # failed command doesn't output anything, other outputs are kept
+            lines = (
+                resp["stdout"] if len(commands) > 1 or resp["returncode"] == 0 else []
+            )
+
+        updated = self.parse_contents(lines)
+        values = {}
+        for control in reads + [control for control, _ in writes]:
+            if control["name"] in updated:
+                control["values"] = updated[control["name"]]["values"]
+                values[control["numid"]] = list(control["values"])
+        return values
+
+    def transaction(self):
+        """
+        Return new mixer transaction
+
+        Returns:
+            MixerTransaction: transaction on this map
+        """
+        return MixerTransaction(self)
+
+    def read(self, control):
+        """
+        Read control values (single amixer call)
+
+        Args:
+            control (dict): control (see parse_contents)
+
+        Returns:
+            list: control raw values or None if error
+        """
+        return self.execute([], [control]).get(control["numid"])
+
+    def write(self, control, values):
+        """
+        Write control values (through mixer session or single amixer call). Written values
+        are confirmed by amixer output and returned
+
+        Args:
+            control (dict): control (see parse_contents)
+            values (list): raw values (single value is applied on all channels)
+
+        Returns:
+            list: control raw values after write or None if error
+        """
+        raw = ",".join(str(value) for value in values)
+        return self.execute([(control, raw)], []).get(control["numid"])
+
+    @staticmethod
+    def _percent_to_db(percent, db_min, db_max):
+        """
+        Convert percentage to dB on perceptual curve: percentage is linear on normalized
+        gain 10^(dB/60), so each step has the same loudness change on most of the range
+
+        Args:
+            percent (int): percentage
+            db_min (float): dB value at 0%
+            db_max (float): dB value at 100%
+
+        Returns:
+            float: dB value
+        """
+        min_norm = 10.0 ** ((db_min - db_max) / ControlMap.CURVE_DB_RANGE)
+        norm = percent / 100.0 * (1.0 - min_norm) + min_norm
+        return db_max + ControlMap.CURVE_DB_RANGE * math.log10(norm)
+
+    @staticmethod
+    def build_volume_table(control):
+        """
+        Build lookup table of control raw value of each percentage (0 to 100)
+
+        Controls with dB info are mapped on their dB range. Controls without dB info use
+        soft gain: percentage is mapped on an assumed SOFT_GAIN_DB_RANGE, and resulting
+        linear gain is applied on raw range.
+
+        Args:
+            control (dict): integer control (see parse_contents)
+
+        Returns:
+            list: 101 raw values (non decreasing)
+        """
+        raw_min = control["min"]
+        raw_range = control["max"] - control["min"]
+        table = []
+        if control["db_min"] is not None and control["db_max"] > control["db_min"]:
+            db_min = control["db_min"]
+            db_range = control["db_max"] - db_min
+            for percent in range(101):
+                db = ControlMap._percent_to_db(percent, db_min, control["db_max"])
+                table.append(raw_min + int(round((db - db_min) / db_range * raw_range)))
+        else:
+            gain_min = 10.0 ** (-ControlMap.SOFT_GAIN_DB_RANGE / 20.0)
+            for percent in range(101):
+                db = ControlMap._percent_to_db(
+                    percent, -ControlMap.SOFT_GAIN_DB_RANGE, 0.0
+                )
+                gain = (10.0 ** (db / 20.0) - gain_min) / (1.0 - gain_min)
+                table.append(raw_min + int(round(gain * raw_range)))
+
+        return table
+
+    @staticmethod
+    def get_volume_table(control):
+        """
+        Return control volume lookup table, built on first call and kept in control (so
+        it lives as long as card controls map)
+
+        Args:
+            control (dict): integer control (see parse_contents)
+
+        Returns:
+            list: raw value of each percentage
+        """
+        table = control.get("table")
+        if table is None:
+            table = ControlMap.build_volume_table(control)
+            control["table"] = table
+        return table
+
+    @staticmethod
+    def raw_to_percent(control, raw):
+        """
+        Convert control raw value to perceptual percentage (closest volume table entry)
+
+        Args:
+            control (dict): control (see parse_contents)
+            raw (int): raw value
+
+        Returns:
+            int: percentage
+        """
+        if control["min"] is None or control["max"] == control["min"]:
+            return 0
+
+        table = ControlMap.get_volume_table(control)
+        if raw >= table[100]:
+            return 100
+        if raw <= table[0]:
+            return 0
+        index = bisect.bisect_left(table, raw)
+        if table[index] == raw:
+            # several percentages have same raw value on small ranges, use middle one
+            return (index + bisect.bisect_right(table, raw) - 1) // 2
+        if table[index] - raw < raw - table[index - 1]:
+            return index
+        return index - 1
+
+    @staticmethod
+    def percent_to_raw(control, percent):
+        """
+        Convert perceptual percentage to control raw value (volume table lookup)
+
+        Args:
+            control (dict): control (see parse_contents)
+            percent (int): percentage
+
+        Returns:
+            int: raw value
+        """
+        percent = int(round(min(max(percent, 0), 100)))
+        return ControlMap.get_volume_table(control)[percent]
+
+
+class MixerTransaction:
+    """
+    Batch of mixer controls writes and reads executed in a single round trip on commit
+    (see ControlMap.execute)
+
+    Usage::
+
+        transaction = controls.transaction()
+        transaction.set_percent(playback_control, 50)
+        transaction.set_percent(capture_control, None)
+        transaction.commit()
+        volume = transaction.get_percent(capture_control)
+
+    """
+
+    def __init__(self, controls):
+        """
+        Constructor
+
+        Args:
+            controls (ControlMap): controls map
+        """
+        self.controls = controls
+        self.__writes = []
+        self.__reads = []
+        self.__values = {}
+
+    def write(self, control, values):
+        """
+        Add control write
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents). Ignored if None
+            values (list): raw values (single value is applied on all channels)
+
+        Returns:
+            MixerTransaction: this transaction
+        """
+        if control:
+            raw = ",".join(str(value) for value in values)
+            self.__writes.append((control, raw))
+        return self
+
+    def read(self, control):
+        """
+        Add control read
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents). Ignored if None
+
+        Returns:
+            MixerTransaction: this transaction
+        """
+        if control:
+            self.__reads.append(control)
+        return self
+
+    def set_percent(self, control, percent):
+        """
+        Add control write of percentage, or control read if no percentage
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents). Ignored if None
+            percent (int): percentage (None to read control)
+
+        Returns:
+            MixerTransaction: this transaction
+        """
+        if percent is None or not control:
+            return self.read(control)
+        return self.write(control, [ControlMap.percent_to_raw(control, percent)])
+
+    def set_percents(self, control, percents):
+        """
+        Add control write of percentage of each channel, or control read if no percentages
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents). Ignored if None
+            percents (list): percentage of each channel (None to read control)
+
+        Returns:
+            MixerTransaction: this transaction
+
+        Raises:
+            Exception: if number of percentages does not match control channels
+        """
+        if percents is None or not control:
+            return self.read(control)
+        if len(percents) != control["channels"]:
+            raise Exception(
+                f'Control "{control["name"]}" has {control["channels"]} channel(s)'
+            )
+        return self.write(
+            control,
+            [ControlMap.percent_to_raw(control, percent) for percent in percents],
+        )
+
+    def commit(self):
+        """
+        Execute writes and reads
+
+        Returns:
+            MixerTransaction: this transaction
+        """
+        self.__values = self.controls.execute(self.__writes, self.__reads)
+        self.__writes = []
+        self.__reads = []
+        return self
+
+    def get(self, control):
+        """
+        Return control raw values after commit
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents)
+
+        Returns:
+            list: control raw values or None if control failed or not in transaction
+        """
+        return self.__values.get(control["numid"]) if control else None
+
+    def get_percent(self, control):
+        """
+        Return control percentage (loudest channel) after commit
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents)
+
+        Returns:
+            int: percentage or None if control failed or not in transaction
+        """
+        percents = self.get_percents(control)
+        return max(percents) if percents else None
+
+    def get_percents(self, control):
+        """
+        Return percentage of each channel after commit
+
+        Args:
+            control (dict): control (see ControlMap.parse_contents)
+
+        Returns:
+            list: percentage of each channel or None if control failed or not in
+                transaction
+        """
+        values = self.get(control)
+        if not values:
+            return None
+        return [ControlMap.raw_to_percent(control, value) for value in values]
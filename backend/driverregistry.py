@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import importlib
+import importlib.metadata
+import logging
+import os
+import re
+import threading
+import cleep.libs.internals.tools as Tools
+
+BLUETOOTH_ADAPTERS_PATH = "/sys/class/bluetooth"
+
+
+def has_bluetooth_adapter(cards):
+    """
+    Check if device has a bluetooth adapter
+
+    Args:
+        cards (str): soundcards list (unused, bluetooth speakers are not alsa cards)
+
+    Returns:
+        bool: True if a bluetooth adapter exists
+    """
+    return os.path.isdir(BLUETOOTH_ADAPTERS_PATH) and bool(
+        os.listdir(BLUETOOTH_ADAPTERS_PATH)
+    )
+
+
+class DriverRegistry:
+    """
+    Discover audio drivers and instantiate them only when they apply to current hardware
+
+    Driver is described by a spec, a lightweight dict that can be checked without importing
+    driver module::
+
+        {
+            name (str): driver name (same as driver instance name)
+            target (str): driver class path "module:Class" (module relative to app package
+                if it starts with a dot)
+            card_pattern (str): regexp searched in soundcards list (/proc/asound/cards)
+            probe (function): applicability probe called with soundcards list, used
+                instead of card_pattern (optional)
+        }
+
+    Third party drivers are declared as spec in "cleep.audio.drivers" entry points group.
+    """
+
+    ENTRY_POINTS_GROUP = "cleep.audio.drivers"
+    CARDS_PATH = "/proc/asound/cards"
+
+    DEFAULT_DRIVER = "Raspberry pi soundcard"
+    BUILTIN_DRIVERS = [
+        {
+            "name": DEFAULT_DRIVER,
+            "target": ".bcm2835audiodriver:Bcm2835AudioDriver",
+            # soundcard may be disabled in config.txt, driver is needed to enable it
+            "probe": lambda cards: Tools.raspberry_pi_infos()["audio"],
+        },
+        {
+            "name": "USB audio device",
+            "target": ".usbaudiodriver:UsbAudioDriver",
+            "card_pattern": r"USB-Audio",
+        },
+        {
+            "name": "I2S audio HAT",
+            "target": ".i2saudiodriver:I2sAudioDriver",
+            # HAT card only appears once its overlay is installed
+            "probe": lambda cards: Tools.raspberry_pi_infos()["audio"],
+        },
+        {
+            "name": "Bluetooth audio device",
+            "target": ".bluetoothaudiodriver:BluetoothAudioDriver",
+            "probe": has_bluetooth_adapter,
+        },
+    ]
+
+    def __init__(self, cards_path=CARDS_PATH, package=__package__):
+        """
+        Constructor
+
+        Args:
+            cards_path (str): soundcards list file path
+            package (str): package used to import relative driver modules
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cards_path = cards_path
+        self.package = package
+        self.__specs = None
+        self.__drivers = {}
+        self.__lock = threading.Lock()
+
+    def get_specs(self):
+        """
+        Return known drivers specs (builtin and entry points ones). Entry points are read once
+
+        Returns:
+            dict: drivers specs by driver name
+        """
+        with self.__lock:
+            if self.__specs is None:
+                self.__specs = {spec["name"]: spec for spec in self.BUILTIN_DRIVERS}
+                for spec in self._read_entry_points():
+                    self.__specs.setdefault(spec["name"], spec)
+            return dict(self.__specs)
+
+    def _read_entry_points(self):
+        """
+        Read drivers specs declared in entry points
+
+        Returns:
+            list: valid drivers specs
+        """
+        specs = []
+        try:
+            entry_points = importlib.metadata.entry_points(
+                group=self.ENTRY_POINTS_GROUP
+            )
+        except Exception:
+            self.logger.exception("Unable to read audio drivers entry points")
+            return specs
+
+        for entry_point in entry_points:
+            try:
+                spec = entry_point.load()
+            except Exception:
+                self.logger.exception(
+                    'Unable to load audio driver spec "%s"', entry_point.name
+                )
+                continue
+            if not isinstance(spec, dict) or not spec.get("target"):
+                self.logger.warning(
+                    'Invalid audio driver spec "%s": target is missing',
+                    entry_point.name,
+                )
+                continue
+            specs.append({"name": entry_point.name, **spec})
+
+        return specs
+
+    def _read_cards(self):
+        """
+        Read soundcards list
+
+        Returns:
+            str: soundcards list or empty string if file does not exist
+        """
+        try:
+            with open(self.cards_path, encoding="utf-8") as cards_file:
+                return cards_file.read()
+        except OSError:
+            return ""
+
+    def is_applicable(self, spec, cards):
+        """
+        Check if driver applies to current hardware
+
+        Args:
+            spec (dict): driver spec
+            cards (str): soundcards list
+
+        Returns:
+            bool: True if driver applies
+        """
+        try:
+            if spec.get("probe"):
+                return bool(spec["probe"](cards))
+            if spec.get("card_pattern"):
+                return re.search(spec["card_pattern"], cards) is not None
+        except Exception:
+            self.logger.exception('Audio driver "%s" probe failed', spec["name"])
+        return False
+
+    def discover(self, cards=None, required=None):
+        """
+        Instantiate drivers that apply to current hardware and are not loaded yet
+
+        Args:
+            cards (str): soundcards list (read if not specified)
+            required (list): drivers names to load even if they don't apply (configured
+                driver for example)
+
+        Returns:
+            list: newly instantiated drivers
+        """
+        if cards is None:
+            cards = self._read_cards()
+        required = required or []
+
+        drivers = []
+        for name, spec in self.get_specs().items():
+            if name in self.__drivers:
+                continue
+            if name not in required and not self.is_applicable(spec, cards):
+                self.logger.debug('Audio driver "%s" does not apply', name)
+                continue
+            driver = self.load(name)
+            if driver:
+                drivers.append(driver)
+
+        return drivers
+
+    def load(self, name):
+        """
+        Import and instantiate driver
+
+        Args:
+            name (str): driver name
+
+        Returns:
+            AudioDriver: driver instance or None if driver can't be loaded
+        """
+        spec = self.get_specs().get(name)
+        if not spec:
+            self.logger.warning('Unknown audio driver "%s"', name)
+            return None
+
+        with self.__lock:
+            if name in self.__drivers:
+                return self.__drivers[name]
+            try:
+                module_name, class_name = spec["target"].split(":")
+                module = importlib.import_module(module_name, self.package)
+                driver = getattr(module, class_name)()
+            except Exception:
+                self.logger.exception('Unable to load audio driver "%s"', name)
+                return None
+            self.__drivers[name] = driver
+
+        self.logger.debug('Audio driver "%s" loaded', name)
+        return driver
+
+    def get_drivers(self):
+        """
+        Return loaded drivers
+
+        Returns:
+            dict: drivers instances by name
+        """
+        with self.__lock:
+            return dict(self.__drivers)
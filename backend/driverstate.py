@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class DriverState:
+    """
+    Memoized driver status flags (card present, asound.conf written, driver installed)
+
+    Each flag is probed once, then kept until driver updates it after its own transitions
+    (enable, disable, install...) or invalidates it (hotplug).
+    """
+
+    def __init__(self, probes):
+        """
+        Constructor
+
+        Args:
+            probes (dict): functions returning current flag value, by flag name
+        """
+        self.probes = probes
+        self.__values = {}
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Return flag value, probed if unknown
+
+        Args:
+            name (str): flag name
+
+        Returns:
+            bool: flag value
+        """
+        with self.__lock:
+            if name in self.__values:
+                return self.__values[name]
+            generation = self.__generation
+
+        value = self.probes[name]()
+        with self.__lock:
+            # do not memoize value probed while flags were invalidated
+            if generation == self.__generation:
+                self.__values[name] = value
+
+        return value
+
+    def set(self, name, value):
+        """
+        Set flag value after a known transition
+
+        Args:
+            name (str): flag name
+            value (bool): flag value
+        """
+        with self.__lock:
+            self.__generation += 1
+            self.__values[name] = value
+
+    def invalidate(self, *names):
+        """
+        Forget flags values, they will be probed again on next query
+
+        Args:
+            names (str): flags names (all flags if not specified)
+        """
+        with self.__lock:
+            self.__generation += 1
+            if not names:
+                self.__values.clear()
+            for name in names:
+                self.__values.pop(name, None)
+
+    def is_known(self, name):
+        """
+        Return True if flag value is memoized
+
+        Args:
+            name (str): flag name
+
+        Returns:
+            bool: True if flag value is memoized
+        """
+        return name in self.__values
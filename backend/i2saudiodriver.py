@@ -0,0 +1,510 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+from cleep.libs.configs.etcasoundconf import EtcAsoundConf
+from cleep.libs.drivers.audiodriver import AudioDriver
+from cleep.libs.internals.console import Console
+from .configtxtbatch import ConfigTxtBatch
+from .amixersession import AmixerSession
+from .controlmap import ControlMap
+from .driverstate import DriverState
+
+# supported I2S HATs
+#  - overlay: dtoverlay declared in config.txt (with optional parameters)
+#  - card_pattern: regexp matching alsa card name
+#  - product_pattern: regexp matching HAT EEPROM product name (None if HAT has no EEPROM)
+#  - playback_control/capture_control: mixer volume control name pattern (None if card
+#    has no hardware volume)
+I2S_HATS = [
+    {
+        "name": "HiFiBerry DAC/MiniAmp/Beocreate",
+        "overlay": "hifiberry-dac",
+        "params": [],
+        "card_pattern": r"sndrpihifiberry|snd_rpi_hifiberry_dac$",
+        "product_pattern": r"^HiFiBerry DAC$",
+        "playback_control": None,
+        "capture_control": None,
+    },
+    {
+        "name": "HiFiBerry DAC+/Amp2",
+        "overlay": "hifiberry-dacplus",
+        "params": [],
+        "card_pattern": r"sndrpihifiberry|snd_rpi_hifiberry_dacplus",
+        "product_pattern": r"^HiFiBerry (DAC\+|Amp2)",
+        "playback_control": "Digital Playback Volume",
+        "capture_control": None,
+    },
+    {
+        "name": "HiFiBerry Amp+",
+        "overlay": "hifiberry-amp",
+        "params": [],
+        "card_pattern": r"sndrpihifiberry|snd_rpi_hifiberry_amp",
+        "product_pattern": None,
+        "playback_control": "Master Playback Volume",
+        "capture_control": None,
+    },
+    {
+        "name": "IQaudIO DAC/DAC+",
+        "overlay": "iqaudio-dacplus",
+        "params": [],
+        "card_pattern": r"IQaudIODAC",
+        "product_pattern": r"^(Pi-DAC|Raspberry Pi DAC)",
+        "playback_control": "Digital Playback Volume",
+        "capture_control": None,
+    },
+    {
+        "name": "IQaudIO DigiAMP+",
+        "overlay": "iqaudio-dacplus",
+        "params": ["unmute_amp"],
+        "card_pattern": r"IQaudIODAC",
+        "product_pattern": r"DigiAMP",
+        "playback_control": "Digital Playback Volume",
+        "capture_control": None,
+    },
+    {
+        "name": "Google AIY Voice HAT",
+        "overlay": "googlevoicehat-soundcard",
+        "params": [],
+        "card_pattern": r"sndrpigooglevoi",
+        "product_pattern": None,
+        "playback_control": None,
+        "capture_control": None,
+    },
+    {
+        "name": "ReSpeaker 2-Mics Pi HAT",
+        "overlay": "seeed-2mic-voicecard",
+        "params": [],
+        "card_pattern": r"seeed2micvoicec",
+        "product_pattern": None,
+        "playback_control": "Playback Volume",
+        "capture_control": "Capture Volume",
+    },
+]
+
+
+class I2sAudioDriver(AudioDriver):
+    """
+    Audio driver for I2S DAC HATs (HiFiBerry, IQaudIO...)
+
+    All HATs are handled by this driver using I2S_HATS table: installing a HAT declares its
+    overlay in /boot/config.txt (onboard audio is disabled), enabling it writes
+    /etc/asound.conf for HAT soundcard.
+    """
+
+    # product name of HAT with ID EEPROM
+    HAT_PRODUCT_PATH = "/proc/device-tree/hat/product"
+
+    def __init__(self, hats=None):
+        """
+        Constructor
+
+        Args:
+            hats (list): supported HATs (default I2S_HATS)
+        """
+        AudioDriver.__init__(self, "I2S audio HAT")
+
+        self.hats = hats or I2S_HATS
+        self.asoundconf = None
+        self.console = None
+        self.controls = None
+        self.state = DriverState(
+            {
+                "installed": self._is_installed,
+                "hat": self._probe_installed_hat,
+                "card": lambda: self.is_card_enabled(),
+                "asound": lambda: self.asoundconf.exists(),
+            }
+        )
+
+    def _on_audio_registered(self):
+        """
+        Audio driver registered
+        """
+        self.asoundconf = EtcAsoundConf(self.cleep_filesystem)
+        self.console = Console()
+        self.controls = ControlMap(self.console, AmixerSession)
+
+    def get_hats(self):
+        """
+        Return supported HATs names
+
+        Returns:
+            list: HATs names
+        """
+        return [hat["name"] for hat in self.hats]
+
+    def _get_hat_by_name(self, name):
+        """
+        Return HAT by name
+
+        Args:
+            name (str): HAT name
+
+        Returns:
+            dict: HAT or None if HAT is not supported
+        """
+        return next((hat for hat in self.hats if hat["name"] == name), None)
+
+    def detect_hat(self):
+        """
+        Detect plugged HAT from its ID EEPROM
+
+        Returns:
+            dict: HAT or None if HAT has no EEPROM or is not supported
+        """
+        try:
+            with open(self.HAT_PRODUCT_PATH, encoding="utf-8") as product_file:
+                product = product_file.read().strip("\x00\n ")
+        except OSError:
+            return None
+
+        self.logger.debug('HAT product "%s"', product)
+        return next(
+            (
+                hat
+                for hat in self.hats
+                if hat["product_pattern"] and re.search(hat["product_pattern"], product)
+            ),
+            None,
+        )
+
+    def get_installed_hat(self):
+        """
+        Return HAT declared in config.txt (memoized)
+
+        Returns:
+            dict: HAT or None if no HAT overlay declared
+        """
+        return self.state.get("hat")
+
+    def _probe_installed_hat(self):
+        """
+        Read HAT declared in config.txt
+
+        Returns:
+            dict: HAT or None if no HAT overlay declared
+        """
+        batch = ConfigTxtBatch(self.cleep_filesystem)
+        declared = [
+            hat
+            for hat in self.hats
+            if batch.get_overlay_params(hat["overlay"]) is not None
+        ]
+        # HATs can share same overlay with different parameters
+        return next(
+            (
+                hat
+                for hat in declared
+                if batch.get_overlay_params(hat["overlay"]) == hat["params"]
+            ),
+            declared[0] if declared else None,
+        )
+
+    def _get_card_name(self, devices_names):
+        """
+        Return card name
+
+        Returns:
+            string: card name or None if card not found
+        """
+        patterns = [re.compile(hat["card_pattern"]) for hat in self.hats]
+        for device_name in devices_names:
+            for pattern in patterns:
+                if pattern.search(device_name["card_name"]) or pattern.search(
+                    device_name["card_desc"]
+                ):
+                    return device_name["card_name"]
+
+        return None
+
+    def get_card_capabilities(self):
+        """
+        Return card capabilities
+
+        Returns:
+            tuple: card capabilities::
+
+                (
+                    bool: playback capability,
+                    bool: capture capability
+                )
+        """
+        hat = self.get_installed_hat()
+        return (True, bool(hat and hat["capture_control"]))
+
+    def _install(self, params=None):
+        """
+        Install driver: declare HAT overlay and disable onboard audio (single config.txt
+        write)
+
+        Args:
+            params (dict): additional parameters::
+
+                {
+                    hat (str): HAT name (see get_hats). HAT is detected from its EEPROM
+                        if not specified
+                }
+
+        """
+        hat_name = (params or {}).get("hat")
+        hat = self._get_hat_by_name(hat_name) if hat_name else self.detect_hat()
+        if not hat:
+            raise Exception("Unsupported I2S HAT")
+
+        # as the default driver and just in case, delete existing config
+        self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
+
+        with ConfigTxtBatch(self.cleep_filesystem) as batch:
+            for other_hat in self.hats:
+                if other_hat["overlay"] != hat["overlay"]:
+                    batch.remove_overlay(other_hat["overlay"])
+            batch.add_overlay(hat["overlay"], hat["params"])
+            batch.set_dtparam("audio", "off")
+
+        self.state.invalidate("installed", "hat")
+        return True
+
+    def _uninstall(self, params=None):
+        """
+        Uninstall driver: remove HAT overlay and enable onboard audio again (single
+        config.txt write)
+
+        Args:
+            params (dict): additional parameters
+        """
+        with ConfigTxtBatch(self.cleep_filesystem) as batch:
+            for hat in self.hats:
+                batch.remove_overlay(hat["overlay"])
+            batch.set_dtparam("audio", "on")
+
+        self.state.invalidate("installed", "hat")
+        return True
+
+    def is_installed(self):
+        """
+        Is driver installed (memoized)
+
+        Returns:
+            bool: True if driver is installed
+        """
+        return self.state.get("installed")
+
+    def _is_installed(self):
+        """
+        Probe driver installation
+
+        Returns:
+            bool: True if a HAT overlay is declared
+        """
+        return self.get_installed_hat() is not None
+
+    def enable(self, params=None):
+        """
+        Enable driver
+        """
+        if not self.get_card_name():
+            self.logger.error(
+                "No I2S HAT found. Please install driver and reboot before enabling it"
+            )
+            return False
+
+        # as the default driver and just in case, delete existing config
+        self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
+
+        # create default /etc/asound.conf
+        card_infos = self.get_cardid_deviceid()
+        self.logger.debug("card_infos=%s", card_infos)
+        if card_infos[0] is None:
+            self.logger.error(
+                'Unable to get alsa infos for card "%s"', self.get_card_name()
+            )
+            return False
+        self.logger.debug(
+            'Write to /etc/asound.conf values "%s:%s"', card_infos[0], card_infos[1]
+        )
+        if not self.asoundconf.save_default_file(card_infos[0], card_infos[1]):
+            self.logger.error(
+                'Unable to create /etc/asound.conf for soundcard "%s"',
+                self.get_card_name(),
+            )
+            return False
+
+        # force saving alsa conf (this will create asound.state if needed)
+        self.alsa.save()
+        self.state.set("asound", True)
+
+        self.logger.debug("Driver enabled")
+        return True
+
+    def disable(self, params=None):
+        """
+        Disable driver
+
+        Args:
+            params (dict): additional parameters
+        """
+        self.logger.debug("Delete /etc/asound.conf and /var/lib/alsa/asound.state")
+        if not self.asoundconf.delete():
+            self.logger.error("Unable to delete asound.conf file")
+            self.state.invalidate("asound", "card")
+            return False
+        self.state.set("asound", False)
+        self.state.invalidate("card")
+
+        self.logger.debug("Driver disabled")
+        return True
+
+    def is_enabled(self):
+        """
+        Is driver enabled ? Status is memoized, it is updated by driver transitions and
+        hotplug events
+
+        Returns:
+            bool: True if driver enabled
+        """
+        return self.state.get("card") and self.state.get("asound")
+
+    def on_cards_changed(self):
+        """
+        Soundcards changed (hotplug), invalidate card controls map and card status
+        """
+        self.controls.invalidate()
+        self.state.invalidate("card")
+
+    def _get_controls(self):
+        """
+        Return card controls map. Map is built once per card appearance
+
+        Returns:
+            ControlMap: controls map or None if card is not found
+        """
+        if not self.controls.is_built():
+            card_id, _ = self.get_cardid_deviceid()
+            if card_id is None or not self.controls.build(card_id):
+                return None
+
+        return self.controls
+
+    def _get_control(self, key):
+        """
+        Return HAT volume control
+
+        Args:
+            key (str): HAT control key (playback_control or capture_control)
+
+        Returns:
+            dict: volume control or None if HAT has no hardware volume
+        """
+        hat = self.get_installed_hat()
+        if not hat or not hat[key]:
+            return None
+        controls = self._get_controls()
+        return controls.find(hat[key]) if controls else None
+
+    def get_volumes(self):
+        """
+        Get volumes
+
+        Returns:
+            dict: volumes level::
+
+                {
+                    playback (float): playback volume (None if not supported)
+                    capture (float): capture volume (None if not supported)
+                }
+
+        """
+        return self._apply_volumes(None, None)
+
+    def set_volumes(self, playback=None, capture=None):
+        """
+        Set volumes
+
+        Args:
+            playback (float): playback volume (None to disable update)
+            capture (float): capture volume (None to disable update)
+
+        Returns:
+            dict: volumes level::
+
+                {
+                    playback (float): playback volume
+                    capture (float): capture volume
+                }
+
+        """
+        return self._apply_volumes(playback, capture)
+
+    def _apply_volumes(self, playback, capture):
+        """
+        Write (or read) playback and capture volumes in a single mixer transaction
+
+        Args:
+            playback (float): playback volume (None to read it)
+            capture (float): capture volume (None to read it)
+
+        Returns:
+            dict: volumes level (None if not supported or error)
+        """
+        playback_control = self._get_control("playback_control")
+        capture_control = self._get_control("capture_control")
+        transaction = self.controls.transaction()
+        transaction.set_percent(playback_control, playback)
+        transaction.set_percent(capture_control, capture)
+        transaction.commit()
+        return {
+            "playback": transaction.get_percent(playback_control),
+            "capture": transaction.get_percent(capture_control),
+        }
+
+    def get_channel_volumes(self):
+        """
+        Get volume of each channel
+
+        Returns:
+            dict: channels volumes::
+
+                {
+                    playback (list): playback volume of each channel (None if not supported)
+                    capture (list): capture volume of each channel (None if not supported)
+                }
+
+        """
+        return self.set_channel_volumes(None, None)
+
+    def set_channel_volumes(self, playback=None, capture=None):
+        """
+        Set volume of each channel (ie stereo balance) in a single mixer transaction
+
+        Args:
+            playback (list): playback volume of each channel (None to disable update)
+            capture (list): capture volume of each channel (None to disable update)
+
+        Returns:
+            dict: channels volumes (see get_channel_volumes)
+
+        Raises:
+            Exception: if number of volumes does not match control channels
+        """
+        playback_control = self._get_control("playback_control")
+        capture_control = self._get_control("capture_control")
+        transaction = self.controls.transaction()
+        transaction.set_percents(playback_control, playback)
+        transaction.set_percents(capture_control, capture)
+        transaction.commit()
+        return {
+            "playback": transaction.get_percents(playback_control),
+            "capture": transaction.get_percents(capture_control),
+        }
+
+    def require_reboot(self):
+        """
+        Require reboot after install/uninstall
+
+        Returns:
+            bool: True if reboot required (overlay is loaded at boot)
+        """
+        return True
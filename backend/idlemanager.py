@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import threading
+import time
+
+
+class ManagedOutput:
+    """
+    Playback output handed out by idle manager
+
+    It behaves as PcmPlayback but draining it gives playback back to idle manager that keeps
+    it opened until idle timeout.
+    """
+
+    def __init__(self, manager, playback, pooled):
+        """
+        Constructor
+
+        Args:
+            manager (OutputIdleManager): idle manager
+            playback (PcmPlayback): playback stream
+            pooled (bool): True if playback is kept opened by manager when released
+        """
+        self.manager = manager
+        self.playback = playback
+        self.pooled = pooled
+
+    def start(self):
+        """
+        Start playback (does nothing if playback is already opened)
+        """
+        self.manager._wake(self.playback)
+
+    def write(self, data):
+        """
+        Write frames to play
+
+        Args:
+            data (bytes): raw interleaved PCM data
+
+        Returns:
+            bool: True if data written
+        """
+        return self.playback.write(data)
+
+    def drain(self, timeout=None):
+        """
+        End of playback: give playback back to manager
+
+        Args:
+            timeout (float): max time to wait for end of playback (seconds)
+
+        Returns:
+            bool: True if playback completed successfully
+        """
+        if not self.pooled:
+            return self.playback.drain(timeout)
+
+        self.manager._release(self.playback)
+        return True
+
+    def stop(self):
+        """
+        Stop playback immediately (playback is closed)
+        """
+        self.playback.stop()
+        if self.pooled:
+            self.manager._release(None)
+
+
+class OutputIdleManager:
+    """
+    Keep playback output opened between sounds, and close it after idle timeout so device
+    can be powered down. Output can be opened ahead (pre-warmed) when a playback request is
+    queued to keep first sound latency low.
+
+    Silence is written to idle output at playback pace, otherwise device buffer underruns
+    until next sound.
+    """
+
+    STATE_SUSPENDED = "suspended"
+    STATE_IDLE = "idle"
+    STATE_ACTIVE = "active"
+
+    STATS_WINDOW = 20
+    # duration of silence chunks written to idle output (seconds)
+    SILENCE_PERIOD = 0.05
+
+    def __init__(self, playback_factory, idle_timeout=30.0):
+        """
+        Constructor
+
+        Args:
+            playback_factory (function): function returning new playback stream (PcmPlayback)
+            idle_timeout (float): time before closing unused output (seconds, 0 closes
+                output as soon as it is released)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.playback_factory = playback_factory
+        self.idle_timeout = idle_timeout
+        self.__lock = threading.Lock()
+        self.__wake_lock = threading.Lock()
+        self.__playback = None
+        self.__in_use = False
+        self.__timer = None
+        self.__feeder = None
+        self.__feeder_stop = None
+        self.__latencies = collections.deque(maxlen=self.STATS_WINDOW)
+        self.__wakeups = 0
+        self.__suspends = 0
+
+    def get_output(self):
+        """
+        Return playback output. Opened output is reused if it is not already in use
+
+        Returns:
+            ManagedOutput: playback output
+        """
+        with self.__lock:
+            self._cancel_timer()
+            self._stop_feeder()
+            if self.__in_use:
+                # output already used by another player: give dedicated one
+                return ManagedOutput(self, self.playback_factory(), False)
+            if self.__playback is None:
+                self.__playback = self.playback_factory()
+            self.__in_use = True
+            return ManagedOutput(self, self.__playback, True)
+
+    def prewarm(self):
+        """
+        Open output ahead of playback if it is suspended. Output is closed after idle
+        timeout if it is not used
+        """
+        with self.__lock:
+            if self.__playback is not None:
+                return
+            self.__playback = self.playback_factory()
+            playback = self.__playback
+            self._start_timer()
+            self._start_feeder(playback)
+        try:
+            self._wake(playback)
+        except Exception:
+            # playback will be opened again when needed
+            self.logger.exception("Unable to prewarm playback output")
+
+    def suspend(self):
+        """
+        Close output if it is not used
+        """
+        with self.__lock:
+            self._cancel_timer()
+            self._stop_feeder()
+            if self.__in_use or self.__playback is None:
+                return
+            playback = self.__playback
+            self.__playback = None
+            self.__suspends += 1
+        self.logger.debug("Suspend playback output")
+        playback.drain(1.0)
+
+    def get_state(self):
+        """
+        Return output state
+
+        Returns:
+            str: output state (suspended, idle or active)
+        """
+        if self.__in_use:
+            return self.STATE_ACTIVE
+        return self.STATE_IDLE if self.__playback else self.STATE_SUSPENDED
+
+    def get_stats(self):
+        """
+        Return idle manager stats
+
+        Returns:
+            dict: stats::
+
+                {
+                    state (str): output state
+                    idle_timeout (float): idle timeout (seconds)
+                    wakeups (int): number of output openings
+                    suspends (int): number of output closings after idle timeout
+                    latency (dict): wake up latency of last openings (ms): count, mean, max
+                }
+
+        """
+        with self.__lock:
+            latencies = list(self.__latencies)
+            stats = {
+                "state": self.get_state(),
+                "idle_timeout": self.idle_timeout,
+                "wakeups": self.__wakeups,
+                "suspends": self.__suspends,
+            }
+        stats["latency"] = {
+            "count": len(latencies),
+            "mean": sum(latencies) / len(latencies) * 1000.0 if latencies else None,
+            "max": max(latencies) * 1000.0 if latencies else None,
+        }
+
+        return stats
+
+    def _wake(self, playback):
+        """
+        Open playback if not opened yet, measuring wake up latency
+        """
+        with self.__wake_lock:
+            if playback.is_running():
+                return
+            start = time.perf_counter()
+            playback.start()
+            latency = time.perf_counter() - start
+        with self.__lock:
+            self.__latencies.append(latency)
+            self.__wakeups += 1
+
+    def _release(self, playback):
+        """
+        Pooled output released: keep playback opened until idle timeout
+
+        Args:
+            playback (PcmPlayback): released playback, None if it was stopped
+        """
+        with self.__lock:
+            self.__in_use = False
+            if playback is None or not playback.is_running():
+                self.__playback = None
+                return
+            self._start_timer()
+            self._start_feeder(playback)
+
+    def _start_timer(self):
+        """
+        Start idle timer. Must be called with lock acquired
+        """
+        self._cancel_timer()
+        self.__timer = threading.Timer(self.idle_timeout, self.suspend)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def _cancel_timer(self):
+        """
+        Cancel idle timer. Must be called with lock acquired
+        """
+        if self.__timer:
+            self.__timer.cancel()
+        self.__timer = None
+
+    def _start_feeder(self, playback):
+        """
+        Start writing silence to idle playback. Must be called with lock acquired
+
+        Args:
+            playback (PcmPlayback): idle playback
+        """
+        self._stop_feeder()
+        self.__feeder_stop = threading.Event()
+        self.__feeder = threading.Thread(
+            target=self._feed_silence, args=(playback, self.__feeder_stop), daemon=True
+        )
+        self.__feeder.start()
+
+    def _stop_feeder(self):
+        """
+        Stop writing silence and wait for last write, so output can be used by a player.
+        Must be called with lock acquired
+        """
+        feeder = self.__feeder
+        self.__feeder = None
+        if feeder is None:
+            return
+        self.__feeder_stop.set()
+        if feeder is not threading.current_thread():
+            feeder.join()
+
+    def _feed_silence(self, playback, stop):
+        """
+        Write silence chunks to playback at playback pace until stopped
+
+        Args:
+            playback (PcmPlayback): idle playback
+            stop (threading.Event): stop event
+        """
+        frames = max(1, int(playback.rate * self.SILENCE_PERIOD))
+        silence = bytes(frames * playback.frame_size)
+        period = frames / playback.rate
+        next_write = time.monotonic() + period
+        while not stop.wait(max(0.0, next_write - time.monotonic())):
+            # prewarmed playback may not be opened yet
+            if playback.is_running() and not playback.write(silence):
+                self.logger.debug("Unable to write silence to idle output")
+                return
+            next_write += period
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+import numpy
+from .audioconverter import SampleFormat, frames_from_bytes, to_float
+
+SILENCE_DBFS = -96.0
+
+
+def compute_levels(frames):
+    """
+    Compute RMS and peak levels of each window of frames
+
+    Args:
+        frames (numpy.ndarray): float frames of shape (windows, window frames, channels)
+
+    Returns:
+        tuple: levels in dBFS::
+
+            (
+                numpy.ndarray: rms levels of shape (windows, channels),
+                numpy.ndarray: peak levels of shape (windows, channels),
+            )
+
+    """
+    rms = numpy.sqrt(numpy.mean(numpy.square(frames, dtype=numpy.float64), axis=1))
+    peak = numpy.max(numpy.abs(frames), axis=1)
+    return to_dbfs(rms), to_dbfs(peak)
+
+
+def to_dbfs(levels):
+    """
+    Convert linear levels (1.0 is full scale) to dBFS, clamped to silence level
+
+    Args:
+        levels (numpy.ndarray): linear levels
+
+    Returns:
+        numpy.ndarray: levels in dBFS
+    """
+    with numpy.errstate(divide="ignore"):
+        dbfs = 20.0 * numpy.log10(levels)
+    return numpy.maximum(dbfs, SILENCE_DBFS)
+
+
+class LevelMeter:
+    """
+    Decimate capture stream to RMS and peak levels at UI update rate
+
+    Each level is computed over a window of rate/update_rate frames, all complete windows
+    of a chunk are computed at once.
+    """
+
+    def __init__(
+        self, rate, channels, sample_format=SampleFormat.S16_LE, update_rate=20.0
+    ):
+        """
+        Constructor
+
+        Args:
+            rate (int): stream sample rate
+            channels (int): stream channels
+            sample_format (str): stream sample format (see SampleFormat)
+            update_rate (float): number of levels per second
+        """
+        if update_rate <= 0 or update_rate > rate:
+            raise Exception(f"Invalid level meter update rate {update_rate}")
+
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.window = int(round(rate / update_rate))
+        self.__pending = numpy.zeros((0, channels), dtype=numpy.float32)
+
+    def reset(self):
+        """
+        Drop pending frames
+        """
+        self.__pending = numpy.zeros((0, self.channels), dtype=numpy.float32)
+
+    def process(self, frames):
+        """
+        Process frames
+
+        Args:
+            frames (numpy.ndarray): frames of shape (frames, channels) in meter sample format
+
+        Returns:
+            list: levels of each completed window::
+
+                [
+                    {
+                        rms (list): rms level in dBFS of each channel
+                        peak (list): peak level in dBFS of each channel
+                    },
+                    ...
+                ]
+
+        """
+        frames = to_float(frames, self.sample_format)
+        if len(self.__pending):
+            frames = numpy.concatenate((self.__pending, frames))
+
+        windows = len(frames) // self.window
+        used = windows * self.window
+        self.__pending = frames[used:].copy()
+        if not windows:
+            return []
+
+        rms, peak = compute_levels(
+            frames[:used].reshape(windows, self.window, self.channels)
+        )
+        rms = numpy.round(rms, 1).tolist()
+        peak = numpy.round(peak, 1).tolist()
+        return [{"rms": rms[i], "peak": peak[i]} for i in range(windows)]
+
+    def process_bytes(self, raw):
+        """
+        Process raw interleaved PCM data
+
+        Args:
+            raw (bytes): raw PCM data in meter sample format
+
+        Returns:
+            list: levels of each completed window (see process)
+        """
+        return self.process(frames_from_bytes(raw, self.sample_format, self.channels))
+
+
+class LevelMeterStream:
+    """
+    Run level meter on capture stream in background thread
+
+    Capture is stopped automatically after max duration to not keep microphone open.
+    """
+
+    def __init__(
+        self, capture, on_level, update_rate=20.0, max_duration=60.0, on_stop=None
+    ):
+        """
+        Constructor
+
+        Args:
+            capture (PcmCapture): capture stream
+            on_level (function): function called with each level (see LevelMeter.process)
+            update_rate (float): number of levels per second
+            max_duration (float): capture duration before automatic stop (seconds)
+            on_stop (function): function called when metering ends (stopped, max duration
+                reached or capture error)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.capture = capture
+        self.on_level = on_level
+        self.on_stop = on_stop
+        self.max_duration = max_duration
+        self.meter = LevelMeter(
+            capture.rate, capture.channels, capture.sample_format, update_rate
+        )
+        self.__thread = None
+        self.__running = threading.Event()
+
+    def is_running(self):
+        """
+        Return True if stream is running
+
+        Returns:
+            bool: True if running
+        """
+        return self.__running.is_set()
+
+    def start(self):
+        """
+        Start capture and metering
+
+        Raises:
+            Exception: if stream is already running
+        """
+        if self.is_running():
+            raise Exception("Level meter is already running")
+
+        self.meter.reset()
+        self.capture.start()
+        self.__running.set()
+        self.__thread = threading.Thread(target=self._run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop capture and metering
+        """
+        self.__running.clear()
+        thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            # unblock reader thread and wait for it before closing capture output
+            self.capture.interrupt()
+            thread.join(2.0)
+        self.__thread = None
+        self.capture.stop()
+
+    def _run(self):
+        """
+        Capture loop: read one window per iteration and push its level
+        """
+        end = time.monotonic() + self.max_duration
+        try:
+            while self.__running.is_set() and time.monotonic() < end:
+                raw = self.capture.read(self.meter.window)
+                if raw is None:
+                    break
+                for level in self.meter.process_bytes(raw):
+                    self.on_level(level)
+        except Exception:
+            self.logger.exception("Level meter failed")
+        finally:
+            self.__running.clear()
+            self.capture.stop()
+            if self.on_stop:
+                try:
+                    self.on_stop()
+                except Exception:
+                    self.logger.exception("Error notifying level meter stop")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from .audioconverter import SampleFormat
+
+
+class PcmBuffer:
+    """
+    Bounded in-memory raw PCM buffer
+
+    Buffer is preallocated for max duration, data written after buffer is full is dropped.
+    """
+
+    def __init__(
+        self, rate, channels=1, sample_format=SampleFormat.S16_LE, max_duration=5.0
+    ):
+        """
+        Constructor
+
+        Args:
+            rate (int): buffer sample rate
+            channels (int): number of channels
+            sample_format (str): buffer sample format (see SampleFormat)
+            max_duration (float): buffer capacity (seconds)
+        """
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frame_size = SampleFormat.get_dtype(sample_format).itemsize * channels
+        self.capacity = int(rate * max_duration) * self.frame_size
+        self.__data = bytearray(self.capacity)
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Return buffer size in bytes
+        """
+        return self.__size
+
+    def is_full(self):
+        """
+        Return True if buffer is full
+
+        Returns:
+            bool: True if buffer is full
+        """
+        return self.__size >= self.capacity
+
+    def get_duration(self):
+        """
+        Return buffered duration
+
+        Returns:
+            float: buffered duration (seconds)
+        """
+        return self.__size / float(self.frame_size * self.rate)
+
+    def write(self, data):
+        """
+        Append data to buffer. Data that does not fit is dropped
+
+        Args:
+            data (bytes): raw interleaved PCM data
+
+        Returns:
+            int: number of bytes written
+        """
+        with self.__lock:
+            size = min(len(data), self.capacity - self.__size)
+            self.__data[self.__size : self.__size + size] = data[:size]
+            self.__size += size
+
+        return size
+
+    def get_view(self):
+        """
+        Return buffered data without copy
+
+        Returns:
+            memoryview: buffered data
+        """
+        return memoryview(self.__data)[: self.__size]
+
+    def get_chunks(self, frames):
+        """
+        Iterate over buffered data by chunks of frames, without copy
+
+        Args:
+            frames (int): number of frames per chunk
+
+        Yields:
+            memoryview: data chunk
+        """
+        view = self.get_view()
+        size = frames * self.frame_size
+        for offset in range(0, len(view), size):
+            yield view[offset : offset + size]
+
+    def clear(self):
+        """
+        Empty buffer (memory is kept allocated)
+        """
+        with self.__lock:
+            self.__size = 0
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import subprocess
+from .audioconverter import SampleFormat
+
+
+class PcmStream:
+    """
+    Raw PCM stream base class, running alsa-utils command (arecord, aplay) in raw mode
+    """
+
+    COMMAND = None
+
+    def __init__(
+        self,
+        rate,
+        channels=1,
+        sample_format=SampleFormat.S16_LE,
+        device="default",
+    ):
+        """
+        Constructor
+
+        Args:
+            rate (int): stream sample rate
+            channels (int): number of channels
+            sample_format (str): stream sample format (see SampleFormat)
+            device (str): alsa device
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.device = device
+        self.frame_size = SampleFormat.get_dtype(sample_format).itemsize * self.channels
+        self._process = None
+
+    def get_command(self):
+        """
+        Return command line
+
+        Returns:
+            list: command line arguments
+        """
+        return [
+            self.COMMAND,
+            "-q",
+            "-D",
+            self.device,
+            "-t",
+            "raw",
+            "-f",
+            self.sample_format,
+            "-r",
+            str(self.rate),
+            "-c",
+            str(self.channels),
+        ]
+
+    def is_running(self):
+        """
+        Return True if stream is running
+
+        Returns:
+            bool: True if running
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self, **pipes):
+        """
+        Launch stream command
+
+        Args:
+            pipes (dict): subprocess pipes
+
+        Raises:
+            Exception: if stream is already running or command can't be launched
+        """
+        if self.is_running():
+            raise Exception("Stream is already running")
+
+        self.logger.debug("Start stream: %s", self.get_command())
+        self._process = subprocess.Popen(
+            self.get_command(), stderr=subprocess.DEVNULL, **pipes
+        )
+
+    def interrupt(self):
+        """
+        Terminate stream process without closing its pipe, so a blocked read or write
+        returns. Stop must still be called to release stream
+        """
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def _terminate(self, process, timeout):
+        """
+        Wait for command end, kill it after timeout
+
+        Args:
+            process (Popen): stream process
+            timeout (float): max time to wait (seconds)
+        """
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class PcmCapture(PcmStream):
+    """
+    Raw PCM capture stream read from arecord standard output
+
+    Capture runs until stopped, data is read by fixed size chunks of frames.
+    """
+
+    COMMAND = "arecord"
+
+    def start(self):
+        """
+        Start capture
+
+        Raises:
+            Exception: if capture is already running or arecord can't be launched
+        """
+        self._start(stdout=subprocess.PIPE)
+
+    def read(self, frames):
+        """
+        Read captured frames (blocking)
+
+        Args:
+            frames (int): number of frames to read
+
+        Returns:
+            bytes: raw interleaved PCM data or None if capture stopped
+        """
+        process = self._process
+        if process is None:
+            return None
+
+        size = frames * self.frame_size
+        data = b""
+        while len(data) < size:
+            chunk = process.stdout.read(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+
+        return data
+
+    def stop(self):
+        """
+        Stop capture
+        """
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+
+        process.terminate()
+        self._terminate(process, 1.0)
+        process.stdout.close()
+
+
+class PcmPlayback(PcmStream):
+    """
+    Raw PCM playback stream written to aplay standard input
+    """
+
+    COMMAND = "aplay"
+
+    def start(self):
+        """
+        Start playback
+
+        Raises:
+            Exception: if playback is already running or aplay can't be launched
+        """
+        self._start(stdin=subprocess.PIPE)
+
+    def write(self, data):
+        """
+        Write frames to play (blocking while alsa buffer is full)
+
+        Args:
+            data (bytes): raw interleaved PCM data
+
+        Returns:
+            bool: True if data written, False if playback stopped
+        """
+        process = self._process
+        if process is None:
+            return False
+
+        try:
+            process.stdin.write(data)
+            return True
+        except (BrokenPipeError, ValueError):
+            return False
+
+    def drain(self, timeout=None):
+        """
+        Close stream and wait for end of playback of written frames
+
+        Args:
+            timeout (float): max time to wait (seconds). Playback is stopped after timeout
+
+        Returns:
+            bool: True if playback completed successfully
+        """
+        process = self._process
+        self._process = None
+        if process is None:
+            return False
+
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._terminate(process, timeout)
+        return process.returncode == 0
+
+    def stop(self):
+        """
+        Stop playback immediately
+        """
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+
+        process.terminate()
+        self._terminate(process, 1.0)
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import threading
+
+
+class PrefetchBuffer:
+    """
+    Bounded prefetch buffer filled from stream source by a background thread
+
+    Prefetch pauses when buffered data reaches high watermark and resumes when it falls
+    under low watermark, so memory stays flat whatever the stream length. Buffer is a
+    blocking, non seekable binary file object for its consumer.
+    """
+
+    READ_SIZE = 16384
+
+    def __init__(self, source, high_watermark=262144, low_watermark=131072):
+        """
+        Constructor
+
+        Args:
+            source (StreamSource): stream source (opened by buffer)
+            high_watermark (int): buffered size that pauses prefetch (bytes)
+            low_watermark (int): buffered size that resumes prefetch (bytes)
+        """
+        if not 0 <= low_watermark < high_watermark:
+            raise Exception("Invalid prefetch buffer watermarks")
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.source = source
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.error = None
+        self.underruns = 0
+        self.received = 0
+        self.__chunks = collections.deque()
+        self.__offset = 0
+        self.__size = 0
+        self.__max_size = 0
+        self.__eof = False
+        self.__closed = False
+        self.__cond = threading.Condition()
+        self.__thread = None
+
+    def __len__(self):
+        """
+        Return buffered size in bytes
+        """
+        return self.__size
+
+    def start(self):
+        """
+        Open source and start prefetch
+
+        Raises:
+            Exception: if source can't be opened
+        """
+        self.source.open()
+        self.__thread = threading.Thread(target=self._prefetch, daemon=True)
+        self.__thread.start()
+
+    def wait_filled(self, timeout=None):
+        """
+        Wait for buffer to reach high watermark (or end of stream)
+
+        Args:
+            timeout (float): max time to wait (seconds)
+
+        Returns:
+            bool: True if buffer is filled
+        """
+        with self.__cond:
+            return self.__cond.wait_for(
+                lambda: self.__size >= self.high_watermark
+                or self.__eof
+                or self.__closed,
+                timeout,
+            )
+
+    def get_stats(self):
+        """
+        Return buffer stats
+
+        Returns:
+            dict: stats::
+
+                {
+                    buffered (int): buffered size (bytes)
+                    max_buffered (int): max buffered size (bytes)
+                    received (int): received size (bytes)
+                    underruns (int): number of reads that waited for data
+                    eof (bool): True if whole stream is received
+                }
+
+        """
+        with self.__cond:
+            return {
+                "buffered": self.__size,
+                "max_buffered": self.__max_size,
+                "received": self.received,
+                "underruns": self.underruns,
+                "eof": self.__eof,
+            }
+
+    def read(self, size=-1):
+        """
+        Read buffered data, blocking until data is available
+
+        Args:
+            size (int): max number of bytes to read (-1 reads up to end of stream)
+
+        Returns:
+            bytes: data, empty at end of stream or if buffer is closed
+        """
+        if size < 0:
+            parts = []
+            while True:
+                data = self.read(self.READ_SIZE)
+                if not data:
+                    return b"".join(parts)
+                parts.append(data)
+
+        parts = []
+        with self.__cond:
+            if self.__size == 0 and not self.__eof and not self.__closed:
+                self.underruns += 1
+            while size > 0:
+                self.__cond.wait_for(
+                    lambda: self.__size > 0 or self.__eof or self.__closed
+                )
+                if self.__size == 0:
+                    break
+                chunk = self.__chunks[0]
+                part = chunk[self.__offset : self.__offset + size]
+                self.__offset += len(part)
+                if self.__offset >= len(chunk):
+                    self.__chunks.popleft()
+                    self.__offset = 0
+                self.__size -= len(part)
+                size -= len(part)
+                parts.append(part)
+            self.__cond.notify_all()
+
+        return b"".join(parts)
+
+    def close(self):
+        """
+        Stop prefetch and drop buffered data
+        """
+        with self.__cond:
+            self.__closed = True
+            self.__chunks.clear()
+            self.__size = 0
+            self.__cond.notify_all()
+        thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(2.0)
+
+    def _prefetch(self):
+        """
+        Prefetch thread
+        """
+        try:
+            while True:
+                with self.__cond:
+                    if self.__size >= self.high_watermark:
+                        self.__cond.wait_for(
+                            lambda: self.__size <= self.low_watermark or self.__closed
+                        )
+                    if self.__closed:
+                        break
+
+                data = self.source.read(self.READ_SIZE)
+                with self.__cond:
+                    if not data:
+                        break
+                    self.__chunks.append(data)
+                    self.__size += len(data)
+                    self.__max_size = max(self.__max_size, self.__size)
+                    self.received += len(data)
+                    self.__cond.notify_all()
+        except Exception as error:
+            self.logger.exception("Stream source read failed")
+            self.error = str(error)
+        finally:
+            with self.__cond:
+                self.__eof = True
+                self.__cond.notify_all()
+            self.source.close()
@@ -0,0 +1,878 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import socket
+import threading
+import time
+from .audioconverter import SampleFormat
+from .pulseprotocol import (
+    CHANNEL_FRONT_LEFT,
+    CHANNEL_FRONT_RIGHT,
+    CHANNEL_MONO,
+    CONTROL_CHANNEL,
+    DESCRIPTOR,
+    INVALID_INDEX,
+    VOLUME_NORM,
+    Command,
+    TagStruct,
+    pack_packet,
+)
+
+
+class PulseClient:
+    """
+    PulseAudio client over a single persistent native protocol connection (no pactl
+    subprocess). PipeWire serves the same protocol with pipewire-pulse.
+
+    Connection is opened on first call and opened again if it is lost (server restarted).
+    A reader thread dispatches replies to callers and data requests to playback streams.
+    """
+
+    PROTOCOL_VERSION = 32
+    COOKIE_SIZE = 256
+    # max audio data sent in a single packet
+    MAX_PACKET_SIZE = 65536
+    # delay before trying again to connect to unavailable server (seconds)
+    RETRY_DELAY = 5.0
+    # system wide server (pulseaudio --system), the one used when running as root
+    SYSTEM_SOCKET_PATH = "/var/run/pulse/native"
+    SYSTEM_COOKIE_PATH = "/var/run/pulse/.config/pulse/cookie"
+    SAMPLE_FORMATS = {
+        SampleFormat.S16_LE: 3,
+        SampleFormat.FLOAT_LE: 5,
+        SampleFormat.S32_LE: 7,
+    }
+
+    def __init__(self, path=None, cookie_path=None, timeout=5.0, name="Cleep"):
+        """
+        Constructor
+
+        Args:
+            path (str): server socket path (default path is computed if not specified)
+            cookie_path (str): authentication cookie path (default cookie if not specified)
+            timeout (float): command timeout (seconds)
+            name (str): client name displayed by server
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.cookie_path = cookie_path
+        self.timeout = timeout
+        self.name = name
+        self.__socket = None
+        self.__reader = None
+        self.__tag = 0
+        # pending replies by tag: [event, command, payload]
+        self.__pending = {}
+        # writable bytes by stream channel (None when stream is killed)
+        self.__credits = {}
+        self.__retry_time = 0.0
+        self.__connection_id = 0
+        self.__lock = threading.Lock()
+        self.__send_lock = threading.Lock()
+        self.__connect_lock = threading.Lock()
+        self.__credits_changed = threading.Condition(self.__lock)
+
+    @classmethod
+    def get_socket_paths(cls):
+        """
+        Return server socket paths to try, in order. Root has no per-user server, so
+        system wide server socket is tried first in this case
+
+        Returns:
+            list: socket paths
+        """
+        paths = []
+        server = os.environ.get("PULSE_SERVER", "")
+        for address in server.split():
+            if address.startswith("unix:"):
+                paths.append(address[5:])
+            elif address.startswith("/"):
+                paths.append(address)
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+        user_path = os.path.join(runtime_dir, "pulse", "native")
+        if os.getuid() == 0:
+            paths.extend([cls.SYSTEM_SOCKET_PATH, user_path])
+        else:
+            paths.extend([user_path, cls.SYSTEM_SOCKET_PATH])
+        return paths
+
+    def _read_cookie(self):
+        """
+        Read authentication cookie. Anonymous cookie is returned if no cookie is found
+        (server may still accept client according to its credentials)
+
+        Returns:
+            bytes: cookie
+        """
+        home = os.path.expanduser("~")
+        paths = (
+            [self.cookie_path]
+            if self.cookie_path
+            else [
+                os.environ.get("PULSE_COOKIE", ""),
+                os.path.join(home, ".config", "pulse", "cookie"),
+                os.path.join(home, ".pulse-cookie"),
+                self.SYSTEM_COOKIE_PATH,
+            ]
+        )
+        for path in paths:
+            try:
+                with open(path, "rb") as cookie_file:
+                    cookie = cookie_file.read(self.COOKIE_SIZE)
+                if len(cookie) == self.COOKIE_SIZE:
+                    return cookie
+            except OSError:
+                continue
+        return bytes(self.COOKIE_SIZE)
+
+    def is_available(self):
+        """
+        Return True if server is reachable. Connection is opened if necessary
+
+        Returns:
+            bool: True if server is available
+        """
+        try:
+            self._get_socket()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """
+        Close connection
+        """
+        with self.__lock:
+            sock = self.__socket
+        if sock is not None:
+            self._close_socket(sock)
+        reader = self.__reader
+        if reader is not None and reader is not threading.current_thread():
+            reader.join()
+
+    def _get_socket(self):
+        """
+        Return connected socket, connection is opened (and authenticated) if necessary
+
+        Returns:
+            socket: connected socket
+
+        Raises:
+            Exception: if server is not available
+        """
+        with self.__connect_lock:
+            return self.__socket or self._connect()
+
+    def _connect(self):
+        """
+        Open and authenticate connection. Must be called with connect lock acquired
+
+        Returns:
+            socket: connected socket
+
+        Raises:
+            Exception: if server is not available
+        """
+        with self.__lock:
+            if time.monotonic() < self.__retry_time:
+                raise Exception("PulseAudio server is not available")
+
+            paths = [self.path] if self.path else self.get_socket_paths()
+            for path in paths:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(path)
+                    break
+                except OSError:
+                    sock.close()
+            else:
+                self.__retry_time = time.monotonic() + self.RETRY_DELAY
+                raise Exception("PulseAudio server is not available")
+
+            self.logger.debug("Connected to PulseAudio server %s", path)
+            self.__socket = sock
+            self.__reader = threading.Thread(
+                target=self._read_packets, args=(sock,), daemon=True
+            )
+            self.__reader.start()
+
+        try:
+            auth = TagStruct().put_u32(self.PROTOCOL_VERSION)
+            auth.put_arbitrary(self._read_cookie())
+            reply = self._command(Command.AUTH, auth)
+            version = reply.get_u32() & 0xFFFF
+            if version < self.PROTOCOL_VERSION:
+                raise Exception(f"Unsupported PulseAudio protocol version {version}")
+            client = TagStruct().put_proplist(
+                {
+                    "application.name": self.name,
+                    "application.process.id": str(os.getpid()),
+                }
+            )
+            self._command(Command.SET_CLIENT_NAME, client)
+        except Exception:
+            self._close_socket(sock)
+            with self.__lock:
+                self.__retry_time = time.monotonic() + self.RETRY_DELAY
+            raise
+        with self.__lock:
+            self.__connection_id += 1
+        return sock
+
+    def get_connection_id(self):
+        """
+        Return id of server connection, connection is opened if necessary. Id changes
+        each time connection is opened again (server restarted), so server objects read
+        before (indexes...) may have changed
+
+        Returns:
+            int: connection id
+
+        Raises:
+            Exception: if server is not available
+        """
+        self._get_socket()
+        with self.__lock:
+            return self.__connection_id
+
+    def _close_socket(self, sock):
+        """
+        Close socket and fail pending commands and streams
+
+        Args:
+            sock (socket): socket to close
+        """
+        with self.__lock:
+            if self.__socket is not sock:
+                return
+            self.__socket = None
+            for pending in self.__pending.values():
+                pending[0].set()
+            self.__pending.clear()
+            for channel in self.__credits:
+                self.__credits[channel] = None
+            self.__credits_changed.notify_all()
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _recv(self, sock, size):
+        """
+        Receive exactly specified bytes count
+
+        Returns:
+            bytes: received data or None if connection is closed
+        """
+        data = b""
+        while len(data) < size:
+            try:
+                chunk = sock.recv(size - len(data))
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _read_packets(self, sock):
+        """
+        Reader thread: dispatch received packets until connection is closed
+
+        Args:
+            sock (socket): connected socket
+        """
+        while True:
+            header = self._recv(sock, DESCRIPTOR.size)
+            if header is None:
+                break
+            length, channel, _, _, _ = DESCRIPTOR.unpack(header)
+            payload = self._recv(sock, length)
+            if payload is None:
+                break
+            if channel != CONTROL_CHANNEL:
+                # record streams are not used
+                continue
+            try:
+                self._dispatch(TagStruct(payload))
+            except Exception:
+                self.logger.exception("Invalid packet received")
+                break
+
+        self.logger.debug("PulseAudio connection closed")
+        self._close_socket(sock)
+
+    def _dispatch(self, packet):
+        """
+        Dispatch received command packet
+
+        Args:
+            packet (TagStruct): command packet
+        """
+        command = packet.get_u32()
+        tag = packet.get_u32()
+        with self.__lock:
+            if command in (Command.REPLY, Command.ERROR):
+                pending = self.__pending.pop(tag, None)
+                if pending is not None:
+                    pending[1] = command
+                    pending[2] = packet
+                    pending[0].set()
+            elif command == Command.REQUEST:
+                channel = packet.get_u32()
+                if self.__credits.get(channel) is not None:
+                    self.__credits[channel] += packet.get_u32()
+                    self.__credits_changed.notify_all()
+            elif command == Command.PLAYBACK_STREAM_KILLED:
+                channel = packet.get_u32()
+                if channel in self.__credits:
+                    self.__credits[channel] = None
+                    self.__credits_changed.notify_all()
+
+    def _send(self, sock, payload, channel=CONTROL_CHANNEL):
+        """
+        Send packet
+
+        Raises:
+            Exception: if connection is lost
+        """
+        self._send_data(sock, pack_packet(bytes(payload), channel))
+
+    def _send_data(self, sock, data):
+        """
+        Send packed packets
+
+        Raises:
+            Exception: if connection is lost
+        """
+        try:
+            with self.__send_lock:
+                sock.sendall(data)
+        except OSError as error:
+            self._close_socket(sock)
+            raise Exception(f"PulseAudio connection lost: {error}") from error
+
+    def _command(self, command, arguments=None, timeout=None):
+        """
+        Send command and wait for its reply
+
+        Args:
+            command (int): command (see Command)
+            arguments (TagStruct): command arguments
+            timeout (float): reply timeout (default timeout if not specified)
+
+        Returns:
+            TagStruct: reply payload positioned on first reply value
+
+        Raises:
+            Exception: if command failed
+        """
+        return self._pipeline([(command, arguments)], timeout)[0]
+
+    def _pipeline(self, commands, timeout=None):
+        """
+        Send commands at once and wait for their replies: a single round trip whatever the
+        number of commands. Server executes commands of a connection in order
+
+        Args:
+            commands (list): (command, arguments) tuples (see _command)
+            timeout (float): replies timeout (default timeout if not specified)
+
+        Returns:
+            list: replies payloads positioned on first reply value
+
+        Raises:
+            Exception: if a command failed (first error is raised once all replies are
+                received)
+        """
+        pendings = []
+        data = b""
+        with self.__lock:
+            sock = self.__socket
+            if sock is None:
+                raise Exception("PulseAudio connection lost")
+            for command, arguments in commands:
+                tag = self.__tag
+                self.__tag = (self.__tag + 1) & 0x7FFFFFFF
+                pending = [threading.Event(), None, None]
+                self.__pending[tag] = pending
+                pendings.append((command, tag, pending))
+                packet = TagStruct().put_u32(command).put_u32(tag)
+                if arguments is not None:
+                    packet.data += arguments.data
+                data += pack_packet(bytes(packet.data))
+        self._send_data(sock, data)
+
+        end = time.monotonic() + (timeout or self.timeout)
+        replies = []
+        error = None
+        for command, tag, pending in pendings:
+            if not pending[0].wait(max(0.0, end - time.monotonic())):
+                with self.__lock:
+                    self.__pending.pop(tag, None)
+                error = error or f"PulseAudio command {command} timed out"
+            elif pending[1] is None:
+                error = error or "PulseAudio connection lost"
+            elif pending[1] == Command.ERROR:
+                error = (
+                    error
+                    or f"PulseAudio command {command} failed with error {pending[2].get_u32()}"
+                )
+            replies.append(pending[2])
+        if error:
+            raise Exception(error)
+
+        return replies
+
+    def _call(self, command, arguments=None, timeout=None):
+        """
+        Connect if necessary and execute command
+
+        Returns:
+            TagStruct: reply payload
+
+        Raises:
+            Exception: if server is not available or command failed
+        """
+        self._get_socket()
+        return self._command(command, arguments, timeout)
+
+    def get_server_info(self):
+        """
+        Return server infos
+
+        Returns:
+            dict: server infos::
+
+                {
+                    name (str): server package name
+                    version (str): server version
+                    default_sink (str): default sink name
+                    default_source (str): default source name
+                }
+
+        """
+        reply = self._call(Command.GET_SERVER_INFO)
+        name = reply.get_string()
+        version = reply.get_string()
+        reply.get_string()
+        reply.get_string()
+        reply.get_sample_spec()
+        return {
+            "name": name,
+            "version": version,
+            "default_sink": reply.get_string(),
+            "default_source": reply.get_string(),
+        }
+
+    def _read_device(self, reply):
+        """
+        Read sink or source infos (layouts are the same since protocol version 16)
+
+        Args:
+            reply (TagStruct): reply positioned on device infos
+
+        Returns:
+            dict: device infos
+        """
+        device = {"index": reply.get_u32(), "name": reply.get_string()}
+        device["description"] = reply.get_string()
+        reply.get_sample_spec()
+        reply.get_channel_map()
+        reply.get_u32()
+        device["volumes"] = reply.get_cvolume()
+        device["mute"] = reply.get_bool()
+        # monitor source (sink) or monitored sink (source)
+        device["monitor"] = reply.get_u32()
+        reply.get_string()
+        reply.get_usec()
+        reply.get_string()
+        reply.get_u32()
+        device["properties"] = reply.get_proplist()
+        reply.get_usec()
+        reply.get_volume()
+        reply.get_u32()
+        reply.get_u32()
+        reply.get_u32()
+        for _ in range(reply.get_u32()):
+            reply.get_string()
+            reply.get_string()
+            reply.get_u32()
+            reply.get_u32()
+        reply.get_string()
+        for _ in range(reply.get_u8()):
+            reply.get_format_info()
+        return device
+
+    def _get_devices(self, command):
+        reply = self._call(command)
+        devices = []
+        while not reply.eof():
+            devices.append(self._read_device(reply))
+        return devices
+
+    def get_sinks(self):
+        """
+        Return sinks (playback devices)
+
+        Returns:
+            list: sinks::
+
+                [
+                    {
+                        index (int): sink index
+                        name (str): sink name
+                        description (str): sink description
+                        volumes (list): channels volumes (VOLUME_NORM is 100%)
+                        mute (bool): True if sink is muted
+                        monitor (int): monitor source index
+                        properties (dict): sink properties (device.bus, alsa.card...)
+                    },
+                    ...
+                ]
+
+        """
+        return self._get_devices(Command.GET_SINK_INFO_LIST)
+
+    def get_sources(self):
+        """
+        Return sources (capture devices and sinks monitors)
+
+        Returns:
+            list: sources (same format as sinks, monitor is monitored sink index or
+                INVALID_INDEX for capture devices)
+        """
+        return self._get_devices(Command.GET_SOURCE_INFO_LIST)
+
+    def set_default_sink(self, name):
+        """
+        Set default sink, existing streams are moved by server
+
+        Args:
+            name (str): sink name
+        """
+        self._call(Command.SET_DEFAULT_SINK, TagStruct().put_string(name))
+
+    def _set_volumes(self, command, name, volumes):
+        arguments = TagStruct().put_u32(INVALID_INDEX).put_string(name)
+        self._call(command, arguments.put_cvolume(volumes))
+
+    def set_sink_volumes(self, name, volumes):
+        """
+        Set sink channels volumes
+
+        Args:
+            name (str): sink name
+            volumes (list): channels volumes (VOLUME_NORM is 100%)
+        """
+        self._set_volumes(Command.SET_SINK_VOLUME, name, volumes)
+
+    def set_source_volumes(self, name, volumes):
+        """
+        Set source channels volumes
+
+        Args:
+            name (str): source name
+            volumes (list): channels volumes (VOLUME_NORM is 100%)
+        """
+        self._set_volumes(Command.SET_SOURCE_VOLUME, name, volumes)
+
+    def update_volumes(self, sink=None, source=None):
+        """
+        Write sink and source volumes and read devices back in a single round trip
+        (commands are pipelined). Server executes commands in order, so returned devices
+        hold volumes applied by server
+
+        Args:
+            sink (tuple): sink index and channels volumes (volumes None to only read
+                sink), None to skip sink
+            source (tuple): source index and channels volumes, same as sink
+
+        Returns:
+            tuple: sink and source infos (see get_sinks), None for skipped device
+
+        Raises:
+            Exception: if a command failed (unknown device...)
+        """
+        commands = []
+        reads = []
+        for device, set_command, get_command in (
+            (sink, Command.SET_SINK_VOLUME, Command.GET_SINK_INFO),
+            (source, Command.SET_SOURCE_VOLUME, Command.GET_SOURCE_INFO),
+        ):
+            if device is None:
+                reads.append(None)
+                continue
+            index, volumes = device
+            if volumes is not None:
+                arguments = TagStruct().put_u32(index).put_string(None)
+                commands.append((set_command, arguments.put_cvolume(volumes)))
+            reads.append(len(commands))
+            commands.append((get_command, TagStruct().put_u32(index).put_string(None)))
+
+        self._get_socket()
+        replies = self._pipeline(commands)
+        return tuple(
+            None if index is None else self._read_device(replies[index])
+            for index in reads
+        )
+
+    @staticmethod
+    def get_channel_map(channels):
+        """
+        Return channel map of specified channels count
+
+        Args:
+            channels (int): number of channels
+
+        Returns:
+            list: channels positions
+        """
+        if channels == 1:
+            return [CHANNEL_MONO]
+        if channels == 2:
+            return [CHANNEL_FRONT_LEFT, CHANNEL_FRONT_RIGHT]
+        # aux channels
+        return [12 + channel for channel in range(channels)]
+
+    def create_playback_stream(self, name, rate, channels, sample_format, sink=None):
+        """
+        Create playback stream
+
+        Args:
+            name (str): stream name
+            rate (int): sample rate
+            channels (int): number of channels
+            sample_format (str): sample format (see SampleFormat)
+            sink (str): sink name (default sink if not specified)
+
+        Returns:
+            int: stream channel
+
+        Raises:
+            Exception: if stream can't be created
+        """
+        if sample_format not in self.SAMPLE_FORMATS:
+            raise Exception(f"Unsupported sample format {sample_format}")
+        arguments = TagStruct()
+        arguments.put_sample_spec(self.SAMPLE_FORMATS[sample_format], channels, rate)
+        arguments.put_channel_map(self.get_channel_map(channels))
+        arguments.put_u32(INVALID_INDEX).put_string(sink)
+        # buffer attributes (maxlength, corked, tlength, prebuf, minreq): server defaults
+        arguments.put_u32(INVALID_INDEX).put_bool(False)
+        arguments.put_u32(INVALID_INDEX).put_u32(INVALID_INDEX).put_u32(INVALID_INDEX)
+        # sync id, volume
+        arguments.put_u32(0).put_cvolume([VOLUME_NORM] * channels)
+        # no remap, no remix, fix format, fix rate, fix channels, no move, variable rate
+        for _ in range(7):
+            arguments.put_bool(False)
+        # muted, adjust latency, properties
+        arguments.put_bool(False).put_bool(True)
+        arguments.put_proplist({"media.name": name, "media.role": "music"})
+        # volume set, early requests, muted set, don't inhibit auto suspend,
+        # fail on suspend, relative volume, passthrough
+        for _ in range(7):
+            arguments.put_bool(False)
+        # formats
+        arguments.put_u8(0)
+
+        reply = self._call(Command.CREATE_PLAYBACK_STREAM, arguments)
+        channel = reply.get_u32()
+        reply.get_u32()
+        with self.__lock:
+            self.__credits[channel] = reply.get_u32()
+        self.logger.debug("Playback stream %s created", channel)
+        return channel
+
+    def write_stream(self, channel, data, timeout=None):
+        """
+        Write audio data to playback stream. Data is sent when server requests it, so
+        call blocks while server buffer is full
+
+        Args:
+            channel (int): stream channel
+            data (bytes): audio data
+            timeout (float): max time to wait for server request (default timeout)
+
+        Returns:
+            bool: True if data written, False if stream is closed
+        """
+        view = memoryview(data)
+        while len(view) > 0:
+            with self.__credits_changed:
+                if not self.__credits_changed.wait_for(
+                    lambda: self.__credits.get(channel) != 0,
+                    timeout or self.timeout,
+                ):
+                    self.logger.warning("Playback stream %s is stalled", channel)
+                    return False
+                credit = self.__credits.get(channel)
+                if credit is None:
+                    return False
+                size = min(credit, len(view), self.MAX_PACKET_SIZE)
+                self.__credits[channel] = credit - size
+                sock = self.__socket
+            if sock is None:
+                return False
+            try:
+                self._send(sock, view[:size], channel)
+            except Exception:
+                return False
+            view = view[size:]
+        return True
+
+    def drain_stream(self, channel, timeout=None):
+        """
+        Wait for end of playback of written data
+
+        Args:
+            channel (int): stream channel
+            timeout (float): max time to wait (default timeout)
+
+        Returns:
+            bool: True if stream is drained
+        """
+        try:
+            self._command(
+                Command.DRAIN_PLAYBACK_STREAM, TagStruct().put_u32(channel), timeout
+            )
+            return True
+        except Exception as error:
+            self.logger.debug("Drain of stream %s failed: %s", channel, error)
+            return False
+
+    def delete_stream(self, channel):
+        """
+        Delete playback stream, pending data is dropped
+
+        Args:
+            channel (int): stream channel
+        """
+        with self.__lock:
+            self.__credits.pop(channel, None)
+            self.__credits_changed.notify_all()
+        try:
+            self._command(Command.DELETE_PLAYBACK_STREAM, TagStruct().put_u32(channel))
+        except Exception as error:
+            self.logger.debug("Delete of stream %s failed: %s", channel, error)
+
+    def is_stream_alive(self, channel):
+        """
+        Return True if stream exists on server
+
+        Args:
+            channel (int): stream channel
+
+        Returns:
+            bool: True if stream is alive
+        """
+        with self.__lock:
+            return self.__credits.get(channel) is not None
+
+
+class PulsePlayback:
+    """
+    Raw PCM playback stream written to PulseAudio server (same interface as PcmPlayback)
+    """
+
+    def __init__(
+        self,
+        client,
+        rate,
+        channels=1,
+        sample_format=SampleFormat.S16_LE,
+        sink=None,
+        name="Cleep audio",
+    ):
+        """
+        Constructor
+
+        Args:
+            client (PulseClient): client connected to server
+            rate (int): stream sample rate
+            channels (int): number of channels
+            sample_format (str): stream sample format (see SampleFormat)
+            sink (str): sink name (default sink if not specified)
+            name (str): stream name displayed by server
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.client = client
+        self.rate = rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.sink = sink
+        self.name = name
+        self.frame_size = SampleFormat.get_dtype(sample_format).itemsize * self.channels
+        self._channel = None
+
+    def is_running(self):
+        """
+        Return True if stream is running
+
+        Returns:
+            bool: True if running
+        """
+        channel = self._channel
+        return channel is not None and self.client.is_stream_alive(channel)
+
+    def start(self):
+        """
+        Start playback
+
+        Raises:
+            Exception: if playback is already running or stream can't be created
+        """
+        if self.is_running():
+            raise Exception("Stream is already running")
+
+        self._channel = self.client.create_playback_stream(
+            self.name, self.rate, self.channels, self.sample_format, self.sink
+        )
+
+    def write(self, data):
+        """
+        Write frames to play (blocking while server buffer is full)
+
+        Args:
+            data (bytes): raw interleaved PCM data
+
+        Returns:
+            bool: True if data written, False if playback stopped
+        """
+        channel = self._channel
+        if channel is None:
+            return False
+        return self.client.write_stream(channel, data)
+
+    def drain(self, timeout=None):
+        """
+        Wait for end of playback of written frames and close stream
+
+        Args:
+            timeout (float): max time to wait (seconds). Playback is stopped after timeout
+
+        Returns:
+            bool: True if playback completed successfully
+        """
+        channel = self._channel
+        self._channel = None
+        if channel is None:
+            return False
+
+        drained = self.client.drain_stream(channel, timeout)
+        self.client.delete_stream(channel)
+        return drained
+
+    def stop(self):
+        """
+        Stop playback immediately
+        """
+        channel = self._channel
+        self._channel = None
+        if channel is None:
+            return
+
+        self.client.delete_stream(channel)
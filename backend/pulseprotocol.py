@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+PulseAudio native protocol encoding (also served by PipeWire pipewire-pulse)
+
+A packet is a 20 bytes descriptor (length, channel, offset high, offset low, flags as
+big endian uint32) followed by payload. Command packets are sent on control channel and
+carry a tagstruct (command, tag, arguments), audio data packets are sent on stream channel.
+"""
+
+import struct
+
+
+class Command:
+    """
+    Native protocol commands used by client
+    """
+
+    ERROR = 0
+    REPLY = 2
+    CREATE_PLAYBACK_STREAM = 3
+    DELETE_PLAYBACK_STREAM = 4
+    AUTH = 8
+    SET_CLIENT_NAME = 9
+    DRAIN_PLAYBACK_STREAM = 12
+    GET_SERVER_INFO = 20
+    GET_SINK_INFO = 21
+    GET_SINK_INFO_LIST = 22
+    GET_SOURCE_INFO = 23
+    GET_SOURCE_INFO_LIST = 24
+    SET_SINK_VOLUME = 36
+    SET_SOURCE_VOLUME = 38
+    SET_DEFAULT_SINK = 44
+    SET_DEFAULT_SOURCE = 45
+    REQUEST = 61
+    PLAYBACK_STREAM_KILLED = 64
+
+
+DESCRIPTOR = struct.Struct(">IIIII")
+CONTROL_CHANNEL = 0xFFFFFFFF
+INVALID_INDEX = 0xFFFFFFFF
+VOLUME_NORM = 0x10000
+SAMPLE_S16LE = 3
+# channel positions
+CHANNEL_MONO = 0
+CHANNEL_FRONT_LEFT = 1
+CHANNEL_FRONT_RIGHT = 2
+
+
+def pack_packet(payload, channel=CONTROL_CHANNEL):
+    """
+    Build packet
+
+    Args:
+        payload (bytes): packet payload
+        channel (int): packet channel (stream index for audio data)
+
+    Returns:
+        bytes: packet
+    """
+    return DESCRIPTOR.pack(len(payload), channel, 0, 0, 0) + payload
+
+
+class TagStruct:
+    """
+    Tagged values serialization: each value is prefixed by a type tag, so payload can be
+    decoded without knowing its layout
+    """
+
+    TAG_STRING = b"t"
+    TAG_STRING_NULL = b"N"
+    TAG_U32 = b"L"
+    TAG_U8 = b"B"
+    TAG_U64 = b"R"
+    TAG_S64 = b"r"
+    TAG_SAMPLE_SPEC = b"a"
+    TAG_ARBITRARY = b"x"
+    TAG_BOOLEAN_TRUE = b"1"
+    TAG_BOOLEAN_FALSE = b"0"
+    TAG_TIMEVAL = b"T"
+    TAG_USEC = b"U"
+    TAG_CHANNEL_MAP = b"m"
+    TAG_CVOLUME = b"v"
+    TAG_PROPLIST = b"P"
+    TAG_VOLUME = b"V"
+    TAG_FORMAT_INFO = b"f"
+
+    def __init__(self, data=b""):
+        """
+        Constructor
+
+        Args:
+            data (bytes): payload to decode (empty to encode new payload)
+        """
+        self.data = bytearray(data)
+        self.offset = 0
+
+    # encoding
+
+    def put_u32(self, value):
+        self.data += self.TAG_U32 + struct.pack(">I", value)
+        return self
+
+    def put_u8(self, value):
+        self.data += self.TAG_U8 + struct.pack(">B", value)
+        return self
+
+    def put_u64(self, value):
+        self.data += self.TAG_U64 + struct.pack(">Q", value)
+        return self
+
+    def put_usec(self, value):
+        self.data += self.TAG_USEC + struct.pack(">Q", value)
+        return self
+
+    def put_string(self, value):
+        if value is None:
+            self.data += self.TAG_STRING_NULL
+        else:
+            self.data += self.TAG_STRING + value.encode("utf-8") + b"\x00"
+        return self
+
+    def put_bool(self, value):
+        self.data += self.TAG_BOOLEAN_TRUE if value else self.TAG_BOOLEAN_FALSE
+        return self
+
+    def put_arbitrary(self, value):
+        self.data += self.TAG_ARBITRARY + struct.pack(">I", len(value)) + value
+        return self
+
+    def put_sample_spec(self, sample_format, channels, rate):
+        self.data += self.TAG_SAMPLE_SPEC + struct.pack(
+            ">BBI", sample_format, channels, rate
+        )
+        return self
+
+    def put_channel_map(self, positions):
+        self.data += self.TAG_CHANNEL_MAP + bytes([len(positions)] + list(positions))
+        return self
+
+    def put_cvolume(self, volumes):
+        self.data += self.TAG_CVOLUME + bytes([len(volumes)])
+        self.data += b"".join(struct.pack(">I", volume) for volume in volumes)
+        return self
+
+    def put_volume(self, value):
+        self.data += self.TAG_VOLUME + struct.pack(">I", value)
+        return self
+
+    def put_proplist(self, properties):
+        self.data += self.TAG_PROPLIST
+        for key, value in properties.items():
+            raw = value.encode("utf-8") + b"\x00"
+            self.put_string(key)
+            self.put_u32(len(raw))
+            self.put_arbitrary(raw)
+        self.put_string(None)
+        return self
+
+    def put_format_info(self, encoding, properties):
+        self.data += self.TAG_FORMAT_INFO
+        self.put_u8(encoding)
+        self.put_proplist(properties)
+        return self
+
+    # decoding
+
+    def eof(self):
+        """
+        Return True if all values are decoded
+
+        Returns:
+            bool: True if end of payload is reached
+        """
+        return self.offset >= len(self.data)
+
+    def _read(self, size):
+        if self.offset + size > len(self.data):
+            raise Exception("Invalid tagstruct: truncated payload")
+        value = bytes(self.data[self.offset : self.offset + size])
+        self.offset += size
+        return value
+
+    def _expect(self, *tags):
+        tag = self._read(1)
+        if tag not in tags:
+            raise Exception(
+                f"Invalid tagstruct: unexpected tag {tag} (expected {tags})"
+            )
+        return tag
+
+    def get_u32(self):
+        self._expect(self.TAG_U32)
+        return struct.unpack(">I", self._read(4))[0]
+
+    def get_u8(self):
+        self._expect(self.TAG_U8)
+        return self._read(1)[0]
+
+    def get_u64(self):
+        self._expect(self.TAG_U64)
+        return struct.unpack(">Q", self._read(8))[0]
+
+    def get_usec(self):
+        self._expect(self.TAG_USEC)
+        return struct.unpack(">Q", self._read(8))[0]
+
+    def get_string(self):
+        if self._expect(self.TAG_STRING, self.TAG_STRING_NULL) == self.TAG_STRING_NULL:
+            return None
+        end = self.data.index(b"\x00", self.offset)
+        value = self._read(end - self.offset).decode("utf-8", errors="replace")
+        self.offset += 1
+        return value
+
+    def get_bool(self):
+        return self._expect(self.TAG_BOOLEAN_TRUE, self.TAG_BOOLEAN_FALSE) == (
+            self.TAG_BOOLEAN_TRUE
+        )
+
+    def get_arbitrary(self):
+        self._expect(self.TAG_ARBITRARY)
+        (size,) = struct.unpack(">I", self._read(4))
+        return self._read(size)
+
+    def get_sample_spec(self):
+        self._expect(self.TAG_SAMPLE_SPEC)
+        return struct.unpack(">BBI", self._read(6))
+
+    def get_channel_map(self):
+        self._expect(self.TAG_CHANNEL_MAP)
+        return list(self._read(self._read(1)[0]))
+
+    def get_cvolume(self):
+        self._expect(self.TAG_CVOLUME)
+        count = self._read(1)[0]
+        return list(struct.unpack(f">{count}I", self._read(count * 4)))
+
+    def get_volume(self):
+        self._expect(self.TAG_VOLUME)
+        return struct.unpack(">I", self._read(4))[0]
+
+    def get_proplist(self):
+        self._expect(self.TAG_PROPLIST)
+        properties = {}
+        while True:
+            key = self.get_string()
+            if key is None:
+                return properties
+            self.get_u32()
+            properties[key] = (
+                self.get_arbitrary().rstrip(b"\x00").decode("utf-8", errors="replace")
+            )
+
+    def get_format_info(self):
+        self._expect(self.TAG_FORMAT_INFO)
+        return (self.get_u8(), self.get_proplist())
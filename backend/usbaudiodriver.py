@@ -6,17 +6,48 @@ from cleep.libs.configs.etcasoundconf import EtcAsoundConf
 from cleep.libs.drivers.audiodriver import AudioDriver
 from cleep.libs.internals.console import Console
 from cleep.libs.configs.configtxt import ConfigTxt
+from .amixersession import AmixerSession
+from .controlmap import ControlMap
+from .driverstate import DriverState
+from .pulseclient import PulseClient, PulsePlayback
+from .pulseprotocol import INVALID_INDEX, VOLUME_NORM
 
 
 class UsbAudioDriver(AudioDriver):
     """
     Audio driver for USB audio devices
 
+    When a PulseAudio (or PipeWire) server is running, device is selected as server default
+    sink and volumes and playback streams go through server native protocol (streams are
+    mixed by server). Raw alsa is used otherwise.
+
+    Cleep runs as root and root has no per-user sound server, so driver installs PulseAudio
+    as a system wide server (pulseaudio --system) and adds root to pulse-access group
+    allowed to connect to its socket. Per-user servers are disabled to not hold the card.
+
     Tested hardare:
      * Mini external USB stereo speaker: https://thepihut.com/collections/raspberry-pi-usb-audio/products/mini-external-usb-stereo-speaker
     """
 
-    VOLUME_PATTERN = ("Mono", r"\[(\d*)%\]")
+    # alsa pcms listing, used to detect card capabilities
+    PCM_PATH = "/proc/asound/pcm"
+    PCM_PATTERN = re.compile(r"^(\d+)-(\d+):")
+
+    # system wide sound server
+    PULSE_SERVICE = "cleep-pulseaudio.service"
+    PULSE_SERVICE_PATH = "/etc/systemd/system/cleep-pulseaudio.service"
+    PULSE_SERVICE_CONTENT = """[Unit]
+Description=PulseAudio system wide server for Cleep
+After=sound.target
+
+[Service]
+ExecStart=/usr/bin/pulseaudio --system --daemonize=no --disallow-exit --exit-idle-time=-1
+Restart=on-failure
+
+[Install]
+WantedBy=multi-user.target
+"""
+    PULSE_ACCESS_GROUP = "pulse-access"
 
     def __init__(self):
         """
@@ -29,6 +60,20 @@ class UsbAudioDriver(AudioDriver):
         self.console = None
         self.volume_control = ""
         self.volume_control_numid = None
+        self.controls = None
+        self.pulse = None
+        # server device sink and source cached for a connection: (connection id, sink, source)
+        self.pulse_devices = None
+        self.state = DriverState(
+            {
+                "installed": self._is_installed,
+                "card": lambda: self.is_card_enabled(),
+                "asound": lambda: self.asoundconf.exists(),
+                "pulse": lambda: self._get_pulse_sink() is not None,
+                "sink": self._is_default_sink,
+            }
+        )
+        self.capabilities = None
 
     def _on_audio_registered(self):
         """
@@ -37,6 +82,8 @@ class UsbAudioDriver(AudioDriver):
         self.asoundconf = EtcAsoundConf(self.cleep_filesystem)
         self.configtxt = ConfigTxt(self.cleep_filesystem)
         self.console = Console()
+        self.controls = ControlMap(self.console, AmixerSession)
+        self.pulse = PulseClient()
 
     def _get_card_name(self, devices_names):
         """
@@ -54,7 +101,7 @@ class UsbAudioDriver(AudioDriver):
 
     def get_card_capabilities(self):
         """
-        Return card capabilities
+        Return card capabilities. Capabilities are probed once per card appearance
 
         Returns:
             tuple: card capabilities::
@@ -64,7 +111,61 @@ class UsbAudioDriver(AudioDriver):
                     bool: capture capability
                 )
         """
-        return (True, False)
+        # local copy, cache can be invalidated by hotplug meanwhile
+        capabilities = self.capabilities
+        if capabilities is None:
+            card_id, _ = self.get_cardid_deviceid()
+            if card_id is None:
+                return (True, False)
+            capabilities = self._probe_card_capabilities(card_id)
+            self.logger.debug("Card %s capabilities: %s", card_id, str(capabilities))
+            self.capabilities = capabilities
+
+        return capabilities
+
+    def _read_pcm_listing(self):
+        """
+        Read alsa pcms listing
+
+        Returns:
+            list: listing lines or empty list if listing is not available
+        """
+        try:
+            with open(self.PCM_PATH, encoding="utf-8") as pcm_file:
+                return pcm_file.readlines()
+        except OSError:
+            return []
+
+    def _probe_card_capabilities(self, card_id):
+        """
+        Probe card capabilities from alsa pcms listing. Mixer controls are used if
+        listing is not available
+
+        Args:
+            card_id (int): card index
+
+        Returns:
+            tuple: card capabilities (playback, capture)
+        """
+        playback = capture = False
+        found = False
+        for line in self._read_pcm_listing():
+            match = self.PCM_PATTERN.match(line)
+            if not match or int(match.group(1)) != card_id:
+                continue
+            found = True
+            playback = playback or ": playback " in line
+            capture = capture or ": capture " in line
+        if found:
+            return (playback, capture)
+
+        controls = self._get_controls(card_id)
+        if not controls:
+            return (True, False)
+        return (
+            controls.find("Playback") is not None,
+            controls.find("Capture") is not None,
+        )
 
     def _install(self, params=None):
         """
@@ -75,6 +176,7 @@ class UsbAudioDriver(AudioDriver):
         """
         # as the default driver and just in case, delete existing config
         self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
 
         # install pulseaudio debian package
         resp = self.console.command(
@@ -84,10 +186,15 @@ class UsbAudioDriver(AudioDriver):
             self.logger.error("Unable to install USB audio: %s", resp)
             return False
 
+        # run server system wide: root (Cleep) has no per-user server
+        if not self._install_system_server():
+            return False
+
         # installing native audio device consists of enabling dtparam audio in /boot/config.txt
         if not self.configtxt.enable_audio():
             raise Exception("Error enabling USB audio")
 
+        self.state.invalidate("installed")
         return True
 
     def _uninstall(self, params=None):
@@ -97,16 +204,62 @@ class UsbAudioDriver(AudioDriver):
         Args:
             params (dict): additional parameters
         """
+        self.console.command(f"systemctl disable --now {self.PULSE_SERVICE}")
+        self.cleep_filesystem.rm(self.PULSE_SERVICE_PATH)
+        self.console.command("systemctl daemon-reload")
+        self.console.command(
+            "systemctl --global enable pulseaudio.service pulseaudio.socket"
+        )
+
         resp = self.console.command("apt purge --q --yes pulseaudio")
         if resp["returncode"] != 0:
             self.logger.error("Unable to uninstall USB audio: %s", resp)
             raise Exception("Unable to uninstall USB audio")
 
+        self.state.invalidate("installed")
+        return True
+
+    def _install_system_server(self):
+        """
+        Configure and start PulseAudio system wide server. Root is added to pulse-access
+        group to be allowed to connect to server socket (/var/run/pulse/native)
+
+        Returns:
+            bool: True if server is configured
+        """
+        if not self.cleep_filesystem.write_data(
+            self.PULSE_SERVICE_PATH, self.PULSE_SERVICE_CONTENT
+        ):
+            self.logger.error("Unable to write %s", self.PULSE_SERVICE_PATH)
+            return False
+
+        commands = [
+            f"usermod -a -G {self.PULSE_ACCESS_GROUP} root",
+            # per-user servers would hold the card used by system server
+            "systemctl --global disable pulseaudio.service pulseaudio.socket",
+            "systemctl daemon-reload",
+            f"systemctl enable --now {self.PULSE_SERVICE}",
+        ]
+        for command in commands:
+            resp = self.console.command(command)
+            if resp["returncode"] != 0:
+                self.logger.error("Unable to configure PulseAudio server: %s", resp)
+                return False
+
         return True
 
     def is_installed(self):
         """
-        Is driver installed
+        Is driver installed (memoized)
+
+        Returns:
+            bool: True if driver is installed
+        """
+        return self.state.get("installed")
+
+    def _is_installed(self):
+        """
+        Probe driver installation
 
         Returns:
             bool: True if driver is installed
@@ -126,6 +279,13 @@ class UsbAudioDriver(AudioDriver):
 
         # as the default driver and just in case, delete existing config
         self.asoundconf.delete()
+        self.state.invalidate("asound", "card")
+        self.pulse_devices = None
+
+        sink = self._get_pulse_sink()
+        if sink:
+            # alsa default device is routed to sound server, select device on server
+            return self._enable_pulse_sink(sink)
 
         # create default /etc/asound.conf
         card_infos = self.get_cardid_deviceid()
@@ -147,9 +307,34 @@ class UsbAudioDriver(AudioDriver):
 
         # force saving alsa conf (this will create asound.state if needed)
         self.alsa.save()
+        self.state.set("asound", True)
+        self.state.set("pulse", False)
 
         return True
 
+    def _enable_pulse_sink(self, sink):
+        """
+        Select device sink as sound server default sink
+
+        Args:
+            sink (dict): device sink
+
+        Returns:
+            bool: True if sink selected
+        """
+        self.logger.debug('Set default sink "%s"', sink["name"])
+        try:
+            self.pulse.set_default_sink(sink["name"])
+        except Exception:
+            self.logger.exception('Unable to select sink "%s"', sink["name"])
+            self.state.invalidate("pulse", "sink")
+            return False
+
+        self.state.set("asound", False)
+        self.state.set("pulse", True)
+        self.state.set("sink", True)
+        return True
+
     def disable(self, params=None):
         """
         Disable driver
@@ -157,36 +342,180 @@ class UsbAudioDriver(AudioDriver):
         Args:
             params (dict): additional parameters
         """
+        # device stays server default sink until another driver is enabled
+        self.state.set("sink", False)
         self.logger.debug("Delete /etc/asound.conf and /var/lib/alsa/asound.state")
         if not self.asoundconf.delete():
             self.logger.error("Unable to delete asound.conf file")
+            self.state.invalidate("asound", "card")
             return False
+        self.state.set("asound", False)
+        self.state.invalidate("card")
 
         self.logger.debug("Driver disabled")
         return True
 
     def is_enabled(self):
         """
-        Is driver enabled ?
+        Is driver enabled ? Status is memoized, it is updated by driver transitions and
+        hotplug events
 
         Returns:
             bool: True if driver enabled
         """
-        card = self.is_card_enabled()
-        asound = self.asoundconf.exists()
+        if self.state.get("pulse"):
+            return self.state.get("card") and self.state.get("sink")
+        return self.state.get("card") and self.state.get("asound")
+
+    def on_cards_changed(self):
+        """
+        Soundcards changed (hotplug), invalidate card controls map, capabilities and card status
+        """
+        self.controls.invalidate()
+        self.state.invalidate("card", "pulse", "sink")
+        self.capabilities = None
+        self.pulse_devices = None
+
+    def _get_pulse_sink(self):
+        """
+        Return device sink on sound server
+
+        Returns:
+            dict: sink (see PulseClient.get_sinks) or None if server is not available or
+                device is not handled by server
+        """
+        return self._get_pulse_devices()[0]
+
+    def _get_pulse_devices(self):
+        """
+        Return device sink and capture source on sound server. Devices are cached until
+        soundcards change or server connection is opened again (server restarted)
+
+        Returns:
+            tuple: sink and source (None if not found or server is not available)
+        """
+        if self.pulse is None:
+            return None, None
+        try:
+            connection_id = self.pulse.get_connection_id()
+            cached = self.pulse_devices
+            if cached and cached[0] == connection_id:
+                return cached[1], cached[2]
+            sinks = self.pulse.get_sinks()
+            sources = self.pulse.get_sources()
+        except Exception as error:
+            self.logger.debug("Sound server is not available: %s", error)
+            return None, None
+        sink = next((sink for sink in sinks if self._is_usb_device(sink)), None)
+        source = next(
+            (
+                source
+                for source in sources
+                if source["monitor"] == INVALID_INDEX and self._is_usb_device(source)
+            ),
+            None,
+        )
+        # device may not be handled by server yet, do not cache its absence
+        if sink:
+            self.pulse_devices = (connection_id, sink, source)
+        return sink, source
+
+    @staticmethod
+    def _is_usb_device(device):
+        """
+        Return True if server device is an USB device
+
+        Args:
+            device (dict): server sink or source
+
+        Returns:
+            bool: True if device is an USB device
+        """
+        return (
+            device["properties"].get("device.bus") == "usb" or ".usb-" in device["name"]
+        )
+
+    def _is_default_sink(self):
+        """
+        Probe if device sink is server default sink
+
+        Returns:
+            bool: True if device sink is default sink
+        """
+        sink = self._get_pulse_sink()
+        if sink is None:
+            return False
+        try:
+            return self.pulse.get_server_info()["default_sink"] == sink["name"]
+        except Exception:
+            return False
+
+    def create_playback(self, rate, channels):
+        """
+        Create playback stream on device sink. Stream is mixed by sound server
+
+        Args:
+            rate (int): stream sample rate
+            channels (int): number of channels
+
+        Returns:
+            PulsePlayback: playback stream or None if sound server is not available (raw
+                alsa playback must be used)
+        """
+        sink = self._get_pulse_sink()
+        if sink is None:
+            return None
+        return PulsePlayback(self.pulse, rate, channels, sink=sink["name"])
+
+    def _get_controls(self, card_id=None):
+        """
+        Return card controls map. Map is built once per card appearance
 
-        return card and asound
+        Args:
+            card_id (int): card index if already known
+
+        Returns:
+            ControlMap: controls map or None if card is not found
+        """
+        if card_id is not None and card_id != self.controls.card_id:
+            self.controls.invalidate()
+        if not self.controls.is_built():
+            if card_id is None:
+                card_id, _ = self.get_cardid_deviceid()
+            if card_id is None or not self.controls.build(card_id):
+                return None
+
+        return self.controls
+
+    def _get_volume_control(self):
+        """
+        Return playback volume control
+
+        Returns:
+            dict: playback volume control or None if not found
+        """
+        controls = self._get_controls()
+        return controls.find("Playback Volume") if controls else None
 
     def _set_volumes_controls(self):
         """
-        Set controls to control volumes
+        Set controls used to configure volumes
         """
-        # search for appropriate volume control
-        controls = self.alsa.get_simple_controls()
-        self.volume_control = controls[0] if len(controls) > 0 else ""
+        control = self._get_volume_control()
+        self.volume_control = (
+            control["name"].replace(" Playback Volume", "") if control else ""
+        )
+        self.volume_control_numid = control["numid"] if control else None
+
+    def _get_capture_control(self):
+        """
+        Return capture volume control (ie "Mic Capture Volume")
 
-        # get volume control numid
-        self.volume_control_numid = self.get_control_numid("Volume")
+        Returns:
+            dict: capture volume control or None if not found
+        """
+        controls = self._get_controls()
+        return controls.find("Capture Volume") if controls else None
 
     def get_volumes(self):
         """
@@ -196,15 +525,82 @@ class UsbAudioDriver(AudioDriver):
             dict: volumes level::
 
                 {
-                    playback (float): playback volume
-                    capture (float): capture volume
+                    playback (float): playback volume (None if not supported)
+                    capture (float): capture volume (None if not supported)
                 }
 
         """
-        return {
-            "playback": self.alsa.get_volume(self.volume_control, self.VOLUME_PATTERN),
-            "capture": None,
-        }
+        sink, source = self._get_pulse_devices()
+        if sink:
+            playback, capture = self._update_pulse_volumes(sink, source, None, None)
+            return {
+                "playback": max(playback) if playback else None,
+                "capture": max(capture) if capture else None,
+            }
+
+        return self._apply_volumes(None, None)
+
+    @staticmethod
+    def _pulse_to_percents(device):
+        """
+        Convert server device volumes to percentages
+
+        Args:
+            device (dict): server sink or source (can be None)
+
+        Returns:
+            list: volume percentage of each channel or None if no device
+        """
+        if not device:
+            return None
+        return [round(volume * 100 / VOLUME_NORM) for volume in device["volumes"]]
+
+    def _update_pulse_volumes(self, sink, source, playback, capture):
+        """
+        Write (or read) server device volumes of each channel. Writes and reads are
+        pipelined in a single server round trip and returned volumes are the ones
+        applied by server
+
+        Args:
+            sink (dict): server sink
+            source (dict): server source (can be None)
+            playback (list): playback volume percentage of each channel (None to read it)
+            capture (list): capture volume percentage of each channel (None to read it)
+
+        Returns:
+            tuple: playback and capture volume percentage of each channel (None if no
+                device or error)
+
+        Raises:
+            Exception: if number of percentages does not match device channels
+        """
+        devices = []
+        for device, percents in ((sink, playback), (source, capture)):
+            if not device:
+                devices.append(None)
+                continue
+            if percents is not None and len(percents) != len(device["volumes"]):
+                raise Exception(
+                    f'Device "{device["name"]}" has {len(device["volumes"])} channel(s)'
+                )
+            volumes = (
+                None
+                if percents is None
+                else [
+                    round(min(max(percent, 0), 100) * VOLUME_NORM / 100)
+                    for percent in percents
+                ]
+            )
+            devices.append((device["index"], volumes))
+
+        try:
+            devices = self.pulse.update_volumes(*devices)
+        except Exception:
+            self.logger.exception("Unable to update sound server volumes")
+            # device may have been removed from server, search it again next time
+            self.pulse_devices = None
+            return None, None
+        return tuple(self._pulse_to_percents(device) for device in devices)
 
     def set_volumes(self, playback=None, capture=None):
         """
@@ -223,11 +619,92 @@ class UsbAudioDriver(AudioDriver):
                 }
 
         """
+        sink, source = self._get_pulse_devices()
+        if sink:
+            playback, capture = self._update_pulse_volumes(
+                sink,
+                source,
+                None if playback is None else [playback] * len(sink["volumes"]),
+                (
+                    None
+                    if capture is None or not source
+                    else [capture] * len(source["volumes"])
+                ),
+            )
+            return {
+                "playback": max(playback) if playback else None,
+                "capture": max(capture) if capture else None,
+            }
+
+        return self._apply_volumes(playback, capture)
+
+    def _apply_volumes(self, playback, capture):
+        """
+        Write (or read) playback and capture volumes in a single mixer transaction
+
+        Args:
+            playback (float): playback volume (None to read it)
+            capture (float): capture volume (None to read it)
+
+        Returns:
+            dict: volumes level (None if not supported or error)
+        """
+        playback_control = self._get_volume_control()
+        capture_control = self._get_capture_control()
+        transaction = self.controls.transaction()
+        transaction.set_percent(playback_control, playback)
+        transaction.set_percent(capture_control, capture)
+        transaction.commit()
         return {
-            "playback": self.alsa.set_volume(
-                self.volume_control, self.VOLUME_PATTERN, playback
-            ),
-            "capture": None,
+            "playback": transaction.get_percent(playback_control),
+            "capture": transaction.get_percent(capture_control),
+        }
+
+    def get_channel_volumes(self):
+        """
+        Get volume of each channel
+
+        Returns:
+            dict: channels volumes::
+
+                {
+                    playback (list): playback volume of each channel (None if not supported)
+                    capture (list): capture volume of each channel (None if not supported)
+                }
+
+        """
+        return self.set_channel_volumes(None, None)
+
+    def set_channel_volumes(self, playback=None, capture=None):
+        """
+        Set volume of each channel (ie stereo balance)
+
+        Args:
+            playback (list): playback volume of each channel (None to disable update)
+            capture (list): capture volume of each channel (None to disable update)
+
+        Returns:
+            dict: channels volumes (see get_channel_volumes)
+
+        Raises:
+            Exception: if number of volumes does not match device channels
+        """
+        sink, source = self._get_pulse_devices()
+        if sink:
+            playback, capture = self._update_pulse_volumes(
+                sink, source, playback, capture
+            )
+            return {"playback": playback, "capture": capture}
+
+        playback_control = self._get_volume_control()
+        capture_control = self._get_capture_control()
+        transaction = self.controls.transaction()
+        transaction.set_percents(playback_control, playback)
+        transaction.set_percents(capture_control, capture)
+        transaction.commit()
+        return {
+            "playback": transaction.get_percents(playback_control),
+            "capture": transaction.get_percents(capture_control),
         }
 
     def require_reboot(self):
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import re
+import subprocess
+import threading
+import time
+
+
+class VolumeMonitor:
+    """
+    Watch alsa control devices for mixer values changes, using "alsactl monitor" that
+    polls control devices and prints one line per event
+
+    Bursts of events (slider moved, hardware button kept pressed) are coalesced in a single
+    notification.
+    """
+
+    COMMAND = ["alsactl", "monitor"]
+    # "node hw:1, #3 (2,0,0,PCM Playback Volume,0) VALUE" (or "card 1, #3 ...")
+    EVENT_PATTERN = re.compile(
+        r"^(?:node hw:|card )(\d+), #(\d+) \(\d+,\d+,\d+,(.+),\d+\) (.+)$"
+    )
+    DEBOUNCE = 0.1
+
+    def __init__(self, on_change, command=None):
+        """
+        Constructor
+
+        Args:
+            on_change (function): function called with list of changed controls, each
+                control is a dict {card (int), numid (int), name (str)}
+            command (list): monitor command line (default COMMAND)
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_change = on_change
+        self.command = command or self.COMMAND
+        self.__process = None
+        self.__thread = None
+        self.__cond = threading.Condition()
+        self.__changes = {}
+        self.__notifier = None
+        self.__running = False
+
+    def is_running(self):
+        """
+        Return True if monitor is running
+
+        Returns:
+            bool: True if running
+        """
+        return self.__running
+
+    def start(self):
+        """
+        Start monitoring
+
+        Raises:
+            Exception: if monitor command can't be launched
+        """
+        if self.__running:
+            return
+
+        try:
+            self.__process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+            )
+        except OSError as error:
+            raise Exception(f"Unable to monitor volumes: {error}") from error
+        self.__running = True
+        self.__thread = threading.Thread(
+            target=self._run, args=(self.__process,), daemon=True
+        )
+        self.__notifier = threading.Thread(target=self._notify, daemon=True)
+        self.__thread.start()
+        self.__notifier.start()
+
+    def stop(self):
+        """
+        Stop monitoring
+        """
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+        process = self.__process
+        self.__process = None
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def parse_event(self, line):
+        """
+        Parse monitor line
+
+        Args:
+            line (str): monitor output line
+
+        Returns:
+            dict: changed control {card, numid, name} or None if line is not a mixer value
+                change
+        """
+        match = self.EVENT_PATTERN.match(line.strip())
+        if not match or "VALUE" not in match.group(4):
+            return None
+        name = match.group(3).strip("'")
+        if "Volume" not in name and "Switch" not in name:
+            return None
+
+        return {"card": int(match.group(1)), "numid": int(match.group(2)), "name": name}
+
+    def _run(self, process):
+        """
+        Reader thread
+        """
+        for line in process.stdout:
+            control = self.parse_event(line)
+            if control is None:
+                continue
+            with self.__cond:
+                self.__changes[(control["card"], control["numid"])] = control
+                self.__cond.notify_all()
+        process.stdout.close()
+
+        if self.__running:
+            self.logger.warning("Volume monitor stopped unexpectedly")
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify_all()
+
+    def _notify(self):
+        """
+        Notifier thread: coalesce changes during debounce time
+        """
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(lambda: self.__changes or not self.__running)
+                if not self.__changes:
+                    return
+                # collect burst events
+                end = time.monotonic() + self.DEBOUNCE
+                while self.__running and time.monotonic() < end:
+                    self.__cond.wait(end - time.monotonic())
+                changes = list(self.__changes.values())
+                self.__changes.clear()
+
+            try:
+                self.on_change(changes)
+            except Exception:
+                self.logger.exception("Error notifying volume change")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Audio application hot paths benchmarks
+
+Audio module runs with real drivers code plugged on fake alsa backend (see tests/fakealsa.py)
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../"))
+from cleep.libs.tests import session
+from cleep.libs.drivers.driver import Driver
+from backend.audio import Audio
+from backend.audiojobs import AudioJob
+from backend.bcm2835audiodriver import Bcm2835AudioDriver
+from backend.usbaudiodriver import UsbAudioDriver
+from tests.fakealsa import FakeAlsaBackend, make_bcm2835_card, make_usb_speaker_card
+
+
+class BenchContext(unittest.TestCase):
+    """
+    Test case used as context for Cleep test session
+    """
+
+    def runTest(self):  # pragma: no cover
+        pass
+
+
+class BenchDrivers:
+    """
+    Cleep drivers registry holding drivers plugged on fake backend
+    """
+
+    def __init__(self):
+        self.drivers = {}
+
+    def register(self, driver):
+        self.drivers[driver.name] = driver
+
+    def unregister(self, driver):
+        self.drivers.pop(driver.name, None)
+
+    def get_driver(self, driver_type, driver_name):
+        return self.drivers.get(driver_name)
+
+    def get_drivers(self, driver_type):
+        return dict(self.drivers) if driver_type == Driver.DRIVER_AUDIO else {}
+
+
+class AudioBench:
+    """
+    Audio application running on fake alsa backend
+    """
+
+    def __init__(self, latency):
+        """
+        Constructor
+
+        Args:
+            latency (float): fake backend operations latency (seconds)
+        """
+        self.played = threading.Event()
+        self.playback_job = None
+        # fast pcm clock: playback startup is measured, not playback duration
+        self.backend = FakeAlsaBackend(latency=latency, speed=100.0)
+        self.backend.add_card(make_bcm2835_card(0))
+        self.backend.add_card(make_usb_speaker_card(1))
+        self.backend.add_listener(self._on_backend_event)
+        self.drivers = BenchDrivers()
+        self.bcm2835_driver = self.backend.attach(Bcm2835AudioDriver())
+        self.usb_driver = self.backend.attach(UsbAudioDriver())
+        self.drivers.register(self.bcm2835_driver)
+        self.drivers.register(self.usb_driver)
+
+        cleep_filesystem = MagicMock()
+        cleep_filesystem.open.return_value.read.return_value = "dtparam=audio=on"
+        self.session = session.TestSession(BenchContext())
+        self.module = self.session.setup(
+            Audio,
+            bootstrap={"cleep_filesystem": cleep_filesystem},
+            mock_on_start=False,
+            mock_on_stop=False,
+        )
+        self.session.add_mock_command(self.session.make_mock_command("restart_cleep"))
+        self.session.start_module(self.module)
+
+        # plug drivers running on fake backend once module is started
+        self.module.drivers = self.drivers
+        self.module.alsa = self.backend.alsa()
+        self.module._set_config_field("driver", self.bcm2835_driver.name)
+
+    def _on_backend_event(self, event_name, payload):
+        if event_name == "pcm.open":
+            self.played.set()
+
+    def close(self):
+        """
+        Close bench session
+        """
+        self.session.clean()
+
+    def configure(self):
+        self.module._configure()
+
+    def get_module_config(self):
+        self.module.get_module_config()
+
+    def set_volumes(self):
+        self.module.set_volumes(40, None)
+
+    def select_device(self):
+        current = self.module._get_config_field("driver")
+        new = (
+            self.usb_driver.name
+            if current == self.bcm2835_driver.name
+            else self.bcm2835_driver.name
+        )
+        self.module.select_device(new)
+
+    def playback_startup(self):
+        self.played.clear()
+        self.playback_job = self.module.test_playing()
+        if not self.played.wait(5.0):
+            raise Exception("Playback did not start")
+
+    def playback_teardown(self):
+        # job holds playback resource: next iteration must not start before its end
+        job_id, self.playback_job = self.playback_job, None
+        if job_id:
+            self._wait_job(job_id, 5.0)
+
+    def _wait_job(self, job_id, timeout):
+        """
+        Wait for job to reach a terminal status
+
+        Args:
+            job_id (str): job id
+            timeout (float): max time to wait (seconds)
+
+        Raises:
+            Exception: if job failed or did not finish in time
+        """
+        end = time.monotonic() + timeout
+        job = self.module.get_job(job_id)
+        while job["status"] not in (AudioJob.STATUS_DONE, AudioJob.STATUS_FAILED):
+            if time.monotonic() > end:
+                raise Exception(f'Job "{job_id}" did not finish')
+            time.sleep(0.001)
+            job = self.module.get_job(job_id)
+        if job["status"] == AudioJob.STATUS_FAILED:
+            raise Exception(f'Job "{job_id}" failed: {job["error"]}')
+
+
+def get_benchmarks(options):
+    """
+    Return benchmarks of this suite
+
+    Args:
+        options (argparse.Namespace): runner options
+
+    Returns:
+        tuple: benchmarks dict (name: function or (function, teardown)) and cleanup
+            function
+    """
+    bench = AudioBench(options.latency / 1000.0)
+    return (
+        {
+            "audio._configure": bench.configure,
+            "audio.get_module_config": bench.get_module_config,
+            "audio.set_volumes": bench.set_volumes,
+            "audio.select_device": bench.select_device,
+            "audio.playback_startup": (bench.playback_startup, bench.playback_teardown),
+        },
+        bench.close,
+    )
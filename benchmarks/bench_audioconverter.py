@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Audio converter benchmark
+
+Report real-time factor (processing time / audio duration) of the playback converter
+stage on a single core. A real-time factor of 0.05 means 1 second of audio is converted
+in 50ms.
+
+Usage:
+    python3 bench_audioconverter.py [--quality fast|medium|best] [--duration 10]
+"""
+
+import os
+
+# force single core before numpy is imported (BLAS threads)
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import functools
+import json
+import sys
+import time
+import numpy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../"))
+from backend.audioconverter import AudioConverter, PolyphaseResampler, SampleFormat
+
+CASES = [
+    # (name, in_format, in_rate, out_format, out_rate)
+    ("s16_44100_to_s16_48000", SampleFormat.S16_LE, 44100, SampleFormat.S16_LE, 48000),
+    ("s16_48000_to_s16_44100", SampleFormat.S16_LE, 48000, SampleFormat.S16_LE, 44100),
+    ("s16_22050_to_s32_48000", SampleFormat.S16_LE, 22050, SampleFormat.S32_LE, 48000),
+    ("s16_44100_to_s32_44100", SampleFormat.S16_LE, 44100, SampleFormat.S32_LE, 44100),
+]
+
+
+def pin_single_core():
+    """
+    Pin process on first allowed core (when supported by platform)
+    """
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[0]})
+
+
+def bench_case(in_format, in_rate, out_format, out_rate, quality, duration, chunk):
+    """
+    Run a single benchmark case
+
+    Returns:
+        dict: case results
+    """
+    channels = 2
+    frames_count = int(in_rate * duration)
+    noise = numpy.random.default_rng(0).uniform(-0.5, 0.5, (frames_count, channels))
+    dtype = SampleFormat.get_dtype(in_format)
+    if in_format == SampleFormat.FLOAT_LE:
+        frames = noise.astype(dtype)
+    else:
+        frames = (noise * SampleFormat.SCALES[in_format]).astype(dtype)
+
+    converter = AudioConverter(
+        in_format, in_rate, out_format, out_rate, channels, quality=quality
+    )
+    start = time.perf_counter()
+    for index in range(0, frames_count, chunk):
+        converter.process(frames[index : index + chunk])
+    converter.flush()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "quality": quality,
+        "duration": duration,
+        "chunk": chunk,
+        "elapsed": elapsed,
+        "rtf": elapsed / duration,
+    }
+
+
+def get_benchmarks(options):
+    """
+    Return benchmarks of this suite for run_benchmarks runner. Each benchmark
+    converts 1 second of audio, so its time is also its real-time factor
+
+    Args:
+        options (argparse.Namespace): runner options
+
+    Returns:
+        tuple: benchmarks dict (name: function) and cleanup function
+    """
+    benchmarks = {}
+    for quality in sorted(PolyphaseResampler.QUALITIES.keys()):
+        for name, in_format, in_rate, out_format, out_rate in CASES:
+            benchmarks[f"audioconverter.{name}[{quality}]"] = functools.partial(
+                bench_case,
+                in_format,
+                in_rate,
+                out_format,
+                out_rate,
+                quality,
+                duration=1.0,
+                chunk=1024,
+            )
+
+    return benchmarks, lambda: None
+
+
+def main():
+    """
+    Benchmark entry point
+    """
+    parser = argparse.ArgumentParser(description="Audio converter benchmark")
+    parser.add_argument(
+        "--quality",
+        choices=sorted(PolyphaseResampler.QUALITIES.keys()),
+        action="append",
+        help="resampling quality (can be repeated, all qualities by default)",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="audio seconds")
+    parser.add_argument("--chunk", type=int, default=1024, help="frames per chunk")
+    parser.add_argument("--json", action="store_true", help="output json results")
+    args = parser.parse_args()
+
+    pin_single_core()
+    qualities = args.quality or sorted(PolyphaseResampler.QUALITIES.keys())
+    results = {}
+    for quality in qualities:
+        for name, in_format, in_rate, out_format, out_rate in CASES:
+            results[f"{name}[{quality}]"] = bench_case(
+                in_format,
+                in_rate,
+                out_format,
+                out_rate,
+                quality,
+                args.duration,
+                args.chunk,
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        print(
+            f"{name:40} rtf={result['rtf']:.4f} ({1.0 / result['rtf']:.1f}x realtime)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Audio benchmark suite runner
+
+Run all benchmark suites, write results as json and compare them to a baseline.
+Exit code is 1 if a benchmark median time regressed more than threshold.
+
+Usage:
+    python3 run_benchmarks.py --output results.json
+    python3 run_benchmarks.py --baseline results.json --threshold 0.25
+"""
+
+import os
+
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import importlib
+import json
+import platform
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SUITES = ["bench_audio", "bench_audioconverter"]
+
+
+def measure(function, iterations, warmup, teardown=None):
+    """
+    Measure function execution time
+
+    Args:
+        function (function): function to measure
+        iterations (int): number of measured iterations
+        warmup (int): number of unmeasured iterations
+        teardown (function): function called after each iteration, not measured
+
+    Returns:
+        dict: timings in seconds
+    """
+    for _ in range(warmup):
+        function()
+        if teardown:
+            teardown()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+        if teardown:
+            teardown()
+    timings.sort()
+
+    return {
+        "iterations": iterations,
+        "min": timings[0],
+        "mean": statistics.mean(timings),
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "max": timings[-1],
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results to baseline
+
+    Args:
+        results (dict): current results
+        baseline (dict): baseline results
+        threshold (float): allowed relative slowdown (0.25 for 25%)
+
+    Returns:
+        list: regressions (name, baseline median, current median)
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if result["median"] > reference["median"] * (1.0 + threshold):
+            regressions.append((name, reference["median"], result["median"]))
+
+    return regressions
+
+
+def main():
+    """
+    Runner entry point
+    """
+    parser = argparse.ArgumentParser(description="Audio benchmark suite")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=5.0,
+        help="fake backend subprocess latency in milliseconds",
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--filter", default="", help="run benchmarks matching filter")
+    parser.add_argument("--output", help="json results file")
+    parser.add_argument("--baseline", help="json baseline file to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed median slowdown ratio before failing",
+    )
+    options = parser.parse_args()
+
+    results = {}
+    for suite_name in SUITES:
+        suite = importlib.import_module(suite_name)
+        benchmarks, cleanup = suite.get_benchmarks(options)
+        try:
+            for name, benchmark in benchmarks.items():
+                if options.filter not in name:
+                    continue
+                # benchmark is a function or a (function, teardown) tuple
+                function, teardown = (
+                    benchmark if isinstance(benchmark, tuple) else (benchmark, None)
+                )
+                results[name] = measure(
+                    function, options.iterations, options.warmup, teardown
+                )
+                print(
+                    f"{name:45} median={results[name]['median'] * 1000.0:9.3f}ms "
+                    f"p95={results[name]['p95'] * 1000.0:9.3f}ms",
+                    file=sys.stderr,
+                )
+        finally:
+            cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "latency_ms": options.latency,
+            "iterations": options.iterations,
+        },
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], options.threshold)
+        for name, reference, current in regressions:
+            print(
+                f"REGRESSION {name}: {reference * 1000.0:.3f}ms -> {current * 1000.0:.3f}ms",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,10 @@
  */
 angular
 .module('Cleep')
-.directive('audioConfigComponent', ['$rootScope', 'toastService', 'audioService', 'cleepService',
-function($rootScope, toast, audioService, cleepService) {
+.directive('audioConfigComponent', ['$rootScope', '$interval', 'toastService', 'audioService', 'cleepService',
+function($rootScope, $interval, toast, audioService, cleepService) {
 
-    var audioController = function() {
+    var audioController = ['$scope', function($scope) {
         var self = this;
         self.playbackDevices = [];
         self.captureDevices = [];
@@ -15,6 +15,12 @@ function($rootScope, toast, audioService, cleepService) {
         self.volumeCapture = 0;
         self.currentDevice = null;
         self.devices = [];
+        self.route = null;
+        self.routes = [];
+        self.levelMeterRunning = false;
+        self.level = 0;
+        self.peak = 0;
+        self.configVersion = 0;
 
         /**
          * Set volumes
@@ -41,40 +47,89 @@ function($rootScope, toast, audioService, cleepService) {
             audioService.selectDevice(self.currentDevice.label)
                 .then(function() {
                     toast.success('Audio device changed. Cleep will restart in few seconds');
-                })
-                .finally(function() {
-                    //reload module config to get new volumes
-                    return cleepService.reloadModuleConfig('audio');
                 });
         };
 
         /**
-         * Play test sound
+         * Set output route
          */
-        self.testPlaying = function() {
-            audioService.testPlaying()
+        self.setOutputRoute = function() {
+            audioService.setOutputRoute(self.route)
                 .then(function() {
-                    toast.success('You should have heard a sound');
+                    toast.success('Output route changed');
                 });
         };
 
+        /**
+         * Play test sound
+         */
+        self.testPlaying = function() {
+            audioService.testPlaying();
+        };
+
         /**
          * Record voice and play it
          */
         self.testRecording = function() {
-            toast.loading('Recording 5 seconds...');
-            audioService.testRecording()
+            audioService.testRecording();
+        };
+
+        /**
+         * Start/stop input level meter
+         */
+        self.toggleLevelMeter = function() {
+            if( self.levelMeterRunning ) {
+                audioService.stopLevelMeter()
+                    .finally(function() {
+                        self.levelMeterRunning = false;
+                        self.level = 0;
+                        self.peak = 0;
+                    });
+                return;
+            }
+
+            audioService.startLevelMeter()
                 .then(function() {
-                    toast.success('You will hear your record');
+                    self.levelMeterRunning = true;
                 });
         };
 
+        /**
+         * Convert dBFS level to percentage (-60dBFS..0dBFS)
+         */
+        self.dbfsToPercent = function(dbfs) {
+            return Math.min(100, Math.max(0, (dbfs + 60) * 100 / 60));
+        };
+
         // set internal members according to received config
         self.setConfig = function(config) {
-            self.playbackDevices = config.devices.playback;
-            self.captureDevices = config.devices.capture;
-            self.volumePlayback = config.volumes.playback;
-            self.volumeCapture = config.volumes.capture;
+            self.applyChanges(config);
+            self.configVersion = config.version || 0;
+        };
+
+        // update internal members of changed config sections only
+        self.applyChanges = function(changes) {
+            if( changes.devices ) {
+                self.setDevices(changes.devices);
+            }
+            if( changes.volumes ) {
+                self.volumePlayback = changes.volumes.playback;
+                self.volumeCapture = changes.volumes.capture;
+            }
+            if( changes.route !== undefined ) {
+                self.route = changes.route;
+            }
+            if( changes.routes ) {
+                self.routes = changes.routes.map(function(route) {
+                    return { label: route, value: route };
+                });
+            }
+        };
+
+        // rebuild devices lists
+        self.setDevices = function(devices) {
+            self.playbackDevices = devices.playback;
+            self.captureDevices = devices.capture;
 
             // search for current device in playback devices list
             for (var i=0; i<self.playbackDevices.length; i++) {
@@ -84,29 +139,89 @@ function($rootScope, toast, audioService, cleepService) {
                 }
             }
 
-            const devices = [];
-            for (const device of config.devices.playback) {
+            const devicesOptions = [];
+            for (const device of devices.playback) {
                 const installed = !device.installed ? ' (driver not installed)' : '';
-                devices.push({
+                devicesOptions.push({
                     label: device.label + installed,
                     value: device,
                     disabled: !device.installed,
                 });
             }
-            self.devices = devices;
+            self.devices = devicesOptions;
+        };
+
+        /**
+         * Poll config changes since last known version
+         */
+        self.refreshConfig = function() {
+            audioService.getModuleConfigChanges(self.configVersion)
+                .then(function(resp) {
+                    self.applyChanges(resp.data.changes);
+                    self.configVersion = resp.data.version;
+                });
         };
+        var configPoller = $interval(self.refreshConfig, 10000);
+        // rootScope listeners outlive component, they are removed on destroy
+        var deregisters = [];
+        $scope.$on('$destroy', function() {
+            $interval.cancel(configPoller);
+            deregisters.forEach(function(deregister) {
+                deregister();
+            });
+        });
+
+        /**
+         * Handle test jobs events
+         */
+        deregisters.push($rootScope.$on('audio.job.update', function(event, uuid, params) {
+            if( params.status === 'failed' ) {
+                toast.error('Test failed: ' + params.error);
+            } else if( params.action === 'playing' && params.status === 'done' ) {
+                toast.success('You should have heard a sound');
+            } else if( params.action === 'recording' && params.status === 'running' && params.progress === 0 ) {
+                toast.loading('Recording 5 seconds...');
+            } else if( params.action === 'recording' && params.status === 'running' && params.progress === 50 ) {
+                toast.info('You will hear your record');
+            } else if( params.action === 'recording' && params.status === 'done' ) {
+                toast.success('Recording test done');
+            }
+        }));
+
+        /**
+         * Handle level meter events
+         */
+        deregisters.push($rootScope.$on('audio.level.update', function(event, uuid, params) {
+            self.levelMeterRunning = params.running;
+            if( !params.running ) {
+                // meter stopped automatically (max duration, capture needed elsewhere)
+                self.level = 0;
+                self.peak = 0;
+                return;
+            }
+            self.level = self.dbfsToPercent(Math.max.apply(null, params.rms));
+            self.peak = self.dbfsToPercent(Math.max.apply(null, params.peak));
+        }));
+
+        /**
+         * Handle volume changes (from this app, other apps or device buttons)
+         */
+        deregisters.push($rootScope.$on('audio.volume.changed', function(event, uuid, params) {
+            self.volumePlayback = params.playback;
+            self.volumeCapture = params.capture;
+        }));
 
         /**
          * Watch for config changes
          */
-        $rootScope.$watchCollection(function() {
+        deregisters.push($rootScope.$watchCollection(function() {
             return cleepService.modules['audio'];
         }, function(newConfig, oldConfig) {
             if( newConfig ) {
                 self.setConfig(newConfig.config);
             }
-        });
-    };
+        }));
+    }];
 
     return {
         templateUrl: 'audio.config.html',
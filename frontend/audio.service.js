@@ -16,6 +16,22 @@ function($q, $rootScope, rpcService) {
         return rpcService.sendCommand('select_device', 'audio', {'driver_name':label}, 30.0);
     };
 
+    self.getModuleConfigChanges = function(sinceVersion) {
+        return rpcService.sendCommand('get_module_config_changes', 'audio', {'since_version':sinceVersion});
+    };
+
+    self.setOutputRoute = function(route) {
+        return rpcService.sendCommand('set_output_route', 'audio', {'route':route});
+    };
+
+    self.startLevelMeter = function() {
+        return rpcService.sendCommand('start_level_meter', 'audio', {'update_rate':20});
+    };
+
+    self.stopLevelMeter = function() {
+        return rpcService.sendCommand('stop_level_meter', 'audio');
+    };
+
     self.testPlaying = function()
     {
         return rpcService.sendCommand('test_playing', 'audio');
@@ -23,7 +39,7 @@ function($q, $rootScope, rpcService) {
 
     self.testRecording = function()
     {
-        return rpcService.sendCommand('test_recording', 'audio', null, 10);
+        return rpcService.sendCommand('test_recording', 'audio');
     };
 
 }]);
@@ -0,0 +1,8 @@
+#!/bin/sh
+
+# python dependencies
+#  - numpy: software mixer, sample converter and level meter (prebuilt debian package)
+#  - jeepney: bluetooth driver D-Bus client (jeepney.io.threading needs jeepney>=0.7)
+apt-get update -qq
+apt-get install -q --yes python3-numpy
+python3 -m pip install --upgrade "jeepney>=0.7"
@@ -0,0 +1,1000 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+In-memory fake ALSA backend
+
+Provides virtual cards with mixer controls (numids, ranges, dB scales), PCM devices that
+consume frames at real-time clock rate and fault/latency injection. Fakes mimic Alsa,
+Console, EtcAsoundConf and ConfigTxt objects used by audio drivers, so drivers code can
+be load tested without sound hardware.
+
+Usage:
+    backend = FakeAlsaBackend(latency=0.005, speed=10.0)
+    backend.add_card(make_bcm2835_card(0))
+    backend.attach(driver)
+"""
+
+import functools
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import wave
+from collections import Counter
+from backend.controlmap import ControlMap
+
+NO_FAULT = object()
+
+
+class FakeAlsaError(Exception):
+    """
+    Error raised by fake alsa backend (busy device, missing card...)
+    """
+
+
+def faultable(method):
+    """
+    Decorator that routes method call through backend fault injector
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        override = self.backend.faults.enter(method.__name__)
+        if override is not NO_FAULT:
+            return override
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class FaultInjector:
+    """
+    Latency and fault injection for fake backend operations
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        """
+        Constructor
+
+        Args:
+            latency (float): latency added to each operation (seconds)
+            jitter (float): random latency added to each operation (seconds)
+            seed (int): random seed for reproducible jitter
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self.__random = random.Random(seed)
+        self.__faults = {}
+        self.__lock = threading.Lock()
+
+    def inject(self, operation, error=None, result=NO_FAULT, count=1, latency=None):
+        """
+        Inject fault on operation
+
+        Args:
+            operation (str): operation name (fake method name)
+            error (Exception): exception to raise
+            result (any): value returned instead of calling operation
+            count (int): number of faulty calls (None for permanent fault)
+            latency (float): extra latency for faulty calls (seconds)
+        """
+        with self.__lock:
+            self.__faults[operation] = {
+                "error": error,
+                "result": result,
+                "count": count,
+                "latency": latency or 0.0,
+            }
+
+    def clear(self, operation=None):
+        """
+        Clear injected faults
+
+        Args:
+            operation (str): operation to clear faults for (all if None)
+        """
+        with self.__lock:
+            if operation is None:
+                self.__faults.clear()
+            else:
+                self.__faults.pop(operation, None)
+
+    def enter(self, operation):
+        """
+        Called before each operation
+
+        Args:
+            operation (str): operation name
+
+        Returns:
+            any: NO_FAULT or value to return instead of calling operation
+
+        Raises:
+            Exception: injected error
+        """
+        with self.__lock:
+            self.calls[operation] += 1
+            delay = self.latency
+            if self.jitter:
+                delay += self.__random.uniform(0.0, self.jitter)
+            fault = self.__faults.get(operation)
+            if fault is not None:
+                delay += fault["latency"]
+                if fault["count"] is not None:
+                    fault["count"] -= 1
+                    if fault["count"] <= 0:
+                        del self.__faults[operation]
+
+        if delay > 0:
+            time.sleep(delay)
+        if fault is None:
+            return NO_FAULT
+        if fault["error"] is not None:
+            raise fault["error"]
+        return fault["result"]
+
+
+class FakeControl:
+    """
+    Virtual mixer control
+    """
+
+    TYPE_INTEGER = "INTEGER"
+    TYPE_BOOLEAN = "BOOLEAN"
+    TYPE_ENUMERATED = "ENUMERATED"
+
+    def __init__(
+        self,
+        numid,
+        name,
+        ctl_type=TYPE_INTEGER,
+        minimum=0,
+        maximum=100,
+        values=None,
+        channels=1,
+        items=None,
+        db_range=None,
+        iface="MIXER",
+    ):
+        """
+        Constructor
+
+        Args:
+            numid (int): control numid
+            name (str): control name (ie "PCM Playback Volume")
+            ctl_type (str): control type
+            minimum (int): min raw value
+            maximum (int): max raw value
+            values (list): initial raw values (one per channel)
+            channels (int): number of channels
+            items (list): enumerated items names
+            db_range (tuple): (min dB, max dB) for linear dB scale
+            iface (str): control interface
+        """
+        self.numid = numid
+        self.name = name
+        self.type = ctl_type
+        self.iface = iface
+        self.items = items or []
+        if ctl_type == self.TYPE_BOOLEAN:
+            minimum, maximum = 0, 1
+        elif ctl_type == self.TYPE_ENUMERATED:
+            minimum, maximum = 0, len(self.items) - 1
+        self.min = minimum
+        self.max = maximum
+        self.db_range = db_range
+        self.values = list(values) if values is not None else [maximum] * channels
+        self.writes = 0
+
+    def set_values(self, values):
+        """
+        Set control values (clamped to range)
+
+        Args:
+            values (list): raw values. Single value is applied to all channels
+
+        Returns:
+            bool: True if value changed
+        """
+        if len(values) == 1:
+            values = values * len(self.values)
+        clamped = [max(self.min, min(self.max, int(value))) for value in values]
+        changed = clamped != self.values
+        self.values = clamped[: len(self.values)]
+        self.writes += 1
+        return changed
+
+    def get_percent(self):
+        """
+        Return first channel value as percentage
+        """
+        if self.max == self.min:
+            return 0
+        return int(round((self.values[0] - self.min) * 100.0 / (self.max - self.min)))
+
+    def set_percent(self, percent):
+        """
+        Set all channels value from percentage
+
+        Returns:
+            bool: True if value changed
+        """
+        raw = self.min + round((self.max - self.min) * percent / 100.0)
+        return self.set_values([raw])
+
+    def get_simple_name(self):
+        """
+        Return simple control name (as listed by amixer scontrols)
+        """
+        return re.sub(r" (Playback|Capture)? ?(Volume|Switch|Route)$", "", self.name)
+
+    def format_contents(self):
+        """
+        Return control description as "amixer contents" does
+
+        Returns:
+            list: output lines
+        """
+        lines = [f"numid={self.numid},iface={self.iface},name='{self.name}'"]
+        if self.type == self.TYPE_BOOLEAN:
+            lines.append(f"  ; type=BOOLEAN,access=rw------,values={len(self.values)}")
+            values = ",".join("on" if value else "off" for value in self.values)
+        elif self.type == self.TYPE_ENUMERATED:
+            lines.append(
+                f"  ; type=ENUMERATED,access=rw------,values={len(self.values)},items={len(self.items)}"
+            )
+            lines.extend(
+                f"  ; Item #{index} '{item}'" for index, item in enumerate(self.items)
+            )
+            values = ",".join(str(value) for value in self.values)
+        else:
+            lines.append(
+                f"  ; type=INTEGER,access=rw---R--,values={len(self.values)},"
+                f"min={self.min},max={self.max},step=0"
+            )
+            values = ",".join(str(value) for value in self.values)
+        lines.append(f"  : values={values}")
+        if self.db_range:
+            step = (self.db_range[1] - self.db_range[0]) / max(1, self.max - self.min)
+            lines.append(
+                f"  | dBscale-min={self.db_range[0]:.2f}dB,step={step:.2f}dB,mute=1"
+            )
+
+        return lines
+
+
+class FakePcm:
+    """
+    Virtual PCM device that consumes (or produces) frames at real-time clock rate
+    """
+
+    def __init__(
+        self,
+        backend,
+        stream,
+        rate=48000,
+        channels=2,
+        sample_width=2,
+        buffer_frames=4096,
+    ):
+        """
+        Constructor
+
+        Args:
+            backend (FakeAlsaBackend): backend
+            stream (str): playback or capture
+            rate (int): sample rate
+            channels (int): number of channels
+            sample_width (int): sample width in bytes
+            buffer_frames (int): hardware buffer size (frames)
+        """
+        self.backend = backend
+        self.stream = stream
+        self.rate = rate
+        self.channels = channels
+        self.frame_size = channels * sample_width
+        self.buffer_frames = buffer_frames
+        self.frames = 0
+        self.opened = 0
+        self.__owner = None
+        self.__start = None
+        self.__lock = threading.Lock()
+
+    def is_busy(self):
+        """
+        Return True if device is opened
+        """
+        return self.__owner is not None
+
+    def open(self, owner=None):
+        """
+        Open device (exclusive access as hw device)
+
+        Raises:
+            FakeAlsaError: if device is busy
+        """
+        with self.__lock:
+            if self.__owner is not None:
+                raise FakeAlsaError("Device or resource busy")
+            self.__owner = owner or threading.get_ident()
+            self.__start = time.monotonic()
+            self.frames = 0
+            self.opened += 1
+
+    def close(self):
+        """
+        Close device
+        """
+        with self.__lock:
+            self.__owner = None
+            self.__start = None
+
+    def _wait_clock(self, frames):
+        """
+        Block until device clock reached specified frame position
+        """
+        due = self.__start + frames / float(self.rate) / self.backend.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def write(self, data):
+        """
+        Write frames. Block when hardware buffer is full as a real device does
+
+        Args:
+            data (bytes|int): raw data or number of frames
+
+        Returns:
+            int: number of written frames
+        """
+        if self.__start is None:
+            raise FakeAlsaError("Device is not opened")
+        frames = data if isinstance(data, int) else len(data) // self.frame_size
+        self.frames += frames
+        self._wait_clock(self.frames - self.buffer_frames)
+        return frames
+
+    def read(self, frames):
+        """
+        Read frames of silence. Block until frames are available
+
+        Args:
+            frames (int): number of frames to read
+
+        Returns:
+            bytes: raw data
+        """
+        if self.__start is None:
+            raise FakeAlsaError("Device is not opened")
+        self.frames += frames
+        self._wait_clock(self.frames)
+        return bytes(frames * self.frame_size)
+
+    def drain(self):
+        """
+        Block until all written frames are played
+        """
+        if self.__start is not None:
+            self._wait_clock(self.frames)
+
+
+class FakeCard:
+    """
+    Virtual sound card
+    """
+
+    def __init__(
+        self,
+        card_id,
+        card_name,
+        card_desc,
+        device_name,
+        device_desc,
+        controls,
+        playback=True,
+        capture=False,
+        rate=48000,
+    ):
+        """
+        Constructor
+
+        Args:
+            card_id (int): card index
+            card_name (str): card name (ie "Headphones")
+            card_desc (str): card description
+            device_name (str): device name
+            device_desc (str): device description
+            controls (list): list of FakeControl
+            playback (bool): card has playback pcm
+            capture (bool): card has capture pcm
+            rate (int): native sample rate
+        """
+        self.card_id = card_id
+        self.card_name = card_name
+        self.card_desc = card_desc
+        self.device_name = device_name
+        self.device_desc = device_desc
+        self.controls = {control.numid: control for control in controls}
+        self.pcms = {}
+        self.rate = rate
+        self.__playback = playback
+        self.__capture = capture
+
+    def attach_backend(self, backend):
+        """
+        Create card pcms for backend
+        """
+        self.pcms = {}
+        if self.__playback:
+            self.pcms["playback"] = FakePcm(backend, "playback", rate=self.rate)
+        if self.__capture:
+            self.pcms["capture"] = FakePcm(
+                backend, "capture", rate=self.rate, channels=1
+            )
+
+    def get_control(self, name):
+        """
+        Return first control which name contains specified name
+        """
+        for control in self.controls.values():
+            if control.name.find(name) >= 0:
+                return control
+        return None
+
+    def get_simple_control(self, simple_name, stream="Playback"):
+        """
+        Return volume control of simple control
+        """
+        for control in self.controls.values():
+            if control.get_simple_name() == simple_name and control.name.endswith(
+                "Volume"
+            ):
+                if stream in control.name or (
+                    "Playback" not in control.name and "Capture" not in control.name
+                ):
+                    return control
+        return None
+
+
+def make_bcm2835_card(card_id=0):
+    """
+    Return raspberry pi onboard soundcard (headphones jack)
+    """
+    return FakeCard(
+        card_id,
+        "Headphones",
+        "bcm2835 Headphones",
+        "Headphones",
+        "bcm2835 Headphones",
+        [
+            FakeControl(
+                1,
+                "PCM Playback Volume",
+                minimum=-10239,
+                maximum=400,
+                values=[-2000],
+                db_range=(-102.39, 4.0),
+            ),
+            FakeControl(2, "PCM Playback Switch", FakeControl.TYPE_BOOLEAN),
+            FakeControl(3, "PCM Playback Route", minimum=0, maximum=2, values=[1]),
+        ],
+        rate=44100,
+    )
+
+
+def make_usb_speaker_card(card_id=1):
+    """
+    Return USB stereo speaker (playback only)
+    """
+    return FakeCard(
+        card_id,
+        "UACDemoV10",
+        "UACDemoV1.0",
+        "USB Audio",
+        "USB Audio",
+        [
+            FakeControl(1, "PCM Playback Switch", FakeControl.TYPE_BOOLEAN),
+            FakeControl(
+                2,
+                "PCM Playback Volume",
+                minimum=0,
+                maximum=30,
+                values=[20, 20],
+                db_range=(-45.0, 0.0),
+            ),
+        ],
+    )
+
+
+def make_usb_headset_card(card_id=1):
+    """
+    Return USB headset (playback and capture)
+    """
+    return FakeCard(
+        card_id,
+        "Headset",
+        "USB Headset",
+        "USB Audio",
+        "USB Audio",
+        [
+            FakeControl(1, "Speaker Playback Switch", FakeControl.TYPE_BOOLEAN),
+            FakeControl(
+                2,
+                "Speaker Playback Volume",
+                minimum=0,
+                maximum=151,
+                values=[100, 100],
+                db_range=(-28.37, 0.0),
+            ),
+            FakeControl(3, "Mic Capture Switch", FakeControl.TYPE_BOOLEAN),
+            FakeControl(
+                4,
+                "Mic Capture Volume",
+                minimum=0,
+                maximum=127,
+                values=[64],
+                db_range=(0.0, 23.81),
+            ),
+        ],
+        capture=True,
+    )
+
+
+class FakeAlsa:
+    """
+    Fake of cleep Alsa command lib
+    """
+
+    CSET = "cset"
+    CGET = "cget"
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @faultable
+    def get_simple_controls(self):
+        card = self.backend.get_default_card()
+        if not card:
+            return []
+        names = []
+        for control in card.controls.values():
+            if control.get_simple_name() not in names:
+                names.append(control.get_simple_name())
+        return names
+
+    @faultable
+    def get_controls(self):
+        card = self.backend.get_default_card()
+        if not card:
+            return []
+        return [
+            {"numid": control.numid, "iface": control.iface, "name": control.name}
+            for control in card.controls.values()
+        ]
+
+    @faultable
+    def get_volume(self, control, pattern):
+        with self.backend.lock:
+            card = self.backend.get_default_card()
+            ctl = card.get_simple_control(control) if card else None
+            return ctl.get_percent() if ctl else None
+
+    @faultable
+    def set_volume(self, control, pattern, volume):
+        with self.backend.lock:
+            card = self.backend.get_default_card()
+            ctl = card.get_simple_control(control) if card else None
+            if not ctl:
+                return None
+            if volume is not None and ctl.set_percent(volume):
+                self.backend.notify("control.changed", (card, ctl))
+            return ctl.get_percent()
+
+    @faultable
+    def amixer_control(self, command, numid, value=None):
+        with self.backend.lock:
+            card = self.backend.get_default_card()
+            ctl = card.controls.get(numid) if card else None
+            if not ctl:
+                return False
+            if command == self.CGET:
+                return list(ctl.values)
+            if ctl.set_values([value]):
+                self.backend.notify("control.changed", (card, ctl))
+            return True
+
+    @faultable
+    def save(self):
+        return True
+
+    @faultable
+    def play_sound(self, path, timeout=5.0):
+        card = self.backend.get_default_card()
+        pcm = card.pcms.get("playback") if card else None
+        if not pcm:
+            return False
+        duration = self.backend.get_sound_duration(path)
+        try:
+            pcm.open()
+        except FakeAlsaError:
+            self.backend.busy_errors += 1
+            return False
+
+        self.backend.notify("pcm.open", (card, pcm))
+        try:
+            period = 1024
+            remaining = int(duration * pcm.rate)
+            while remaining > 0:
+                remaining -= pcm.write(min(period, remaining))
+            pcm.drain()
+        finally:
+            pcm.close()
+            self.backend.notify("pcm.close", (card, pcm))
+        return True
+
+    @faultable
+    def record_sound(self, channels=1, rate=44100, format="S16_LE", timeout=5.0):
+        card = self.backend.get_default_card()
+        pcm = card.pcms.get("capture") if card else None
+        if not pcm:
+            return None
+        pcm.open()
+        try:
+            data = pcm.read(int(timeout * pcm.rate))
+        finally:
+            pcm.close()
+
+        handle, path = tempfile.mkstemp(suffix=".wav")
+        os.close(handle)
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(pcm.channels)
+            wav.setsampwidth(2)
+            wav.setframerate(pcm.rate)
+            wav.writeframes(data)
+        return path
+
+
+class FakeConsole:
+    """
+    Fake of cleep Console handling amixer and packages commands
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _response(self, returncode, stdout=None, stderr=None):
+        return {
+            "returncode": returncode,
+            "error": returncode != 0,
+            "killed": False,
+            "stdout": stdout or [],
+            "stderr": stderr or [],
+        }
+
+    @faultable
+    def command(self, command, timeout=2.0):
+        if " ; " in command:
+            # chained commands: outputs are concatenated, last return code is kept
+            responses = [self._command(part) for part in command.split(" ; ")]
+            return self._response(
+                responses[-1]["returncode"],
+                [line for resp in responses for line in resp["stdout"]],
+                [line for resp in responses for line in resp["stderr"]],
+            )
+        return self._command(command)
+
+    def _command(self, command):
+        amixer = re.match(r"amixer -c (\d+) (\w+)\s*(.*)", command)
+        if amixer:
+            return self._amixer(int(amixer.group(1)), amixer.group(2), amixer.group(3))
+
+        package = re.search(r"(dpkg -s|install|purge)\s.*?(\S+)$", command)
+        if package:
+            action, name = package.groups()
+            if action == "dpkg -s":
+                return self._response(0 if name in self.backend.packages else 1)
+            if action == "install":
+                self.backend.packages.add(name)
+            else:
+                self.backend.packages.discard(name)
+            return self._response(0)
+
+        return self._response(127, stderr=[f"{command}: command not found"])
+
+    def _amixer(self, card_id, action, args):
+        with self.backend.lock:
+            card = self.backend.cards.get(card_id)
+            if not card:
+                return self._response(1, stderr=[f"Invalid card number '{card_id}'"])
+            if action == "contents":
+                lines = []
+                for numid in sorted(card.controls):
+                    lines.extend(card.controls[numid].format_contents())
+                return self._response(0, lines)
+            match = re.match(r"numid=(\d+)\s*$", args)
+            if action == "cget" and match:
+                ctl = card.controls.get(int(match.group(1)))
+                if not ctl:
+                    return self._response(1, stderr=["Cannot find the given element"])
+                return self._response(0, ctl.format_contents())
+            match = re.match(r"numid=(\d+)\s+(--\s+)?(\S+)", args)
+            if action == "cset" and match:
+                if match.group(3).startswith("-") and not match.group(2):
+                    # amixer parses negative value as an option without "--"
+                    return self._response(
+                        1, stderr=[f"amixer: invalid option -- '{match.group(3)[1]}'"]
+                    )
+                ctl = card.controls.get(int(match.group(1)))
+                if not ctl:
+                    return self._response(1, stderr=["Cannot find the given element"])
+                values = [
+                    1 if value == "on" else 0 if value == "off" else int(value)
+                    for value in match.group(3).split(",")
+                ]
+                if ctl.set_values(values):
+                    self.backend.notify("control.changed", (card, ctl))
+                return self._response(0, ctl.format_contents())
+
+        return self._response(1, stderr=[f"amixer: unsupported command {action}"])
+
+
+class FakeConfigFile:
+    """
+    Fake of EtcAsoundConf and ConfigTxt
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @faultable
+    def exists(self):
+        return self.backend.default_card_id is not None
+
+    @faultable
+    def delete(self):
+        self.backend.default_card_id = None
+        return True
+
+    @faultable
+    def save_default_file(self, card_id, device_id):
+        self.backend.default_card_id = card_id
+        return True
+
+    @faultable
+    def is_audio_enabled(self):
+        return self.backend.onboard_audio
+
+    @faultable
+    def enable_audio(self):
+        self.backend.onboard_audio = True
+        return True
+
+    @faultable
+    def disable_audio(self):
+        self.backend.onboard_audio = False
+        return True
+
+
+class FakeAlsaBackend:
+    """
+    In-memory fake ALSA backend
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, speed=1.0, seed=0):
+        """
+        Constructor
+
+        Args:
+            latency (float): latency added to each operation (seconds)
+            jitter (float): random latency added to each operation (seconds)
+            speed (float): pcm clock speed factor (2.0 plays twice faster than real-time)
+            seed (int): random seed
+        """
+        self.faults = FaultInjector(latency, jitter, seed)
+        self.speed = speed
+        self.cards = {}
+        self.default_card_id = None
+        self.onboard_audio = True
+        self.packages = {"pulseaudio"}
+        self.busy_errors = 0
+        self.hotplugs = 0
+        self.lock = threading.RLock()
+        self.backend = self
+        self.__listeners = []
+
+    def add_listener(self, callback):
+        """
+        Add backend events listener
+
+        Args:
+            callback (function): function(event_name, payload). Events are card.added,
+                                 card.removed, control.changed, pcm.open and pcm.close
+        """
+        self.__listeners.append(callback)
+
+    def notify(self, event_name, payload):
+        """
+        Notify listeners
+        """
+        for listener in list(self.__listeners):
+            listener(event_name, payload)
+
+    def add_card(self, card):
+        """
+        Plug card
+
+        Args:
+            card (FakeCard): card to add
+        """
+        with self.lock:
+            card.attach_backend(self)
+            self.cards[card.card_id] = card
+            self.hotplugs += 1
+        self.notify("card.added", card)
+
+    def remove_card(self, card_id):
+        """
+        Unplug card
+
+        Args:
+            card_id (int): card index
+        """
+        with self.lock:
+            card = self.cards.pop(card_id, None)
+            if card is None:
+                return
+            self.hotplugs += 1
+            if self.default_card_id == card_id:
+                self.default_card_id = None
+        self.notify("card.removed", card)
+
+    def get_default_card(self):
+        """
+        Return card configured in asound.conf (or first card)
+        """
+        with self.lock:
+            if self.default_card_id is not None:
+                return self.cards.get(self.default_card_id)
+            return self.cards[min(self.cards)] if self.cards else None
+
+    def get_card_by_name(self, card_name):
+        """
+        Return card by name
+        """
+        with self.lock:
+            for card in self.cards.values():
+                if card.card_name == card_name:
+                    return card
+        return None
+
+    @faultable
+    def get_devices_names(self):
+        """
+        Return devices names as alsa lib does
+        """
+        with self.lock:
+            return [
+                {
+                    "card_name": card.card_name,
+                    "card_desc": card.card_desc,
+                    "device_name": card.device_name,
+                    "device_desc": card.device_desc,
+                }
+                for _, card in sorted(self.cards.items())
+            ]
+
+    def proc_asound_cards(self):
+        """
+        Return /proc/asound/cards content
+        """
+        lines = []
+        with self.lock:
+            for card_id, card in sorted(self.cards.items()):
+                lines.append(
+                    f"{card_id:2d} [{card.card_name:15s}]: {card.device_name} - {card.card_desc}"
+                )
+                lines.append(f"                      {card.card_desc}")
+        return "\n".join(lines) + "\n"
+
+    def proc_asound_pcm(self):
+        """
+        Return /proc/asound/pcm content lines
+        """
+        lines = []
+        with self.lock:
+            for card_id, card in sorted(self.cards.items()):
+                streams = "".join(
+                    f" : {stream} 1"
+                    for stream in ("playback", "capture")
+                    if stream in card.pcms
+                )
+                lines.append(
+                    f"{card_id:02d}-00: {card.device_name} : {card.card_desc}{streams}\n"
+                )
+        return lines
+
+    def get_sound_duration(self, path):
+        """
+        Return sound file duration (1 second for unreadable files)
+        """
+        try:
+            with wave.open(path, "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except Exception:
+            return 1.0
+
+    def alsa(self):
+        return FakeAlsa(self)
+
+    def console(self):
+        return FakeConsole(self)
+
+    def config_file(self):
+        return FakeConfigFile(self)
+
+    def attach(self, driver):
+        """
+        Plug fake backend into audio driver. AudioDriver base methods that enumerate
+        cards are replaced by fake implementations, driver own code is kept.
+
+        Args:
+            driver (AudioDriver): driver instance
+        """
+        driver.alsa = self.alsa()
+        driver.console = self.console()
+        driver.asoundconf = self.config_file()
+        driver.configtxt = self.config_file()
+        driver.controls = ControlMap(driver.console)
+
+        def get_card_name():
+            return driver._get_card_name(self.get_devices_names())
+
+        def get_card():
+            card_name = get_card_name()
+            return self.get_card_by_name(card_name) if card_name else None
+
+        def get_cardid_deviceid():
+            card = get_card()
+            return (card.card_id, 0) if card else (None, None)
+
+        def is_card_enabled():
+            card = get_card()
+            return card is not None and card.card_id == self.default_card_id
+
+        def get_control_numid(control_name):
+            card = get_card()
+            control = card.get_control(control_name) if card else None
+            return control.numid if control else None
+
+        def get_device_infos():
+            card = get_card()
+            playback, capture = driver.get_card_capabilities()
+            return {
+                "cardname": card.card_name if card else None,
+                "cardid": card.card_id if card else None,
+                "deviceid": 0 if card else None,
+                "playback": playback,
+                "capture": capture,
+            }
+
+        def on_backend_event(event_name, payload):
+            # hotplug is notified as audio app card watcher does
+            if event_name in ("card.added", "card.removed"):
+                driver.on_cards_changed()
+
+        if hasattr(driver, "on_cards_changed"):
+            self.add_listener(on_backend_event)
+
+        driver.get_card_name = get_card_name
+        driver.get_cardid_deviceid = get_cardid_deviceid
+        driver.is_card_enabled = is_card_enabled
+        driver.get_control_numid = get_control_numid
+        driver.get_device_infos = get_device_infos
+        if hasattr(driver, "_read_pcm_listing"):
+            driver._read_pcm_listing = self.proc_asound_pcm
+
+        return driver
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local stand-in PulseAudio server
+
+Serves the subset of native protocol used by PulseClient on a unix socket: authentication,
+server, sinks and sources infos, default sink, volumes and playback streams. Streams
+consume written data immediately and request more, audio data is kept for checks.
+
+Usage:
+    server = FakePulseServer(socket_path)
+    server.add_sink("alsa_output.usb-Generic_USB_Audio-00.analog-stereo", bus="usb")
+    ...
+    server.stop()
+"""
+
+import select
+import socket
+import threading
+from collections import Counter
+from backend.pulseprotocol import (
+    CONTROL_CHANNEL,
+    DESCRIPTOR,
+    INVALID_INDEX,
+    VOLUME_NORM,
+    Command,
+    TagStruct,
+    pack_packet,
+)
+
+# PA_ERR_NOENTITY
+ERROR_NO_ENTITY = 5
+# PA_ERR_PROTOCOL
+ERROR_PROTOCOL = 7
+
+
+class FakePulseServer:
+    """
+    Stand-in PulseAudio server
+    """
+
+    VERSION = 32
+    # bytes requested to client each time stream buffer is empty
+    STREAM_REQUEST = 4096
+
+    def __init__(self, path, version=VERSION):
+        """
+        Constructor
+
+        Args:
+            path (str): unix socket path
+            version (int): protocol version announced to clients
+        """
+        self.path = path
+        self.version = version
+        self.sinks = []
+        self.sources = []
+        self.default_sink = None
+        self.default_source = None
+        # received audio data by stream channel
+        self.streams = {}
+        # stream sink, sample spec and name by stream channel
+        self.stream_infos = {}
+        self.commands = Counter()
+        # replies sent with no other command pending (client waited for them)
+        self.round_trips = 0
+        self.connections = 0
+        self.__clients = []
+        self.__next_channel = 0
+        self.__lock = threading.Lock()
+        self.__server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__server.bind(path)
+        self.__server.listen(4)
+        self.__thread = threading.Thread(target=self._accept, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop server and close clients connections
+        """
+        self.__server.shutdown(socket.SHUT_RDWR)
+        self.__server.close()
+        self.__thread.join()
+        self.disconnect_clients()
+
+    def disconnect_clients(self):
+        """
+        Close clients connections (server restart)
+        """
+        with self.__lock:
+            clients = list(self.__clients)
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _add_device(self, devices, name, description, bus, channels, monitor):
+        device = {
+            "index": len(self.sinks) + len(self.sources),
+            "name": name,
+            "description": description or name,
+            "volumes": [VOLUME_NORM] * channels,
+            "mute": False,
+            "monitor": monitor,
+            "properties": {"device.bus": bus} if bus else {},
+        }
+        devices.append(device)
+        return device
+
+    def add_sink(self, name, description=None, bus=None, channels=2):
+        """
+        Add sink (its monitor source is added too). First sink is the default one
+
+        Returns:
+            dict: sink
+        """
+        sink = self._add_device(self.sinks, name, description, bus, channels, 0)
+        monitor = self._add_device(
+            self.sources, name + ".monitor", None, bus, channels, sink["index"]
+        )
+        sink["monitor"] = monitor["index"]
+        self.default_sink = self.default_sink or name
+        return sink
+
+    def add_source(self, name, description=None, bus=None, channels=1):
+        """
+        Add capture source
+
+        Returns:
+            dict: source
+        """
+        source = self._add_device(
+            self.sources, name, description, bus, channels, INVALID_INDEX
+        )
+        self.default_source = self.default_source or name
+        return source
+
+    def get_sink(self, name):
+        return next((sink for sink in self.sinks if sink["name"] == name), None)
+
+    def get_source(self, name):
+        return next((source for source in self.sources if source["name"] == name), None)
+
+    def _get_device_name(self, packet):
+        """
+        Read device designated by index or by name
+        """
+        index = packet.get_u32()
+        name = packet.get_string()
+        if name is None:
+            device = next(
+                (
+                    device
+                    for device in self.sinks + self.sources
+                    if device["index"] == index
+                ),
+                None,
+            )
+            name = device["name"] if device else None
+        return name
+
+    def kill_stream(self, channel):
+        """
+        Kill playback stream (sink removed)
+        """
+        self._broadcast(
+            TagStruct()
+            .put_u32(Command.PLAYBACK_STREAM_KILLED)
+            .put_u32(INVALID_INDEX)
+            .put_u32(channel)
+        )
+
+    def _broadcast(self, packet):
+        with self.__lock:
+            clients = list(self.__clients)
+        for client in clients:
+            try:
+                client.sendall(pack_packet(bytes(packet.data)))
+            except OSError:
+                pass
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.__server.accept()
+            except OSError:
+                return
+            with self.__lock:
+                self.__clients.append(client)
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _recv(self, client, size):
+        data = b""
+        while len(data) < size:
+            try:
+                chunk = client.recv(size - len(data))
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _serve(self, client):
+        authenticated = False
+        while True:
+            header = self._recv(client, DESCRIPTOR.size)
+            if header is None:
+                break
+            length, channel, _, _, _ = DESCRIPTOR.unpack(header)
+            payload = self._recv(client, length)
+            if payload is None:
+                break
+
+            if channel != CONTROL_CHANNEL:
+                self.streams[channel] += payload
+                self._send(client, self._request(channel, len(payload)))
+                continue
+
+            packet = TagStruct(payload)
+            command = packet.get_u32()
+            tag = packet.get_u32()
+            self.commands[command] += 1
+            if not authenticated and command != Command.AUTH:
+                self._send(client, self._error(tag, ERROR_PROTOCOL))
+                break
+            authenticated = True
+            reply = self._handle(command, tag, packet)
+            # counted before reply is sent: client reads counter once reply is received
+            if not select.select([client], [], [], 0)[0]:
+                self.round_trips += 1
+            self._send(client, reply)
+
+        with self.__lock:
+            self.__clients.remove(client)
+        client.close()
+
+    def _send(self, client, packet):
+        try:
+            client.sendall(pack_packet(bytes(packet.data)))
+        except OSError:
+            pass
+
+    def _reply(self, tag):
+        return TagStruct().put_u32(Command.REPLY).put_u32(tag)
+
+    def _error(self, tag, error):
+        return TagStruct().put_u32(Command.ERROR).put_u32(tag).put_u32(error)
+
+    def _request(self, channel, size):
+        return (
+            TagStruct()
+            .put_u32(Command.REQUEST)
+            .put_u32(INVALID_INDEX)
+            .put_u32(channel)
+            .put_u32(size)
+        )
+
+    def _put_device(self, reply, device):
+        reply.put_u32(device["index"]).put_string(device["name"])
+        reply.put_string(device["description"])
+        reply.put_sample_spec(3, len(device["volumes"]), 48000)
+        reply.put_channel_map([1, 2][: len(device["volumes"])])
+        reply.put_u32(0).put_cvolume(device["volumes"]).put_bool(device["mute"])
+        reply.put_u32(device["monitor"]).put_string(None)
+        reply.put_usec(0).put_string("module-alsa-card.c").put_u32(0)
+        reply.put_proplist(device["properties"])
+        reply.put_usec(0).put_volume(VOLUME_NORM)
+        reply.put_u32(0).put_u32(VOLUME_NORM + 1).put_u32(0)
+        reply.put_u32(1).put_string("analog-output").put_string("Analog Output")
+        reply.put_u32(9900).put_u32(0)
+        reply.put_string("analog-output")
+        reply.put_u8(1).put_format_info(1, {})
+
+    def _handle(self, command, tag, packet):
+        reply = self._reply(tag)
+        if command == Command.AUTH:
+            packet.get_u32()
+            if len(packet.get_arbitrary()) != 256:
+                return self._error(tag, ERROR_PROTOCOL)
+            return reply.put_u32(self.version)
+        if command == Command.SET_CLIENT_NAME:
+            packet.get_proplist()
+            return reply.put_u32(0)
+        if command == Command.GET_SERVER_INFO:
+            reply.put_string("pulseaudio").put_string("16.1")
+            reply.put_string("pi").put_string("raspberrypi")
+            reply.put_sample_spec(3, 2, 48000)
+            reply.put_string(self.default_sink).put_string(self.default_source)
+            return reply.put_u32(0).put_channel_map([1, 2])
+        if command in (Command.GET_SINK_INFO_LIST, Command.GET_SOURCE_INFO_LIST):
+            devices = (
+                self.sinks if command == Command.GET_SINK_INFO_LIST else self.sources
+            )
+            for device in devices:
+                self._put_device(reply, device)
+            return reply
+        if command in (Command.GET_SINK_INFO, Command.GET_SOURCE_INFO):
+            name = self._get_device_name(packet)
+            device = (
+                self.get_sink(name)
+                if command == Command.GET_SINK_INFO
+                else self.get_source(name)
+            )
+            if not device:
+                return self._error(tag, ERROR_NO_ENTITY)
+            self._put_device(reply, device)
+            return reply
+        if command == Command.SET_DEFAULT_SINK:
+            name = packet.get_string()
+            if not self.get_sink(name):
+                return self._error(tag, ERROR_NO_ENTITY)
+            self.default_sink = name
+            return reply
+        if command in (Command.SET_SINK_VOLUME, Command.SET_SOURCE_VOLUME):
+            name = self._get_device_name(packet)
+            volumes = packet.get_cvolume()
+            device = (
+                self.get_sink(name)
+                if command == Command.SET_SINK_VOLUME
+                else self.get_source(name)
+            )
+            if not device:
+                return self._error(tag, ERROR_NO_ENTITY)
+            device["volumes"] = volumes
+            return reply
+        if command == Command.CREATE_PLAYBACK_STREAM:
+            return self._create_stream(tag, packet)
+        if command == Command.DRAIN_PLAYBACK_STREAM:
+            return reply
+        if command == Command.DELETE_PLAYBACK_STREAM:
+            channel = packet.get_u32()
+            if channel not in self.streams:
+                return self._error(tag, ERROR_NO_ENTITY)
+            return reply
+        return self._error(tag, ERROR_PROTOCOL)
+
+    def _create_stream(self, tag, packet):
+        sample_format, channels, rate = packet.get_sample_spec()
+        packet.get_channel_map()
+        packet.get_u32()
+        sink = packet.get_string() or self.default_sink
+        packet.get_u32()
+        packet.get_bool()
+        for _ in range(4):
+            packet.get_u32()
+        packet.get_cvolume()
+        for _ in range(9):
+            packet.get_bool()
+        properties = packet.get_proplist()
+        for _ in range(7):
+            packet.get_bool()
+        packet.get_u8()
+        if not packet.eof() or not self.get_sink(sink):
+            return self._error(tag, ERROR_NO_ENTITY)
+
+        with self.__lock:
+            channel = self.__next_channel
+            self.__next_channel += 1
+        self.streams[channel] = bytearray()
+        self.stream_infos[channel] = {
+            "sink": sink,
+            "spec": (sample_format, channels, rate),
+            "name": properties.get("media.name"),
+        }
+        reply = self._reply(tag).put_u32(channel).put_u32(channel)
+        reply.put_u32(self.STREAM_REQUEST)
+        for _ in range(4):
+            reply.put_u32(self.STREAM_REQUEST)
+        reply.put_sample_spec(sample_format, channels, rate)
+        reply.put_channel_map([1, 2][:channels])
+        reply.put_u32(self.get_sink(sink)["index"]).put_string(sink)
+        reply.put_bool(False).put_usec(0)
+        return reply.put_format_info(1, {})
@@ -0,0 +1,127 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.amixersession import AmixerSession
+from cleep.libs.tests.common import get_log_level
+import os
+import shutil
+import tempfile
+
+LOG_LEVEL = get_log_level()
+
+# fake "amixer -s": numid 4 is a volume control, numid 8 prints error only and
+# numid 9 crashes amixer
+FAKE_AMIXER = """
+import sys
+
+for line in sys.stdin:
+    _, numid, value = line.split()
+    numid = int(numid.split("=")[1])
+    if numid == 9:
+        sys.exit(1)
+    if numid == 8:
+        sys.stderr.write("amixer: Invalid value\\n")
+        continue
+    print("numid=4,iface=MIXER,name='Mic Capture Volume'")
+    print("  ; type=INTEGER,access=rw---R--,values=2,min=0,max=127,step=0")
+    print("  : values=" + value)
+    print("  | dBminmax-min=0.00dB,max=23.81dB")
+    sys.stdout.flush()
+"""
+
+
+class TestAmixerSession(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.tmp_dir = tempfile.mkdtemp()
+        script = os.path.join(self.tmp_dir, "amixer.py")
+        with open(script, "w", encoding="utf-8") as script_file:
+            script_file.write(FAKE_AMIXER)
+        self.session = AmixerSession(1, timeout=0.5, command=[sys.executable, script])
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _get_pid(self):
+        return self.session._AmixerSession__process.pid
+
+    def test_default_command(self):
+        session = AmixerSession(2)
+
+        self.assertEqual(session.command, ["stdbuf", "-oL", "amixer", "-s", "-c", "2"])
+
+    def test_cset(self):
+        lines = self.session.cset(4, "10,20", 4)
+
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0], "numid=4,iface=MIXER,name='Mic Capture Volume'")
+        self.assertEqual(lines[2], "  : values=10,20")
+        self.assertTrue(self.session.is_running())
+
+    def test_cset_single_process(self):
+        self.session.cset(4, "10,20", 4)
+        pid = self._get_pid()
+
+        lines = self.session.cset(4, "30,40", 4)
+
+        self.assertEqual(lines[2], "  : values=30,40")
+        self.assertEqual(self._get_pid(), pid)
+
+    def test_execute(self):
+        outputs = self.session.execute([(4, "10,20", 4), (4, "30,40", 4)])
+
+        self.assertEqual(len(outputs), 2)
+        self.assertEqual(outputs[0][2], "  : values=10,20")
+        self.assertEqual(outputs[1][2], "  : values=30,40")
+
+    def test_execute_failed_command(self):
+        self.assertIsNone(self.session.execute([(4, "10,20", 4), (8, "0", 4)]))
+
+        self.assertEqual(self.session.cset(4, "1,1", 4)[2], "  : values=1,1")
+
+    def test_cset_restart_after_crash(self):
+        self.session.cset(4, "10,20", 4)
+        pid = self._get_pid()
+
+        self.assertIsNone(self.session.cset(9, "0", 4))
+        lines = self.session.cset(4, "30,40", 4)
+
+        self.assertEqual(lines[2], "  : values=30,40")
+        self.assertNotEqual(self._get_pid(), pid)
+
+    def test_cset_no_output(self):
+        self.assertIsNone(self.session.cset(8, "0", 4))
+
+        self.assertEqual(self.session.cset(4, "1,1", 4)[2], "  : values=1,1")
+
+    def test_cset_unexpected_line_count(self):
+        # too many lines expected: timeout and restart
+        self.assertIsNone(self.session.cset(4, "1,1", 5))
+
+        # too few lines expected: remaining lines don't corrupt next command
+        self.assertEqual(len(self.session.cset(4, "1,1", 3)), 3)
+        self.assertEqual(self.session.cset(4, "2,2", 3)[2], "  : values=2,2")
+
+    def test_cset_command_not_found(self):
+        session = AmixerSession(1, command=["/dummy/amixer"])
+
+        self.assertIsNone(session.cset(4, "1,1", 4))
+        self.assertFalse(session.is_running())
+
+    def test_close(self):
+        self.session.cset(4, "10,20", 4)
+
+        self.session.close()
+
+        self.assertFalse(self.session.is_running())
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" test_amixersession.py; coverage report -m -i
+    unittest.main()
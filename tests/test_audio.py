@@ -16,7 +16,8 @@ from cleep.exception import (
 from cleep.libs.tests.common import get_log_level
 import os
 import time
-from unittest.mock import Mock, MagicMock, patch
+import numpy
+from unittest.mock import ANY, Mock, MagicMock, patch
 
 LOG_LEVEL = get_log_level()
 
@@ -39,15 +40,28 @@ class TestAudio(unittest.TestCase):
             cleep_filesystem.open.return_value.read.return_value = "dtparam=audio=on"
             bootstrap["cleep_filesystem"] = cleep_filesystem
 
-        self.module = self.session.setup(Audio, bootstrap=bootstrap, mock_on_start=False, mock_on_stop=False)
+        self.module = self.session.setup(
+            Audio, bootstrap=bootstrap, mock_on_start=False, mock_on_stop=False
+        )
         mock_command = self.session.make_mock_command("restart_cleep")
         self.session.add_mock_command(mock_command)
         self.session.start_module(self.module)
 
     def test_init(self):
         self.init_session()
-        self.assertIsNotNone(self.module.bcm2835_driver)
-        self.assertTrue(isinstance(self.module.bcm2835_driver, Bcm2835AudioDriver))
+        drivers = self.module.driver_registry.get_drivers()
+        self.assertTrue(
+            isinstance(drivers["Raspberry pi soundcard"], Bcm2835AudioDriver)
+        )
+
+    @patch("backend.driverregistry.DriverRegistry._read_cards", Mock(return_value=""))
+    @patch("backend.driverregistry.BLUETOOTH_ADAPTERS_PATH", "/dummy/bluetooth")
+    @patch("backend.driverregistry.Tools")
+    def test_init_register_applicable_drivers_only(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": False}
+        self.init_session()
+
+        self.assertEqual(self.module.driver_registry.get_drivers(), {})
 
     @patch("backend.audio.Tools")
     def test_init_no_audio_on_device(self, mock_tools):
@@ -96,6 +110,48 @@ class TestAudio(unittest.TestCase):
             }
         )
 
+    @patch("backend.audio.Task")
+    def test_on_start(self, mock_task):
+        self.init_session()
+
+        mock_task.assert_called_with(
+            Audio.CARDS_WATCH_INTERVAL,
+            self.module.card_watcher.check,
+            self.module.logger,
+        )
+        mock_task.return_value.start.assert_called()
+
+    @patch("backend.audio.Task")
+    def test_on_stop(self, mock_task):
+        self.init_session()
+
+        self.module._on_stop()
+
+        mock_task.return_value.stop.assert_called()
+
+    def test_on_cards_changed(self):
+        driver = Mock()
+        drivers_mock = Mock()
+        drivers_mock.get_drivers.return_value = {"driver": driver}
+        self.init_session(
+            bootstrap={
+                "drivers": drivers_mock,
+            }
+        )
+
+        self.module._on_cards_changed("cards")
+
+        driver.on_cards_changed.assert_called()
+
+    def test_on_cards_changed_register_plugged_driver(self):
+        self.init_session()
+        self.module._register_driver = Mock()
+
+        self.module._on_cards_changed(" 1 [UACDemoV10     ]: USB-Audio - UACDemoV1.0")
+
+        drivers = [args[0][0] for args in self.module._register_driver.call_args_list]
+        self.assertTrue(any(isinstance(driver, UsbAudioDriver) for driver in drivers))
+
     def test_get_module_config(self):
         self.init_session()
         conf = self.module.get_module_config()
@@ -176,9 +232,68 @@ class TestAudio(unittest.TestCase):
                     ],
                 },
                 "volumes": "volumes",
+                "route": None,
+                "routes": [],
+                "ducking": Audio.DEFAULT_CONFIG["ducking"],
+                "idle_timeout": Audio.DEFAULT_CONFIG["idle_timeout"],
+                "version": self.module.config_versions.version,
             },
         )
 
+    def test_get_module_config_changes(self):
+        self.init_session()
+        version = self.module.get_module_config()["version"]
+        self.module.get_module_config = Mock()
+
+        changes = self.module.get_module_config_changes(version)
+
+        self.assertEqual(changes, {"version": version, "changes": {}})
+        self.assertFalse(self.module.get_module_config.called)
+
+    def test_get_module_config_changes_volumes(self):
+        self.init_session()
+        version = self.module.get_module_config()["version"]
+
+        self.module._update_volumes({"playback": 10, "capture": 20})
+        changes = self.module.get_module_config_changes(version)
+
+        self.assertEqual(
+            changes,
+            {
+                "version": version + 1,
+                "changes": {"volumes": {"playback": 10, "capture": 20}},
+            },
+        )
+
+    def test_get_module_config_changes_devices_probed_after_hotplug(self):
+        self.init_session()
+        version = self.module.get_module_config()["version"]
+        self.module._on_cards_changed("cards")
+        self.module.get_module_config = Mock()
+
+        self.module.get_module_config_changes(version)
+
+        self.module.get_module_config.assert_called()
+
+    def test_get_module_config_changes_whole_config(self):
+        self.init_session()
+
+        changes = self.module.get_module_config_changes()
+
+        self.assertCountEqual(
+            changes["changes"].keys(),
+            ["devices", "volumes", "route", "routes", "ducking", "idle_timeout"],
+        )
+
+    def test_get_module_config_changes_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.get_module_config_changes(-1)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "since_version" must be positive'
+        )
+
     @patch("backend.audio.Tools")
     def test_select_device(self, mock_tools):
         mock_tools.raspberry_pi_infos.return_value = {"audio": True}
@@ -346,6 +461,119 @@ class TestAudio(unittest.TestCase):
         self.module.set_volumes(12, 34)
 
         driver.set_volumes.assert_called_with(12, 34)
+        # volumes are confirmed by driver, no read back
+        self.assertFalse(driver.get_volumes.called)
+
+    def test_set_channel_volumes(self):
+        driver = Mock()
+        driver.set_channel_volumes.return_value = {
+            "playback": [100, 50],
+            "capture": None,
+        }
+        self.init_session()
+        self.module._get_selected_driver = Mock(return_value=driver)
+        self.module.volume_changed_event = Mock()
+
+        channels = self.module.set_channel_volumes([100, 50], None)
+
+        driver.set_channel_volumes.assert_called_with([100, 50], None)
+        self.assertEqual(channels, {"playback": [100, 50], "capture": None})
+        self.module.volume_changed_event.send.assert_called_with(
+            params={"playback": 100, "capture": None}, render=False
+        )
+
+    def test_set_channel_volumes_invalid_parameters(self):
+        self.init_session()
+        self.module._get_selected_driver = Mock()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_channel_volumes([100, 101], None)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "playback" must be a list of 0<=volume<=100'
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_channel_volumes(None, [])
+        self.assertEqual(
+            str(cm.exception), 'Parameter "capture" must be a list of 0<=volume<=100'
+        )
+
+    def test_set_channel_volumes_reject_bool(self):
+        driver = Mock()
+        self.init_session()
+        self.module._get_selected_driver = Mock(return_value=driver)
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_channel_volumes([True, False], None)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "playback" must be a list of 0<=volume<=100'
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_channel_volumes(None, [50, True])
+        self.assertEqual(
+            str(cm.exception), 'Parameter "capture" must be a list of 0<=volume<=100'
+        )
+        self.assertFalse(driver.set_channel_volumes.called)
+
+    def test_set_channel_volumes_driver_error(self):
+        driver = Mock()
+        driver.set_channel_volumes.side_effect = Exception("Test")
+        self.init_session()
+        self.module._get_selected_driver = Mock(return_value=driver)
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_channel_volumes([100, 50, 20], None)
+        self.assertEqual(str(cm.exception), "Test")
+
+    def test_set_channel_volumes_not_supported(self):
+        self.init_session()
+        self.module._get_selected_driver = Mock(return_value=Mock(spec=["get_volumes"]))
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.get_channel_volumes()
+        self.assertEqual(
+            str(cm.exception), "Selected device does not support per-channel volume"
+        )
+
+    def test_set_volumes_send_volume_changed_event(self):
+        driver = Mock()
+        driver.set_volumes.return_value = {"playback": 12, "capture": 34}
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(bootstrap={"drivers": drivers_mock})
+        self.module._get_config_field = Mock(return_value="dummydriver")
+
+        volumes = self.module.set_volumes(12, 34)
+
+        self.assertEqual(volumes, {"playback": 12, "capture": 34})
+        self.session.assert_event_called_with(
+            "audio.volume.changed", {"playback": 12, "capture": 34}
+        )
+
+    def test_on_volumes_changed(self):
+        driver = Mock()
+        driver.is_enabled.return_value = True
+        driver.get_volumes.return_value = {"playback": 50, "capture": None}
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(bootstrap={"drivers": drivers_mock})
+        self.module._get_config_field = Mock(return_value="dummydriver")
+        self.module.volume_changed_event = Mock()
+
+        self.module._on_volumes_changed([{"card": 1, "numid": 3, "name": "PCM"}])
+        self.module._on_volumes_changed([{"card": 1, "numid": 3, "name": "PCM"}])
+
+        self.module.volume_changed_event.send.assert_called_once_with(
+            params={"playback": 50, "capture": None}, render=False
+        )
+
+    def test_on_volumes_changed_no_driver(self):
+        self.init_session()
+        self.module._get_config_field = Mock(return_value=None)
+        self.module.volume_changed_event = Mock()
+
+        self.module._on_volumes_changed([])
+
+        self.assertFalse(self.module.volume_changed_event.send.called)
 
     @patch("backend.audio.Tools")
     def test_set_volumes_invalid_parameters(self, mock_tools):
@@ -413,42 +641,869 @@ class TestAudio(unittest.TestCase):
 
         self.assertEqual(volumes, {"playback": None, "capture": None})
 
+    def init_route_driver(self, route="jack"):
+        driver = Mock()
+        driver.OUTPUT_ROUTES = {"auto": 0, "jack": 1, "hdmi": 2}
+        driver.get_output_route.return_value = route
+        driver.set_output_route.return_value = True
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(
+            bootstrap={
+                "drivers": drivers_mock,
+            }
+        )
+        self.module._get_config_field = Mock(return_value="dummydriver")
+        self.module._set_config_field = Mock()
+        return driver
+
+    def test_set_output_route(self):
+        driver = self.init_route_driver()
+
+        self.assertTrue(self.module.set_output_route("hdmi"))
+
+        driver.set_output_route.assert_called_with("hdmi")
+        self.module._set_config_field.assert_called_with("route", "hdmi")
+
+    def test_set_output_route_already_applied(self):
+        driver = self.init_route_driver(route="hdmi")
+
+        self.assertTrue(self.module.set_output_route("hdmi"))
+
+        self.assertFalse(driver.set_output_route.called)
+        self.module._set_config_field.assert_called_with("route", "hdmi")
+
+    def test_set_output_route_failed(self):
+        driver = self.init_route_driver()
+        driver.set_output_route.return_value = False
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_output_route("hdmi")
+        self.assertEqual(str(cm.exception), "Unable to set output route")
+        self.assertFalse(self.module._set_config_field.called)
+
+    def test_set_output_route_not_supported_by_driver(self):
+        driver = self.init_route_driver()
+        del driver.OUTPUT_ROUTES
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.set_output_route("hdmi")
+        self.assertEqual(
+            str(cm.exception), "Current audio device does not support output routing"
+        )
+
+    def test_set_output_route_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(MissingParameter) as cm:
+            self.module.set_output_route(None)
+        self.assertEqual(str(cm.exception), 'Parameter "route" is missing')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_output_route("spdif")
+        self.assertEqual(str(cm.exception), 'Output route "spdif" is not supported')
+
+    def init_capture_driver(self, capture=True):
+        driver = Mock()
+        driver.get_card_capabilities.return_value = (True, capture)
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(
+            bootstrap={
+                "drivers": drivers_mock,
+            }
+        )
+        self.module._get_config_field = Mock(return_value="dummydriver")
+        return driver
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_start_level_meter(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        mock_stream.return_value.is_running.return_value = False
+
+        self.assertTrue(self.module.start_level_meter(10))
+
+        mock_capture.assert_called_with(Audio.LEVEL_METER_RATE)
+        mock_stream.assert_called_with(
+            mock_capture.return_value,
+            self.module._on_level,
+            update_rate=10,
+            max_duration=Audio.LEVEL_METER_MAX_DURATION,
+            on_stop=ANY,
+        )
+        mock_stream.return_value.start.assert_called()
+        grant = self.module.scheduler.get_grant(self.module.level_meter_grant)
+        self.assertEqual(grant.resource, "audio.capture")
+
+        # stop callback releases meter grant
+        mock_stream.call_args.kwargs["on_stop"]()
+        self.assertIsNone(self.module.scheduler.get_grant(grant.id))
+        self.assertIsNone(self.module.level_meter_grant)
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_start_level_meter_stale_stop_callback(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        self.module._need_resource = Mock()
+        mock_stream.return_value.is_running.return_value = False
+        self.module.start_level_meter()
+        old_on_stop = mock_stream.call_args.kwargs["on_stop"]
+        # meter preempted, its stop callback is delayed
+        self.module.scheduler.preempt("audio.capture")
+        self.module.start_level_meter()
+        grant_id = self.module.level_meter_grant
+        self.module.level_update_event = Mock()
+
+        # previous meter stop callback is called after new meter started
+        old_on_stop()
+
+        self.assertEqual(self.module.level_meter_grant, grant_id)
+        self.assertIsNotNone(self.module.scheduler.get_grant(grant_id))
+        self.assertFalse(self.module.level_update_event.send.called)
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_start_level_meter_already_running(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        self.module.start_level_meter()
+        mock_stream.return_value.is_running.return_value = True
+
+        self.assertTrue(self.module.start_level_meter())
+
+        self.assertEqual(mock_stream.call_count, 1)
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_start_level_meter_start_failed(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        mock_stream.return_value.start.side_effect = Exception("Test exception")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.start_level_meter()
+        self.assertEqual(str(cm.exception), "Unable to start level meter")
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_start_level_meter_capture_used(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        self.module.request_audio("audio.capture", "voice", "voice")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.start_level_meter()
+        self.assertEqual(str(cm.exception), "Audio capture is used by another stream")
+        self.assertFalse(mock_stream.return_value.start.called)
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_level_meter_stopped_by_recording(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        mock_stream.return_value.is_running.return_value = False
+        self.module.start_level_meter()
+        self.module._need_resource = Mock()
+
+        self.module.test_recording()
+
+        mock_stream.return_value.stop.assert_called()
+
+    def test_start_level_meter_no_capture(self):
+        self.init_capture_driver(capture=False)
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.start_level_meter()
+        self.assertEqual(
+            str(cm.exception), "Selected audio device has no capture capability"
+        )
+
+    def test_start_level_meter_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.start_level_meter(0)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "update_rate" must be 1<=update_rate<=50'
+        )
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_stop_level_meter(self, mock_stream, mock_capture):
+        self.init_capture_driver()
+        mock_stream.return_value.is_running.return_value = False
+        self.module.start_level_meter()
+
+        self.module.stop_level_meter()
+
+        mock_stream.return_value.stop.assert_called()
+
+    def test_on_level(self):
+        self.init_session()
+        level = {"rms": [-20.0], "peak": [-12.0]}
+
+        self.module._on_level(level)
+
+        self.session.assert_event_called_with(
+            "audio.level.update", {"rms": [-20.0], "peak": [-12.0], "running": True}
+        )
+
+    def test_on_level_meter_stop(self):
+        self.init_session()
+        grant = self.module.scheduler.request("audio.capture", "audio", 0)
+        self.module.level_meter_grant = grant.id
+
+        self.module._on_level_meter_stop(grant.id)
+
+        self.session.assert_event_called_with(
+            "audio.level.update", {"rms": [], "peak": [], "running": False}
+        )
+        self.assertIsNone(self.module.scheduler.get_grant(grant.id))
+        self.assertIsNone(self.module.level_meter_grant)
+
+    def wait_job(self, job_id, timeout=2.0):
+        end = time.time() + timeout
+        while time.time() < end:
+            job = self.module.get_job(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.05)
+        return self.module.get_job(job_id)
+
     @patch("backend.audio.Alsa")
     def test_test_playing(self, mock_alsa):
         self.init_session()
-        self.module.test_playing()
+        job_id = self.module.test_playing()
 
-        time.sleep(1.0)
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "done")
         self.assertTrue(mock_alsa.return_value.play_sound.called)
+        self.session.assert_event_called_with("audio.job.update", job)
 
     @patch("backend.audio.Alsa")
     def test_test_playing_failed(self, mock_alsa):
         mock_alsa.return_value.play_sound.return_value = False
         self.init_session()
-        self.module.test_playing()
+        job_id = self.module.test_playing()
 
-        time.sleep(1.0)
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Unable to play test sound: internal error")
         self.assertTrue(mock_alsa.return_value.play_sound.called)
 
     @patch("backend.audio.Alsa")
-    def test_test_recording(self, mock_alsa):
+    def test_test_playing_already_running(self, mock_alsa):
         self.init_session()
-        self.module.test_recording()
+        self.module._need_resource = Mock()
+        self.module.test_playing()
 
-        self.assertTrue(mock_alsa.return_value.record_sound.called)
+        with self.assertRaises(CommandError) as cm:
+            self.module.test_playing()
+        self.assertEqual(str(cm.exception), 'Job "playing" is already running')
 
     @patch("backend.audio.Alsa")
-    def test_test_recording_failed(self, mock_alsa):
-        mock_alsa.return_value.play_sound.return_value = False
+    def test_test_playing_resource_not_acquired(self, mock_alsa):
         self.init_session()
-        self.module.test_recording()
+        self.module.RESOURCE_TIMEOUT = 0.1
+        self.module._need_resource = Mock()
+        job_id = self.module.test_playing()
+
+        job = self.wait_job(job_id)
+
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], 'Unable to acquire resource "audio.playback"')
+        self.assertEqual(self.module.job_grants, {})
+        self.assertEqual(self.module.pending_jobs, {})
+        self.assertFalse(mock_alsa.return_value.play_sound.called)
+        # job can be started again and resource is free in scheduler
+        self.assertIsNotNone(self.module.test_playing())
+        self.assertEqual(self.module.scheduler.get_stats()["preemptions"], 0)
+
+    @patch("backend.audio.Alsa")
+    def test_test_playing_need_resource_failed(self, mock_alsa):
+        self.init_session()
+        self.module._need_resource = Mock(side_effect=Exception("Test"))
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.test_playing()
+        self.assertEqual(
+            str(cm.exception), 'Unable to acquire resource "audio.playback"'
+        )
+
+        self.assertEqual(self.module.job_grants, {})
+        self.assertEqual(self.module.job_timers, {})
+        self.assertEqual(self.module.cleep_resources, {})
+        self.assertFalse(self.module.scheduler.is_used("audio.playback"))
+
+    def test_resource_acquired_after_timeout(self):
+        self.init_session()
+        self.module._release_resource = Mock()
+        self.module._release_grant = Mock()
+
+        self.module._resource_acquired("audio.capture")
+
+        self.module._release_resource.assert_called_with("audio.capture")
+        # no grant to release
+        self.assertFalse(self.module._release_grant.called)
 
-        self.assertTrue(mock_alsa.return_value.record_sound.called)
+    def init_recording(self, mock_capture, mock_playback):
+        chunk = b"\x00\x00" * Audio.RECORD_CHUNK_FRAMES
+        mock_capture.return_value.read.return_value = chunk
+        mock_playback.return_value.write.return_value = True
+        mock_playback.return_value.drain.return_value = True
+
+    @patch("backend.audio.PcmPlayback")
+    @patch("backend.audio.PcmCapture")
+    def test_test_recording(self, mock_capture, mock_playback):
+        self.init_recording(mock_capture, mock_playback)
+        self.init_session()
+        job_id = self.module.test_recording()
+
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "done")
+        mock_capture.assert_called_with(Audio.RECORD_RATE)
+        self.assertEqual(mock_capture.return_value.read.call_count, 50)
+        self.assertEqual(mock_playback.return_value.write.call_count, 50)
+        self.assertEqual(
+            len(mock_playback.return_value.write.call_args[0][0]),
+            Audio.RECORD_CHUNK_FRAMES * 2,
+        )
+        mock_playback.return_value.drain.assert_called()
+
+    @patch("backend.audio.PcmPlayback")
+    @patch("backend.audio.PcmCapture")
+    def test_test_recording_capture_stopped(self, mock_capture, mock_playback):
+        self.init_recording(mock_capture, mock_playback)
+        mock_capture.return_value.read.return_value = None
+        self.init_session()
+        job_id = self.module.test_recording()
+
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Unable to record sound: capture stopped")
+        self.assertFalse(mock_playback.return_value.start.called)
+        mock_capture.return_value.stop.assert_called()
+
+    @patch("backend.audio.PcmPlayback")
+    @patch("backend.audio.PcmCapture")
+    def test_test_recording_playback_failed(self, mock_capture, mock_playback):
+        self.init_recording(mock_capture, mock_playback)
+        mock_playback.return_value.drain.return_value = False
+        self.init_session()
+        job_id = self.module.test_recording()
+
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Unable to play recorded sound: internal error")
+        mock_playback.return_value.stop.assert_called()
+
+    @patch("backend.audio.PcmPlayback")
+    def test_create_playback_driver_stream(self, mock_playback):
+        driver = Mock()
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(bootstrap={"drivers": drivers_mock})
+        self.module._get_config_field = Mock(return_value="drivername")
+
+        playback = self.module._create_playback()
+
+        self.assertEqual(playback, driver.create_playback.return_value)
+        driver.create_playback.assert_called_with(
+            Audio.MIXER_RATE, Audio.MIXER_CHANNELS
+        )
+        self.assertFalse(mock_playback.called)
+
+    @patch("backend.audio.PcmPlayback")
+    def test_create_playback_alsa_stream(self, mock_playback):
+        driver = Mock()
+        driver.create_playback.return_value = None
+        drivers_mock = Mock()
+        drivers_mock.get_driver.return_value = driver
+        self.init_session(bootstrap={"drivers": drivers_mock})
+        self.module._get_config_field = Mock(return_value="drivername")
+
+        playback = self.module._create_playback()
+
+        self.assertEqual(playback, mock_playback.return_value)
+        mock_playback.assert_called_with(Audio.MIXER_RATE, Audio.MIXER_CHANNELS)
+
+    @patch("backend.audio.Alsa")
+    def test_test_playing_audio_used_by_higher_priority(self, mock_alsa):
+        self.init_session()
+        self.module._need_resource = Mock()
+        self.module.request_audio("audio.playback", "alarm", "alarm")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.test_playing()
+        self.assertEqual(
+            str(cm.exception), "Audio is used by a stream with same or higher priority"
+        )
+        # acquired once, for alarm grant
+        self.module._need_resource.assert_called_once_with("audio.playback")
+
+    def test_request_audio(self):
+        self.init_session()
+
+        grant = self.module.request_audio("audio.playback", "music", "music")
+        preempting = self.module.request_audio(
+            "audio.playback", "alarm", "alarm", timeout=1.0
+        )
+
+        self.assertEqual(grant["state"], "active")
+        self.assertEqual(preempting["state"], "active")
+        self.session.assert_event_called_with(
+            "audio.resource.update", dict(grant, state="preempted")
+        )
+        self.assertTrue(self.module.release_audio(preempting["id"]))
+        self.assertFalse(self.module.release_audio(preempting["id"]))
+
+    def test_request_audio_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.request_audio("audio.dummy", "owner", "music")
+        self.assertEqual(
+            str(cm.exception), 'Resource "audio.dummy" is not an audio resource'
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.request_audio("audio.playback", "owner", "dummy")
+        self.assertEqual(str(cm.exception), 'Priority "dummy" is not supported')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.request_audio("audio.playback", "owner", "music", timeout=60.0)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "timeout" must be 0<=timeout<=10.0'
+        )
+
+    def test_request_audio_ducking(self):
+        self.init_session()
+        music = self.module.request_audio("audio.playback", "music", "music")
+
+        notif = self.module.request_audio(
+            "audio.playback", "notif", "notification", duck=True
+        )
+
+        self.assertTrue(self.module.ducker.is_ducked(music["id"]))
+        self.module.release_audio(notif["id"])
+        self.assertFalse(self.module.ducker.is_ducked(music["id"]))
+        self.module.release_audio(music["id"])
+        self.assertEqual(self.module.ducker.get_gain(music["id"]), 1.0)
+
+    def test_set_ducking(self):
+        self.init_session()
+        self.module._set_config_field = Mock()
+
+        self.module.set_ducking(0.1, 1.0, -20.0)
+
+        self.assertEqual(self.module.ducker.duck_gain, -20.0)
+        self.assertEqual(self.module.ducker.release, 1.0)
+        self.module._set_config_field.assert_called_with(
+            "ducking", {"attack": 0.1, "release": 1.0, "gain": -20.0}
+        )
+
+    def test_set_ducking_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_ducking(-1.0, 1.0, -20.0)
+        self.assertEqual(str(cm.exception), 'Parameter "attack" must be 0<=attack<=5.0')
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_ducking(0.1, 6.0, -20.0)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "release" must be 0<=release<=5.0'
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_ducking(0.1, 1.0, 6.0)
+        self.assertEqual(str(cm.exception), 'Parameter "gain" must be -60.0<=gain<=0')
+
+    def test_set_app_volume(self):
+        self.init_session()
+        self.module._set_config_field = Mock()
+
+        self.module.set_app_volume("alarm", 25)
+
+        self.assertEqual(self.module.app_gains.get_gain("alarm"), 0.25)
+        self.assertEqual(self.module.get_app_volume("alarm"), 25)
+        self.module._set_config_field.assert_called_with("app_volumes", {"alarm": 25})
+
+    def test_set_app_volume_full_level(self):
+        self.init_session()
+        self.module._get_config_field = Mock(return_value={"alarm": 25})
+        self.module._set_config_field = Mock()
+
+        self.module.set_app_volume("alarm", 100)
+
+        self.assertEqual(self.module.get_app_volume("alarm"), 100)
+        self.module._set_config_field.assert_called_with("app_volumes", {})
+
+    def test_set_app_volume_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_app_volume("alarm", 101)
+        self.assertEqual(str(cm.exception), 'Parameter "volume" must be 0<=volume<=100')
+
+    def test_app_volume_applied_on_stream_voice(self):
+        self.init_session()
+        self.module.set_app_volume("radio", 50)
+        grant = self.module.request_audio("audio.playback", "radio", "music")
+        frames = numpy.full((4, 2), 0.5, dtype=numpy.float32)
+
+        result = self.module.mixer.mix({grant["id"]: frames})
+
+        self.assertAlmostEqual(float(result[0][0]), 0.25, places=4)
+
+    def test_set_idle_timeout(self):
+        self.init_session()
+        self.module._set_config_field = Mock()
+
+        self.module.set_idle_timeout(5.0)
+
+        self.assertEqual(self.module.idle_manager.idle_timeout, 5.0)
+        self.module._set_config_field.assert_called_with("idle_timeout", 5.0)
+
+    def test_set_idle_timeout_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.set_idle_timeout(-1.0)
+        self.assertEqual(
+            str(cm.exception), 'Parameter "timeout" must be 0<=timeout<=3600.0'
+        )
+
+    def test_get_output_stats(self):
+        self.init_session()
+
+        stats = self.module.get_output_stats()
+
+        self.assertEqual(stats["state"], "suspended")
+        self.assertEqual(stats["wakeups"], 0)
+
+    def test_enqueue_sounds_prewarm_output(self):
+        self.init_session()
+        self.module.queue = Mock()
+        self.module.idle_manager = Mock()
+
+        self.module.enqueue_sounds(["connected.wav"])
+
+        self.module.idle_manager.prewarm.assert_called()
+
+    def test_cards_changed_suspend_output(self):
+        self.init_session()
+        self.module.idle_manager = Mock()
+
+        self.module._on_cards_changed("cards")
+
+        self.module.idle_manager.suspend.assert_called()
+
+    def test_get_audio_scheduler_stats(self):
+        self.init_session()
+        self.module.request_audio("audio.playback", "music", "music")
+
+        stats = self.module.get_audio_scheduler_stats()
+
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["latency"]["count"], 1)
+
+    def test_enqueue_sounds(self):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        self.module.queue = Mock()
+        self.module.queue.enqueue.side_effect = ["id1", "id2"]
+
+        path = os.path.join(self.module.APP_ASSET_PATH, "connected.wav")
+
+        ids = self.module.enqueue_sounds(["connected.wav", path])
+
+        self.assertEqual(ids, ["id1", "id2"])
+        self.assertEqual(self.module.queue.enqueue.call_count, 2)
+        self.module.queue.enqueue.assert_called_with(path)
+
+    def test_enqueue_sounds_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.enqueue_sounds(["dummy.wav"])
+        self.assertEqual(
+            str(cm.exception),
+            'Parameter "sounds" must be a list of existing sound files',
+        )
+        with self.assertRaises(InvalidParameter):
+            self.module.enqueue_sounds([])
+
+    def test_enqueue_sounds_not_wav(self):
+        self.init_session()
+        self.module.queue = Mock()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.enqueue_sounds(["connected.wav", "doorbell.mp3"])
+        self.assertEqual(
+            str(cm.exception), "Sounds queue only plays wav files: doorbell.mp3"
+        )
+        self.assertFalse(self.module.queue.enqueue.called)
+
+    def test_enqueue_sounds_failed(self):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        self.module.queue = Mock()
+        self.module.queue.enqueue.side_effect = Exception("Unsupported file")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.enqueue_sounds(["connected.wav"])
+        self.assertEqual(str(cm.exception), "Unsupported file")
+
+    def test_sounds_queue_commands(self):
+        self.init_session()
+        self.module.queue = Mock()
+
+        self.module.skip_sound()
+        self.module.clear_sounds()
+        self.module.get_sounds_queue()
+
+        self.module.queue.skip.assert_called()
+        self.module.queue.clear.assert_called()
+        self.module.queue.get_items.assert_called()
+
+    def test_on_queue_start_and_idle(self):
+        self.init_session()
+
+        self.assertTrue(self.module._on_queue_start())
+        grant_id = self.module.queue_grant
+        self.assertEqual(self.module.queue.voice_id, grant_id)
+        self.assertTrue(self.module.scheduler.get_grant(grant_id).is_granted())
+
+        self.module._on_queue_idle()
+        self.assertIsNone(self.module.queue_grant)
+        self.assertIsNone(self.module.scheduler.get_grant(grant_id))
+
+    def test_on_queue_start_audio_used_by_higher_priority(self):
+        self.init_session()
+        self.module.request_audio("audio.playback", "alarm", "alarm")
+
+        self.assertFalse(self.module._on_queue_start())
+        self.assertIsNone(self.module.queue_grant)
+
+    def test_sounds_queue_preempted(self):
+        self.init_session()
+        self.module._on_queue_start()
+        self.module.queue = Mock()
+
+        self.module.request_audio("audio.playback", "alarm", "alarm")
+
+        self.module.queue.clear.assert_called()
+
+    @patch("backend.audio.AudioStream")
+    def test_play_stream(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        mock_stream.return_value.to_dict.return_value = {"id": "stream"}
+
+        stream = self.module.play_stream("http://localhost/stream.wav")
+
+        self.assertEqual(stream, {"id": "stream"})
+        mock_stream.return_value.start.assert_called()
+        grant_id = mock_stream.return_value.voice_id
+        self.assertTrue(self.module.scheduler.get_grant(grant_id).is_granted())
+
+        self.module._on_stream_end(mock_stream.return_value)
+        self.assertIsNone(self.module.scheduler.get_grant(grant_id))
+
+    @patch("backend.audio.AudioStream")
+    def test_play_stream_owner(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+
+        self.module.play_stream("http://localhost/stream.wav", owner="radio")
+
+        grant_id = mock_stream.return_value.voice_id
+        self.assertEqual(self.module._get_grant_owner(grant_id), "radio")
+
+    def test_play_stream_invalid_parameters(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.play_stream("stream.wav")
+        self.assertEqual(str(cm.exception), 'Unsupported stream location "stream.wav"')
+
+    @patch("backend.audio.AudioStream")
+    def test_play_stream_audio_used_by_higher_priority(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        self.module.request_audio("audio.playback", "voice", "voice")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.play_stream("http://localhost/stream.wav")
+        self.assertEqual(
+            str(cm.exception), "Audio is used by a stream with same or higher priority"
+        )
+        self.assertFalse(mock_stream.return_value.start.called)
+
+    @patch("backend.audio.AudioStream")
+    def test_play_stream_start_failed(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        mock_stream.return_value.start.side_effect = Exception("Unable to open")
+
+        with self.assertRaises(CommandError) as cm:
+            self.module.play_stream("/tmp/stream.wav")
+        self.assertEqual(str(cm.exception), "Unable to open")
+        self.assertEqual(self.module.scheduler.get_stats()["requests"], 1)
+        self.assertIsNone(self.module.get_stream())
+
+    @patch("backend.audio.AudioStream")
+    def test_stop_stream(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        mock_stream.STATE_BUFFERING = "buffering"
+        mock_stream.STATE_PLAYING = "playing"
+        self.assertFalse(self.module.stop_stream())
+        self.module.play_stream("http://localhost/stream.wav")
+        mock_stream.return_value.state = "playing"
+
+        self.assertTrue(self.module.stop_stream())
+
+        mock_stream.return_value.stop.assert_called()
+
+    @patch("backend.audio.AudioStream")
+    def test_stream_preempted(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        self.module.play_stream("http://localhost/stream.wav")
+
+        self.module.request_audio("audio.playback", "alarm", "alarm")
+
+        mock_stream.return_value.stop.assert_called()
+
+    def test_get_job_unknown(self):
+        self.init_session()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.module.get_job("dummy")
+        self.assertEqual(str(cm.exception), 'Job "dummy" does not exist')
 
     def test_resource_acquired(self):
         self.init_session()
         self.module._resource_acquired("dummy.resource")
 
+    def test_resource_acquired_no_pending_job(self):
+        self.init_session()
+        self.module._release_resource = Mock()
+
+        self.module._resource_acquired("audio.playback")
+
+        self.module._release_resource.assert_called_with("audio.playback")
+
+    def test_resource_acquired_for_grant(self):
+        self.init_session()
+        self.module._need_resource = Mock()
+        self.module._release_resource = Mock()
+        self.module.request_audio("audio.playback", "music", "music")
+
+        self.module._resource_acquired("audio.playback")
+
+        self.assertEqual(self.module.cleep_resources, {"audio.playback": True})
+        self.assertFalse(self.module._release_resource.called)
+
+    def test_grants_acquire_and_release_cleep_resource(self):
+        self.init_session()
+        self.module._need_resource = Mock()
+        self.module._release_resource = Mock()
+
+        music = self.module.request_audio("audio.playback", "music", "music")
+        notif = self.module.request_audio(
+            "audio.playback", "notif", "notification", duck=True
+        )
+        self.module._need_resource.assert_called_once_with("audio.playback")
+
+        self.module.release_audio(notif["id"])
+        self.assertFalse(self.module._release_resource.called)
+        self.module.release_audio(music["id"])
+        self.module._release_resource.assert_called_once_with("audio.playback")
+        self.assertEqual(self.module.cleep_resources, {})
+
+    @patch("backend.audio.AudioStream")
+    def test_resource_needs_to_be_released_stops_stream(self, mock_stream):
+        self.init_session()
+        self.module.idle_manager = Mock()
+        self.module._need_resource = Mock()
+        self.module._release_resource = Mock()
+        self.module.play_stream("http://localhost/stream.wav")
+
+        self.module._resource_needs_to_be_released("audio.playback")
+
+        mock_stream.return_value.stop.assert_called()
+        self.module._release_resource.assert_called_once_with("audio.playback")
+        self.assertFalse(self.module.scheduler.is_used("audio.playback"))
+        self.assertEqual(self.module.cleep_resources, {})
+
+    @patch("backend.audio.PcmCapture")
+    @patch("backend.audio.LevelMeterStream")
+    def test_resource_needs_to_be_released_stops_level_meter(
+        self, mock_stream, mock_capture
+    ):
+        self.init_capture_driver()
+        self.module._need_resource = Mock()
+        self.module._release_resource = Mock()
+        mock_stream.return_value.is_running.return_value = False
+        self.module.start_level_meter()
+        self.module._need_resource.assert_called_once_with("audio.capture")
+
+        self.module._resource_needs_to_be_released("audio.capture")
+
+        mock_stream.return_value.stop.assert_called()
+        self.module._release_resource.assert_called_once_with("audio.capture")
+
+    @patch("backend.audio.Alsa")
+    def test_resource_needs_to_be_released_fails_pending_job(self, mock_alsa):
+        self.init_session()
+        self.module._need_resource = Mock()
+        self.module._release_resource = Mock()
+        job_id = self.module.test_playing()
+
+        self.module._resource_needs_to_be_released("audio.playback")
+
+        job = self.module.get_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Audio is used by another stream")
+        self.assertEqual(self.module.job_grants, {})
+        self.assertEqual(self.module.pending_jobs, {})
+        self.module._release_resource.assert_called_once_with("audio.playback")
+        # resource acquired late is released
+        self.module._resource_acquired("audio.playback")
+        self.assertFalse(mock_alsa.return_value.play_sound.called)
+
+    @patch("backend.audio.PcmPlayback")
+    @patch("backend.audio.PcmCapture")
+    def test_resource_needs_to_be_released_interrupts_recording(
+        self, mock_capture, mock_playback
+    ):
+        self.init_recording(mock_capture, mock_playback)
+        chunk = mock_capture.return_value.read.return_value
+
+        def read(frames):
+            if not mock_capture.return_value.interrupt.called:
+                self.module._resource_needs_to_be_released("audio.capture")
+            return None if mock_capture.return_value.interrupt.called else chunk
+
+        mock_capture.return_value.read.side_effect = read
+        self.init_session()
+        job_id = self.module.test_recording()
+
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "Unable to record sound: capture stopped")
+        mock_playback.return_value.interrupt.assert_called()
+        self.assertFalse(self.module.scheduler.is_used("audio.capture"))
+
+    @patch("backend.audio.Alsa")
+    def test_test_playing_resource_already_acquired(self, mock_alsa):
+        self.init_session()
+        mock_alsa.return_value.play_sound.return_value = True
+        self.module._need_resource = Mock()
+        self.module.request_audio("audio.playback", "music", "music")
+        self.module._resource_acquired("audio.playback")
+
+        job_id = self.module.test_playing()
+
+        job = self.wait_job(job_id)
+        self.assertEqual(job["status"], "done")
+        self.module._need_resource.assert_called_once_with("audio.playback")
+
 
 if __name__ == "__main__":
     # coverage run --include="**/backend/**/*.py" --concurrency=thread test_audio.py; coverage report -m -i
@@ -0,0 +1,200 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.audioconverter import (
+    SampleFormat,
+    PolyphaseResampler,
+    AudioConverter,
+    convert_format,
+    frames_from_bytes,
+    frames_to_bytes,
+)
+from cleep.libs.tests.common import get_log_level
+import numpy
+
+LOG_LEVEL = get_log_level()
+
+
+class TestSampleFormat(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def test_get_dtype_invalid_format(self):
+        with self.assertRaises(Exception) as cm:
+            SampleFormat.get_dtype("S24_LE")
+        self.assertEqual(str(cm.exception), 'Unsupported sample format "S24_LE"')
+
+    def test_frames_bytes_roundtrip(self):
+        frames = numpy.array([[1, -1], [32767, -32768]], dtype="<i2")
+
+        raw = frames_to_bytes(frames)
+        result = frames_from_bytes(raw + b"\x00", SampleFormat.S16_LE, 2)
+
+        self.assertTrue(numpy.array_equal(result, frames))
+
+    def test_convert_format_s16_to_s32(self):
+        frames = numpy.array([[1, -1]], dtype="<i2")
+
+        result = convert_format(frames, SampleFormat.S16_LE, SampleFormat.S32_LE)
+
+        self.assertEqual(result.dtype, numpy.int32)
+        self.assertEqual(result.tolist(), [[65536, -65536]])
+
+    def test_convert_format_s32_to_s16(self):
+        frames = numpy.array([[65536, -65536]], dtype="<i4")
+
+        result = convert_format(frames, SampleFormat.S32_LE, SampleFormat.S16_LE)
+
+        self.assertEqual(result.tolist(), [[1, -1]])
+
+    def test_convert_format_float_clipping(self):
+        frames = numpy.array([[2.0, -2.0], [0.5, 0.0]], dtype=numpy.float32)
+
+        result = convert_format(frames, SampleFormat.FLOAT_LE, SampleFormat.S16_LE)
+
+        self.assertEqual(result.tolist(), [[32767, -32768], [16384, 0]])
+
+    def test_convert_format_same_format(self):
+        frames = numpy.array([[1, 2]], dtype="<i2")
+
+        self.assertIs(
+            convert_format(frames, SampleFormat.S16_LE, SampleFormat.S16_LE), frames
+        )
+
+
+class TestPolyphaseResampler(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def _make_sine(self, rate, frequency=1000.0, duration=1.0, channels=2):
+        times = numpy.arange(int(rate * duration)) / rate
+        sine = numpy.sin(2.0 * numpy.pi * frequency * times).astype(numpy.float32)
+        return numpy.repeat(sine[:, None], channels, axis=1)
+
+    def test_invalid_quality(self):
+        with self.assertRaises(Exception) as cm:
+            PolyphaseResampler(44100, 48000, 2, quality="ultra")
+        self.assertEqual(str(cm.exception), 'Unsupported resampling quality "ultra"')
+
+    def test_invalid_rate(self):
+        with self.assertRaises(Exception) as cm:
+            PolyphaseResampler(0, 48000, 2)
+        self.assertEqual(str(cm.exception), "Sample rates must be positive")
+
+    def test_ratio(self):
+        resampler = PolyphaseResampler(44100, 48000, 2)
+
+        self.assertEqual(resampler.up, 160)
+        self.assertEqual(resampler.down, 147)
+
+    def test_output_length(self):
+        for quality in PolyphaseResampler.QUALITIES:
+            resampler = PolyphaseResampler(44100, 48000, 2, quality=quality)
+
+            output = resampler.process(self._make_sine(44100))
+
+            self.assertEqual(output.shape, (48000, 2))
+
+    def test_chunked_processing_matches_single_call(self):
+        sine = self._make_sine(48000, duration=0.5)
+        single = PolyphaseResampler(48000, 44100, 2).process(sine)
+
+        resampler = PolyphaseResampler(48000, 44100, 2)
+        chunks = [
+            resampler.process(sine[i : i + 997]) for i in range(0, len(sine), 997)
+        ]
+        chunked = numpy.concatenate(chunks)
+
+        self.assertEqual(chunked.shape, single.shape)
+        self.assertTrue(numpy.allclose(chunked, single, atol=1e-6))
+
+    def test_sine_accuracy(self):
+        resampler = PolyphaseResampler(
+            44100, 48000, 1, quality=PolyphaseResampler.QUALITY_BEST
+        )
+
+        output = resampler.process(self._make_sine(44100, channels=1))[:, 0]
+
+        delay = (resampler.up * resampler.taps - 1) / (2.0 * resampler.up) / 44100
+        times = numpy.arange(len(output)) / 48000.0 - delay
+        expected = numpy.sin(2.0 * numpy.pi * 1000.0 * times)
+        self.assertLess(numpy.abs(output[1000:] - expected[1000:]).max(), 1e-2)
+
+    def test_same_rate_passthrough(self):
+        sine = self._make_sine(44100, duration=0.1)
+
+        output = PolyphaseResampler(44100, 44100, 2).process(sine)
+
+        self.assertTrue(numpy.array_equal(output, sine))
+
+    def test_flush(self):
+        resampler = PolyphaseResampler(44100, 48000, 2)
+        resampler.process(self._make_sine(44100, duration=0.1))
+
+        tail = resampler.flush()
+
+        self.assertGreater(len(tail), 0)
+        self.assertEqual(resampler.get_output_frames_count(0), 0)
+
+
+class TestAudioConverter(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def test_passthrough(self):
+        converter = AudioConverter(
+            SampleFormat.S16_LE, 44100, SampleFormat.S16_LE, 44100, 2
+        )
+
+        self.assertTrue(converter.is_passthrough())
+        self.assertEqual(
+            converter.process_bytes(b"\x01\x02\x03\x04"), b"\x01\x02\x03\x04"
+        )
+
+    def test_process_bytes_format_only(self):
+        converter = AudioConverter(
+            SampleFormat.S16_LE, 48000, SampleFormat.S32_LE, 48000, 2
+        )
+        raw = numpy.array([[1, 2]], dtype="<i2").tobytes()
+
+        result = converter.process_bytes(raw)
+
+        self.assertFalse(converter.is_passthrough())
+        self.assertEqual(
+            numpy.frombuffer(result, dtype="<i4").tolist(), [65536, 131072]
+        )
+
+    def test_process_resample_and_convert(self):
+        converter = AudioConverter(
+            SampleFormat.S16_LE, 44100, SampleFormat.FLOAT_LE, 48000, 2
+        )
+        frames = numpy.zeros((4410, 2), dtype="<i2")
+
+        result = converter.process(frames)
+
+        self.assertEqual(result.shape, (4800, 2))
+        self.assertEqual(result.dtype, numpy.float32)
+        self.assertEqual(converter.flush().dtype, numpy.float32)
+
+    def test_flush_without_resampler(self):
+        converter = AudioConverter(
+            SampleFormat.S16_LE, 44100, SampleFormat.S32_LE, 44100, 2
+        )
+
+        self.assertEqual(converter.flush().shape, (0, 2))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audioconverter.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.audiojobs import AudioJob, AudioJobs
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+
+class TestAudioJobs(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.on_update = Mock()
+        self.jobs = AudioJobs(self.on_update)
+
+    def get_statuses(self):
+        return [
+            (call[0][0]["status"], call[0][0]["progress"])
+            for call in self.on_update.call_args_list
+        ]
+
+    def test_create(self):
+        job = self.jobs.create("playing")
+
+        self.assertEqual(job.status, AudioJob.STATUS_PENDING)
+        self.assertIs(self.jobs.get(job.id), job)
+        self.on_update.assert_called_with(job.to_dict())
+
+    def test_create_already_running(self):
+        self.jobs.create("playing")
+
+        with self.assertRaises(Exception) as cm:
+            self.jobs.create("playing")
+        self.assertEqual(str(cm.exception), 'Job "playing" is already running')
+        self.jobs.create("recording")
+
+    def test_get_unknown_job(self):
+        self.assertIsNone(self.jobs.get("dummy"))
+
+    def test_run(self):
+        job = self.jobs.create("recording")
+
+        def target(progress):
+            progress(50)
+
+        self.jobs.run(job, target).join(2.0)
+
+        self.assertEqual(job.status, AudioJob.STATUS_DONE)
+        self.assertEqual(
+            self.get_statuses(),
+            [("pending", 0), ("running", 0), ("running", 50), ("done", 100)],
+        )
+        # finished job can be started again
+        self.jobs.create("recording")
+
+    def test_run_failed(self):
+        job = self.jobs.create("playing")
+        target = Mock(side_effect=Exception("Test exception"))
+
+        self.jobs.run(job, target).join(2.0)
+
+        self.assertEqual(job.status, AudioJob.STATUS_FAILED)
+        self.assertEqual(job.error, "Test exception")
+        self.assertTrue(job.is_finished())
+
+    def test_notify_failed(self):
+        self.on_update.side_effect = Exception("Test exception")
+
+        job = self.jobs.create("playing")
+
+        self.assertIsNotNone(job)
+
+    def test_purge_finished_jobs(self):
+        ids = []
+        for _ in range(AudioJobs.MAX_FINISHED_JOBS + 2):
+            job = self.jobs.create("playing")
+            self.jobs.update(job, status=AudioJob.STATUS_DONE)
+            ids.append(job.id)
+
+        self.jobs.create("playing")
+
+        self.assertIsNone(self.jobs.get(ids[0]))
+        self.assertIsNone(self.jobs.get(ids[1]))
+        self.assertIsNotNone(self.jobs.get(ids[2]))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audiojobs.py; coverage report -m -i
+    unittest.main()
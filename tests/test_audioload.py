@@ -0,0 +1,207 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.bcm2835audiodriver import Bcm2835AudioDriver
+from backend.usbaudiodriver import UsbAudioDriver
+from tests.fakealsa import (
+    FakeAlsaBackend,
+    FakeAlsaError,
+    make_bcm2835_card,
+    make_usb_headset_card,
+    make_usb_speaker_card,
+)
+from cleep.libs.tests.common import get_log_level
+import os
+import threading
+import time
+
+LOG_LEVEL = get_log_level()
+ASSET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../asset")
+
+
+class TestAudioLoad(unittest.TestCase):
+    """
+    Load tests of audio drivers running on fake alsa backend
+    """
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def tearDown(self):
+        pass
+
+    def init_session(self, latency=0.0, speed=20.0):
+        self.backend = FakeAlsaBackend(latency=latency, speed=speed)
+        self.backend.add_card(make_bcm2835_card(0))
+        self.backend.add_card(make_usb_speaker_card(1))
+        self.bcm2835_driver = self.backend.attach(Bcm2835AudioDriver())
+        self.usb_driver = self.backend.attach(UsbAudioDriver())
+
+    def _run_threads(self, target, count):
+        errors = []
+
+        def wrapper(index):
+            try:
+                target(index)
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        threads = [threading.Thread(target=wrapper, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30.0)
+        self.assertEqual(errors, [])
+
+    def test_concurrent_playback(self):
+        self.init_session(speed=5.0)
+        self.assertTrue(self.bcm2835_driver.enable())
+        results = []
+        sound = os.path.join(ASSET_PATH, "connected.wav")
+
+        self._run_threads(
+            lambda index: results.append(self.bcm2835_driver.alsa.play_sound(sound)), 8
+        )
+
+        pcm = self.backend.get_default_card().pcms["playback"]
+        self.assertEqual(len(results), 8)
+        self.assertGreaterEqual(results.count(True), 1)
+        self.assertEqual(results.count(False), self.backend.busy_errors)
+        self.assertEqual(pcm.opened, results.count(True))
+        self.assertFalse(pcm.is_busy())
+
+    def test_playback_consumes_frames_at_clock_rate(self):
+        self.init_session(speed=1.0)
+        self.assertTrue(self.bcm2835_driver.enable())
+        sound = os.path.join(ASSET_PATH, "connected.wav")
+        duration = self.backend.get_sound_duration(sound)
+
+        start = time.monotonic()
+        self.assertTrue(self.bcm2835_driver.alsa.play_sound(sound))
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, duration * 0.95)
+        self.assertLess(elapsed, duration + 0.2)
+
+    def test_hotplug_storm(self):
+        self.init_session()
+        self.assertTrue(self.usb_driver.enable())
+        stop = threading.Event()
+        started = threading.Barrier(4)
+        infos = []
+
+        def storm(_):
+            started.wait()
+            for index in range(200):
+                if index % 2:
+                    self.backend.add_card(make_usb_speaker_card(1))
+                else:
+                    self.backend.remove_card(1)
+            stop.set()
+
+        def query(_):
+            started.wait()
+            while not stop.is_set():
+                infos.append(self.usb_driver.get_device_infos())
+                self.usb_driver.is_enabled()
+
+        self._run_threads(lambda index: storm(index) if index == 0 else query(index), 4)
+
+        self.assertEqual(self.backend.hotplugs, 202)
+        self.assertGreater(len(infos), 0)
+        self.assertEqual(self.usb_driver.get_card_name(), "UACDemoV10")
+        # card was unplugged during storm, driver must be enabled again
+        self.assertFalse(self.usb_driver.is_enabled())
+        self.assertTrue(self.usb_driver.enable())
+        self.assertTrue(self.usb_driver.is_enabled())
+
+    def test_enable_unplugged_card(self):
+        self.init_session()
+        self.backend.remove_card(1)
+
+        self.assertFalse(self.usb_driver.enable())
+
+    def test_headset_capture(self):
+        self.init_session()
+        self.backend.remove_card(1)
+        self.backend.add_card(make_usb_headset_card(1))
+
+        self.assertEqual(self.usb_driver.get_card_capabilities(), (True, True))
+        volumes = self.usb_driver.set_volumes(capture=100)
+
+        self.assertEqual(volumes["capture"], 100)
+        control = self.backend.get_card_by_name("Headset").get_control(
+            "Mic Capture Volume"
+        )
+        self.assertEqual(control.get_percent(), 100)
+
+    def test_volume_flood(self):
+        self.init_session()
+        self.assertTrue(self.bcm2835_driver.enable())
+        self.bcm2835_driver._set_volumes_controls()
+        requested = set()
+
+        def flood(index):
+            for iteration in range(50):
+                volume = (index * 50 + iteration) % 101
+                requested.add(volume)
+                self.bcm2835_driver.set_volumes(playback=volume)
+
+        self._run_threads(flood, 16)
+
+        control = self.backend.get_default_card().get_control("PCM Playback Volume")
+        self.assertEqual(control.writes, 16 * 50)
+        volumes = self.bcm2835_driver.get_volumes()
+        self.assertIn(volumes["playback"], requested)
+
+    def test_set_negative_raw_volume(self):
+        self.init_session()
+        self.assertTrue(self.bcm2835_driver.enable())
+
+        # console fallback (no mixer session), 50% is a negative raw value
+        volumes = self.bcm2835_driver.set_volumes(playback=50)
+
+        self.assertEqual(volumes["playback"], 50)
+        control = self.backend.get_default_card().get_control("PCM Playback Volume")
+        self.assertEqual(control.values, [-1363])
+
+    def test_injected_latency(self):
+        self.init_session(latency=0.01)
+        self.bcm2835_driver._set_volumes_controls()
+        self.backend.faults.calls.clear()
+
+        start = time.monotonic()
+        self.bcm2835_driver.get_volumes()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.01)
+        # controls map is cached: single amixer call, no listing nor enumeration
+        self.assertEqual(dict(self.backend.faults.calls), {"command": 1})
+
+    def test_injected_fault(self):
+        self.init_session()
+        self.bcm2835_driver._set_volumes_controls()
+        self.backend.faults.inject("command", error=FakeAlsaError("I/O error"))
+
+        with self.assertRaises(FakeAlsaError):
+            self.bcm2835_driver.set_volumes(playback=10)
+        # fault is consumed
+        self.assertIsNotNone(self.bcm2835_driver.set_volumes(playback=10)["playback"])
+
+    def test_injected_result(self):
+        self.init_session()
+        self.backend.faults.inject("save_default_file", result=False, count=None)
+
+        self.assertFalse(self.bcm2835_driver.enable())
+        self.assertFalse(self.bcm2835_driver.enable())
+        self.backend.faults.clear()
+        self.assertTrue(self.bcm2835_driver.enable())
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audioload.py; coverage report -m -i
+    unittest.main()
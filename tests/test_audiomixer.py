@@ -0,0 +1,172 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.audiomixer import AppGains, AudioDucker, AudioMixer
+from cleep.libs.tests.common import get_log_level
+import numpy
+
+LOG_LEVEL = get_log_level()
+
+
+class TestAudioDucker(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        # -6.02dB is half gain
+        self.ducker = AudioDucker(1000, attack=0.1, release=0.2, duck_gain=-6.0206)
+        self.frames = numpy.ones((50, 2), dtype=numpy.float32)
+
+    def test_configure(self):
+        self.assertAlmostEqual(self.ducker.ducked_level, 0.5, places=4)
+        self.assertAlmostEqual(self.ducker.attack_step, 0.005, places=4)
+        self.assertAlmostEqual(self.ducker.release_step, 0.0025, places=4)
+
+    def test_configure_invalid(self):
+        with self.assertRaises(Exception) as cm:
+            self.ducker.configure(0.1, 0.1, 6.0)
+        self.assertEqual(str(cm.exception), "Invalid ducking parameters")
+
+    def test_configure_instant(self):
+        self.ducker.configure(0.0, 0.0, -6.0206)
+        self.ducker.set_ducked("voice", True)
+
+        result = self.ducker.process("voice", self.frames)
+
+        self.assertAlmostEqual(float(result[0][0]), 0.5, places=4)
+
+    def test_process_unknown_voice(self):
+        result = self.ducker.process("voice", self.frames)
+
+        self.assertIs(result, self.frames)
+
+    def test_process_attack_ramp(self):
+        self.ducker.set_ducked("voice", True)
+
+        first = self.ducker.process("voice", self.frames)
+        second = self.ducker.process("voice", self.frames)
+        third = self.ducker.process("voice", self.frames)
+
+        self.assertAlmostEqual(float(first[0][0]), 0.995, places=4)
+        self.assertAlmostEqual(float(first[-1][1]), 0.75, places=4)
+        # ramp is continuous between buffers
+        self.assertAlmostEqual(float(second[0][0]), 0.745, places=4)
+        self.assertAlmostEqual(float(second[-1][0]), 0.5, places=4)
+        self.assertTrue(numpy.allclose(third, 0.5, atol=1e-4))
+        self.assertTrue(self.ducker.is_ducked("voice"))
+
+    def test_process_release_ramp(self):
+        self.ducker.set_ducked("voice", True)
+        self.ducker.process("voice", numpy.ones((200, 2), dtype=numpy.float32))
+        self.ducker.set_ducked("voice", False)
+
+        result = self.ducker.process("voice", numpy.ones((100, 2), dtype=numpy.float32))
+
+        self.assertAlmostEqual(float(result[-1][0]), 0.75, places=3)
+        self.assertAlmostEqual(self.ducker.get_gain("voice"), 0.75, places=3)
+
+    def test_remove(self):
+        self.ducker.set_ducked("voice", True)
+        self.ducker.process("voice", self.frames)
+
+        self.ducker.remove("voice")
+
+        self.assertEqual(self.ducker.get_gain("voice"), 1.0)
+        self.assertFalse(self.ducker.is_ducked("voice"))
+
+
+class TestAppGains(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.owners = {"voice1": "app1", "voice2": "app2"}
+        self.gains = AppGains(self.owners.get)
+        self.frames = numpy.ones((10, 2), dtype=numpy.float32)
+
+    def test_set_gain(self):
+        self.gains.set_gain("app1", 0.25)
+
+        self.assertEqual(self.gains.get_gain("app1"), 0.25)
+        self.assertEqual(self.gains.get_gain("app2"), 1.0)
+        self.assertEqual(self.gains.get_gains(), {"app1": 0.25})
+
+    def test_set_gain_full_level(self):
+        self.gains.set_gain("app1", 0.25)
+
+        self.gains.set_gain("app1", 1.0)
+
+        self.assertEqual(self.gains.get_gains(), {})
+
+    def test_set_gain_invalid(self):
+        with self.assertRaises(Exception) as cm:
+            self.gains.set_gain("app1", 1.5)
+        self.assertEqual(str(cm.exception), "Invalid application gain")
+
+    def test_process(self):
+        self.gains.set_gain("app1", 0.25)
+
+        result = self.gains.process("voice1", self.frames)
+
+        self.assertEqual(result.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(result, 0.25))
+
+    def test_process_full_level(self):
+        self.gains.set_gain("app1", 0.25)
+
+        self.assertIs(self.gains.process("voice2", self.frames), self.frames)
+        self.assertIs(self.gains.process("unknown", self.frames), self.frames)
+
+
+class TestAudioMixer(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.ducker = AudioDucker(1000, attack=0.0, release=0.0, duck_gain=-6.0206)
+        self.mixer = AudioMixer(2, self.ducker)
+
+    def test_mix(self):
+        music = numpy.full((10, 2), 0.4, dtype=numpy.float32)
+        notif = numpy.full((5, 2), 0.3, dtype=numpy.float32)
+        self.ducker.set_ducked("music", True)
+
+        result = self.mixer.mix({"music": music, "notif": notif})
+
+        self.assertEqual(result.shape, (10, 2))
+        self.assertAlmostEqual(float(result[0][0]), 0.5, places=4)
+        self.assertAlmostEqual(float(result[-1][0]), 0.2, places=4)
+
+    def test_mix_clipping(self):
+        frames = numpy.full((4, 2), 0.8, dtype=numpy.float32)
+
+        result = self.mixer.mix({"a": frames, "b": frames})
+
+        self.assertTrue(numpy.array_equal(result, numpy.ones((4, 2))))
+
+    def test_mix_app_gains(self):
+        owners = {"music": "app1", "notif": "app2"}
+        gains = AppGains(owners.get)
+        gains.set_gain("app1", 0.5)
+        mixer = AudioMixer(2, self.ducker, gains)
+        music = numpy.full((4, 2), 0.4, dtype=numpy.float32)
+        notif = numpy.full((4, 2), 0.3, dtype=numpy.float32)
+        self.ducker.set_ducked("music", True)
+
+        result = mixer.mix({"music": music, "notif": notif})
+
+        # ducking and application gain are cumulated
+        self.assertAlmostEqual(float(result[0][0]), 0.4, places=4)
+
+    def test_mix_no_voice(self):
+        self.assertEqual(self.mixer.mix({}).shape, (0, 2))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audiomixer.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,263 @@
+import unittest
+import logging
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import wave
+
+sys.path.append("../")
+from backend.audioqueue import AudioQueue, decode_wav, read_wav_infos
+from backend.audioconverter import SampleFormat, frames_from_bytes
+from cleep.libs.tests.common import get_log_level
+import numpy
+
+LOG_LEVEL = get_log_level()
+
+
+class FakeOutput:
+    def __init__(self, fail_write=False):
+        self.data = b""
+        self.started = False
+        self.drained = False
+        self.stopped = False
+        self.fail_write = fail_write
+
+    def start(self):
+        self.started = True
+
+    def write(self, data):
+        if self.fail_write:
+            return False
+        self.data += data
+        return True
+
+    def drain(self, timeout=None):
+        self.drained = True
+        return True
+
+    def stop(self):
+        self.stopped = True
+
+
+class TestAudioQueue(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.path = tempfile.mkdtemp()
+        self.outputs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _write_wav(self, name, frames, rate=1000, channels=1, value=1000):
+        path = os.path.join(self.path, name)
+        data = numpy.full((frames, channels), value, dtype=numpy.int16)
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(data.tobytes())
+        return path
+
+    def _output_factory(self):
+        output = FakeOutput()
+        self.outputs.append(output)
+        return output
+
+    def _init_queue(self, **kwargs):
+        self.queue = AudioQueue(1000, 2, self._output_factory, **kwargs)
+        self.queue.CHUNK_FRAMES = 64
+
+    def _get_output_frames(self, output):
+        return frames_from_bytes(output.data, SampleFormat.S16_LE, 2)
+
+    def test_read_wav_infos(self):
+        path = self._write_wav("sound.wav", 100, rate=8000, channels=2)
+
+        self.assertEqual(read_wav_infos(path), (100, 8000, 2, SampleFormat.S16_LE))
+
+    def test_read_wav_infos_invalid_file(self):
+        path = os.path.join(self.path, "sound.wav")
+        with open(path, "w") as fd:
+            fd.write("not a wav")
+
+        with self.assertRaises(Exception) as cm:
+            read_wav_infos(path)
+        self.assertTrue(str(cm.exception).startswith("Unable to read audio file"))
+
+    def test_read_wav_infos_unsupported_sample_width(self):
+        path = os.path.join(self.path, "sound.wav")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(1)
+            wav.setframerate(8000)
+            wav.writeframes(b"\x00" * 10)
+
+        with self.assertRaises(Exception) as cm:
+            read_wav_infos(path)
+        self.assertEqual(
+            str(cm.exception), f'Unsupported sample width in audio file "{path}"'
+        )
+
+    def test_decode_wav(self):
+        path = self._write_wav("sound.wav", 100, channels=2, value=42)
+
+        frames, rate, sample_format = decode_wav(path)
+
+        self.assertEqual(frames.shape, (100, 2))
+        self.assertEqual(rate, 1000)
+        self.assertEqual(sample_format, SampleFormat.S16_LE)
+        self.assertEqual(int(frames[50][1]), 42)
+
+    def test_gapless_playback(self):
+        self._init_queue()
+        # items length is not a multiple of chunk size
+        self.queue.enqueue(self._write_wav("sound1.wav", 100, value=1000))
+        self.queue.enqueue(self._write_wav("sound2.wav", 150, value=2000))
+
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.assertEqual(len(self.outputs), 1)
+        self.assertTrue(self.outputs[0].drained)
+        frames = self._get_output_frames(self.outputs[0])
+        self.assertEqual(frames.shape, (250, 2))
+        self.assertTrue(numpy.all(frames[:100] == 1000))
+        self.assertTrue(numpy.all(frames[100:] == 2000))
+
+    def test_resampled_item(self):
+        self._init_queue()
+
+        self.queue.enqueue(self._write_wav("sound.wav", 500, rate=500, value=8000))
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        frames = self._get_output_frames(self.outputs[0])
+        self.assertEqual(len(frames), 1000)
+        # no gap nor offset introduced by resampler
+        self.assertTrue(numpy.all(numpy.abs(frames[100:900] - 8000) < 100))
+
+    def test_enqueue_after_end(self):
+        self._init_queue()
+        self.queue.enqueue(self._write_wav("sound1.wav", 100))
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.queue.enqueue(self._write_wav("sound2.wav", 100))
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.assertEqual(len(self.outputs), 2)
+        self.assertFalse(self.queue.is_playing())
+
+    def test_enqueue_invalid_file(self):
+        self._init_queue()
+
+        with self.assertRaises(Exception):
+            self.queue.enqueue(os.path.join(self.path, "dummy.wav"))
+        self.assertFalse(self.queue.is_playing())
+
+    def test_skip(self):
+        started = threading.Event()
+        resume = threading.Event()
+
+        def on_start():
+            started.set()
+            resume.wait(5.0)
+            return True
+
+        self._init_queue(on_start=on_start)
+        self.queue.enqueue(self._write_wav("sound1.wav", 100, value=1000))
+        second_id = self.queue.enqueue(self._write_wav("sound2.wav", 100, value=2000))
+        started.wait(5.0)
+
+        self.assertTrue(self.queue.skip())
+        self.assertEqual([item["id"] for item in self.queue.get_items()], [second_id])
+        resume.set()
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        frames = self._get_output_frames(self.outputs[0])
+        self.assertEqual(len(frames), 100)
+        self.assertTrue(numpy.all(frames == 2000))
+
+    def test_skip_empty_queue(self):
+        self._init_queue()
+
+        self.assertFalse(self.queue.skip())
+
+    def test_clear(self):
+        started = threading.Event()
+        resume = threading.Event()
+
+        def on_start():
+            started.set()
+            resume.wait(5.0)
+            return True
+
+        self._init_queue(on_start=on_start)
+        self.queue.enqueue(self._write_wav("sound1.wav", 100))
+        self.queue.enqueue(self._write_wav("sound2.wav", 100))
+        started.wait(5.0)
+
+        self.queue.clear()
+        resume.set()
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.assertEqual(self.queue.get_items(), [])
+        self.assertEqual(self.outputs, [])
+
+    def test_on_start_refused(self):
+        on_idle_calls = []
+        self._init_queue(
+            on_start=lambda: False, on_idle=lambda: on_idle_calls.append(1)
+        )
+
+        self.queue.enqueue(self._write_wav("sound.wav", 100))
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.assertEqual(self.outputs, [])
+        self.assertEqual(self.queue.get_items(), [])
+        self.assertEqual(on_idle_calls, [1])
+
+    def test_output_stopped(self):
+        self._init_queue()
+        self.queue.output_factory = lambda: FakeOutput(fail_write=True)
+
+        self.queue.enqueue(self._write_wav("sound.wav", 1000))
+        self.assertTrue(self.queue.wait_idle(5.0))
+
+        self.assertEqual(self.queue.get_items(), [])
+
+    def test_lookahead_budget(self):
+        started = threading.Event()
+        resume = threading.Event()
+
+        def on_start():
+            started.set()
+            resume.wait(5.0)
+            return True
+
+        # budget allows a single 100 frames item (float32 stereo) after next one
+        self._init_queue(on_start=on_start, lookahead_bytes=2 * 800)
+        for index in range(4):
+            self.queue.enqueue(self._write_wav(f"sound{index}.wav", 100))
+        started.wait(5.0)
+        # let decoder work
+        for _ in range(50):
+            items = self.queue.get_items()
+            if sum(item["decoded"] for item in items) >= 3:
+                break
+            threading.Event().wait(0.02)
+
+        self.assertEqual(
+            [item["decoded"] for item in self.queue.get_items()],
+            [True, True, True, False],
+        )
+        resume.set()
+        self.assertTrue(self.queue.wait_idle(5.0))
+        self.assertEqual(len(self._get_output_frames(self.outputs[0])), 400)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audioqueue.py; coverage report -m -i
+    unittest.main()
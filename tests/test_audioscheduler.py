@@ -0,0 +1,222 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.audioscheduler import AudioScheduler, AudioGrant, AudioPriority
+from cleep.libs.tests.common import get_log_level
+import threading
+import time
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+PLAYBACK = "audio.playback"
+
+
+class TestAudioScheduler(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.on_update = Mock()
+        self.on_resource = Mock()
+        self.scheduler = AudioScheduler(self.on_update, self.on_resource)
+
+    def get_updates(self):
+        return [
+            (call[0][0]["owner"], call[0][0]["state"])
+            for call in self.on_update.call_args_list
+        ]
+
+    def test_request_free_resource(self):
+        grant = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        self.assertEqual(grant.state, AudioGrant.STATE_ACTIVE)
+        self.assertIs(self.scheduler.get_grant(grant.id), grant)
+        self.assertFalse(self.on_update.called)
+
+    def test_request_resources_are_independent(self):
+        self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        grant = self.scheduler.request("audio.capture", "voice", AudioPriority.MUSIC)
+
+        self.assertTrue(grant.is_granted())
+
+    def test_preemption(self):
+        music = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        alarm = self.scheduler.request(PLAYBACK, "alarm", AudioPriority.ALARM)
+
+        self.assertEqual(alarm.state, AudioGrant.STATE_ACTIVE)
+        self.assertEqual(music.state, AudioGrant.STATE_PREEMPTED)
+        self.assertEqual(self.get_updates(), [("music", "preempted")])
+        self.assertIsNone(self.scheduler.get_grant(music.id))
+        self.assertFalse(self.scheduler.release(music.id))
+        self.assertEqual(self.scheduler.get_stats()["preemptions"], 1)
+
+    def test_ducking(self):
+        music = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+        notif = self.scheduler.request(
+            PLAYBACK, "notif", AudioPriority.NOTIFICATION, duck=True
+        )
+
+        self.assertEqual(music.state, AudioGrant.STATE_DUCKED)
+        self.assertTrue(music.is_granted())
+
+        self.scheduler.release(notif.id)
+
+        self.assertEqual(music.state, AudioGrant.STATE_ACTIVE)
+        self.assertEqual(notif.state, AudioGrant.STATE_RELEASED)
+        self.assertEqual(self.get_updates(), [("music", "ducked"), ("music", "active")])
+
+    def test_preemption_of_ducked_streams(self):
+        music = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+        notif = self.scheduler.request(
+            PLAYBACK, "notif", AudioPriority.NOTIFICATION, duck=True
+        )
+
+        alarm = self.scheduler.request(PLAYBACK, "alarm", AudioPriority.ALARM)
+
+        self.assertTrue(alarm.is_granted())
+        self.assertEqual(music.state, AudioGrant.STATE_PREEMPTED)
+        self.assertEqual(notif.state, AudioGrant.STATE_PREEMPTED)
+
+    def test_request_lower_priority_no_wait(self):
+        self.scheduler.request(PLAYBACK, "voice", AudioPriority.VOICE)
+
+        grant = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        self.assertEqual(grant.state, AudioGrant.STATE_TIMEOUT)
+        self.assertIsNone(self.scheduler.get_grant(grant.id))
+        self.assertEqual(self.scheduler.get_stats()["timeouts"], 1)
+
+    def test_request_wait_released_resource(self):
+        voice = self.scheduler.request(PLAYBACK, "voice", AudioPriority.VOICE)
+        threading.Timer(0.1, self.scheduler.release, args=(voice.id,)).start()
+
+        grant = self.scheduler.request(
+            PLAYBACK, "music", AudioPriority.MUSIC, timeout=2.0
+        )
+
+        self.assertEqual(grant.state, AudioGrant.STATE_ACTIVE)
+        self.assertGreaterEqual(self.scheduler.get_stats()["latency"]["max"], 100.0)
+
+    def test_request_wait_bounded(self):
+        self.scheduler.MAX_WAIT = 0.1
+        self.scheduler.request(PLAYBACK, "voice", AudioPriority.VOICE)
+
+        start = time.monotonic()
+        grant = self.scheduler.request(
+            PLAYBACK, "music", AudioPriority.MUSIC, timeout=60.0
+        )
+
+        self.assertEqual(grant.state, AudioGrant.STATE_TIMEOUT)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_waiting_requests_granted_by_priority(self):
+        voice = self.scheduler.request(PLAYBACK, "voice", AudioPriority.VOICE)
+        grants = {}
+
+        def wait(owner, priority):
+            grants[owner] = self.scheduler.request(
+                PLAYBACK, owner, priority, timeout=2.0
+            )
+
+        threads = [
+            threading.Thread(target=wait, args=("music", AudioPriority.MUSIC)),
+            threading.Thread(target=wait, args=("notif", AudioPriority.NOTIFICATION)),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.scheduler.release(voice.id)
+        threads[1].join(2.0)
+
+        self.assertEqual(grants["notif"].state, AudioGrant.STATE_ACTIVE)
+        self.scheduler.release(grants["notif"].id)
+        threads[0].join(2.0)
+        self.assertEqual(grants["music"].state, AudioGrant.STATE_ACTIVE)
+
+    def test_release_unknown_grant(self):
+        self.assertFalse(self.scheduler.release("dummy"))
+        self.assertFalse(self.scheduler.release(None))
+
+    def test_get_stats(self):
+        self.assertEqual(
+            self.scheduler.get_stats(),
+            {
+                "requests": 0,
+                "preemptions": 0,
+                "timeouts": 0,
+                "latency": {"count": 0, "mean": None, "p95": None, "max": None},
+            },
+        )
+
+        self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+        stats = self.scheduler.get_stats()
+
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["latency"]["count"], 1)
+        self.assertLess(stats["latency"]["max"], 100.0)
+
+    def test_notify_failed(self):
+        self.on_update.side_effect = Exception("Test exception")
+        self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        grant = self.scheduler.request(PLAYBACK, "alarm", AudioPriority.ALARM)
+
+        self.assertTrue(grant.is_granted())
+
+    def test_resource_used_and_freed(self):
+        music = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+        self.on_resource.assert_called_once_with(PLAYBACK)
+        self.assertTrue(self.scheduler.is_used(PLAYBACK))
+
+        notif = self.scheduler.request(
+            PLAYBACK, "notif", AudioPriority.NOTIFICATION, duck=True
+        )
+        self.scheduler.release(notif.id)
+        # resource stayed used
+        self.assertEqual(self.on_resource.call_count, 1)
+
+        self.scheduler.release(music.id)
+        self.assertEqual(self.on_resource.call_count, 2)
+        self.assertFalse(self.scheduler.is_used(PLAYBACK))
+
+    def test_resource_not_notified_on_preemption_by_request(self):
+        self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+
+        self.scheduler.request(PLAYBACK, "alarm", AudioPriority.ALARM)
+
+        self.assertEqual(self.on_resource.call_count, 1)
+
+    def test_preempt(self):
+        music = self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC)
+        notif = self.scheduler.request(
+            PLAYBACK, "notif", AudioPriority.NOTIFICATION, duck=True
+        )
+        self.on_resource.reset_mock()
+
+        self.assertEqual(self.scheduler.preempt(PLAYBACK), 2)
+
+        self.assertEqual(music.state, AudioGrant.STATE_PREEMPTED)
+        self.assertEqual(notif.state, AudioGrant.STATE_PREEMPTED)
+        self.assertIsNone(self.scheduler.get_grant(music.id))
+        self.assertFalse(self.scheduler.is_used(PLAYBACK))
+        self.on_resource.assert_called_once_with(PLAYBACK)
+        self.assertEqual(self.scheduler.get_stats()["preemptions"], 2)
+        # resource is free again for next request
+        self.assertTrue(
+            self.scheduler.request(PLAYBACK, "music", AudioPriority.MUSIC).is_granted()
+        )
+
+    def test_preempt_unused_resource(self):
+        self.assertEqual(self.scheduler.preempt(PLAYBACK), 0)
+
+        self.assertFalse(self.on_resource.called)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audioscheduler.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import logging
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append("../")
+from backend.audiosource import (
+    FileSource,
+    HttpSource,
+    PipeSource,
+    StreamSource,
+    get_source,
+)
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    content = b"0123456789" * 100
+
+    def do_GET(self):
+        if self.path != "/stream.wav":
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.content)))
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAudioSource(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _read_all(self, source):
+        source.open()
+        data = b""
+        while True:
+            chunk = source.read(64)
+            if not chunk:
+                break
+            data += chunk
+        source.close()
+        return data
+
+    def test_stream_source_not_implemented(self):
+        source = StreamSource("dummy")
+
+        with self.assertRaises(NotImplementedError):
+            source.open()
+        with self.assertRaises(NotImplementedError):
+            source.read(10)
+        with self.assertRaises(NotImplementedError):
+            source.close()
+
+    def test_pipe_source(self):
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, "wb") as fd:
+            fd.write(b"hello world")
+
+        source = PipeSource(os.fdopen(read_fd, "rb"))
+
+        self.assertEqual(self._read_all(source), b"hello world")
+        self.assertEqual(source.location, "pipe")
+
+    def test_file_source(self):
+        path = os.path.join(self.path, "sound.wav")
+        with open(path, "wb") as fd:
+            fd.write(b"\x01" * 1000)
+
+        self.assertEqual(self._read_all(FileSource(path)), b"\x01" * 1000)
+
+    def test_file_source_open_failed(self):
+        source = FileSource(os.path.join(self.path, "dummy.wav"))
+
+        with self.assertRaises(Exception) as cm:
+            source.open()
+        self.assertTrue(str(cm.exception).startswith("Unable to open"))
+        source.close()
+
+    def test_http_source(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/stream.wav"
+
+            self.assertEqual(self._read_all(HttpSource(url)), StreamHandler.content)
+
+            with self.assertRaises(Exception) as cm:
+                HttpSource(url.replace("stream", "dummy")).open()
+            self.assertTrue(str(cm.exception).startswith("Unable to open"))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_get_source(self):
+        self.assertIsInstance(get_source("http://localhost/stream"), HttpSource)
+        self.assertIsInstance(get_source("https://localhost/stream"), HttpSource)
+        self.assertIsInstance(get_source("/tmp/sound.wav"), FileSource)
+        with self.assertRaises(Exception) as cm:
+            get_source("sound.wav")
+        self.assertEqual(str(cm.exception), 'Unsupported stream location "sound.wav"')
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audiosource.py; coverage report -m -i
+    unittest.main()
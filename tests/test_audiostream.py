@@ -0,0 +1,189 @@
+import unittest
+import logging
+import sys
+import io
+import threading
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append("../")
+from backend.audiostream import AudioStream
+from backend.audiosource import HttpSource, PipeSource
+from backend.audioconverter import SampleFormat, frames_from_bytes
+from cleep.libs.tests.common import get_log_level
+import numpy
+
+LOG_LEVEL = get_log_level()
+
+
+def make_wav(frames, rate=1000, channels=1, value=1000):
+    data = io.BytesIO()
+    with wave.open(data, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(numpy.full((frames, channels), value, numpy.int16).tobytes())
+    return data.getvalue()
+
+
+class FakeOutput:
+    def __init__(self):
+        self.data = b""
+        self.written = threading.Event()
+        self.drained = False
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    def write(self, data):
+        if self.stopped:
+            return False
+        self.data += data
+        self.written.set()
+        return True
+
+    def drain(self, timeout=None):
+        self.drained = True
+        return True
+
+    def stop(self):
+        self.stopped = True
+
+
+class SlowStreamHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for a stream server: send first half of content, then wait for gate
+    """
+
+    content = b""
+    gate = None
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.content)))
+        self.end_headers()
+        half = len(self.content) // 2
+        self.wfile.write(self.content[:half])
+        self.wfile.flush()
+        self.gate.wait(5.0)
+        self.wfile.write(self.content[half:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAudioStream(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.output = FakeOutput()
+        self.ended = []
+
+    def _init_stream(self, source, **kwargs):
+        self.stream = AudioStream(
+            source,
+            1000,
+            2,
+            lambda: self.output,
+            on_end=self.ended.append,
+            high_watermark=kwargs.pop("high_watermark", 2048),
+            low_watermark=kwargs.pop("low_watermark", 1024),
+            **kwargs,
+        )
+        self.stream.CHUNK_FRAMES = 128
+
+    def _get_output_frames(self):
+        return frames_from_bytes(self.output.data, SampleFormat.S16_LE, 2)
+
+    def test_play_pipe_stream(self):
+        self._init_stream(PipeSource(io.BytesIO(make_wav(5000, value=1000))))
+
+        self.stream.start()
+        self.assertTrue(self.stream.join(5.0))
+
+        frames = self._get_output_frames()
+        self.assertEqual(frames.shape, (5000, 2))
+        self.assertTrue(numpy.all(frames == 1000))
+        self.assertTrue(self.output.drained)
+        self.assertEqual(self.stream.state, "ended")
+        self.assertEqual(self.ended, [self.stream])
+        self.assertLessEqual(
+            self.stream.buffer.get_stats()["max_buffered"],
+            2048 + self.stream.buffer.READ_SIZE,
+        )
+
+    def test_play_resampled_stream(self):
+        self._init_stream(PipeSource(io.BytesIO(make_wav(500, rate=500, value=8000))))
+
+        self.stream.start()
+        self.assertTrue(self.stream.join(5.0))
+
+        frames = self._get_output_frames()
+        self.assertAlmostEqual(len(frames), 1000, delta=50)
+        self.assertTrue(numpy.all(numpy.abs(frames[100:900] - 8000) < 100))
+
+    def test_http_playback_starts_before_download_end(self):
+        gate = threading.Event()
+        SlowStreamHandler.content = make_wav(20000)
+        SlowStreamHandler.gate = gate
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStreamHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/stream.wav"
+            self._init_stream(HttpSource(url))
+
+            self.stream.start()
+
+            self.assertTrue(self.output.written.wait(5.0))
+            self.assertEqual(self.stream.state, "playing")
+            self.assertFalse(self.stream.buffer.get_stats()["eof"])
+            gate.set()
+            self.assertTrue(self.stream.join(5.0))
+            self.assertEqual(len(self._get_output_frames()), 20000)
+            self.assertEqual(self.stream.state, "ended")
+        finally:
+            gate.set()
+            server.shutdown()
+            server.server_close()
+
+    def test_stop(self):
+        source = PipeSource(io.BytesIO(make_wav(100000)))
+        self._init_stream(source)
+        self.stream.start()
+        self.assertTrue(self.output.written.wait(5.0))
+
+        self.stream.stop()
+
+        self.assertTrue(self.stream.join(5.0))
+        self.assertEqual(self.stream.state, "stopped")
+        self.assertIsNone(self.stream.error)
+        self.assertTrue(self.output.stopped)
+
+    def test_invalid_stream(self):
+        self._init_stream(PipeSource(io.BytesIO(b"not a wav stream")))
+
+        self.stream.start()
+        self.assertTrue(self.stream.join(5.0))
+
+        self.assertEqual(self.stream.state, "failed")
+        self.assertTrue(self.stream.error.startswith("Invalid audio stream"))
+        self.assertEqual(self.ended, [self.stream])
+
+    def test_to_dict(self):
+        self._init_stream(PipeSource(io.BytesIO(b"")))
+
+        stream = self.stream.to_dict()
+
+        self.assertEqual(stream["id"], self.stream.id)
+        self.assertEqual(stream["location"], "pipe")
+        self.assertEqual(stream["state"], "buffering")
+        self.assertIsNone(stream["error"])
+        self.assertIn("buffered", stream["buffer"])
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_audiostream.py; coverage report -m -i
+    unittest.main()
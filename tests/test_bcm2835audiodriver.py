@@ -4,6 +4,7 @@ import sys
 
 sys.path.append("../")
 from backend.bcm2835audiodriver import Bcm2835AudioDriver
+from backend.controlmap import ControlMap
 from cleep.exception import (
     InvalidParameter,
     MissingParameter,
@@ -18,6 +19,19 @@ from unittest.mock import Mock, MagicMock, patch
 
 LOG_LEVEL = get_log_level()
 
+CONTENTS = [
+    "numid=3,iface=MIXER,name='PCM Playback Route'",
+    "  ; type=INTEGER,access=rw------,values=1,min=0,max=2,step=0",
+    "  : values=1",
+    "numid=1,iface=MIXER,name='PCM Playback Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=1,min=-10239,max=400,step=0",
+    "  : values=-2000",
+    "  | dBscale-min=-102.39dB,step=0.01dB,mute=1",
+    "numid=2,iface=MIXER,name='PCM Playback Switch'",
+    "  ; type=BOOLEAN,access=rw------,values=1",
+    "  : values=on",
+]
+
 
 class TestBcm2835AudioDriver(unittest.TestCase):
     def setUp(self):
@@ -35,6 +49,7 @@ class TestBcm2835AudioDriver(unittest.TestCase):
         self.driver = Bcm2835AudioDriver()
         self.driver.cleep_filesystem = Mock()
         self.driver._on_registered()
+        self.driver.controls.session_factory = None
 
     def test__get_card_name(self):
         self.driver = Bcm2835AudioDriver()
@@ -71,7 +86,7 @@ class TestBcm2835AudioDriver(unittest.TestCase):
     def test_get_card_capabilities(self):
         self.init_session()
 
-        (playback, capture) = self.driver.get_card_capabilities()
+        playback, capture = self.driver.get_card_capabilities()
 
         self.assertTrue(playback)
         self.assertFalse(capture)
@@ -150,64 +165,172 @@ class TestBcm2835AudioDriver(unittest.TestCase):
 
         self.assertFalse(self.driver.is_installed())
 
+    def test_is_intalled_memoized(self):
+        self.init_session()
+        self.driver.configtxt.is_audio_enabled = Mock(return_value=True)
+        self.driver.configtxt.enable_audio = Mock(return_value=True)
+
+        self.assertTrue(self.driver.is_installed())
+        self.assertTrue(self.driver.is_installed())
+        self.assertEqual(self.driver.configtxt.is_audio_enabled.call_count, 1)
+
+        with patch("backend.bcm2835audiodriver.Tools") as mock_tools:
+            mock_tools.raspberry_pi_infos.return_value = {"audio": True}
+            self.driver._install()
+        self.driver.is_installed()
+        self.assertEqual(self.driver.configtxt.is_audio_enabled.call_count, 2)
+
+    def init_controls(self, returncode=0):
+        console = Mock()
+        console.command.return_value = {"returncode": returncode, "stdout": CONTENTS}
+        self.driver.controls = ControlMap(console)
+        return console
+
     @patch("backend.bcm2835audiodriver.EtcAsoundConf")
     def test_enable(self, mock_asound):
         self.init_session()
         mock_alsa = MagicMock()
         self.driver.alsa = mock_alsa
         self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
-        self.driver.get_control_numid = Mock(return_value=1)
+        console = self.init_controls()
 
         self.assertTrue(self.driver.enable())
 
         self.assertTrue(mock_asound.return_value.delete.called)
         self.assertTrue(mock_asound.return_value.save_default_file.called)
-        self.assertTrue(mock_alsa.amixer_control.called)
+        console.command.assert_any_call("amixer -c 0 contents")
+        console.command.assert_called_with("amixer -c 0 cset numid=3 -- 1")
         self.assertTrue(mock_alsa.save.called)
 
     @patch("backend.bcm2835audiodriver.EtcAsoundConf")
-    @patch("backend.bcm2835audiodriver.Alsa")
-    def test_enable_no_card_infos(self, mock_alsa, mock_asound):
+    def test_enable_no_card_infos(self, mock_asound):
         self.init_session()
+        mock_alsa = MagicMock()
+        self.driver.alsa = mock_alsa
         self.driver.get_cardid_deviceid = Mock(return_value=(None, None))
+        console = self.init_controls()
 
         self.assertFalse(self.driver.enable())
 
         self.assertTrue(mock_asound.return_value.delete.called)
         self.assertFalse(mock_asound.return_value.save_default_file.called)
-        self.assertFalse(mock_alsa.return_value.amixer_control.called)
-        self.assertFalse(mock_alsa.return_value.save.called)
+        self.assertFalse(console.command.called)
+        self.assertFalse(mock_alsa.save.called)
 
     @patch("backend.bcm2835audiodriver.EtcAsoundConf")
-    @patch("backend.bcm2835audiodriver.Alsa")
-    def test_enable_alsa_save_default_file_failed(self, mock_alsa, mock_asound):
+    def test_enable_alsa_save_default_file_failed(self, mock_asound):
         mock_asound.return_value.save_default_file.return_value = False
         self.init_session()
+        mock_alsa = MagicMock()
+        self.driver.alsa = mock_alsa
         self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
 
         self.assertFalse(self.driver.enable())
 
         self.assertTrue(mock_asound.return_value.delete.called)
         self.assertTrue(mock_asound.return_value.save_default_file.called)
-        self.assertFalse(mock_alsa.return_value.amixer_control.called)
-        self.assertFalse(mock_alsa.return_value.save.called)
+        self.assertFalse(console.command.called)
+        self.assertFalse(mock_alsa.save.called)
 
     @patch("backend.bcm2835audiodriver.EtcAsoundConf")
     def test_enable_alsa_amixer_control_failed(self, mock_asound):
         self.init_session()
         mock_alsa = MagicMock()
-        mock_alsa.amixer_control.return_value = False
         self.driver.alsa = mock_alsa
         self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
-        self.driver.get_control_numid = Mock(return_value=1)
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 1, "stdout": []},
+        ]
 
         self.assertFalse(self.driver.enable())
 
         self.assertTrue(mock_asound.return_value.delete.called)
         self.assertTrue(mock_asound.return_value.save_default_file.called)
-        self.assertTrue(mock_alsa.amixer_control.called)
+        self.assertEqual(console.command.call_count, 2)
         self.assertFalse(mock_alsa.save.called)
 
+    @patch("backend.bcm2835audiodriver.EtcAsoundConf")
+    def test_enable_no_route_control(self, mock_asound):
+        self.init_session()
+        mock_alsa = MagicMock()
+        self.driver.alsa = mock_alsa
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.return_value = {"returncode": 0, "stdout": CONTENTS[3:]}
+
+        self.assertTrue(self.driver.enable())
+
+        console.command.assert_called_once_with("amixer -c 0 contents")
+        self.assertTrue(mock_alsa.save.called)
+
+    @patch("backend.bcm2835audiodriver.EtcAsoundConf")
+    def test_enable_use_output_route(self, mock_asound):
+        self.init_session()
+        self.driver.alsa = MagicMock()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[0:2] + ["  : values=2"]},
+        ]
+        self.driver.output_route = "hdmi"
+
+        self.assertTrue(self.driver.enable())
+
+        console.command.assert_called_with("amixer -c 0 cset numid=3 -- 2")
+
+    def test_get_output_route(self):
+        self.init_session()
+
+        self.assertEqual(self.driver.get_output_route(), "jack")
+
+    def test_set_output_route(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[0:2] + ["  : values=2"]},
+        ]
+
+        self.assertTrue(self.driver.set_output_route("hdmi"))
+
+        console.command.assert_called_with("amixer -c 0 cset numid=3 -- 2")
+        self.assertEqual(self.driver.get_output_route(), "hdmi")
+
+    def test_set_output_route_invalid_route(self):
+        self.init_session()
+
+        with self.assertRaises(Exception) as cm:
+            self.driver.set_output_route("spdif")
+        self.assertEqual(str(cm.exception), 'Unsupported output route "spdif"')
+
+    def test_set_output_route_no_route_control(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.return_value = {"returncode": 0, "stdout": CONTENTS[3:]}
+
+        self.assertFalse(self.driver.set_output_route("hdmi"))
+
+        self.assertEqual(self.driver.get_output_route(), "jack")
+
+    def test_set_output_route_write_failed(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 1, "stdout": []},
+        ]
+
+        self.assertFalse(self.driver.set_output_route("hdmi"))
+
+        self.assertEqual(self.driver.get_output_route(), "jack")
+
     @patch("backend.bcm2835audiodriver.EtcAsoundConf")
     def test_disable(self, mock_asound):
         self.init_session()
@@ -235,40 +358,177 @@ class TestBcm2835AudioDriver(unittest.TestCase):
 
         self.driver.is_card_enabled = Mock(return_value=False)
         mock_asound.return_value.exists.return_value = True
+        self.driver.state.invalidate()
         self.assertFalse(self.driver.is_enabled())
 
         self.driver.is_card_enabled = Mock(return_value=True)
         mock_asound.return_value.exists.return_value = False
+        self.driver.state.invalidate()
         self.assertFalse(self.driver.is_enabled())
 
+    @patch("backend.bcm2835audiodriver.EtcAsoundConf")
+    def test_is_enabled_memoized(self, mock_asound):
+        self.init_session()
+        self.driver.is_card_enabled = Mock(return_value=True)
+        mock_asound.return_value.exists.return_value = True
+
+        self.assertTrue(self.driver.is_enabled())
+        self.assertTrue(self.driver.is_enabled())
+
+        self.assertEqual(self.driver.is_card_enabled.call_count, 1)
+        self.assertEqual(mock_asound.return_value.exists.call_count, 1)
+
+    @patch("backend.bcm2835audiodriver.EtcAsoundConf")
+    def test_is_enabled_updated_by_disable(self, mock_asound):
+        self.init_session()
+        self.driver.is_card_enabled = Mock(return_value=True)
+        mock_asound.return_value.exists.return_value = True
+        mock_asound.return_value.delete.return_value = True
+        self.assertTrue(self.driver.is_enabled())
+
+        self.driver.disable()
+
+        self.assertFalse(self.driver.is_enabled())
+        self.assertEqual(mock_asound.return_value.exists.call_count, 1)
+
+    @patch("backend.bcm2835audiodriver.EtcAsoundConf")
+    def test_is_enabled_updated_by_hotplug(self, mock_asound):
+        self.init_session()
+        self.driver.is_card_enabled = Mock(return_value=True)
+        mock_asound.return_value.exists.return_value = True
+        self.assertTrue(self.driver.is_enabled())
+
+        self.driver.is_card_enabled.return_value = False
+        self.driver.on_cards_changed()
+
+        self.assertFalse(self.driver.is_enabled())
+        self.assertEqual(mock_asound.return_value.exists.call_count, 1)
+
     def test__set_volumes_controls(self):
         self.init_session()
-        self.driver.alsa = Mock()
-        self.driver.alsa.get_simple_controls.return_value = ["PCM"]
-        self.driver.get_control_numid = Mock(return_value=3)
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        self.init_controls()
 
         self.driver._set_volumes_controls()
 
         self.assertEqual(self.driver.volume_control, "PCM")
-        self.assertEqual(self.driver.volume_control_numid, 3)
+        self.assertEqual(self.driver.volume_control_numid, 1)
+
+    def test__set_volumes_controls_no_card(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(None, None))
+        self.init_controls()
+
+        self.driver._set_volumes_controls()
+
+        self.assertEqual(self.driver.volume_control, "")
+        self.assertIsNone(self.driver.volume_control_numid)
+
+    def test_controls_map_built_once(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+
+        self.driver.get_volumes()
+        self.driver.get_volumes()
+        self.driver.set_volumes(playback=50)
+
+        listings = [
+            call
+            for call in console.command.call_args_list
+            if call.args[0].endswith("contents")
+        ]
+        self.assertEqual(len(listings), 1)
+        self.assertEqual(self.driver.get_cardid_deviceid.call_count, 1)
+
+    def test_on_cards_changed(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        self.driver.get_volumes()
+
+        self.driver.on_cards_changed()
+        self.driver.get_volumes()
+
+        self.assertEqual(self.driver.get_cardid_deviceid.call_count, 2)
+        console.command.assert_any_call("amixer -c 0 contents")
 
     def test_get_volumes(self):
         self.init_session()
-        mock_alsa = Mock()
-        mock_alsa.get_volume.return_value = 66
-        self.driver.alsa = mock_alsa
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
 
         vols = self.driver.get_volumes()
-        self.assertEqual(vols, {"playback": 66, "capture": None})
+
+        console.command.assert_called_with("amixer -c 0 cget numid=1")
+        self.assertEqual(vols, {"playback": 39, "capture": None})
+
+    def test_get_volumes_no_card(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(None, None))
+        self.init_controls()
+
+        vols = self.driver.get_volumes()
+
+        self.assertEqual(vols, {"playback": None, "capture": None})
 
     def test_set_volumes(self):
         self.init_session()
-        mock_alsa = Mock()
-        mock_alsa.set_volume.return_value = 99
-        self.driver.alsa = mock_alsa
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[3:5] + ["  : values=400"]},
+        ]
+
+        vols = self.driver.set_volumes(playback=100, capture=34)
+
+        console.command.assert_called_with("amixer -c 0 cset numid=1 -- 400")
+        self.assertEqual(vols, {"playback": 100, "capture": None})
+
+    def test_set_volumes_failed(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 1, "stdout": []},
+        ]
 
-        vols = self.driver.set_volumes(playback=12, capture=34)
-        self.assertEqual(vols, {"playback": 99, "capture": None})
+        vols = self.driver.set_volumes(playback=100)
+
+        self.assertEqual(vols, {"playback": None, "capture": None})
+
+    def test_set_volumes_no_playback(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+
+        vols = self.driver.set_volumes(playback=None, capture=12)
+
+        console.command.assert_called_with("amixer -c 0 cget numid=1")
+        self.assertEqual(vols, {"playback": 39, "capture": None})
+
+    def test_get_channel_volumes(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        console = self.init_controls()
+
+        vols = self.driver.get_channel_volumes()
+
+        console.command.assert_called_with("amixer -c 0 cget numid=1")
+        self.assertEqual(vols, {"playback": [39], "capture": None})
+
+    def test_set_channel_volumes_mono_control(self):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        self.init_controls()
+
+        with self.assertRaises(Exception) as cm:
+            self.driver.set_channel_volumes(playback=[100, 50])
+        self.assertEqual(
+            str(cm.exception), 'Control "PCM Playback Volume" has 1 channel(s)'
+        )
 
     def test_require_reboot(self):
         self.init_session()
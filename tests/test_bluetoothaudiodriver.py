@@ -0,0 +1,292 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.bluetoothaudiodriver import BluetoothAudioDriver
+from cleep.libs.tests import lib
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock, patch
+
+LOG_LEVEL = get_log_level()
+
+SPEAKER = {
+    "path": "/org/bluez/hci0/dev_00_11_22_33_44_55",
+    "address": "00:11:22:33:44:55",
+    "name": "Speaker",
+    "paired": True,
+    "connected": True,
+    "a2dp_sink": True,
+    "transport": "/org/bluez/hci0/dev_00_11_22_33_44_55/fd0",
+}
+HEADPHONES = {
+    "path": "/org/bluez/hci0/dev_66_77_88_99_AA_BB",
+    "address": "66:77:88:99:AA:BB",
+    "name": "Headphones",
+    "paired": True,
+    "connected": False,
+    "a2dp_sink": True,
+    "transport": None,
+}
+KEYBOARD = {
+    "path": "/org/bluez/hci0/dev_CC_DD_EE_FF_00_11",
+    "address": "CC:DD:EE:FF:00:11",
+    "name": "Keyboard",
+    "paired": True,
+    "connected": True,
+    "a2dp_sink": False,
+    "transport": None,
+}
+
+
+class TestBluetoothAudioDriver(unittest.TestCase):
+    def setUp(self):
+        self.session = lib.TestLib()
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def tearDown(self):
+        pass
+
+    @patch("backend.bluetoothaudiodriver.BluezClient")
+    def init_session(self, mock_bluez, devices=None):
+        mock_bluez.return_value.get_devices.return_value = (
+            [dict(SPEAKER), dict(HEADPHONES), dict(KEYBOARD)]
+            if devices is None
+            else devices
+        )
+        self.driver = BluetoothAudioDriver()
+        self.driver.cleep_filesystem = Mock()
+        self.driver._on_registered()
+        self.driver.console = Mock()
+        self.bluez = self.driver.bluez
+
+    def test_get_devices(self):
+        self.init_session()
+
+        devices = self.driver.get_devices()
+
+        self.assertEqual(
+            devices,
+            [
+                {"address": "00:11:22:33:44:55", "name": "Speaker", "connected": True},
+                {
+                    "address": "66:77:88:99:AA:BB",
+                    "name": "Headphones",
+                    "connected": False,
+                },
+            ],
+        )
+
+    def test_get_devices_bluez_failed(self):
+        self.init_session()
+        self.bluez.get_devices.side_effect = Exception("Test")
+
+        self.assertEqual(self.driver.get_devices(), [])
+        self.assertIsNone(self.driver.get_card_name())
+
+    def test_get_card_name(self):
+        self.init_session()
+
+        self.assertEqual(self.driver.get_card_name(), "Speaker")
+        self.assertEqual(self.driver._get_card_name([]), "Speaker")
+
+    def test_get_card_name_no_speaker_connected(self):
+        self.init_session(devices=[dict(HEADPHONES)])
+
+        self.assertIsNone(self.driver.get_card_name())
+        self.assertFalse(self.driver.is_card_enabled())
+
+    def test_get_cardid_deviceid(self):
+        self.init_session()
+
+        self.assertEqual(self.driver.get_cardid_deviceid(), (None, None))
+
+    def test_get_card_capabilities(self):
+        self.init_session()
+
+        self.assertEqual(self.driver.get_card_capabilities(), (True, False))
+
+    def test__install(self):
+        self.init_session()
+        self.driver.console.command.return_value = {"returncode": 0}
+
+        self.assertTrue(self.driver._install())
+
+        self.assertIn("bluez-alsa-utils", self.driver.console.command.call_args[0][0])
+
+    def test__install_failed(self):
+        self.init_session()
+        self.driver.console.command.return_value = {"returncode": 1}
+
+        with self.assertRaises(Exception) as cm:
+            self.driver._install()
+        self.assertEqual(str(cm.exception), "Unable to install bluetooth audio")
+
+    def test__uninstall(self):
+        self.init_session()
+        self.driver.console.command.return_value = {"returncode": 0}
+
+        self.assertTrue(self.driver._uninstall())
+
+    def test__uninstall_failed(self):
+        self.init_session()
+        self.driver.console.command.return_value = {"returncode": 1}
+
+        with self.assertRaises(Exception) as cm:
+            self.driver._uninstall()
+        self.assertEqual(str(cm.exception), "Unable to uninstall bluetooth audio")
+
+    def test_is_installed_memoized(self):
+        self.init_session()
+        self.driver.console.command.return_value = {"returncode": 0}
+
+        self.assertTrue(self.driver.is_installed())
+        self.assertTrue(self.driver.is_installed())
+
+        self.assertEqual(self.driver.console.command.call_count, 1)
+
+    def test_enable_connected_speaker(self):
+        self.init_session()
+        self.driver.cleep_filesystem.write_data.return_value = True
+
+        self.assertTrue(self.driver.enable())
+
+        self.assertFalse(self.bluez.connect_device.called)
+        self.driver.asoundconf.delete.assert_called()
+        path, content = self.driver.cleep_filesystem.write_data.call_args[0]
+        self.assertEqual(path, "/etc/asound.conf")
+        self.assertIn('defaults.bluealsa.device "00:11:22:33:44:55"', content)
+        self.assertTrue(self.driver.state.get("asound"))
+
+    def test_enable_connect_speaker(self):
+        self.init_session()
+        self.driver.cleep_filesystem.write_data.return_value = True
+
+        self.assertTrue(self.driver.enable({"address": "66:77:88:99:AA:BB"}))
+
+        self.bluez.connect_device.assert_called_with(HEADPHONES["path"])
+        content = self.driver.cleep_filesystem.write_data.call_args[0][1]
+        self.assertIn('defaults.bluealsa.device "66:77:88:99:AA:BB"', content)
+
+    def test_enable_connect_first_paired_speaker(self):
+        self.init_session(devices=[dict(HEADPHONES)])
+        self.driver.cleep_filesystem.write_data.return_value = True
+
+        self.assertTrue(self.driver.enable())
+
+        self.bluez.connect_device.assert_called_with(HEADPHONES["path"])
+
+    def test_enable_connection_failed(self):
+        self.init_session(devices=[dict(HEADPHONES)])
+        self.bluez.connect_device.side_effect = Exception("Host is down")
+
+        self.assertFalse(self.driver.enable())
+
+        self.assertFalse(self.driver.cleep_filesystem.write_data.called)
+
+    def test_enable_no_speaker(self):
+        self.init_session(devices=[dict(KEYBOARD)])
+
+        self.assertFalse(self.driver.enable())
+        self.assertFalse(self.driver.enable({"address": "00:11:22:33:44:55"}))
+
+    def test_enable_write_asoundconf_failed(self):
+        self.init_session()
+        self.driver.cleep_filesystem.write_data.return_value = False
+
+        self.assertFalse(self.driver.enable())
+
+    def test_disable(self):
+        self.init_session()
+        self.driver.asoundconf.delete.return_value = True
+
+        self.assertTrue(self.driver.disable())
+
+        self.assertFalse(self.driver.state.get("asound"))
+        self.assertFalse(self.bluez.disconnect_device.called)
+
+    def test_disable_asound_failed(self):
+        self.init_session()
+        self.driver.asoundconf.delete.return_value = False
+
+        self.assertFalse(self.driver.disable())
+
+    def test_is_enabled(self):
+        self.init_session()
+        self.driver.asoundconf.exists.return_value = True
+        self.driver.cleep_filesystem.read_data.return_value = "type bluealsa"
+
+        self.assertTrue(self.driver.is_enabled())
+
+    def test_is_enabled_asound_not_bluetooth(self):
+        self.init_session()
+        self.driver.asoundconf.exists.return_value = True
+        self.driver.cleep_filesystem.read_data.return_value = "defaults.pcm.card 0"
+
+        self.assertFalse(self.driver.is_enabled())
+
+    def test_is_enabled_speaker_disconnected(self):
+        self.init_session()
+        self.driver.state.set("asound", True)
+
+        self.assertTrue(self.driver.is_enabled())
+        self.bluez.get_devices.return_value = [dict(HEADPHONES)]
+        self.assertFalse(self.driver.is_enabled())
+
+    def test_on_cards_changed(self):
+        self.init_session()
+
+        self.driver.on_cards_changed()
+
+        self.bluez.invalidate.assert_called()
+
+    def test_get_volumes(self):
+        self.init_session()
+        self.bluez.get_transport_volume.return_value = 64
+
+        volumes = self.driver.get_volumes()
+
+        self.assertEqual(volumes, {"playback": 50, "capture": None})
+        self.bluez.get_transport_volume.assert_called_with(SPEAKER["transport"])
+
+    def test_get_volumes_not_supported(self):
+        self.init_session()
+        self.bluez.get_transport_volume.side_effect = Exception("Test")
+
+        self.assertEqual(self.driver.get_volumes(), {"playback": None, "capture": None})
+
+    def test_get_volumes_not_streaming(self):
+        self.init_session(devices=[dict(HEADPHONES)])
+
+        self.assertEqual(self.driver.get_volumes(), {"playback": None, "capture": None})
+        self.assertFalse(self.bluez.get_transport_volume.called)
+
+    def test_set_volumes(self):
+        self.init_session()
+        self.bluez.get_transport_volume.return_value = 127
+
+        volumes = self.driver.set_volumes(playback=100, capture=50)
+
+        self.bluez.set_transport_volume.assert_called_with(SPEAKER["transport"], 127)
+        self.assertEqual(volumes, {"playback": 100, "capture": None})
+
+    def test_set_volumes_failed(self):
+        self.init_session()
+        self.bluez.set_transport_volume.side_effect = Exception("Test")
+
+        volumes = self.driver.set_volumes(playback=100)
+
+        self.assertEqual(volumes, {"playback": None, "capture": None})
+
+    def test_require_reboot(self):
+        self.init_session()
+
+        self.assertFalse(self.driver.require_reboot())
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" test_bluetoothaudiodriver.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,282 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.bluezclient import BluezClient
+from cleep.libs.tests.common import get_log_level
+from jeepney import (
+    DBusAddress,
+    HeaderFields,
+    MessageType,
+    message_bus,
+    new_error,
+    new_method_return,
+    new_signal,
+)
+from jeepney.io.blocking import open_dbus_connection
+import subprocess
+import threading
+import time
+
+LOG_LEVEL = get_log_level()
+
+SPEAKER_PATH = "/org/bluez/hci0/dev_00_11_22_33_44_55"
+PHONE_PATH = "/org/bluez/hci0/dev_66_77_88_99_AA_BB"
+TRANSPORT_PATH = SPEAKER_PATH + "/fd0"
+A2DP_SINK_UUID = "0000110b-0000-1000-8000-00805f9b34fb"
+
+
+class FakeBluez:
+    """
+    Local mock of BlueZ D-Bus service
+    """
+
+    def __init__(self, address):
+        self.conn = open_dbus_connection(bus=address)
+        self.conn.send_and_get_reply(message_bus.RequestName("org.bluez"))
+        self.calls = []
+        self.volume = 64
+        self.connect_delay = 0.0
+        self.objects = {
+            SPEAKER_PATH: {
+                "org.bluez.Device1": {
+                    "Address": ("s", "00:11:22:33:44:55"),
+                    "Alias": ("s", "Speaker"),
+                    "Paired": ("b", True),
+                    "Connected": ("b", True),
+                    "UUIDs": ("as", [A2DP_SINK_UUID]),
+                },
+            },
+            PHONE_PATH: {
+                "org.bluez.Device1": {
+                    "Address": ("s", "66:77:88:99:AA:BB"),
+                    "Name": ("s", "Phone"),
+                    "Paired": ("b", False),
+                    "Connected": ("b", False),
+                    "UUIDs": ("as", []),
+                },
+            },
+            TRANSPORT_PATH: {
+                "org.bluez.MediaTransport1": {
+                    "Device": ("o", SPEAKER_PATH),
+                    "Volume": ("q", 64),
+                },
+            },
+        }
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.conn.close()
+
+    def emit_connected(self, path, connected):
+        self.objects[path]["org.bluez.Device1"]["Connected"] = ("b", connected)
+        address = DBusAddress(path, interface="org.freedesktop.DBus.Properties")
+        self.conn.send(
+            new_signal(
+                address,
+                "PropertiesChanged",
+                "sa{sv}as",
+                ("org.bluez.Device1", {"Connected": ("b", connected)}, []),
+            )
+        )
+
+    def _serve(self):
+        while self.running:
+            try:
+                msg = self.conn.receive(timeout=0.1)
+            except TimeoutError:
+                continue
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            member = msg.header.fields[HeaderFields.member]
+            path = msg.header.fields[HeaderFields.path]
+            self.calls.append((path, member))
+            if member == "Connect" and self.connect_delay:
+                # reply later, as BlueZ does once device is connected
+                threading.Timer(
+                    self.connect_delay,
+                    lambda msg=msg, path=path: self.conn.send(
+                        self._handle(msg, path, "Connect")
+                    ),
+                ).start()
+                continue
+            self.conn.send(self._handle(msg, path, member))
+
+    def _handle(self, msg, path, member):
+        if member == "GetManagedObjects":
+            return new_method_return(msg, "a{oa{sa{sv}}}", (self.objects,))
+        if member == "Connect" and path == PHONE_PATH:
+            return new_error(msg, "org.bluez.Error.Failed", "s", ("Host is down",))
+        if member in ("Connect", "Disconnect"):
+            connected = member == "Connect"
+            self.objects[path]["org.bluez.Device1"]["Connected"] = ("b", connected)
+            return new_method_return(msg)
+        if member == "Get":
+            return new_method_return(msg, "v", (("q", self.volume),))
+        if member == "Set":
+            self.volume = msg.body[2][1]
+            return new_method_return(msg)
+        return new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod")
+
+
+class TestBluezClient(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        # private bus
+        self.daemon = subprocess.Popen(
+            ["dbus-daemon", "--session", "--print-address", "--nofork"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        )
+        self.address = self.daemon.stdout.readline().strip()
+        self.bluez = None
+        self.client = BluezClient(bus=self.address, timeout=2.0)
+
+    def tearDown(self):
+        self.client.close()
+        if self.bluez:
+            self.bluez.stop()
+        self.daemon.terminate()
+        self.daemon.wait()
+        self.daemon.stdout.close()
+
+    def init_session(self):
+        self.bluez = FakeBluez(self.address)
+
+    def _count_calls(self, member):
+        return len([call for call in self.bluez.calls if call[1] == member])
+
+    def _wait_until(self, condition, timeout=2.0):
+        end = time.monotonic() + timeout
+        while not condition() and time.monotonic() < end:
+            time.sleep(0.05)
+        return condition()
+
+    def test_get_devices(self):
+        self.init_session()
+
+        devices = self.client.get_devices()
+
+        self.assertEqual(
+            devices,
+            [
+                {
+                    "path": SPEAKER_PATH,
+                    "address": "00:11:22:33:44:55",
+                    "name": "Speaker",
+                    "paired": True,
+                    "connected": True,
+                    "a2dp_sink": True,
+                    "transport": TRANSPORT_PATH,
+                },
+                {
+                    "path": PHONE_PATH,
+                    "address": "66:77:88:99:AA:BB",
+                    "name": "Phone",
+                    "paired": False,
+                    "connected": False,
+                    "a2dp_sink": False,
+                    "transport": None,
+                },
+            ],
+        )
+
+    def test_get_devices_cached(self):
+        self.init_session()
+
+        self.client.get_devices()
+        self.client.get_devices()
+
+        self.assertEqual(self._count_calls("GetManagedObjects"), 1)
+
+    def test_get_devices_updated_by_signal(self):
+        self.init_session()
+        self.client.get_devices()
+
+        self.bluez.emit_connected(SPEAKER_PATH, False)
+
+        self.assertTrue(
+            self._wait_until(lambda: not self.client.get_devices()[0]["connected"])
+        )
+        self.assertEqual(self._count_calls("GetManagedObjects"), 2)
+
+    def test_get_devices_invalidate(self):
+        self.init_session()
+        self.client.get_devices()
+
+        self.client.invalidate()
+        self.client.get_devices()
+
+        self.assertEqual(self._count_calls("GetManagedObjects"), 2)
+
+    def test_get_devices_bluez_not_running(self):
+        with self.assertRaises(Exception) as cm:
+            self.client.get_devices()
+        self.assertIn("GetManagedObjects failed", str(cm.exception))
+
+    def test_single_connection_reopened_after_close(self):
+        self.init_session()
+        self.client.get_devices()
+
+        self.client.close()
+        devices = self.client.get_devices()
+
+        self.assertEqual(len(devices), 2)
+        self.assertEqual(self._count_calls("GetManagedObjects"), 2)
+
+    def test_connect_device(self):
+        self.init_session()
+        self.client.get_devices()
+
+        self.client.disconnect_device(SPEAKER_PATH)
+        self.assertFalse(self.client.get_devices()[0]["connected"])
+        self.client.connect_device(SPEAKER_PATH)
+        self.assertTrue(self.client.get_devices()[0]["connected"])
+
+    def test_connect_device_does_not_block_other_calls(self):
+        self.init_session()
+        self.client.disconnect_device(SPEAKER_PATH)
+        self.bluez.connect_delay = 0.5
+        thread = threading.Thread(
+            target=self.client.connect_device, args=(SPEAKER_PATH,)
+        )
+        thread.start()
+        self.assertTrue(self._wait_until(lambda: self._count_calls("Connect") == 1))
+
+        start = time.monotonic()
+        self.assertEqual(self.client.get_transport_volume(TRANSPORT_PATH), 64)
+        self.assertLess(time.monotonic() - start, 0.4)
+
+        thread.join()
+        self.assertTrue(self.client.get_devices()[0]["connected"])
+
+    def test_connect_device_failed(self):
+        self.init_session()
+
+        with self.assertRaises(Exception) as cm:
+            self.client.connect_device(PHONE_PATH)
+        self.assertIn("Host is down", str(cm.exception))
+
+        # connection is kept after bluez error
+        self.assertEqual(len(self.client.get_devices()), 2)
+
+    def test_transport_volume(self):
+        self.init_session()
+
+        self.assertEqual(self.client.get_transport_volume(TRANSPORT_PATH), 64)
+        self.client.set_transport_volume(TRANSPORT_PATH, 100)
+        self.assertEqual(self.client.get_transport_volume(TRANSPORT_PATH), 100)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_bluezclient.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.cardwatcher import CardWatcher
+from cleep.libs.tests.common import get_log_level
+import os
+import tempfile
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+
+class TestCardWatcher(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        handle, self.cards_path = tempfile.mkstemp()
+        os.close(handle)
+        self.write_cards(" 0 [Headphones     ]: bcm2835_headpho - bcm2835 Headphones\n")
+        self.on_change = Mock()
+        self.watcher = CardWatcher(self.on_change, cards_path=self.cards_path)
+
+    def tearDown(self):
+        if os.path.exists(self.cards_path):
+            os.remove(self.cards_path)
+
+    def write_cards(self, content):
+        with open(self.cards_path, "w", encoding="utf-8") as cards_file:
+            cards_file.write(content)
+
+    def test_first_check(self):
+        self.assertFalse(self.watcher.check())
+
+        self.assertFalse(self.on_change.called)
+
+    def test_check_no_change(self):
+        self.watcher.check()
+
+        self.assertFalse(self.watcher.check())
+
+        self.assertFalse(self.on_change.called)
+
+    def test_check_card_added(self):
+        self.watcher.check()
+        cards = (
+            " 0 [Headphones     ]: bcm2835_headpho - bcm2835 Headphones\n"
+            " 1 [UACDemoV10     ]: USB-Audio - UACDemoV1.0\n"
+        )
+        self.write_cards(cards)
+
+        self.assertTrue(self.watcher.check())
+
+        self.on_change.assert_called_once_with(cards)
+        self.assertFalse(self.watcher.check())
+
+    def test_check_cards_file_removed(self):
+        self.watcher.check()
+        os.remove(self.cards_path)
+
+        self.assertTrue(self.watcher.check())
+
+        self.on_change.assert_called_once_with("")
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_cardwatcher.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.configtxtbatch import ConfigTxtBatch
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+CONFIG_TXT = """# For more options and information see
+dtparam=audio=on
+#dtoverlay=hifiberry-dac
+
+[pi4]
+dtoverlay=vc4-fkms-v3d
+max_framebuffers=2
+"""
+
+
+class TestConfigTxtBatch(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.cleep_filesystem = Mock()
+        self.cleep_filesystem.read_data.return_value = CONFIG_TXT
+        self.cleep_filesystem.write_data.return_value = True
+        self.batch = ConfigTxtBatch(self.cleep_filesystem)
+
+    def _get_written_lines(self):
+        return self.cleep_filesystem.write_data.call_args[0][1].splitlines()
+
+    def test_get_overlays(self):
+        self.assertEqual(self.batch.get_overlays(), ["vc4-fkms-v3d"])
+        self.assertTrue(self.batch.has_overlay("vc4-fkms-v3d"))
+        self.assertFalse(self.batch.has_overlay("hifiberry-dac"))
+        self.cleep_filesystem.read_data.assert_called_once_with("/boot/config.txt")
+
+    def test_get_overlay_params(self):
+        self.cleep_filesystem.read_data.return_value = (
+            "dtoverlay=iqaudio-dacplus,unmute_amp\n"
+        )
+
+        self.assertEqual(
+            self.batch.get_overlay_params("iqaudio-dacplus"), ["unmute_amp"]
+        )
+        self.assertIsNone(self.batch.get_overlay_params("hifiberry-dac"))
+
+    def test_get_dtparam(self):
+        self.assertEqual(self.batch.get_dtparam("audio"), "on")
+        self.assertIsNone(self.batch.get_dtparam("spi"))
+
+    def test_batched_edits_single_write(self):
+        with ConfigTxtBatch(self.cleep_filesystem) as batch:
+            batch.add_overlay("iqaudio-dacplus", ["unmute_amp"])
+            batch.set_dtparam("audio", "off")
+            batch.set_dtparam("i2s", "on")
+
+        self.cleep_filesystem.read_data.assert_called_once()
+        self.cleep_filesystem.write_data.assert_called_once()
+        lines = self._get_written_lines()
+        self.assertIn("dtparam=audio=off", lines)
+        self.assertNotIn("dtparam=audio=on", lines)
+        # lines appended in [all] section, not in conditional [pi4] section
+        self.assertEqual(
+            lines[-3:],
+            ["[all]", "dtoverlay=iqaudio-dacplus,unmute_amp", "dtparam=i2s=on"],
+        )
+
+    def test_no_write_if_unchanged(self):
+        with ConfigTxtBatch(self.cleep_filesystem) as batch:
+            batch.set_dtparam("audio", "on")
+            batch.add_overlay("vc4-fkms-v3d")
+            batch.remove_overlay("hifiberry-dac")
+
+        self.assertFalse(self.cleep_filesystem.write_data.called)
+
+    def test_add_overlay_replace_params(self):
+        self.cleep_filesystem.read_data.return_value = (
+            "dtoverlay=iqaudio-dacplus\ndtoverlay=iqaudio-dacplus,auto_mute_amp\n"
+        )
+
+        self.batch.add_overlay("iqaudio-dacplus", ["unmute_amp"])
+        self.batch.commit()
+
+        self.assertEqual(
+            self._get_written_lines(), ["dtoverlay=iqaudio-dacplus,unmute_amp"]
+        )
+
+    def test_remove_overlay(self):
+        self.batch.remove_overlay("vc4-fkms-v3d")
+        self.batch.commit()
+
+        lines = self._get_written_lines()
+        self.assertNotIn("dtoverlay=vc4-fkms-v3d", lines)
+        # commented line is kept
+        self.assertIn("#dtoverlay=hifiberry-dac", lines)
+
+    def test_empty_file(self):
+        self.cleep_filesystem.read_data.return_value = None
+
+        self.batch.set_dtparam("audio", "off")
+        self.batch.commit()
+
+        self.assertEqual(self._get_written_lines(), ["dtparam=audio=off"])
+
+    def test_write_failed(self):
+        self.cleep_filesystem.write_data.return_value = False
+
+        with self.assertRaises(Exception) as cm:
+            with ConfigTxtBatch(self.cleep_filesystem) as batch:
+                batch.set_dtparam("audio", "off")
+        self.assertEqual(str(cm.exception), "Unable to write /boot/config.txt")
+
+    def test_no_write_on_error(self):
+        with self.assertRaises(ValueError):
+            with ConfigTxtBatch(self.cleep_filesystem) as batch:
+                batch.set_dtparam("audio", "off")
+                raise ValueError("Test")
+
+        self.assertFalse(self.cleep_filesystem.write_data.called)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" test_configtxtbatch.py; coverage report -m -i
+    unittest.main()
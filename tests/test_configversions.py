@@ -0,0 +1,64 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.configversions import ConfigVersions
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+
+class TestConfigVersions(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.versions = ConfigVersions()
+
+    def test_set(self):
+        self.assertTrue(self.versions.set("volumes", {"playback": 10}))
+        self.assertFalse(self.versions.set("volumes", {"playback": 10}))
+        self.assertTrue(self.versions.set("volumes", {"playback": 20}))
+
+        self.assertEqual(self.versions.version, 2)
+
+    def test_update(self):
+        version = self.versions.update({"route": "jack", "routes": ["jack"]})
+
+        self.assertEqual(version, 2)
+        self.assertEqual(self.versions.update({"route": "jack", "routes": ["jack"]}), 2)
+
+    def test_get_changes(self):
+        self.versions.update({"route": "jack", "volumes": {"playback": 10}})
+        version = self.versions.version
+
+        self.versions.set("route", "hdmi")
+
+        self.assertEqual(self.versions.get_changes(version), {"route": "hdmi"})
+        self.assertEqual(
+            self.versions.get_changes(0),
+            {"route": "hdmi", "volumes": {"playback": 10}},
+        )
+        self.assertEqual(self.versions.get_changes(self.versions.version), {})
+
+    def test_get_changes_unknown_version(self):
+        self.versions.set("route", "jack")
+
+        self.assertEqual(self.versions.get_changes(100), {"route": "jack"})
+
+    def test_values_are_copied(self):
+        volumes = {"playback": 10}
+        self.versions.set("volumes", volumes)
+
+        volumes["playback"] = 20
+
+        self.assertTrue(self.versions.set("volumes", volumes))
+        self.versions.get_changes(0)["volumes"]["playback"] = 30
+        self.assertEqual(self.versions.get_changes(0)["volumes"], {"playback": 20})
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_configversions.py; coverage report -m -i
+    unittest.main()
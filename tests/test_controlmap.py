@@ -0,0 +1,406 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.controlmap import ControlMap
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+CONTENTS = [
+    "numid=3,iface=MIXER,name='PCM Playback Route'",
+    "  ; type=INTEGER,access=rw------,values=1,min=0,max=2,step=0",
+    "  : values=1",
+    "numid=1,iface=MIXER,name='PCM Playback Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=1,min=-10239,max=400,step=0",
+    "  : values=-2000",
+    "  | dBscale-min=-102.39dB,step=0.01dB,mute=1",
+    "numid=2,iface=MIXER,name='PCM Playback Switch'",
+    "  ; type=BOOLEAN,access=rw------,values=1",
+    "  : values=on",
+    "numid=4,iface=MIXER,name='Mic Capture Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=2,min=0,max=127,step=0",
+    "  : values=64,32",
+    "  | dBminmax-min=0.00dB,max=23.81dB",
+    "numid=5,iface=MIXER,name='Input Source'",
+    "  ; type=ENUMERATED,access=rw------,values=1,items=2",
+    "  ; Item #0 'Mic'",
+    "  ; Item #1 'Line'",
+    "  : values=1",
+]
+
+
+class TestControlMap(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.console = Mock()
+        self.console.command.return_value = {"returncode": 0, "stdout": CONTENTS}
+        self.controls = ControlMap(self.console)
+
+    def test_parse_contents(self):
+        controls = ControlMap.parse_contents(CONTENTS)
+
+        self.assertEqual(len(controls), 5)
+        self.assertDictEqual(
+            controls["PCM Playback Volume"],
+            {
+                "numid": 1,
+                "iface": "MIXER",
+                "name": "PCM Playback Volume",
+                "type": "INTEGER",
+                "channels": 1,
+                "min": -10239,
+                "max": 400,
+                "values": [-2000],
+                "items": [],
+                "db_min": -102.39,
+                "db_max": -102.39 + 0.01 * 10639,
+                "lines": 4,
+                "table": None,
+            },
+        )
+        self.assertEqual(controls["PCM Playback Switch"]["values"], [1])
+        self.assertEqual(controls["PCM Playback Switch"]["max"], 1)
+        self.assertEqual(controls["Mic Capture Volume"]["values"], [64, 32])
+        self.assertEqual(controls["Mic Capture Volume"]["db_max"], 23.81)
+        self.assertEqual(controls["Input Source"]["items"], ["Mic", "Line"])
+        self.assertEqual(controls["Input Source"]["lines"], 5)
+        self.assertEqual(controls["PCM Playback Switch"]["lines"], 3)
+        self.assertIsNone(controls["Input Source"]["min"])
+
+    def test_parse_contents_ignore_invalid_lines(self):
+        controls = ControlMap.parse_contents(["  : values=1", "dummy"] + CONTENTS[0:3])
+
+        self.assertEqual(list(controls.keys()), ["PCM Playback Route"])
+
+    def test_build(self):
+        self.assertFalse(self.controls.is_built())
+
+        self.assertTrue(self.controls.build(0))
+
+        self.console.command.assert_called_with("amixer -c 0 contents")
+        self.assertTrue(self.controls.is_built())
+        self.assertEqual(self.controls.card_id, 0)
+        self.assertEqual(len(self.controls.get_controls()), 5)
+
+    def test_build_failed(self):
+        self.console.command.return_value = {"returncode": 1, "stdout": []}
+
+        self.assertFalse(self.controls.build(0))
+
+        self.assertFalse(self.controls.is_built())
+
+    def test_invalidate(self):
+        self.controls.build(0)
+
+        self.controls.invalidate()
+
+        self.assertFalse(self.controls.is_built())
+        self.assertIsNone(self.controls.card_id)
+        self.assertEqual(self.controls.get_controls(), [])
+
+    def test_find(self):
+        self.controls.build(0)
+
+        self.assertEqual(self.controls.find("Playback")["numid"], 1)
+        self.assertEqual(self.controls.get_numid("Route"), 3)
+        self.assertIsNone(self.controls.find("Headphone"))
+        self.assertIsNone(self.controls.get_numid("Headphone"))
+
+    def test_find_not_built(self):
+        self.assertIsNone(self.controls.find("Playback"))
+
+    def test_read(self):
+        self.controls.build(0)
+        control = self.controls.find("Playback Volume")
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[3:6] + ["  : values=-100"],
+        }
+
+        values = self.controls.read(control)
+
+        self.console.command.assert_called_with("amixer -c 0 cget numid=1")
+        self.assertEqual(values, [-100])
+        self.assertEqual(control["values"], [-100])
+
+    def test_write(self):
+        self.controls.build(1)
+        control = self.controls.find("Capture Volume")
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[10:12] + ["  : values=10,20"],
+        }
+
+        values = self.controls.write(control, [10, 20])
+
+        self.console.command.assert_called_with("amixer -c 1 cset numid=4 -- 10,20")
+        self.assertEqual(values, [10, 20])
+
+    def test_write_failed(self):
+        self.controls.build(0)
+        control = self.controls.find("Playback Volume")
+        self.console.command.return_value = {"returncode": 1, "stdout": []}
+
+        self.assertIsNone(self.controls.write(control, [0]))
+        self.assertEqual(control["values"], [-2000])
+
+    def test_write_unexpected_output(self):
+        self.controls.build(0)
+        control = self.controls.find("Playback Volume")
+        self.console.command.return_value = {"returncode": 0, "stdout": CONTENTS[0:3]}
+
+        self.assertIsNone(self.controls.write(control, [0]))
+
+    def init_session(self):
+        session = Mock()
+        session.execute.return_value = [CONTENTS[0:3]]
+        self.controls.session_factory = Mock(return_value=session)
+        return session
+
+    def test_write_session(self):
+        session = self.init_session()
+        self.controls.build(1)
+        control = self.controls.find("Capture Volume")
+        session.execute.return_value = [
+            CONTENTS[10:12] + ["  : values=10,20", CONTENTS[13]]
+        ]
+
+        values = self.controls.write(control, [10, 20])
+        self.controls.write(control, [10, 20])
+
+        self.controls.session_factory.assert_called_once_with(1)
+        session.execute.assert_called_with([(4, "10,20", 4)])
+        self.assertEqual(values, [10, 20])
+        self.assertEqual(control["values"], [10, 20])
+        self.assertEqual(self.console.command.call_count, 1)
+
+    def test_write_session_failed(self):
+        session = self.init_session()
+        self.controls.build(1)
+        control = self.controls.find("Capture Volume")
+        session.execute.return_value = None
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[10:12] + ["  : values=10,20"],
+        }
+
+        values = self.controls.write(control, [10, 20])
+        self.controls.write(control, [10, 20])
+
+        self.assertEqual(values, [10, 20])
+        self.console.command.assert_called_with("amixer -c 1 cset numid=4 -- 10,20")
+        # session is not used anymore for this control
+        self.assertEqual(session.execute.call_count, 1)
+
+    def test_invalidate_close_session(self):
+        session = self.init_session()
+        self.controls.build(0)
+        self.controls.write(self.controls.find("Route"), [0])
+
+        self.controls.invalidate()
+
+        session.close.assert_called()
+
+    def test_build_other_card_close_session(self):
+        session = self.init_session()
+        self.controls.build(0)
+        self.controls.write(self.controls.find("Route"), [0])
+
+        self.controls.build(0)
+        self.assertFalse(session.close.called)
+        self.controls.build(1)
+        session.close.assert_called()
+
+    def test_transaction(self):
+        self.controls.build(0)
+        playback = self.controls.find("Playback Volume")
+        capture = self.controls.find("Capture Volume")
+        route = self.controls.find("Route")
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[10:12]
+            + ["  : values=127,127"]
+            + CONTENTS[3:5]
+            + ["  : values=400"]
+            + CONTENTS[0:2]
+            + ["  : values=2"],
+        }
+
+        transaction = self.controls.transaction()
+        transaction.set_percent(capture, None).set_percent(playback, 100)
+        transaction.write(route, [2]).commit()
+
+        self.console.command.assert_called_with(
+            "amixer -c 0 cget numid=4 ; amixer -c 0 cset numid=1 -- 400 ; amixer -c 0 cset numid=3 -- 2"
+        )
+        self.assertEqual(transaction.get_percent(capture), 100)
+        self.assertEqual(transaction.get_percent(playback), 100)
+        self.assertEqual(transaction.get(route), [2])
+        self.assertEqual(route["values"], [2])
+
+    def test_transaction_partial_failure(self):
+        self.controls.build(0)
+        playback = self.controls.find("Playback Volume")
+        capture = self.controls.find("Capture Volume")
+        self.console.command.return_value = {
+            "returncode": 1,
+            "stdout": CONTENTS[10:12] + ["  : values=0,0"],
+        }
+
+        transaction = self.controls.transaction()
+        transaction.set_percent(capture, 0).set_percent(playback, 100).commit()
+
+        self.assertEqual(transaction.get_percent(capture), 0)
+        self.assertIsNone(transaction.get_percent(playback))
+        self.assertEqual(playback["values"], [-2000])
+
+    def test_transaction_channels(self):
+        self.controls.build(0)
+        capture = self.controls.find("Capture Volume")
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[10:12] + ["  : values=127,78"],
+        }
+
+        transaction = self.controls.transaction()
+        transaction.set_percents(capture, [100, 50]).commit()
+
+        self.console.command.assert_called_with("amixer -c 0 cset numid=4 -- 127,78")
+        self.assertEqual(transaction.get_percents(capture), [100, 50])
+        self.assertEqual(transaction.get_percent(capture), 100)
+
+    def test_transaction_channels_read(self):
+        self.controls.build(0)
+        capture = self.controls.find("Capture Volume")
+        self.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[10:13],
+        }
+
+        transaction = self.controls.transaction()
+        transaction.set_percents(capture, None).commit()
+
+        self.console.command.assert_called_with("amixer -c 0 cget numid=4")
+        self.assertEqual(transaction.get_percents(capture), [39, 17])
+
+    def test_transaction_channels_invalid(self):
+        self.controls.build(0)
+        capture = self.controls.find("Capture Volume")
+
+        with self.assertRaises(Exception) as cm:
+            self.controls.transaction().set_percents(capture, [100])
+        self.assertEqual(
+            str(cm.exception), 'Control "Mic Capture Volume" has 2 channel(s)'
+        )
+
+    def test_transaction_without_controls(self):
+        transaction = self.controls.transaction()
+        transaction.set_percent(None, 10).read(None).write(None, [1]).commit()
+
+        self.assertFalse(self.console.command.called)
+        self.assertIsNone(transaction.get_percent(None))
+
+    def test_transaction_writes_through_session(self):
+        session = self.init_session()
+        self.controls.build(0)
+        playback = self.controls.find("Playback Volume")
+        route = self.controls.find("Route")
+        session.execute.return_value = [
+            CONTENTS[3:5] + ["  : values=400", CONTENTS[6]],
+            CONTENTS[0:2] + ["  : values=0"],
+        ]
+
+        transaction = self.controls.transaction()
+        transaction.set_percent(playback, 100).write(route, [0]).commit()
+
+        session.execute.assert_called_once_with([(1, "400", 4), (3, "0", 3)])
+        self.assertEqual(self.console.command.call_count, 1)
+        self.assertEqual(transaction.get(playback), [400])
+        self.assertEqual(transaction.get(route), [0])
+
+    def test_percent_conversions(self):
+        control = ControlMap.parse_contents(CONTENTS)["PCM Playback Volume"]
+
+        self.assertEqual(ControlMap.percent_to_raw(control, 0), -10239)
+        self.assertEqual(ControlMap.percent_to_raw(control, 100), 400)
+        self.assertEqual(ControlMap.raw_to_percent(control, 400), 100)
+        self.assertEqual(ControlMap.raw_to_percent(control, -10239), 0)
+        self.assertEqual(
+            ControlMap.raw_to_percent(control, ControlMap.percent_to_raw(control, 42)),
+            42,
+        )
+
+    def test_percent_conversions_perceptual(self):
+        control = ControlMap.parse_contents(CONTENTS)["PCM Playback Volume"]
+
+        # half volume is about 18dB under max, not half of dB range
+        raw = ControlMap.percent_to_raw(control, 50)
+        self.assertEqual(raw, -1363)
+        self.assertEqual(ControlMap.raw_to_percent(control, -2000), 39)
+        self.assertEqual(ControlMap.percent_to_raw(control, 150), 400)
+        self.assertEqual(ControlMap.percent_to_raw(control, -1), -10239)
+        self.assertTrue(
+            all(
+                ControlMap.raw_to_percent(
+                    control, ControlMap.percent_to_raw(control, percent)
+                )
+                == percent
+                for percent in range(101)
+            )
+        )
+
+    def test_volume_table_cached(self):
+        self.controls.build(0)
+        control = self.controls.find("Playback Volume")
+
+        table = ControlMap.get_volume_table(control)
+
+        self.assertEqual(len(table), 101)
+        self.assertIs(ControlMap.get_volume_table(control), table)
+        self.controls.build(0)
+        self.assertIsNone(self.controls.find("Playback Volume")["table"])
+
+    def test_volume_table_soft_gain(self):
+        control = {"min": 0, "max": 100, "db_min": None, "db_max": None}
+
+        table = ControlMap.get_volume_table(control)
+
+        self.assertEqual(table[0], 0)
+        self.assertEqual(table[100], 100)
+        # raw value is a linear gain: half volume is far below half raw range
+        self.assertEqual(table[50], 17)
+        self.assertEqual(table, sorted(table))
+
+    def test_raw_to_percent_small_range(self):
+        control = ControlMap.parse_contents(
+            [
+                "numid=2,iface=MIXER,name='PCM Playback Volume'",
+                "  ; type=INTEGER,access=rw---R--,values=2,min=0,max=30,step=0",
+                "  : values=20,20",
+                "  | dBminmax-min=-45.00dB,max=0.00dB",
+            ]
+        )["PCM Playback Volume"]
+
+        # several percentages share a raw value: middle one is returned
+        self.assertEqual(
+            ControlMap.raw_to_percent(control, ControlMap.percent_to_raw(control, 50)),
+            50,
+        )
+        self.assertEqual(ControlMap.raw_to_percent(control, 30), 100)
+        self.assertEqual(ControlMap.raw_to_percent(control, 0), 0)
+
+    def test_raw_to_percent_no_range(self):
+        control = ControlMap.parse_contents(CONTENTS)["Input Source"]
+
+        self.assertEqual(ControlMap.raw_to_percent(control, 1), 0)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_controlmap.py; coverage report -m -i
+    unittest.main()
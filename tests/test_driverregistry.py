@@ -0,0 +1,183 @@
+import unittest
+import logging
+import sys
+import tempfile
+import os
+
+sys.path.append("../")
+from backend.driverregistry import DriverRegistry, has_bluetooth_adapter
+from backend.bcm2835audiodriver import Bcm2835AudioDriver
+from backend.usbaudiodriver import UsbAudioDriver
+from backend.i2saudiodriver import I2sAudioDriver
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock, patch
+
+LOG_LEVEL = get_log_level()
+
+USB_CARDS = """ 0 [Headphones     ]: bcm2835_headpho - bcm2835 Headphones
+                      bcm2835 Headphones
+ 1 [UACDemoV10     ]: USB-Audio - UACDemoV1.0
+                      Jieli Technology UACDemoV1.0 at usb-3f980000.usb-1.4, full speed
+"""
+
+
+class FakeDriver:
+    def __init__(self):
+        self.name = "Fake driver"
+
+
+FAKE_SPEC = {
+    "target": "test_driverregistry:FakeDriver",
+    "card_pattern": r"FakeCard",
+}
+
+
+class TestDriverRegistry(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        bluetooth_patcher = patch(
+            "backend.driverregistry.BLUETOOTH_ADAPTERS_PATH", "/dummy/bluetooth"
+        )
+        bluetooth_patcher.start()
+        self.addCleanup(bluetooth_patcher.stop)
+        self.registry = DriverRegistry()
+        self.registry._read_entry_points = Mock(return_value=[])
+
+    def _make_entry_point(self, name, spec):
+        entry_point = Mock()
+        entry_point.name = name
+        entry_point.load.return_value = spec
+        return entry_point
+
+    @patch("backend.driverregistry.Tools")
+    def test_discover_applicable_drivers(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": True}
+
+        drivers = self.registry.discover(USB_CARDS)
+
+        self.assertEqual(len(drivers), 3)
+        self.assertTrue(isinstance(drivers[0], Bcm2835AudioDriver))
+        self.assertTrue(isinstance(drivers[1], UsbAudioDriver))
+        self.assertTrue(isinstance(drivers[2], I2sAudioDriver))
+
+    @patch("backend.driverregistry.Tools")
+    def test_discover_skip_not_applicable_drivers(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": False}
+
+        drivers = self.registry.discover("")
+
+        self.assertEqual(drivers, [])
+        self.assertEqual(self.registry.get_drivers(), {})
+
+    @patch("backend.driverregistry.Tools")
+    def test_discover_required_driver(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": False}
+
+        drivers = self.registry.discover("", ["USB audio device"])
+
+        self.assertEqual(len(drivers), 1)
+        self.assertTrue(isinstance(drivers[0], UsbAudioDriver))
+
+    @patch("backend.driverregistry.Tools")
+    def test_discover_returns_new_drivers_only(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": True}
+        self.registry.discover("")
+
+        drivers = self.registry.discover(USB_CARDS)
+
+        self.assertEqual(len(drivers), 1)
+        self.assertTrue(isinstance(drivers[0], UsbAudioDriver))
+        self.assertEqual(len(self.registry.get_drivers()), 3)
+
+    @patch("backend.driverregistry.Tools")
+    def test_discover_read_cards(self, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": False}
+        with tempfile.NamedTemporaryFile("w", delete=False) as cards_file:
+            cards_file.write(USB_CARDS)
+        self.addCleanup(os.remove, cards_file.name)
+        self.registry.cards_path = cards_file.name
+
+        drivers = self.registry.discover()
+
+        self.assertEqual(len(drivers), 1)
+
+    def test_has_bluetooth_adapter(self):
+        with tempfile.TemporaryDirectory() as adapters_path:
+            with patch("backend.driverregistry.BLUETOOTH_ADAPTERS_PATH", adapters_path):
+                self.assertFalse(has_bluetooth_adapter(""))
+                os.mkdir(os.path.join(adapters_path, "hci0"))
+                self.assertTrue(has_bluetooth_adapter(""))
+
+        self.assertFalse(has_bluetooth_adapter(""))
+
+    def test_read_cards_no_file(self):
+        self.registry.cards_path = "/dummy/cards"
+
+        self.assertEqual(self.registry._read_cards(), "")
+
+    def test_is_applicable_probe_failed(self):
+        spec = {"name": "driver", "probe": Mock(side_effect=Exception("Test"))}
+
+        self.assertFalse(self.registry.is_applicable(spec, USB_CARDS))
+
+    def test_load_unknown_driver(self):
+        self.assertIsNone(self.registry.load("dummy"))
+
+    def test_load_invalid_target(self):
+        self.registry._read_entry_points.return_value = [
+            {"name": "Dummy driver", "target": "dummymodule:Dummy"}
+        ]
+
+        self.assertIsNone(self.registry.load("Dummy driver"))
+        self.assertEqual(self.registry.get_drivers(), {})
+
+    def test_load_driver_once(self):
+        driver = self.registry.load("USB audio device")
+
+        self.assertIs(self.registry.load("USB audio device"), driver)
+
+    @patch("backend.driverregistry.Tools")
+    @patch("backend.driverregistry.importlib.metadata.entry_points")
+    def test_entry_points_drivers(self, mock_entry_points, mock_tools):
+        mock_tools.raspberry_pi_infos.return_value = {"audio": False}
+        mock_entry_points.return_value = [
+            self._make_entry_point("Fake driver", FAKE_SPEC),
+            self._make_entry_point("Invalid driver", {"card_pattern": "Invalid"}),
+        ]
+        registry = DriverRegistry()
+
+        specs = registry.get_specs()
+        drivers = registry.discover(" 2 [Fake]: FakeCard - Fake", ["dummy"])
+
+        mock_entry_points.assert_called_with(group="cleep.audio.drivers")
+        self.assertIn("Fake driver", specs)
+        self.assertNotIn("Invalid driver", specs)
+        self.assertEqual([driver.name for driver in drivers], ["Fake driver"])
+
+    @patch("backend.driverregistry.importlib.metadata.entry_points")
+    def test_entry_points_spec_load_failed(self, mock_entry_points):
+        entry_point = self._make_entry_point("Fake driver", None)
+        entry_point.load.side_effect = Exception("Test")
+        mock_entry_points.return_value = [entry_point]
+        registry = DriverRegistry()
+
+        self.assertNotIn("Fake driver", registry.get_specs())
+
+    @patch("backend.driverregistry.importlib.metadata.entry_points")
+    def test_entry_points_builtin_driver_not_overriden(self, mock_entry_points):
+        mock_entry_points.return_value = [
+            self._make_entry_point("USB audio device", FAKE_SPEC),
+        ]
+        registry = DriverRegistry()
+
+        spec = registry.get_specs()["USB audio device"]
+
+        self.assertEqual(spec["target"], ".usbaudiodriver:UsbAudioDriver")
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" test_driverregistry.py; coverage report -m -i
+    unittest.main()
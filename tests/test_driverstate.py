@@ -0,0 +1,81 @@
+import unittest
+import logging
+import sys
+import threading
+
+sys.path.append("../")
+from backend.driverstate import DriverState
+from cleep.libs.tests.common import get_log_level
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+
+class TestDriverState(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.card = Mock(return_value=True)
+        self.asound = Mock(return_value=False)
+        self.state = DriverState({"card": self.card, "asound": self.asound})
+
+    def test_get_memoized(self):
+        self.assertTrue(self.state.get("card"))
+        self.assertTrue(self.state.get("card"))
+
+        self.assertEqual(self.card.call_count, 1)
+        self.assertTrue(self.state.is_known("card"))
+        self.assertFalse(self.state.is_known("asound"))
+
+    def test_set(self):
+        self.state.set("asound", True)
+
+        self.assertTrue(self.state.get("asound"))
+        self.assertFalse(self.asound.called)
+
+    def test_invalidate(self):
+        self.state.get("card")
+        self.state.get("asound")
+
+        self.state.invalidate("card")
+        self.state.get("card")
+        self.state.get("asound")
+
+        self.assertEqual(self.card.call_count, 2)
+        self.assertEqual(self.asound.call_count, 1)
+
+    def test_invalidate_all(self):
+        self.state.get("card")
+        self.state.get("asound")
+
+        self.state.invalidate()
+
+        self.assertFalse(self.state.is_known("card"))
+        self.assertFalse(self.state.is_known("asound"))
+
+    def test_value_probed_during_invalidation_not_memoized(self):
+        probing = threading.Event()
+        resume = threading.Event()
+
+        def slow_probe():
+            probing.set()
+            resume.wait(5.0)
+            return True
+
+        self.state.probes["card"] = slow_probe
+        thread = threading.Thread(target=self.state.get, args=("card",))
+        thread.start()
+        probing.wait(5.0)
+
+        self.state.invalidate("card")
+        resume.set()
+        thread.join(5.0)
+
+        self.assertFalse(self.state.is_known("card"))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_driverstate.py; coverage report -m -i
+    unittest.main()
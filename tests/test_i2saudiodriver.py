@@ -0,0 +1,286 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.i2saudiodriver import I2sAudioDriver
+from cleep.libs.tests import lib
+from cleep.libs.tests.common import get_log_level
+import os
+import tempfile
+from unittest.mock import Mock, patch
+
+LOG_LEVEL = get_log_level()
+
+CONTENTS = [
+    "numid=1,iface=MIXER,name='Digital Playback Switch'",
+    "  ; type=BOOLEAN,access=rw------,values=2",
+    "  : values=on,on",
+    "numid=2,iface=MIXER,name='Digital Playback Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=2,min=0,max=207,step=0",
+    "  : values=207,207",
+    "  | dBscale-min=-103.50dB,step=0.50dB,mute=1",
+]
+
+
+class TestI2sAudioDriver(unittest.TestCase):
+    def setUp(self):
+        self.session = lib.TestLib()
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def tearDown(self):
+        pass
+
+    @patch("backend.i2saudiodriver.EtcAsoundConf")
+    def init_session(
+        self, mock_asound, config_txt="dtparam=audio=on\n", card_name="sndrpihifiberry"
+    ):
+        self.driver = I2sAudioDriver()
+        self.driver.cleep_filesystem = Mock()
+        self.driver.cleep_filesystem.read_data.return_value = config_txt
+        self.driver.cleep_filesystem.write_data.return_value = True
+        self.driver._get_card_name = Mock(return_value=card_name)
+        self.driver.get_cardid_deviceid = Mock(return_value=(0, 0))
+        self.driver._on_registered()
+        self.driver.alsa = Mock()
+        self.driver.console = Mock()
+        self.driver.controls.console = self.driver.console
+        self.driver.controls.session_factory = None
+        self.driver.console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS,
+        }
+
+    def _get_written_config(self):
+        return self.driver.cleep_filesystem.write_data.call_args[0][1].splitlines()
+
+    def test__get_card_name(self):
+        self.driver = I2sAudioDriver()
+        devices_names = [
+            {
+                "card_name": "Headphones",
+                "card_desc": "bcm2835 Headphones",
+                "device_name": "Headphones",
+                "device_desc": "bcm2835 Headphones",
+            },
+            {
+                "card_name": "sndrpihifiberry",
+                "card_desc": "snd_rpi_hifiberry_dacplus",
+                "device_name": "HiFiBerry DAC+ HiFi pcm512x-hifi-0",
+                "device_desc": "HiFiBerry DAC+ HiFi pcm512x-hifi-0",
+            },
+        ]
+
+        self.assertEqual(self.driver._get_card_name(devices_names), "sndrpihifiberry")
+        self.assertIsNone(self.driver._get_card_name(devices_names[:1]))
+
+    def test_get_hats(self):
+        self.init_session()
+
+        hats = self.driver.get_hats()
+
+        self.assertIn("HiFiBerry DAC+/Amp2", hats)
+        self.assertIn("IQaudIO DigiAMP+", hats)
+
+    def test_get_installed_hat(self):
+        self.init_session(config_txt="dtoverlay=iqaudio-dacplus,unmute_amp\n")
+
+        self.assertEqual(self.driver.get_installed_hat()["name"], "IQaudIO DigiAMP+")
+
+    def test_get_installed_hat_same_overlay_other_params(self):
+        self.init_session(config_txt="dtoverlay=iqaudio-dacplus,auto_mute_amp\n")
+
+        self.assertEqual(self.driver.get_installed_hat()["name"], "IQaudIO DAC/DAC+")
+
+    def test_get_installed_hat_memoized(self):
+        self.init_session(config_txt="dtoverlay=hifiberry-dacplus\n")
+
+        self.driver.get_installed_hat()
+        self.assertTrue(self.driver.is_installed())
+
+        self.assertEqual(self.driver.cleep_filesystem.read_data.call_count, 1)
+
+    def test_is_installed_not_installed(self):
+        self.init_session()
+
+        self.assertFalse(self.driver.is_installed())
+
+    def test_detect_hat(self):
+        self.init_session()
+        with tempfile.NamedTemporaryFile("w", delete=False) as product_file:
+            product_file.write("HiFiBerry DAC+ Pro\x00")
+        self.addCleanup(os.remove, product_file.name)
+        self.driver.HAT_PRODUCT_PATH = product_file.name
+
+        self.assertEqual(self.driver.detect_hat()["overlay"], "hifiberry-dacplus")
+
+    def test_detect_hat_no_eeprom(self):
+        self.init_session()
+        self.driver.HAT_PRODUCT_PATH = "/dummy/product"
+
+        self.assertIsNone(self.driver.detect_hat())
+
+    def test__install(self):
+        self.init_session(config_txt="dtparam=audio=on\ndtoverlay=hifiberry-dac\n")
+
+        self.assertTrue(self.driver._install({"hat": "IQaudIO DigiAMP+"}))
+
+        self.driver.asoundconf.delete.assert_called()
+        self.driver.cleep_filesystem.write_data.assert_called_once()
+        self.assertEqual(
+            self._get_written_config(),
+            ["dtparam=audio=off", "dtoverlay=iqaudio-dacplus,unmute_amp"],
+        )
+        self.driver.cleep_filesystem.read_data.return_value = (
+            self.driver.cleep_filesystem.write_data.call_args[0][1]
+        )
+        self.assertEqual(self.driver.get_installed_hat()["name"], "IQaudIO DigiAMP+")
+
+    def test__install_detected_hat(self):
+        self.init_session()
+        self.driver.detect_hat = Mock(return_value=self.driver.hats[1])
+
+        self.assertTrue(self.driver._install())
+
+        self.assertIn("dtoverlay=hifiberry-dacplus", self._get_written_config())
+
+    def test__install_unsupported_hat(self):
+        self.init_session()
+        self.driver.detect_hat = Mock(return_value=None)
+
+        with self.assertRaises(Exception) as cm:
+            self.driver._install()
+        self.assertEqual(str(cm.exception), "Unsupported I2S HAT")
+        with self.assertRaises(Exception):
+            self.driver._install({"hat": "dummy"})
+        self.assertFalse(self.driver.cleep_filesystem.write_data.called)
+
+    def test__install_write_failed(self):
+        self.init_session()
+        self.driver.cleep_filesystem.write_data.return_value = False
+
+        with self.assertRaises(Exception) as cm:
+            self.driver._install({"hat": "HiFiBerry Amp+"})
+        self.assertEqual(str(cm.exception), "Unable to write /boot/config.txt")
+
+    def test__uninstall(self):
+        self.init_session(
+            config_txt="dtparam=audio=off\ndtoverlay=hifiberry-dacplus\ndtoverlay=vc4-kms-v3d\n"
+        )
+        self.assertTrue(self.driver.is_installed())
+
+        self.assertTrue(self.driver._uninstall())
+
+        self.driver.cleep_filesystem.write_data.assert_called_once()
+        self.assertEqual(
+            self._get_written_config(), ["dtparam=audio=on", "dtoverlay=vc4-kms-v3d"]
+        )
+        self.driver.cleep_filesystem.read_data.return_value = "dtparam=audio=on\n"
+        self.assertFalse(self.driver.is_installed())
+
+    def test_get_card_capabilities(self):
+        self.init_session(config_txt="dtoverlay=seeed-2mic-voicecard\n")
+
+        self.assertEqual(self.driver.get_card_capabilities(), (True, True))
+
+    def test_enable(self):
+        self.init_session()
+        self.driver.asoundconf.save_default_file.return_value = True
+
+        self.assertTrue(self.driver.enable())
+
+        self.driver.asoundconf.save_default_file.assert_called_with(0, 0)
+        self.driver.alsa.save.assert_called()
+
+    def test_enable_no_card(self):
+        self.init_session(card_name=None)
+
+        self.assertFalse(self.driver.enable())
+        self.assertFalse(self.driver.asoundconf.save_default_file.called)
+
+    def test_enable_asoundconf_failed(self):
+        self.init_session()
+        self.driver.asoundconf.save_default_file.return_value = False
+
+        self.assertFalse(self.driver.enable())
+
+    def test_disable(self):
+        self.init_session()
+        self.driver.asoundconf.delete.return_value = True
+
+        self.assertTrue(self.driver.disable())
+        self.assertFalse(self.driver.state.get("asound"))
+
+    def test_disable_failed(self):
+        self.init_session()
+        self.driver.asoundconf.delete.return_value = False
+
+        self.assertFalse(self.driver.disable())
+
+    def test_on_cards_changed(self):
+        self.init_session()
+        self.driver.controls = Mock()
+
+        self.driver.on_cards_changed()
+
+        self.driver.controls.invalidate.assert_called()
+        self.assertFalse(self.driver.state.is_known("card"))
+
+    def test_get_volumes(self):
+        self.init_session(config_txt="dtoverlay=hifiberry-dacplus\n")
+
+        volumes = self.driver.get_volumes()
+
+        self.assertEqual(volumes, {"playback": 100, "capture": None})
+
+    def test_get_volumes_no_hardware_volume(self):
+        self.init_session(config_txt="dtoverlay=hifiberry-dac\n")
+
+        volumes = self.driver.get_volumes()
+
+        self.assertEqual(volumes, {"playback": None, "capture": None})
+        self.assertFalse(self.driver.console.command.called)
+
+    def test_set_volumes(self):
+        self.init_session(config_txt="dtoverlay=hifiberry-dacplus\n")
+        self.driver.console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {
+                "returncode": 0,
+                "stdout": CONTENTS[3:5] + ["  : values=172,172"],
+            },
+        ]
+
+        volumes = self.driver.set_volumes(playback=50)
+
+        self.assertEqual(volumes, {"playback": 50, "capture": None})
+
+    def test_set_channel_volumes(self):
+        self.init_session(config_txt="dtoverlay=hifiberry-dacplus\n")
+        self.driver.console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {
+                "returncode": 0,
+                "stdout": CONTENTS[3:5] + ["  : values=207,172"],
+            },
+        ]
+
+        volumes = self.driver.set_channel_volumes(playback=[100, 50])
+
+        self.driver.console.command.assert_called_with(
+            "amixer -c 0 cset numid=2 -- 207,172"
+        )
+        self.assertEqual(volumes, {"playback": [100, 50], "capture": None})
+
+    def test_require_reboot(self):
+        self.init_session()
+
+        self.assertTrue(self.driver.require_reboot())
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" test_i2saudiodriver.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,189 @@
+import unittest
+import logging
+import sys
+import time
+
+sys.path.append("../")
+from backend.idlemanager import OutputIdleManager
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+
+class FakePlayback:
+    def __init__(self, start_error=None):
+        self.rate = 1000
+        self.frame_size = 2
+        self.running = False
+        self.starts = 0
+        self.drains = 0
+        self.data = b""
+        self.start_error = start_error
+
+    def is_running(self):
+        return self.running
+
+    def start(self):
+        if self.start_error:
+            raise Exception(self.start_error)
+        self.running = True
+        self.starts += 1
+
+    def write(self, data):
+        self.data += data
+        return True
+
+    def drain(self, timeout=None):
+        self.running = False
+        self.drains += 1
+        return True
+
+    def stop(self):
+        self.running = False
+
+
+class TestOutputIdleManager(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.playbacks = []
+        self.manager = OutputIdleManager(self._playback_factory, idle_timeout=0.2)
+
+    def tearDown(self):
+        self.manager.suspend()
+
+    def _playback_factory(self):
+        playback = FakePlayback()
+        self.playbacks.append(playback)
+        return playback
+
+    def _play(self, data=b"data"):
+        output = self.manager.get_output()
+        output.start()
+        output.write(data)
+        return output.drain()
+
+    def test_output_reused_between_sounds(self):
+        self.assertTrue(self._play())
+        self.assertEqual(self.manager.get_state(), "idle")
+        self.assertTrue(self._play())
+
+        self.assertEqual(len(self.playbacks), 1)
+        self.assertEqual(self.playbacks[0].starts, 1)
+        self.assertEqual(self.playbacks[0].data, b"datadata")
+        self.assertEqual(self.manager.get_stats()["wakeups"], 1)
+
+    def test_silence_written_while_idle(self):
+        self._play()
+
+        time.sleep(0.15)
+
+        self.assertTrue(self.playbacks[0].data.startswith(b"data"))
+        silence = self.playbacks[0].data[4:]
+        self.assertGreaterEqual(len(silence), 100)
+        self.assertEqual(len(silence) % 100, 0)
+        self.assertEqual(silence, bytes(len(silence)))
+
+    def test_silence_stopped_when_output_used(self):
+        self._play()
+        time.sleep(0.08)
+
+        output = self.manager.get_output()
+        written = len(self.playbacks[0].data)
+        time.sleep(0.12)
+
+        self.assertEqual(len(self.playbacks[0].data), written)
+        output.drain()
+
+    def test_silence_stopped_when_suspended(self):
+        self._play()
+
+        time.sleep(0.3)
+        written = len(self.playbacks[0].data)
+        time.sleep(0.1)
+
+        self.assertEqual(self.manager.get_state(), "suspended")
+        self.assertEqual(len(self.playbacks[0].data), written)
+
+    def test_output_suspended_after_idle_timeout(self):
+        self._play()
+
+        time.sleep(0.4)
+
+        self.assertEqual(self.manager.get_state(), "suspended")
+        self.assertEqual(self.playbacks[0].drains, 1)
+        self.assertEqual(self.manager.get_stats()["suspends"], 1)
+        self._play()
+        self.assertEqual(len(self.playbacks), 2)
+
+    def test_output_not_suspended_while_active(self):
+        output = self.manager.get_output()
+        output.start()
+
+        time.sleep(0.4)
+
+        self.assertEqual(self.manager.get_state(), "active")
+        self.manager.suspend()
+        self.assertTrue(self.playbacks[0].is_running())
+        output.drain()
+
+    def test_prewarm(self):
+        self.manager.prewarm()
+
+        self.assertEqual(self.manager.get_state(), "idle")
+        self.assertTrue(self.playbacks[0].is_running())
+        self._play()
+        self.assertEqual(len(self.playbacks), 1)
+        self.assertEqual(self.playbacks[0].starts, 1)
+
+    def test_prewarm_suspended_if_not_used(self):
+        self.manager.prewarm()
+
+        time.sleep(0.4)
+
+        self.assertEqual(self.manager.get_state(), "suspended")
+
+    def test_prewarm_failed(self):
+        self.manager.playback_factory = lambda: FakePlayback("Device busy")
+
+        self.manager.prewarm()
+
+        self.assertEqual(self.manager.get_stats()["wakeups"], 0)
+
+    def test_dedicated_output_when_in_use(self):
+        output = self.manager.get_output()
+        output.start()
+
+        other = self.manager.get_output()
+        other.start()
+        other.drain()
+
+        self.assertEqual(len(self.playbacks), 2)
+        self.assertEqual(self.playbacks[1].drains, 1)
+        self.assertEqual(self.manager.get_state(), "active")
+        output.drain()
+
+    def test_stopped_output_is_closed(self):
+        output = self.manager.get_output()
+        output.start()
+
+        output.stop()
+
+        self.assertEqual(self.manager.get_state(), "suspended")
+
+    def test_stats(self):
+        self._play()
+
+        stats = self.manager.get_stats()
+
+        self.assertEqual(stats["idle_timeout"], 0.2)
+        self.assertEqual(stats["latency"]["count"], 1)
+        self.assertIsNotNone(stats["latency"]["mean"])
+        self.assertIsNotNone(stats["latency"]["max"])
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_idlemanager.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,219 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.levelmeter import (
+    LevelMeter,
+    LevelMeterStream,
+    SILENCE_DBFS,
+    compute_levels,
+    to_dbfs,
+)
+from backend.audioconverter import SampleFormat, frames_to_bytes
+from cleep.libs.tests.common import get_log_level
+import numpy
+import threading
+from unittest.mock import Mock
+
+LOG_LEVEL = get_log_level()
+
+
+class TestLevels(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def test_to_dbfs(self):
+        result = to_dbfs(numpy.array([1.0, 0.5, 0.0]))
+
+        self.assertAlmostEqual(result[0], 0.0)
+        self.assertAlmostEqual(result[1], -6.0206, places=3)
+        self.assertEqual(result[2], SILENCE_DBFS)
+
+    def test_compute_levels(self):
+        sine = numpy.sin(2.0 * numpy.pi * numpy.arange(800) / 80.0) * 0.5
+        frames = numpy.stack([sine, numpy.zeros(800)], axis=1).reshape(2, 400, 2)
+
+        rms, peak = compute_levels(frames)
+
+        self.assertEqual(rms.shape, (2, 2))
+        # sine rms is peak/sqrt(2): -3dB below peak
+        self.assertAlmostEqual(peak[0][0], -6.02, places=1)
+        self.assertAlmostEqual(rms[0][0], -9.03, places=1)
+        self.assertEqual(rms[1][1], SILENCE_DBFS)
+
+
+class TestLevelMeter(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def test_window(self):
+        meter = LevelMeter(16000, 1, update_rate=20.0)
+
+        self.assertEqual(meter.window, 800)
+
+    def test_invalid_update_rate(self):
+        with self.assertRaises(Exception) as cm:
+            LevelMeter(16000, 1, update_rate=0)
+        self.assertEqual(str(cm.exception), "Invalid level meter update rate 0")
+
+    def test_process_decimates_chunks(self):
+        meter = LevelMeter(16000, 2, update_rate=20.0)
+        frames = numpy.full((1000, 2), 16384, dtype="<i2")
+
+        first = meter.process(frames)
+        second = meter.process(frames)
+
+        self.assertEqual(len(first), 1)
+        # 200 pending frames + 1000 new frames
+        self.assertEqual(len(second), 1)
+        self.assertEqual(first[0], {"rms": [-6.0, -6.0], "peak": [-6.0, -6.0]})
+
+    def test_process_several_windows(self):
+        meter = LevelMeter(16000, 1, update_rate=20.0)
+        frames = numpy.zeros((2400, 1), dtype="<i2")
+        frames[800:1600] = 32767
+
+        levels = meter.process(frames)
+
+        self.assertEqual([level["peak"] for level in levels], [[-96.0], [0.0], [-96.0]])
+
+    def test_process_bytes(self):
+        meter = LevelMeter(16000, 1, update_rate=20.0)
+        raw = frames_to_bytes(numpy.full((800, 1), 32767, dtype="<i2"))
+
+        levels = meter.process_bytes(raw)
+
+        self.assertEqual(levels, [{"rms": [0.0], "peak": [0.0]}])
+
+    def test_reset(self):
+        meter = LevelMeter(16000, 1, update_rate=20.0)
+        meter.process(numpy.zeros((799, 1), dtype="<i2"))
+
+        meter.reset()
+
+        self.assertEqual(meter.process(numpy.zeros((1, 1), dtype="<i2")), [])
+
+    def test_float_format(self):
+        meter = LevelMeter(8000, 1, SampleFormat.FLOAT_LE, update_rate=10.0)
+
+        levels = meter.process(numpy.full((800, 1), 0.1, dtype=numpy.float32))
+
+        self.assertEqual(levels, [{"rms": [-20.0], "peak": [-20.0]}])
+
+
+class TestLevelMeterStream(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.capture = Mock(rate=16000, channels=1, sample_format=SampleFormat.S16_LE)
+        self.done = threading.Event()
+        self.levels = []
+
+    def on_level(self, level):
+        self.levels.append(level)
+
+    def make_reads(self, count):
+        chunk = frames_to_bytes(numpy.full((800, 1), 32767, dtype="<i2"))
+        reads = [chunk] * count
+
+        def read(frames):
+            if reads:
+                return reads.pop()
+            self.done.set()
+            return None
+
+        self.capture.read.side_effect = read
+
+    def test_run(self):
+        self.make_reads(3)
+        stream = LevelMeterStream(self.capture, self.on_level, update_rate=20.0)
+
+        stream.start()
+        self.assertTrue(self.done.wait(2.0))
+        stream.stop()
+
+        self.capture.start.assert_called()
+        self.capture.read.assert_called_with(800)
+        self.assertEqual(len(self.levels), 3)
+        self.assertFalse(stream.is_running())
+        self.capture.stop.assert_called()
+
+    def test_start_already_running(self):
+        self.capture.read.side_effect = lambda frames: self.done.wait(2.0) and None
+        stream = LevelMeterStream(self.capture, self.on_level)
+        stream.start()
+
+        with self.assertRaises(Exception) as cm:
+            stream.start()
+        self.assertEqual(str(cm.exception), "Level meter is already running")
+
+        self.done.set()
+        stream.stop()
+
+    def test_max_duration(self):
+        self.capture.read.return_value = frames_to_bytes(
+            numpy.zeros((800, 1), dtype="<i2")
+        )
+        stream = LevelMeterStream(self.capture, self.on_level, max_duration=0.0)
+
+        stream.start()
+        stream.stop()
+
+        self.assertEqual(self.levels, [])
+        self.assertFalse(stream.is_running())
+
+    def test_max_duration_notifies_stop(self):
+        self.capture.read.return_value = frames_to_bytes(
+            numpy.zeros((800, 1), dtype="<i2")
+        )
+        stopped = threading.Event()
+        stream = LevelMeterStream(
+            self.capture, self.on_level, max_duration=0.0, on_stop=stopped.set
+        )
+
+        stream.start()
+
+        self.assertTrue(stopped.wait(2.0))
+        self.assertFalse(stream.is_running())
+
+    def test_stop_joins_reader_before_closing_capture(self):
+        calls = []
+        self.capture.read.side_effect = lambda frames: self.done.wait(2.0) and None
+        self.capture.interrupt.side_effect = lambda: (
+            calls.append("interrupt"),
+            self.done.set(),
+        )
+        self.capture.stop.side_effect = lambda: calls.append("stop")
+        stream = LevelMeterStream(
+            self.capture, self.on_level, on_stop=lambda: calls.append("on_stop")
+        )
+        stream.start()
+
+        stream.stop()
+
+        # reader thread stops capture itself, stream stop is then a no-op
+        self.assertEqual(calls[:3], ["interrupt", "stop", "on_stop"])
+
+    def test_capture_error(self):
+        self.capture.read.side_effect = Exception("Test exception")
+        stream = LevelMeterStream(self.capture, self.on_level)
+
+        stream.start()
+        stream.stop()
+
+        self.assertFalse(stream.is_running())
+        self.capture.stop.assert_called()
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_levelmeter.py; coverage report -m -i
+    unittest.main()
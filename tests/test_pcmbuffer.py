@@ -0,0 +1,62 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.pcmbuffer import PcmBuffer
+from backend.audioconverter import SampleFormat
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+
+class TestPcmBuffer(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.buffer = PcmBuffer(1000, channels=2, max_duration=0.5)
+
+    def test_capacity(self):
+        self.assertEqual(self.buffer.capacity, 2000)
+        self.assertEqual(PcmBuffer(1000, 1, SampleFormat.S32_LE, 1.0).capacity, 4000)
+
+    def test_write(self):
+        self.assertEqual(self.buffer.write(b"\x01" * 400), 400)
+
+        self.assertEqual(len(self.buffer), 400)
+        self.assertAlmostEqual(self.buffer.get_duration(), 0.1)
+        self.assertFalse(self.buffer.is_full())
+        self.assertEqual(bytes(self.buffer.get_view()), b"\x01" * 400)
+
+    def test_write_overflow(self):
+        self.buffer.write(b"\x01" * 1500)
+
+        self.assertEqual(self.buffer.write(b"\x02" * 1000), 500)
+
+        self.assertTrue(self.buffer.is_full())
+        self.assertEqual(self.buffer.write(b"\x03"), 0)
+        self.assertEqual(bytes(self.buffer.get_view()[-500:]), b"\x02" * 500)
+
+    def test_get_chunks(self):
+        self.buffer.write(bytes(range(10)))
+
+        chunks = [bytes(chunk) for chunk in self.buffer.get_chunks(1)]
+
+        self.assertEqual(
+            chunks, [bytes(range(i, i + 4)) for i in (0, 4)] + [b"\x08\x09"]
+        )
+
+    def test_clear(self):
+        self.buffer.write(b"\x01" * 400)
+
+        self.buffer.clear()
+
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(list(self.buffer.get_chunks(10)), [])
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_pcmbuffer.py; coverage report -m -i
+    unittest.main()
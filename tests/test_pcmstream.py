@@ -0,0 +1,190 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.pcmstream import PcmCapture, PcmPlayback
+from backend.audioconverter import SampleFormat
+from cleep.libs.tests.common import get_log_level
+import io
+import subprocess
+from unittest.mock import Mock, patch
+
+LOG_LEVEL = get_log_level()
+
+
+class TestPcmCapture(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.capture = PcmCapture(16000, channels=2)
+
+    def init_process(self, mock_popen, data):
+        process = Mock()
+        process.stdout = io.BytesIO(data)
+        process.poll.return_value = None
+        mock_popen.return_value = process
+        return process
+
+    def test_get_command(self):
+        capture = PcmCapture(48000, 1, SampleFormat.S32_LE, device="hw:1,0")
+
+        self.assertEqual(
+            capture.get_command(),
+            ["arecord", "-q", "-D", "hw:1,0", "-t", "raw", "-f", "S32_LE"]
+            + ["-r", "48000", "-c", "1"],
+        )
+        self.assertEqual(capture.frame_size, 4)
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_start(self, mock_popen):
+        self.init_process(mock_popen, b"")
+
+        self.capture.start()
+
+        self.assertEqual(mock_popen.call_args[0][0], self.capture.get_command())
+        self.assertTrue(self.capture.is_running())
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_start_already_running(self, mock_popen):
+        self.init_process(mock_popen, b"")
+        self.capture.start()
+
+        with self.assertRaises(Exception) as cm:
+            self.capture.start()
+        self.assertEqual(str(cm.exception), "Stream is already running")
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_read(self, mock_popen):
+        self.init_process(mock_popen, bytes(range(12)))
+        self.capture.start()
+
+        self.assertEqual(self.capture.read(2), bytes(range(8)))
+        # not enough data for a complete chunk
+        self.assertIsNone(self.capture.read(2))
+
+    def test_read_not_started(self):
+        self.assertIsNone(self.capture.read(2))
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_stop(self, mock_popen):
+        process = self.init_process(mock_popen, b"")
+        self.capture.start()
+
+        self.capture.stop()
+        self.capture.stop()
+
+        process.terminate.assert_called_once()
+        self.assertTrue(process.stdout.closed)
+        self.assertFalse(self.capture.is_running())
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_interrupt(self, mock_popen):
+        process = self.init_process(mock_popen, b"")
+        process.poll.return_value = None
+        self.capture.start()
+
+        self.capture.interrupt()
+
+        process.terminate.assert_called_once()
+        self.assertFalse(process.stdout.closed)
+
+
+class TestPcmPlayback(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.playback = PcmPlayback(16000)
+
+    def init_process(self, mock_popen, returncode=0):
+        process = Mock()
+        process.stdin = io.BytesIO()
+        process.poll.return_value = None
+        process.returncode = returncode
+        mock_popen.return_value = process
+        return process
+
+    def test_get_command(self):
+        self.assertEqual(self.playback.get_command()[0], "aplay")
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_write(self, mock_popen):
+        process = self.init_process(mock_popen)
+        self.playback.start()
+
+        self.assertTrue(self.playback.write(b"\x01\x02"))
+
+        self.assertEqual(process.stdin.getvalue(), b"\x01\x02")
+        self.assertIn("stdin", mock_popen.call_args[1])
+
+    def test_write_not_started(self):
+        self.assertFalse(self.playback.write(b"\x01\x02"))
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_write_broken_pipe(self, mock_popen):
+        process = self.init_process(mock_popen)
+        process.stdin = Mock()
+        process.stdin.write.side_effect = BrokenPipeError()
+        self.playback.start()
+
+        self.assertFalse(self.playback.write(b"\x01\x02"))
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_drain(self, mock_popen):
+        process = self.init_process(mock_popen)
+        self.playback.start()
+
+        self.assertTrue(self.playback.drain(timeout=2.0))
+
+        self.assertTrue(process.stdin.closed)
+        process.wait.assert_called_with(timeout=2.0)
+        self.assertFalse(process.terminate.called)
+        self.assertFalse(self.playback.drain())
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_drain_failed(self, mock_popen):
+        self.init_process(mock_popen, returncode=1)
+        self.playback.start()
+
+        self.assertFalse(self.playback.drain())
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_drain_timeout(self, mock_popen):
+        process = self.init_process(mock_popen)
+        process.wait.side_effect = [subprocess.TimeoutExpired("aplay", 1.0), 0]
+        self.playback.start()
+
+        self.playback.drain(timeout=1.0)
+
+        process.kill.assert_called()
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_stop(self, mock_popen):
+        process = self.init_process(mock_popen)
+        self.playback.start()
+
+        self.playback.stop()
+        self.playback.stop()
+
+        process.terminate.assert_called_once()
+        self.assertTrue(process.stdin.closed)
+
+    @patch("backend.pcmstream.subprocess.Popen")
+    def test_interrupt(self, mock_popen):
+        process = self.init_process(mock_popen)
+        process.poll.return_value = None
+        self.playback.start()
+
+        self.playback.interrupt()
+
+        process.terminate.assert_called_once()
+        self.assertFalse(process.stdin.closed)
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_pcmstream.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import logging
+import sys
+import threading
+import time
+
+sys.path.append("../")
+from backend.prefetchbuffer import PrefetchBuffer
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+
+class FakeSource:
+    def __init__(self, size, fail_after=None):
+        self.location = "fake"
+        self.remaining = size
+        self.fail_after = fail_after
+        self.read_bytes = 0
+        self.opened = False
+        self.closed = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def open(self):
+        self.opened = True
+
+    def read(self, size):
+        self.gate.wait(5.0)
+        if self.fail_after is not None and self.read_bytes >= self.fail_after:
+            raise Exception("Connection reset")
+        size = min(size, self.remaining)
+        self.remaining -= size
+        self.read_bytes += size
+        return b"\x01" * size
+
+    def close(self):
+        self.closed = True
+
+
+class TestPrefetchBuffer(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def _read_all(self, buffer, size=1000):
+        data = b""
+        while True:
+            chunk = buffer.read(size)
+            if not chunk:
+                return data
+            data += chunk
+
+    def test_invalid_watermarks(self):
+        with self.assertRaises(Exception) as cm:
+            PrefetchBuffer(FakeSource(10), 100, 200)
+        self.assertEqual(str(cm.exception), "Invalid prefetch buffer watermarks")
+
+    def test_read_whole_stream(self):
+        source = FakeSource(1000000)
+        buffer = PrefetchBuffer(source, high_watermark=65536, low_watermark=32768)
+        buffer.start()
+
+        data = self._read_all(buffer, 3000)
+
+        self.assertEqual(len(data), 1000000)
+        self.assertTrue(source.opened)
+        stats = buffer.get_stats()
+        self.assertTrue(stats["eof"])
+        self.assertEqual(stats["received"], 1000000)
+        # memory stays bounded whatever the stream length
+        self.assertLessEqual(stats["max_buffered"], 65536 + PrefetchBuffer.READ_SIZE)
+        buffer.close()
+        self.assertTrue(source.closed)
+
+    def test_prefetch_pauses_at_high_watermark(self):
+        source = FakeSource(1000000)
+        buffer = PrefetchBuffer(source, high_watermark=65536, low_watermark=32768)
+        buffer.start()
+
+        self.assertTrue(buffer.wait_filled(5.0))
+        time.sleep(0.1)
+        self.assertEqual(source.read_bytes, 65536)
+
+        # prefetch resumes only under low watermark
+        buffer.read(16384)
+        time.sleep(0.1)
+        self.assertEqual(source.read_bytes, 65536)
+        buffer.read(16384)
+        time.sleep(0.1)
+        self.assertEqual(source.read_bytes, 65536 + 32768)
+        buffer.close()
+
+    def test_wait_filled_short_stream(self):
+        buffer = PrefetchBuffer(FakeSource(100), high_watermark=65536, low_watermark=0)
+        buffer.start()
+
+        self.assertTrue(buffer.wait_filled(5.0))
+        self.assertEqual(len(buffer), 100)
+        self.assertEqual(buffer.read(), b"\x01" * 100)
+
+    def test_read_blocks_until_data_received(self):
+        source = FakeSource(100)
+        source.gate.clear()
+        buffer = PrefetchBuffer(source, high_watermark=1000, low_watermark=500)
+        buffer.start()
+        threading.Timer(0.1, source.gate.set).start()
+
+        self.assertEqual(buffer.read(50), b"\x01" * 50)
+        self.assertEqual(buffer.get_stats()["underruns"], 1)
+
+    def test_source_error(self):
+        source = FakeSource(100000, fail_after=32768)
+        buffer = PrefetchBuffer(source, high_watermark=65536, low_watermark=32768)
+        buffer.start()
+
+        data = self._read_all(buffer)
+
+        self.assertEqual(len(data), 32768)
+        self.assertEqual(buffer.error, "Connection reset")
+        self.assertTrue(source.closed)
+
+    def test_close_unblocks_reader(self):
+        source = FakeSource(100)
+        source.gate.clear()
+        buffer = PrefetchBuffer(source, high_watermark=1000, low_watermark=500)
+        buffer.start()
+        threading.Timer(0.1, buffer.close).start()
+
+        self.assertEqual(buffer.read(50), b"")
+        source.gate.set()
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_prefetchbuffer.py; coverage report -m -i
+    unittest.main()
@@ -0,0 +1,363 @@
+import unittest
+import logging
+import sys
+
+sys.path.append("../")
+from backend.pulseclient import PulseClient, PulsePlayback
+from backend.pulseprotocol import Command, TagStruct, VOLUME_NORM
+from tests.fakepulse import FakePulseServer
+from cleep.libs.tests.common import get_log_level
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+LOG_LEVEL = get_log_level()
+
+USB_SINK = "alsa_output.usb-Generic_USB_Audio-00.analog-stereo"
+USB_SOURCE = "alsa_input.usb-Generic_USB_Audio-00.mono-fallback"
+HDMI_SINK = "alsa_output.platform-fef00700.hdmi.hdmi-stereo"
+
+
+class TestTagStruct(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+
+    def test_encode_decode(self):
+        data = TagStruct()
+        data.put_u32(42).put_string("name").put_string(None).put_bool(True)
+        data.put_sample_spec(3, 2, 48000).put_channel_map([1, 2])
+        data.put_cvolume([VOLUME_NORM, 0]).put_proplist({"device.bus": "usb"})
+        data.put_usec(10).put_u8(1).put_arbitrary(b"\x01\x02")
+
+        packet = TagStruct(data.data)
+
+        self.assertEqual(packet.get_u32(), 42)
+        self.assertEqual(packet.get_string(), "name")
+        self.assertIsNone(packet.get_string())
+        self.assertTrue(packet.get_bool())
+        self.assertEqual(packet.get_sample_spec(), (3, 2, 48000))
+        self.assertEqual(packet.get_channel_map(), [1, 2])
+        self.assertEqual(packet.get_cvolume(), [VOLUME_NORM, 0])
+        self.assertEqual(packet.get_proplist(), {"device.bus": "usb"})
+        self.assertEqual(packet.get_usec(), 10)
+        self.assertEqual(packet.get_u8(), 1)
+        self.assertEqual(packet.get_arbitrary(), b"\x01\x02")
+        self.assertTrue(packet.eof())
+
+    def test_decode_invalid_tag(self):
+        packet = TagStruct(TagStruct().put_string("name").data)
+
+        with self.assertRaises(Exception) as cm:
+            packet.get_u32()
+        self.assertIn("unexpected tag", str(cm.exception))
+
+    def test_decode_truncated(self):
+        packet = TagStruct(TagStruct().put_u32(1).data[:3])
+
+        with self.assertRaises(Exception) as cm:
+            packet.get_u32()
+        self.assertIn("truncated", str(cm.exception))
+
+
+class TestPulseClient(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "native")
+        self.server = None
+        self.client = PulseClient(path=self.path, timeout=2.0)
+
+    def tearDown(self):
+        self.client.close()
+        if self.server:
+            self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def init_session(self, version=FakePulseServer.VERSION):
+        self.server = FakePulseServer(self.path, version=version)
+        self.server.add_sink(HDMI_SINK, "HDMI")
+        self.server.add_sink(USB_SINK, "USB Audio", bus="usb")
+        self.server.add_source(USB_SOURCE, "USB Mic", bus="usb")
+
+    def _wait_until(self, condition, timeout=2.0):
+        end = time.monotonic() + timeout
+        while not condition() and time.monotonic() < end:
+            time.sleep(0.01)
+        return condition()
+
+    @patch("backend.pulseclient.os.getuid", Mock(return_value=1000))
+    def test_get_socket_paths(self):
+        with patch.dict(
+            os.environ,
+            {
+                "PULSE_SERVER": "unix:/tmp/pulse tcp:localhost",
+                "XDG_RUNTIME_DIR": "/run/user/1000",
+            },
+        ):
+            paths = PulseClient.get_socket_paths()
+
+        self.assertEqual(
+            paths,
+            ["/tmp/pulse", "/run/user/1000/pulse/native", "/var/run/pulse/native"],
+        )
+
+    @patch("backend.pulseclient.os.getuid", Mock(return_value=0))
+    def test_get_socket_paths_root(self):
+        with patch.dict(os.environ, {"PULSE_SERVER": ""}):
+            os.environ.pop("XDG_RUNTIME_DIR", None)
+            paths = PulseClient.get_socket_paths()
+
+        self.assertEqual(paths, ["/var/run/pulse/native", "/run/user/0/pulse/native"])
+
+    def test_read_cookie_system_server(self):
+        cookie_path = os.path.join(self.tmp_dir, "cookie")
+        with open(cookie_path, "wb") as cookie_file:
+            cookie_file.write(b"\x02" * 256)
+        client = PulseClient()
+        client.SYSTEM_COOKIE_PATH = cookie_path
+
+        with patch.dict(os.environ, {"PULSE_COOKIE": "", "HOME": "/dummy"}):
+            self.assertEqual(client._read_cookie(), b"\x02" * 256)
+
+    def test_read_cookie(self):
+        cookie_path = os.path.join(self.tmp_dir, "cookie")
+        with open(cookie_path, "wb") as cookie_file:
+            cookie_file.write(b"\x01" * 256)
+
+        self.assertEqual(
+            PulseClient(cookie_path=cookie_path)._read_cookie(), b"\x01" * 256
+        )
+        self.assertEqual(
+            PulseClient(cookie_path="/dummy/cookie")._read_cookie(), bytes(256)
+        )
+
+    def test_get_server_info(self):
+        self.init_session()
+
+        infos = self.client.get_server_info()
+
+        self.assertEqual(
+            infos,
+            {
+                "name": "pulseaudio",
+                "version": "16.1",
+                "default_sink": HDMI_SINK,
+                "default_source": USB_SOURCE,
+            },
+        )
+
+    def test_get_sinks(self):
+        self.init_session()
+
+        sinks = self.client.get_sinks()
+
+        self.assertEqual([sink["name"] for sink in sinks], [HDMI_SINK, USB_SINK])
+        self.assertEqual(sinks[1]["description"], "USB Audio")
+        self.assertEqual(sinks[1]["volumes"], [VOLUME_NORM, VOLUME_NORM])
+        self.assertFalse(sinks[1]["mute"])
+        self.assertEqual(sinks[1]["properties"], {"device.bus": "usb"})
+
+    def test_get_sources(self):
+        self.init_session()
+
+        sources = self.client.get_sources()
+
+        self.assertEqual(
+            [source["name"] for source in sources],
+            [HDMI_SINK + ".monitor", USB_SINK + ".monitor", USB_SOURCE],
+        )
+        self.assertEqual(sources[2]["monitor"], 0xFFFFFFFF)
+
+    def test_single_connection(self):
+        self.init_session()
+
+        self.client.get_sinks()
+        self.client.get_sources()
+        self.client.set_default_sink(USB_SINK)
+
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.commands[Command.AUTH], 1)
+
+    def test_connection_reopened_after_server_restart(self):
+        self.init_session()
+        self.client.get_sinks()
+        self.assertEqual(self.client.get_connection_id(), 1)
+
+        self.server.disconnect_clients()
+        self.assertTrue(
+            self._wait_until(lambda: self.client._PulseClient__socket is None)
+        )
+        sinks = self.client.get_sinks()
+
+        self.assertEqual(len(sinks), 2)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.client.get_connection_id(), 2)
+
+    def test_server_not_available(self):
+        with self.assertRaises(Exception) as cm:
+            self.client.get_sinks()
+        self.assertEqual(str(cm.exception), "PulseAudio server is not available")
+        self.assertFalse(self.client.is_available())
+
+    def test_server_not_available_retry_delayed(self):
+        self.assertFalse(self.client.is_available())
+        self.init_session()
+
+        self.assertFalse(self.client.is_available())
+        self.client._PulseClient__retry_time = 0.0
+        self.assertTrue(self.client.is_available())
+
+    def test_unsupported_protocol_version(self):
+        self.init_session(version=13)
+
+        with self.assertRaises(Exception) as cm:
+            self.client.get_sinks()
+        self.assertIn("Unsupported PulseAudio protocol version", str(cm.exception))
+
+    def test_set_default_sink(self):
+        self.init_session()
+
+        self.client.set_default_sink(USB_SINK)
+
+        self.assertEqual(self.client.get_server_info()["default_sink"], USB_SINK)
+
+    def test_set_default_sink_unknown(self):
+        self.init_session()
+
+        with self.assertRaises(Exception) as cm:
+            self.client.set_default_sink("dummy")
+        self.assertIn("failed with error 5", str(cm.exception))
+
+        # connection is kept after command error
+        self.assertEqual(len(self.client.get_sinks()), 2)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_set_volumes(self):
+        self.init_session()
+
+        self.client.set_sink_volumes(USB_SINK, [VOLUME_NORM // 2] * 2)
+        self.client.set_source_volumes(USB_SOURCE, [VOLUME_NORM // 4])
+
+        self.assertEqual(self.server.get_sink(USB_SINK)["volumes"], [32768, 32768])
+        self.assertEqual(self.server.get_source(USB_SOURCE)["volumes"], [16384])
+
+    def test_update_volumes(self):
+        self.init_session()
+        sink_index = self.server.get_sink(USB_SINK)["index"]
+        source_index = self.server.get_source(USB_SOURCE)["index"]
+        self.client.get_sinks()
+        round_trips = self.server.round_trips
+
+        sink, source = self.client.update_volumes(
+            (sink_index, [VOLUME_NORM // 2] * 2), (source_index, [VOLUME_NORM // 4])
+        )
+
+        self.assertEqual(self.server.round_trips - round_trips, 1)
+        self.assertEqual(sink["name"], USB_SINK)
+        self.assertEqual(sink["volumes"], [32768, 32768])
+        self.assertEqual(source["name"], USB_SOURCE)
+        self.assertEqual(source["volumes"], [16384])
+        self.assertEqual(self.server.commands[Command.SET_SINK_VOLUME], 1)
+        self.assertEqual(self.server.commands[Command.GET_SOURCE_INFO], 1)
+
+    def test_update_volumes_read_only(self):
+        self.init_session()
+
+        sink_index = self.server.get_sink(USB_SINK)["index"]
+
+        sink, source = self.client.update_volumes((sink_index, None))
+
+        self.assertEqual(sink["volumes"], [VOLUME_NORM, VOLUME_NORM])
+        self.assertIsNone(source)
+        self.assertEqual(self.server.commands[Command.SET_SINK_VOLUME], 0)
+
+    def test_update_volumes_unknown_device(self):
+        self.init_session()
+
+        with self.assertRaises(Exception) as cm:
+            self.client.update_volumes(
+                (666, [VOLUME_NORM] * 2),
+                (self.server.get_source(USB_SOURCE)["index"], [VOLUME_NORM // 4]),
+            )
+        self.assertEqual(str(cm.exception), "PulseAudio command 36 failed with error 5")
+
+        # following commands were executed and connection is still usable
+        self.assertEqual(self.server.get_source(USB_SOURCE)["volumes"], [16384])
+        self.assertEqual(len(self.client.get_sinks()), 2)
+
+    def test_playback(self):
+        self.init_session()
+        playback = PulsePlayback(self.client, 48000, 2, sink=USB_SINK)
+        data = bytes(range(256)) * 64
+
+        playback.start()
+        self.assertTrue(playback.is_running())
+        self.assertTrue(playback.write(data))
+        self.assertTrue(playback.drain(1.0))
+
+        self.assertFalse(playback.is_running())
+        self.assertEqual(bytes(self.server.streams[0]), data)
+        self.assertEqual(
+            self.server.stream_infos[0],
+            {"sink": USB_SINK, "spec": (3, 2, 48000), "name": "Cleep audio"},
+        )
+        self.assertEqual(self.server.commands[Command.DELETE_PLAYBACK_STREAM], 1)
+
+    def test_playback_already_running(self):
+        self.init_session()
+        playback = PulsePlayback(self.client, 48000)
+        playback.start()
+
+        with self.assertRaises(Exception) as cm:
+            playback.start()
+        self.assertEqual(str(cm.exception), "Stream is already running")
+
+    def test_playback_unsupported_format(self):
+        self.init_session()
+
+        with self.assertRaises(Exception):
+            self.client.create_playback_stream("test", 48000, 1, "S24_LE")
+
+    def test_playback_stop(self):
+        self.init_session()
+        playback = PulsePlayback(self.client, 48000)
+        playback.start()
+
+        playback.stop()
+
+        self.assertFalse(playback.is_running())
+        self.assertFalse(playback.write(b"\x00" * 4))
+        self.assertFalse(playback.drain())
+
+    def test_playback_stream_killed(self):
+        self.init_session()
+        playback = PulsePlayback(self.client, 48000)
+        playback.start()
+
+        self.server.kill_stream(0)
+
+        self.assertTrue(self._wait_until(lambda: not playback.is_running()))
+        self.assertFalse(playback.write(b"\x00" * 4))
+
+    def test_playback_connection_lost(self):
+        self.init_session()
+        playback = PulsePlayback(self.client, 48000)
+        playback.start()
+
+        self.server.disconnect_clients()
+
+        self.assertTrue(self._wait_until(lambda: not playback.is_running()))
+        self.assertFalse(playback.write(b"\x00" * 4))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_pulseclient.py; coverage report -m -i
+    unittest.main()
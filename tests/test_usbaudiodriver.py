@@ -4,6 +4,10 @@ import sys
 
 sys.path.append("../")
 from backend.usbaudiodriver import UsbAudioDriver
+from backend.controlmap import ControlMap
+from backend.pulseclient import PulseClient, PulsePlayback
+from backend.pulseprotocol import Command, VOLUME_NORM
+from tests.fakepulse import FakePulseServer
 from cleep.exception import (
     InvalidParameter,
     MissingParameter,
@@ -13,11 +17,39 @@ from cleep.exception import (
 from cleep.libs.tests import session, lib
 from cleep.libs.tests.common import get_log_level
 import os
+import shutil
+import tempfile
 import time
 from unittest.mock import Mock, MagicMock, patch
 
 LOG_LEVEL = get_log_level()
 
+CONTENTS = [
+    "numid=1,iface=MIXER,name='PCM Playback Switch'",
+    "  ; type=BOOLEAN,access=rw------,values=1",
+    "  : values=on",
+    "numid=2,iface=MIXER,name='PCM Playback Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=2,min=0,max=30,step=0",
+    "  : values=20,20",
+    "  | dBminmax-min=-45.00dB,max=0.00dB",
+]
+HEADSET_CONTENTS = CONTENTS + [
+    "numid=3,iface=MIXER,name='Mic Capture Switch'",
+    "  ; type=BOOLEAN,access=rw------,values=1",
+    "  : values=on",
+    "numid=4,iface=MIXER,name='Mic Capture Volume'",
+    "  ; type=INTEGER,access=rw---R--,values=1,min=0,max=127,step=0",
+    "  : values=64",
+    "  | dBminmax-min=0.00dB,max=23.81dB",
+]
+USB_SINK = "alsa_output.usb-Generic_USB_Audio-00.analog-stereo"
+USB_SOURCE = "alsa_input.usb-Generic_USB_Audio-00.mono-fallback"
+HDMI_SINK = "alsa_output.platform-fef00700.hdmi.hdmi-stereo"
+PCM_LISTING = [
+    "00-00: bcm2835 Headphones : bcm2835 Headphones : playback 8\n",
+    "01-00: USB Audio : USB Audio : playback 1 : capture 1\n",
+]
+
 
 class TestUsbAudioDriver(unittest.TestCase):
     def setUp(self):
@@ -27,8 +59,14 @@ class TestUsbAudioDriver(unittest.TestCase):
             format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
         )
 
+        self.server = None
+        self.tmp_dir = None
+
     def tearDown(self):
-        pass
+        if self.server:
+            self.driver.pulse.close()
+            self.server.stop()
+            shutil.rmtree(self.tmp_dir)
 
     def init_session(self, card_name="UACDemoV10"):
         self.driver = UsbAudioDriver()
@@ -36,6 +74,27 @@ class TestUsbAudioDriver(unittest.TestCase):
         self.driver._get_card_name = Mock(return_value=card_name)
 
         self.driver._on_registered()
+        self.driver.controls.session_factory = None
+        # no sound server by default
+        self.driver.pulse = Mock()
+        self.driver.pulse.get_sinks.side_effect = Exception("Not available")
+
+    def init_pulse(self, usb_source=True):
+        self.tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.tmp_dir, "native")
+        self.server = FakePulseServer(path)
+        self.server.add_sink(HDMI_SINK, "HDMI")
+        self.server.add_sink(USB_SINK, "USB Audio", bus="usb")
+        if usb_source:
+            self.server.add_source(USB_SOURCE, "USB Mic", bus="usb")
+        self.driver.pulse = PulseClient(path=path, timeout=2.0)
+        self.driver.console = Mock()
+
+    def _wait_until(self, condition, timeout=2.0):
+        end = time.monotonic() + timeout
+        while not condition() and time.monotonic() < end:
+            time.sleep(0.01)
+        return condition()
 
     def test__get_card_name(self):
         self.driver = UsbAudioDriver()
@@ -77,11 +136,52 @@ class TestUsbAudioDriver(unittest.TestCase):
 
     def test_card_capabilities(self):
         self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(None, None))
 
-        (playback, capture) = self.driver.get_card_capabilities()
+        playback, capture = self.driver.get_card_capabilities()
 
         self.assertTrue(playback)
         self.assertFalse(capture)
+        self.assertIsNone(self.driver.capabilities)
+
+    def test_card_capabilities_from_pcm_listing(self):
+        self.init_session()
+        console = self.init_controls()
+        self.driver._read_pcm_listing = Mock(return_value=PCM_LISTING)
+
+        playback, capture = self.driver.get_card_capabilities()
+
+        self.assertTrue(playback)
+        self.assertTrue(capture)
+        self.assertFalse(console.command.called)
+
+    def test_card_capabilities_from_controls(self):
+        self.init_session()
+        console = self.init_controls()
+        self.driver._read_pcm_listing = Mock(return_value=[])
+
+        self.assertEqual(self.driver.get_card_capabilities(), (True, False))
+
+        console.command.assert_called_once_with("amixer -c 1 contents")
+
+    def test_card_capabilities_cached(self):
+        self.init_session()
+        self.init_controls()
+        self.driver._read_pcm_listing = Mock(return_value=PCM_LISTING)
+
+        self.driver.get_card_capabilities()
+        self.driver.get_card_capabilities()
+        self.assertEqual(self.driver._read_pcm_listing.call_count, 1)
+
+        self.driver.on_cards_changed()
+        self.driver.get_card_capabilities()
+        self.assertEqual(self.driver._read_pcm_listing.call_count, 2)
+
+    def test__read_pcm_listing(self):
+        self.init_session()
+        self.driver.PCM_PATH = "/dummy/pcm"
+
+        self.assertEqual(self.driver._read_pcm_listing(), [])
 
     @patch("backend.usbaudiodriver.ConfigTxt")
     @patch("backend.usbaudiodriver.EtcAsoundConf")
@@ -121,6 +221,64 @@ class TestUsbAudioDriver(unittest.TestCase):
             self.driver._install()
         self.assertEqual(str(cm.exception), "Error enabling USB audio")
 
+    @patch("backend.usbaudiodriver.ConfigTxt")
+    @patch("backend.usbaudiodriver.EtcAsoundConf")
+    @patch("backend.usbaudiodriver.Console")
+    def test__install_system_server(self, mock_console, mock_asound, mock_configtxt):
+        self.init_session()
+        mock_console.return_value.command = Mock(return_value={"returncode": 0})
+        mock_configtxt.return_value.enable_audio.return_value = True
+
+        self.assertTrue(self.driver._install())
+
+        self.driver.cleep_filesystem.write_data.assert_called_once_with(
+            "/etc/systemd/system/cleep-pulseaudio.service",
+            UsbAudioDriver.PULSE_SERVICE_CONTENT,
+        )
+        self.assertIn("--system", UsbAudioDriver.PULSE_SERVICE_CONTENT)
+        commands = [
+            call[0][0] for call in mock_console.return_value.command.call_args_list
+        ]
+        self.assertEqual(
+            commands[1:],
+            [
+                "usermod -a -G pulse-access root",
+                "systemctl --global disable pulseaudio.service pulseaudio.socket",
+                "systemctl daemon-reload",
+                "systemctl enable --now cleep-pulseaudio.service",
+            ],
+        )
+
+    @patch("backend.usbaudiodriver.ConfigTxt")
+    @patch("backend.usbaudiodriver.EtcAsoundConf")
+    @patch("backend.usbaudiodriver.Console")
+    def test__install_system_server_write_failed(
+        self, mock_console, mock_asound, mock_configtxt
+    ):
+        self.init_session()
+        mock_console.return_value.command = Mock(return_value={"returncode": 0})
+        self.driver.cleep_filesystem.write_data.return_value = False
+
+        self.assertFalse(self.driver._install())
+
+        self.assertEqual(mock_console.return_value.command.call_count, 1)
+        self.assertFalse(mock_configtxt.return_value.enable_audio.called)
+
+    @patch("backend.usbaudiodriver.ConfigTxt")
+    @patch("backend.usbaudiodriver.EtcAsoundConf")
+    @patch("backend.usbaudiodriver.Console")
+    def test__install_system_server_command_failed(
+        self, mock_console, mock_asound, mock_configtxt
+    ):
+        self.init_session()
+        mock_console.return_value.command = Mock(
+            side_effect=[{"returncode": 0}, {"returncode": 6}]
+        )
+
+        self.assertFalse(self.driver._install())
+
+        self.assertFalse(mock_configtxt.return_value.enable_audio.called)
+
     @patch("backend.usbaudiodriver.Console")
     def test__uninstall(self, mock_console):
         self.init_session()
@@ -128,6 +286,13 @@ class TestUsbAudioDriver(unittest.TestCase):
 
         self.assertTrue(self.driver._uninstall())
 
+        mock_console.return_value.command.assert_any_call(
+            "systemctl disable --now cleep-pulseaudio.service"
+        )
+        self.driver.cleep_filesystem.rm.assert_called_with(
+            "/etc/systemd/system/cleep-pulseaudio.service"
+        )
+
     @patch("backend.usbaudiodriver.Console")
     def test__uninstall_failed(self, mock_console):
         self.init_session()
@@ -163,6 +328,30 @@ class TestUsbAudioDriver(unittest.TestCase):
         mock_asoundconf.return_value.save_default_file.assert_called_with(1, 1)
         self.driver.alsa.save.assert_called()
 
+    @patch("backend.usbaudiodriver.EtcAsoundConf")
+    def test_enable_updates_enabled_status(self, mock_asoundconf):
+        self.init_session()
+        self.driver.get_cardid_deviceid = Mock(return_value=(1, 1))
+        self.driver.alsa = Mock()
+        self.driver.is_card_enabled = Mock(return_value=True)
+        mock_asoundconf.return_value.exists.return_value = False
+        self.assertFalse(self.driver.is_enabled())
+
+        self.driver.enable()
+
+        self.assertTrue(self.driver.is_enabled())
+        self.assertEqual(mock_asoundconf.return_value.exists.call_count, 1)
+
+    @patch("backend.usbaudiodriver.Console")
+    def test_is_intalled_memoized(self, mock_console):
+        self.init_session()
+        mock_console.return_value.command = Mock(return_value={"returncode": 0})
+
+        self.assertTrue(self.driver.is_installed())
+        self.assertTrue(self.driver.is_installed())
+
+        mock_console.return_value.command.assert_called_once_with("dpkg -s pulseaudio")
+
     def test_enable_no_card_name(self):
         self.init_session(card_name=None)
         self.driver.logger.error = Mock()
@@ -227,50 +416,394 @@ class TestUsbAudioDriver(unittest.TestCase):
 
         self.assertFalse(self.driver.is_enabled())
 
+    def init_controls(self):
+        console = Mock()
+        console.command.return_value = {"returncode": 0, "stdout": CONTENTS}
+        self.driver.controls = ControlMap(console)
+        self.driver.get_cardid_deviceid = Mock(return_value=(1, 0))
+        return console
+
     def test__set_volumes_controls(self):
         self.init_session()
-        self.driver.alsa = Mock()
-        self.driver.alsa.get_simple_controls.return_value = ["PCM"]
-        self.driver.get_control_numid = Mock(return_value=3)
+        self.init_controls()
 
         self.driver._set_volumes_controls()
 
         self.assertEqual(self.driver.volume_control, "PCM")
-        self.assertEqual(self.driver.volume_control_numid, 3)
+        self.assertEqual(self.driver.volume_control_numid, 2)
+
+    def test_on_cards_changed(self):
+        self.init_session()
+        console = self.init_controls()
+        self.driver.get_volumes()
+        self.driver.get_volumes()
+
+        self.driver.on_cards_changed()
+        self.driver.get_volumes()
+
+        self.assertEqual(self.driver.get_cardid_deviceid.call_count, 2)
+        self.assertEqual(console.command.call_count, 5)
 
     def test_get_volumes(self):
         self.init_session()
-        self.driver.alsa = Mock()
-        self.driver.alsa.get_volume.return_value = 12
+        console = self.init_controls()
 
         result = self.driver.get_volumes()
 
+        console.command.assert_called_with("amixer -c 1 cget numid=2")
         self.assertDictEqual(
             result,
             {
-                "playback": 12,
+                "playback": 46,
                 "capture": None,
             },
         )
 
     def test_set_volumes(self):
         self.init_session()
-        self.driver.alsa = Mock()
-        self.driver.alsa.set_volume.return_value = 34
-        self.driver.volume_control = "VOL_CTRL"
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[3:5] + ["  : values=8,8"]},
+        ]
 
         result = self.driver.set_volumes(12, 34)
 
         self.assertDictEqual(
             result,
             {
-                "playback": 34,
+                "playback": 12,
                 "capture": None,
             },
         )
-        self.driver.alsa.set_volume.assert_called_with(
-            "VOL_CTRL", self.driver.VOLUME_PATTERN, 12
+        console.command.assert_called_with("amixer -c 1 cset numid=2 -- 8")
+
+    def test_get_volumes_with_capture(self):
+        self.init_session()
+        console = self.init_controls()
+        console.command.return_value = {"returncode": 0, "stdout": HEADSET_CONTENTS}
+
+        result = self.driver.get_volumes()
+
+        # both controls read in a single round trip
+        console.command.assert_called_with(
+            "amixer -c 1 cget numid=2 ; amixer -c 1 cget numid=4"
         )
+        self.assertEqual(console.command.call_count, 2)
+        self.assertDictEqual(result, {"playback": 46, "capture": 39})
+
+    def test_set_volumes_capture_only(self):
+        self.init_session()
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": HEADSET_CONTENTS},
+            {
+                "returncode": 0,
+                "stdout": HEADSET_CONTENTS[3:7]
+                + HEADSET_CONTENTS[10:12]
+                + ["  : values=127"],
+            },
+        ]
+
+        result = self.driver.set_volumes(None, 100)
+
+        console.command.assert_called_with(
+            "amixer -c 1 cget numid=2 ; amixer -c 1 cset numid=4 -- 127"
+        )
+        self.assertDictEqual(result, {"playback": 46, "capture": 100})
+
+    def test_set_volumes_session(self):
+        self.init_session()
+        console = self.init_controls()
+        console.command.return_value = {"returncode": 0, "stdout": HEADSET_CONTENTS}
+        session = Mock()
+        session.execute.return_value = [
+            HEADSET_CONTENTS[3:5] + ["  : values=21,21", HEADSET_CONTENTS[6]],
+            HEADSET_CONTENTS[10:12] + ["  : values=127", HEADSET_CONTENTS[13]],
+        ]
+        self.driver.controls.session_factory = Mock(return_value=session)
+
+        result = self.driver.set_volumes(50, 100)
+
+        # single round trip through mixer session
+        session.execute.assert_called_once_with([(2, "21", 4), (4, "127", 4)])
+        self.assertEqual(console.command.call_count, 1)
+        self.assertDictEqual(result, {"playback": 50, "capture": 100})
+
+    def test_set_volumes_no_card(self):
+        self.init_session()
+        console = self.init_controls()
+        self.driver.get_cardid_deviceid.return_value = (None, None)
+
+        result = self.driver.set_volumes(12, 34)
+
+        self.assertDictEqual(result, {"playback": None, "capture": None})
+        self.assertFalse(console.command.called)
+
+    def test_get_channel_volumes(self):
+        self.init_session()
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[3:5] + ["  : values=30,21"]},
+        ]
+
+        result = self.driver.get_channel_volumes()
+        # main volume is loudest channel
+        console.command.side_effect = None
+        console.command.return_value = {
+            "returncode": 0,
+            "stdout": CONTENTS[3:5] + ["  : values=21,30"],
+        }
+        volumes = self.driver.get_volumes()
+
+        console.command.assert_called_with("amixer -c 1 cget numid=2")
+        self.assertEqual(volumes["playback"], 100)
+        self.assertDictEqual(result, {"playback": [100, 50], "capture": None})
+
+    def test_set_channel_volumes(self):
+        self.init_session()
+        console = self.init_controls()
+        console.command.side_effect = [
+            {"returncode": 0, "stdout": CONTENTS},
+            {"returncode": 0, "stdout": CONTENTS[3:5] + ["  : values=30,21"]},
+        ]
+
+        result = self.driver.set_channel_volumes([100, 50], None)
+
+        console.command.assert_called_with("amixer -c 1 cset numid=2 -- 30,21")
+        self.assertDictEqual(result, {"playback": [100, 50], "capture": None})
+
+    def test_set_channel_volumes_invalid_channels(self):
+        self.init_session()
+        console = self.init_controls()
+
+        with self.assertRaises(Exception) as cm:
+            self.driver.set_channel_volumes([100, 50, 20], None)
+        self.assertEqual(
+            str(cm.exception), 'Control "PCM Playback Volume" has 2 channel(s)'
+        )
+        self.assertEqual(console.command.call_count, 1)
+
+    def test_enable_pulse(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.is_card_enabled = Mock(return_value=True)
+
+        self.assertTrue(self.driver.enable())
+
+        self.assertEqual(self.server.default_sink, USB_SINK)
+        self.driver.asoundconf.delete.assert_called()
+        self.assertFalse(self.driver.asoundconf.save_default_file.called)
+        self.assertTrue(self.driver.is_enabled())
+        self.assertEqual(self.server.connections, 1)
+
+    @patch("backend.pulseclient.os.getuid", Mock(return_value=0))
+    def test_enable_pulse_system_server_as_root(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.pulse.close()
+        with patch.dict(os.environ, {"PULSE_SERVER": "", "XDG_RUNTIME_DIR": "/dummy"}):
+            with patch.object(
+                PulseClient, "SYSTEM_SOCKET_PATH", os.path.join(self.tmp_dir, "native")
+            ):
+                # driver client with default socket resolution, as Cleep runs it
+                self.driver._on_audio_registered()
+                self.driver.controls.session_factory = None
+                self.driver.is_card_enabled = Mock(return_value=True)
+
+                self.assertTrue(self.driver.enable())
+
+        self.assertEqual(self.server.default_sink, USB_SINK)
+
+    def test_enable_pulse_set_default_sink_failed(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.pulse.set_default_sink = Mock(side_effect=Exception("Test"))
+
+        self.assertFalse(self.driver.enable())
+
+    def test_enable_pulse_no_usb_sink(self):
+        self.init_session()
+        self.init_pulse()
+        self.server.sinks.pop()
+        self.driver.get_cardid_deviceid = Mock(return_value=(1, 0))
+        self.driver.alsa = Mock()
+
+        self.assertTrue(self.driver.enable())
+
+        self.driver.asoundconf.save_default_file.assert_called_with(1, 0)
+        self.assertEqual(self.server.default_sink, HDMI_SINK)
+
+    def test_is_enabled_pulse(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.is_card_enabled = Mock(return_value=True)
+
+        self.assertFalse(self.driver.is_enabled())
+        self.server.default_sink = USB_SINK
+        self.driver.on_cards_changed()
+        self.assertTrue(self.driver.is_enabled())
+
+    def test_disable_pulse(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.is_card_enabled = Mock(return_value=True)
+        self.driver.enable()
+
+        self.assertTrue(self.driver.disable())
+
+        self.assertFalse(self.driver.is_enabled())
+
+    def test_get_volumes_pulse(self):
+        self.init_session()
+        self.init_pulse()
+        self.server.get_sink(USB_SINK)["volumes"] = [VOLUME_NORM // 2, VOLUME_NORM // 4]
+        self.server.get_source(USB_SOURCE)["volumes"] = [VOLUME_NORM]
+
+        result = self.driver.get_volumes()
+
+        self.assertDictEqual(result, {"playback": 50, "capture": 100})
+        self.assertFalse(self.driver.console.command.called)
+
+    def test_get_volumes_pulse_no_capture(self):
+        self.init_session()
+        self.init_pulse(usb_source=False)
+
+        result = self.driver.get_volumes()
+
+        # sink monitor is not a capture source
+        self.assertDictEqual(result, {"playback": 100, "capture": None})
+
+    def test_set_volumes_pulse(self):
+        self.init_session()
+        self.init_pulse()
+
+        result = self.driver.set_volumes(playback=25, capture=None)
+
+        self.assertDictEqual(result, {"playback": 25, "capture": 100})
+        self.assertEqual(self.server.get_sink(USB_SINK)["volumes"], [16384, 16384])
+        self.assertEqual(self.server.get_sink(HDMI_SINK)["volumes"], [VOLUME_NORM] * 2)
+        self.assertFalse(self.driver.console.command.called)
+
+    def test_set_volumes_pulse_single_round_trip(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.get_volumes()
+        round_trips = self.server.round_trips
+
+        result = self.driver.set_volumes(playback=50, capture=25)
+
+        self.assertDictEqual(result, {"playback": 50, "capture": 25})
+        self.assertEqual(self.server.round_trips - round_trips, 1)
+
+    def test_set_volumes_pulse_returns_server_volumes(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.get_volumes()
+        # volume changed by another server client
+        self.server.get_source(USB_SOURCE)["volumes"] = [VOLUME_NORM // 4]
+
+        result = self.driver.set_volumes(playback=50, capture=None)
+
+        self.assertDictEqual(result, {"playback": 50, "capture": 25})
+
+    def test_set_volumes_pulse_devices_cached(self):
+        self.init_session()
+        self.init_pulse()
+
+        self.driver.get_volumes()
+        self.driver.set_volumes(playback=50, capture=25)
+        self.driver.set_channel_volumes(playback=[50, 25])
+
+        self.assertEqual(self.server.commands[Command.GET_SINK_INFO_LIST], 1)
+        self.assertEqual(self.server.commands[Command.GET_SOURCE_INFO_LIST], 1)
+
+    def test_set_volumes_pulse_devices_refreshed_on_cards_changed(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.get_volumes()
+
+        self.driver.on_cards_changed()
+        self.driver.set_volumes(playback=50, capture=25)
+
+        self.assertEqual(self.server.commands[Command.GET_SINK_INFO_LIST], 2)
+
+    def test_set_volumes_pulse_devices_refreshed_on_server_restart(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.get_volumes()
+
+        self.server.disconnect_clients()
+        self.assertTrue(
+            self._wait_until(lambda: self.driver.pulse._PulseClient__socket is None)
+        )
+        result = self.driver.set_volumes(playback=50, capture=25)
+
+        self.assertDictEqual(result, {"playback": 50, "capture": 25})
+        self.assertEqual(self.server.commands[Command.GET_SINK_INFO_LIST], 2)
+
+    def test_set_volumes_pulse_failed(self):
+        self.init_session()
+        self.init_pulse()
+        self.driver.get_volumes()
+        # source removed from server while cached
+        self.server.sources.remove(self.server.get_source(USB_SOURCE))
+
+        result = self.driver.set_volumes(playback=150, capture=10)
+
+        self.assertDictEqual(result, {"playback": None, "capture": None})
+        self.assertEqual(self.server.get_sink(USB_SINK)["volumes"], [VOLUME_NORM] * 2)
+        self.assertIsNone(self.driver.pulse_devices)
+        self.assertDictEqual(
+            self.driver.get_volumes(), {"playback": 100, "capture": None}
+        )
+
+    def test_get_channel_volumes_pulse(self):
+        self.init_session()
+        self.init_pulse()
+        self.server.get_sink(USB_SINK)["volumes"] = [VOLUME_NORM // 2, VOLUME_NORM // 4]
+
+        result = self.driver.get_channel_volumes()
+
+        self.assertDictEqual(result, {"playback": [50, 25], "capture": [100]})
+
+    def test_set_channel_volumes_pulse(self):
+        self.init_session()
+        self.init_pulse()
+
+        result = self.driver.set_channel_volumes(playback=[100, 25])
+
+        self.assertDictEqual(result, {"playback": [100, 25], "capture": [100]})
+        self.assertEqual(
+            self.server.get_sink(USB_SINK)["volumes"], [VOLUME_NORM, 16384]
+        )
+
+    def test_set_channel_volumes_pulse_invalid_channels(self):
+        self.init_session()
+        self.init_pulse()
+
+        with self.assertRaises(Exception) as cm:
+            self.driver.set_channel_volumes(playback=None, capture=[10, 10])
+        self.assertEqual(str(cm.exception), f'Device "{USB_SOURCE}" has 1 channel(s)')
+
+    def test_create_playback_pulse(self):
+        self.init_session()
+        self.init_pulse()
+
+        playback = self.driver.create_playback(48000, 2)
+
+        self.assertTrue(isinstance(playback, PulsePlayback))
+        playback.start()
+        self.assertTrue(playback.write(b"\x00" * 1024))
+        self.assertTrue(playback.drain(1.0))
+        self.assertEqual(self.server.stream_infos[0]["sink"], USB_SINK)
+        self.assertEqual(len(self.server.streams[0]), 1024)
+
+    def test_create_playback_no_pulse(self):
+        self.init_session()
+
+        self.assertIsNone(self.driver.create_playback(48000, 2))
 
     def test_require_reboot(self):
         self.init_session()
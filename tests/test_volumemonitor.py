@@ -0,0 +1,98 @@
+import unittest
+import logging
+import sys
+import threading
+
+sys.path.append("../")
+from backend.volumemonitor import VolumeMonitor
+from cleep.libs.tests.common import get_log_level
+
+LOG_LEVEL = get_log_level()
+
+MONITOR_OUTPUT = [
+    "node hw:1, #3 (2,0,0,PCM Playback Volume,0) VALUE",
+    "node hw:1, #3 (2,0,0,PCM Playback Volume,0) VALUE",
+    "card 1, #5 (2,0,0,Mic Capture Volume,0) VALUE",
+    "node hw:1, #7 (2,0,0,Auto Gain Control,0) VALUE",
+    "node hw:1, #3 (2,0,0,PCM Playback Volume,0) INFO",
+    "dummy line",
+]
+
+
+class TestVolumeMonitor(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format=u"%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.changes = []
+        self.notified = threading.Event()
+
+    def tearDown(self):
+        self.monitor.stop()
+
+    def _on_change(self, controls):
+        self.changes.append(controls)
+        self.notified.set()
+
+    def _init_monitor(self, lines):
+        # simulated monitor prints events as alsactl monitor does
+        command = ["printf", "\\n".join(lines) + "\\n"]
+        self.monitor = VolumeMonitor(self._on_change, command)
+
+    def test_parse_event(self):
+        self.monitor = VolumeMonitor(self._on_change)
+
+        self.assertEqual(
+            self.monitor.parse_event(MONITOR_OUTPUT[0]),
+            {"card": 1, "numid": 3, "name": "PCM Playback Volume"},
+        )
+        self.assertEqual(
+            self.monitor.parse_event(MONITOR_OUTPUT[2]),
+            {"card": 1, "numid": 5, "name": "Mic Capture Volume"},
+        )
+        self.assertIsNone(self.monitor.parse_event(MONITOR_OUTPUT[3]))
+        self.assertIsNone(self.monitor.parse_event(MONITOR_OUTPUT[4]))
+        self.assertIsNone(self.monitor.parse_event(MONITOR_OUTPUT[5]))
+
+    def test_changes_coalesced(self):
+        self._init_monitor(MONITOR_OUTPUT)
+
+        self.monitor.start()
+
+        self.assertTrue(self.notified.wait(5.0))
+        self.assertEqual(len(self.changes), 1)
+        self.assertCountEqual([control["numid"] for control in self.changes[0]], [3, 5])
+
+    def test_monitor_end(self):
+        self._init_monitor(["dummy"])
+
+        self.monitor.start()
+
+        for _ in range(100):
+            if not self.monitor.is_running():
+                break
+            threading.Event().wait(0.02)
+        self.assertFalse(self.monitor.is_running())
+        self.assertEqual(self.changes, [])
+
+    def test_start_failed(self):
+        self.monitor = VolumeMonitor(self._on_change, ["dummy-alsactl", "monitor"])
+
+        with self.assertRaises(Exception) as cm:
+            self.monitor.start()
+        self.assertTrue(str(cm.exception).startswith("Unable to monitor volumes"))
+        self.assertFalse(self.monitor.is_running())
+
+    def test_on_change_exception(self):
+        self._init_monitor(MONITOR_OUTPUT[:1])
+        self.monitor.on_change = lambda controls: self.notified.set() or 1 / 0
+
+        self.monitor.start()
+
+        self.assertTrue(self.notified.wait(5.0))
+
+
+if __name__ == "__main__":
+    # coverage run --omit="*lib/python*/*","test_*" --concurrency=thread test_volumemonitor.py; coverage report -m -i
+    unittest.main()